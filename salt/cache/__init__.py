@@ -8,6 +8,7 @@ Loader mechanism for caching data, with data expiration, etc.
 # Import Python libs
 from __future__ import absolute_import
 import logging
+import os
 import time
 
 # Import Salt libs
@@ -17,9 +18,17 @@ from salt.payload import Serial
 from salt.utils.odict import OrderedDict
 import salt.loader
 import salt.syspaths
+import salt.utils
+import salt.utils.atomicfile
+import salt.utils.process
 
 log = logging.getLogger(__name__)
 
+# Directory of the cachedir the MemCache counters of each process are written
+# to, and how often
+MEMCACHE_STATS_DIR = '.memcache_stats'
+MEMCACHE_STATS_INTERVAL = 10
+
 
 def factory(opts, **kwargs):
     '''
@@ -178,6 +187,87 @@ class Cache(object):
         fun = '{0}.fetch'.format(self.driver)
         return self.modules[fun](bank, key, **self._kwargs)
 
+    def fetch_many(self, items):
+        '''
+        Fetch the data of many keys, using a single request to the cache
+        backend when the driver supports it
+
+        .. versionadded:: Oxygen
+
+        :param items:
+            An iterable of ``(bank, key)`` tuples.
+
+        :return:
+            Return a dict mapping each ``(bank, key)`` tuple to the python
+            object fetched from the cache, or an empty dict if the key was not
+            found.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        '''
+        items = list(items)
+        fun = '{0}.fetch_many'.format(self.driver)
+        if fun in self.modules:
+            return self.modules[fun](items, **self._kwargs)
+        ret = {}
+        for bank, key in items:
+            ret[(bank, key)] = self.fetch(bank, key)
+        return ret
+
+    def store_many(self, items):
+        '''
+        Store the data of many keys, using a single request to the cache
+        backend when the driver supports it
+
+        .. versionadded:: Oxygen
+
+        :param items:
+            A dict mapping ``(bank, key)`` tuples to the data to store.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        '''
+        fun = '{0}.store_many'.format(self.driver)
+        if fun in self.modules:
+            return self.modules[fun](items, **self._kwargs)
+        for (bank, key), data in six.iteritems(items):
+            self.store(bank, key, data)
+
+    def list_with_data(self, bank, key):
+        '''
+        Fetch the data stored under the same key in every entry of a bank,
+        such as the ``data`` key of all the ``minions/<minion id>`` banks,
+        using as few requests to the cache backend as the driver allows
+
+        .. versionadded:: Oxygen
+
+        :param bank:
+            The name of the bank holding the entries.
+
+        :param key:
+            The name of the key to fetch in each entry of the bank.
+
+        :return:
+            Return a dict mapping the name of each entry holding the key to
+            the python object fetched from the cache. Entries without the key
+            are left out.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        '''
+        fun = '{0}.list_with_data'.format(self.driver)
+        if fun in self.modules:
+            return self.modules[fun](bank, key, **self._kwargs)
+        ret = {}
+        for entry in self.ls(bank):
+            sub_bank = '{0}/{1}'.format(bank, entry)
+            if self.contains(sub_bank, key):
+                ret[entry] = self.fetch(sub_bank, key)
+        return ret
+
     def updated(self, bank, key):
         '''
         Get the last updated epoch for the specified key
@@ -272,33 +362,108 @@ class Cache(object):
 
 class MemCache(Cache):
     '''
-    Short-lived in-memory cache store keeping values on time and/or size (count)
-    basis.
+    Short-lived in-memory cache store keeping values on time and/or size (count
+    or bytes) basis, evicting the least recently used values first.
+
+    The hits, misses and evictions are counted per top level bank, see
+    :py:func:`memcache_stats`.
     '''
     # {<storage_id>: odict({<key>: [atime, data], ...}), ...}
     data = {}
+    # {<storage_id>: [<total bytes>, {<key>: bytes, ...}], ...}, only
+    # maintained when memcache_max_bytes is set
+    sizes = {}
+    # {<bank>: {'hits': int, 'misses': int, 'evictions': int}, ...} counted by
+    # the current process
+    stats = {}
+    _stats_pid = None
+    _stats_written = 0
 
     def __init__(self, opts, **kwargs):
         super(MemCache, self).__init__(opts, **kwargs)
         self.expire = opts.get('memcache_expire_seconds', 10)
         self.max = opts.get('memcache_max_items', 1024)
+        self.max_bytes = opts.get('memcache_max_bytes', 0)
         self.cleanup = opts.get('memcache_full_cleanup', False)
         self.debug = opts.get('memcache_debug', False)
         if self.debug:
             self.call = 0
             self.hit = 0
         self._storage = None
+        self._storage_id = None
 
     @classmethod
     def __cleanup(cls, expire):
         now = time.time()
-        for storage in six.itervalues(cls.data):
+        for storage_id, storage in six.iteritems(cls.data):
             for key, data in list(storage.items()):
                 if data[0] + expire < now:
-                    del storage[key]
+                    cls._evict(storage_id, key)
                 else:
                     break
 
+    @classmethod
+    def _evict(cls, storage_id, key=None):
+        '''
+        Evict a value, the least recently used one if no key is passed
+        '''
+        storage = cls.data[storage_id]
+        if key is None:
+            key = next(iter(storage))
+        del storage[key]
+        cls._forget_size(storage_id, key)
+        cls._count(key[0], 'evictions')
+
+    @classmethod
+    def _forget_size(cls, storage_id, key):
+        sizes = cls.sizes.get(storage_id)
+        if sizes is not None:
+            sizes[0] -= sizes[1].pop(key, 0)
+
+    @classmethod
+    def _count(cls, bank, counter):
+        '''
+        Count a hit, miss or eviction of a key of the bank
+        '''
+        if cls._stats_pid != os.getpid():
+            # The counters of the parent process are not ours to report
+            cls.stats = {}
+            cls._stats_pid = os.getpid()
+        bank = bank.split('/', 1)[0]
+        if bank not in cls.stats:
+            cls.stats[bank] = {'hits': 0, 'misses': 0, 'evictions': 0}
+        cls.stats[bank][counter] += 1
+
+    def _write_stats(self, now):
+        '''
+        Periodically write the counters of the process where
+        :py:func:`memcache_stats` reads them
+        '''
+        if now - MemCache._stats_written < MEMCACHE_STATS_INTERVAL:
+            return
+        MemCache._stats_written = now
+        stats = {}
+        for bank, counters in six.iteritems(MemCache.stats):
+            stats[bank] = dict(counters, items=0, bytes=0)
+        for storage_id, storage in six.iteritems(MemCache.data):
+            sizes = MemCache.sizes.get(storage_id, (0, {}))[1]
+            for key in storage:
+                bank = key[0].split('/', 1)[0]
+                if bank not in stats:
+                    stats[bank] = {'hits': 0, 'misses': 0, 'evictions': 0,
+                                   'items': 0, 'bytes': 0}
+                stats[bank]['items'] += 1
+                stats[bank]['bytes'] += sizes.get(key, 0)
+        stats_dir = _memcache_stats_dir(self.opts)
+        try:
+            if not os.path.isdir(stats_dir):
+                os.makedirs(stats_dir)
+            with salt.utils.atomicfile.atomic_open(
+                    os.path.join(stats_dir, str(os.getpid())), 'wb') as fh_:
+                self.serial.dump(stats, fh_)
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write the memcache stats: {0}'.format(exc))
+
     def _get_storage_id(self):
         fun = '{0}.storage_id'.format(self.driver)
         if fun in self.modules:
@@ -313,46 +478,158 @@ class MemCache(Cache):
             if storage_id not in MemCache.data:
                 MemCache.data[storage_id] = OrderedDict()
             self._storage = MemCache.data[storage_id]
+            self._storage_id = storage_id
         return self._storage
 
+    def _drop(self, key):
+        '''
+        Remove a value from memory, return its record
+        '''
+        record = self.storage.pop(key, None)
+        if record is not None:
+            MemCache._forget_size(self._storage_id, key)
+        return record
+
+    def _keep(self, bank, key, record):
+        '''
+        Keep a record in memory, evicting the least recently used values to
+        stay within the item and byte limits
+        '''
+        if len(self.storage) >= self.max:
+            if self.cleanup:
+                MemCache.__cleanup(self.expire)
+            if self.storage and len(self.storage) >= self.max:
+                MemCache._evict(self._storage_id)
+        if self.max_bytes:
+            try:
+                size = len(self.serial.dumps(record[1]))
+            except Exception:  # pylint: disable=broad-except
+                size = 0
+            if size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return
+            sizes = MemCache.sizes.setdefault(self._storage_id, [0, {}])
+            while self.storage and sizes[0] + size > self.max_bytes:
+                MemCache._evict(self._storage_id)
+            sizes[0] += size
+            sizes[1][(bank, key)] = size
+        self.storage[(bank, key)] = record
+
+    def _hit(self, bank, key, now):
+        '''
+        Return the record of an unexpired value kept in memory, marked as the
+        most recently used, or None
+        '''
+        record = self.storage.pop((bank, key), None)
+        if record is not None and record[0] + self.expire >= now:
+            MemCache._count(bank, 'hits')
+            record[0] = now
+            self.storage[(bank, key)] = record
+            return record
+        if record is not None:
+            MemCache._forget_size(self._storage_id, (bank, key))
+        MemCache._count(bank, 'misses')
+        return None
+
     def fetch(self, bank, key):
         if self.debug:
             self.call += 1
         now = time.time()
-        record = self.storage.pop((bank, key), None)
+        record = self._hit(bank, key, now)
+        self._write_stats(now)
         # Have a cached value for the key
-        if record is not None and record[0] + self.expire >= now:
+        if record is not None:
             if self.debug:
                 self.hit += 1
                 log.debug('MemCache stats (call/hit/rate): '
                           '{0}/{1}/{2}'.format(self.call,
                                                self.hit,
                                                float(self.hit) / self.call))
-            # update atime and return
-            record[0] = now
-            self.storage[(bank, key)] = record
             return record[1]
 
         # Have no value for the key or value is expired
         data = super(MemCache, self).fetch(bank, key)
-        if len(self.storage) >= self.max:
-            if self.cleanup:
-                MemCache.__cleanup(self.expire)
-            if len(self.storage) >= self.max:
-                self.storage.popitem(last=False)
-        self.storage[(bank, key)] = [now, data]
+        self._keep(bank, key, [now, data])
         return data
 
+    def fetch_many(self, items):
+        now = time.time()
+        ret = {}
+        missing = []
+        for bank, key in items:
+            record = self._hit(bank, key, now)
+            if record is not None:
+                ret[(bank, key)] = record[1]
+            else:
+                missing.append((bank, key))
+        self._write_stats(now)
+        if missing:
+            fetched = super(MemCache, self).fetch_many(missing)
+            for (bank, key), data in six.iteritems(fetched):
+                self._keep(bank, key, [now, data])
+            ret.update(fetched)
+        return ret
+
     def store(self, bank, key, data):
-        self.storage.pop((bank, key), None)
+        self._drop((bank, key))
         super(MemCache, self).store(bank, key, data)
-        if len(self.storage) >= self.max:
-            if self.cleanup:
-                MemCache.__cleanup(self.expire)
-            if len(self.storage) >= self.max:
-                self.storage.popitem(last=False)
-        self.storage[(bank, key)] = [time.time(), data]
+        self._keep(bank, key, [time.time(), data])
+
+    def store_many(self, items):
+        for bank_key in items:
+            self._drop(bank_key)
+        super(MemCache, self).store_many(items)
+        now = time.time()
+        for (bank, key), data in six.iteritems(items):
+            self._keep(bank, key, [now, data])
 
     def flush(self, bank, key=None):
-        self.storage.pop((bank, key), None)
+        self._drop((bank, key))
         super(MemCache, self).flush(bank, key)
+
+
+def _memcache_stats_dir(opts):
+    return os.path.join(opts.get('cachedir', salt.syspaths.CACHE_DIR),
+                        MEMCACHE_STATS_DIR)
+
+
+def memcache_stats(opts):
+    '''
+    Return the memcache counters of the running processes, summed per top
+    level bank: the number of ``hits``, ``misses`` and ``evictions``, and the
+    number of ``items`` kept in memory along with their size in ``bytes``
+    (only measured when ``memcache_max_bytes`` is set).
+
+    The processes write their counters every few seconds, the counters of the
+    processes which are gone are removed.
+
+    .. versionadded:: Oxygen
+    '''
+    serial = Serial(opts)
+    stats_dir = _memcache_stats_dir(opts)
+    ret = {}
+    if not os.path.isdir(stats_dir):
+        return ret
+    for name in os.listdir(stats_dir):
+        path = os.path.join(stats_dir, name)
+        if not name.isdigit():
+            continue
+        if not salt.utils.process.os_is_running(int(name)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with salt.utils.fopen(path, 'rb') as fh_:
+                stats = serial.load(fh_)
+        except (IOError, OSError, ValueError):
+            continue
+        for bank, counters in six.iteritems(stats):
+            bank_stats = ret.setdefault(bank, {})
+            for counter, value in six.iteritems(counters):
+                bank_stats[counter] = bank_stats.get(counter, 0) + value
+    for counters in six.itervalues(ret):
+        lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        counters['hit_rate'] = float(counters.get('hits', 0)) / lookups if lookups else 0.0
+    return ret
@@ -121,6 +121,58 @@ def fetch(bank, key):
         )
 
 
+def _get_tree(bank):
+    '''
+    Return the keys and values stored below the bank with a single request
+    '''
+    try:
+        _, values = api.kv.get(bank + '/', recurse=True)
+    except Exception as exc:
+        raise SaltCacheError(
+            'There was an error reading the keys below "{0}": {1}'.format(
+                bank, exc
+            )
+        )
+    return dict((value['Key'], value['Value']) for value in values or [])
+
+
+def fetch_many(items):
+    '''
+    Fetch many key values. Consul has no multi-key get, the keys are read
+    with a single request per bank.
+    '''
+    banks = {}
+    for bank, key in items:
+        banks.setdefault(bank, []).append(key)
+    ret = {}
+    for bank, keys in banks.items():
+        if len(keys) == 1:
+            ret[(bank, keys[0])] = fetch(bank, keys[0])
+            continue
+        tree = _get_tree(bank)
+        for key in keys:
+            value = tree.get('{0}/{1}'.format(bank, key))
+            ret[(bank, key)] = {} if value is None else __context__['serial'].loads(value)
+    return ret
+
+
+def list_with_data(bank, key):
+    '''
+    Fetch the value of the key in every entry of the bank with a single
+    request reading the whole bank.
+    '''
+    ret = {}
+    prefix = bank + '/'
+    suffix = '/' + key
+    for c_key, value in _get_tree(bank).items():
+        if not c_key.endswith(suffix) or value is None:
+            continue
+        entry = c_key[len(prefix):-len(suffix)]
+        if entry and '/' not in entry:
+            ret[entry] = __context__['serial'].loads(value)
+    return ret
+
+
 def flush(bank, key=None):
     '''
     Remove the key from the cache bank with all the key content.
@@ -152,6 +152,67 @@ def fetch(bank, key):
         )
 
 
+def _get_tree(bank):
+    '''
+    Return the keys and values stored below the bank with a single recursive
+    read, keyed by their path relative to the bank
+    '''
+    path = '{0}/{1}'.format(path_prefix, bank)
+    try:
+        result = client.read(path, recursive=True)
+    except etcd.EtcdKeyNotFound:
+        return {}
+    except Exception as exc:
+        raise SaltCacheError(
+            'There was an error reading the keys below "{0}": {1}'.format(
+                path, exc
+            )
+        )
+    ret = {}
+    for leaf in result.leaves:
+        if not leaf.dir and leaf.key.startswith(path + '/'):
+            ret[leaf.key[len(path) + 1:]] = leaf.value
+    return ret
+
+
+def fetch_many(items):
+    '''
+    Fetch many key values. The keys of a bank are read with a single
+    recursive read of the bank.
+    '''
+    _init_client()
+    banks = {}
+    for bank, key in items:
+        banks.setdefault(bank, []).append(key)
+    ret = {}
+    for bank, keys in banks.items():
+        if len(keys) == 1:
+            ret[(bank, keys[0])] = fetch(bank, keys[0])
+            continue
+        tree = _get_tree(bank)
+        for key in keys:
+            value = tree.get(key)
+            ret[(bank, key)] = {} if value is None else __context__['serial'].loads(value)
+    return ret
+
+
+def list_with_data(bank, key):
+    '''
+    Fetch the value of the key in every entry of the bank with a single
+    recursive read of the bank.
+    '''
+    _init_client()
+    ret = {}
+    suffix = '/' + key
+    for rel_key, value in _get_tree(bank).items():
+        if not rel_key.endswith(suffix) or value is None:
+            continue
+        entry = rel_key[:-len(suffix)]
+        if entry and '/' not in entry:
+            ret[entry] = __context__['serial'].loads(value)
+    return ret
+
+
 def flush(bank, key=None):
     '''
     Remove the key from the cache bank with all the key content.
@@ -29,6 +29,23 @@ could be set in the master config. These are the defaults:
     mysql.database: salt_cache
     mysql.table_name: cache
 
+The cache calls of all the threads of a master process share a pool of
+connections. These are the defaults of the pool settings:
+
+.. code-block:: yaml
+
+    # Maximum number of connections open by a process
+    mysql.pool_size: 10
+    # Seconds to wait for a free connection before failing the cache call
+    mysql.pool_timeout: 10
+    # Connections idle for longer than this many seconds are pinged before
+    # being used, and replaced if the ping fails
+    mysql.health_check_interval: 30
+    # Seconds to wait for the server to answer or accept a query, no timeout
+    # by default
+    mysql.read_timeout: None
+    mysql.write_timeout: None
+
 Related docs could be found in the `python-mysql documentation`_.
 
 To use the mysql as a minion data cache backend, set the master ``cache`` config
@@ -45,7 +62,11 @@ value to ``mysql``:
 '''
 from __future__ import absolute_import
 from time import sleep
+import contextlib
 import logging
+import os
+import threading
+import time
 try:
     import MySQLdb
     HAS_MYSQL = True
@@ -53,13 +74,20 @@ except ImportError:
     HAS_MYSQL = False
 
 from salt.exceptions import SaltCacheError
+from salt.ext.six.moves import queue, range  # pylint: disable=import-error,redefined-builtin
 
 _DEFAULT_DATABASE_NAME = "salt_cache"
 _DEFAULT_CACHE_TABLE_NAME = "cache"
 _RECONNECT_INTERVAL_SEC = 0.050
+# Number of keys stored or fetched by a single query of store_many/fetch_many
+_BATCH_SIZE = 1000
+_DEFAULT_POOL_SIZE = 10
+_DEFAULT_POOL_TIMEOUT = 10
+_DEFAULT_HEALTH_CHECK_INTERVAL = 30
 
 log = logging.getLogger(__name__)
-client = None
+_pool = None
+_pool_lock = threading.Lock()
 _mysql_kwargs = None
 _table_name = None
 
@@ -79,10 +107,107 @@ def __virtual__():
     return __virtualname__
 
 
+class _PooledConnection(object):
+    '''
+    A connection checked out of the pool, reconnected in place by run_query
+    '''
+    def __init__(self, conn=None):
+        self.conn = conn
+        self.last_used = time.time()
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def reconnect(self):
+        self.close()
+        self.conn = MySQLdb.connect(**_mysql_kwargs)
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:  # pylint: disable=broad-except
+                pass
+            self.conn = None
+
+
+class ConnectionPool(object):
+    '''
+    A pool of at most ``size`` connections shared by the threads of a
+    process. Connections are created when needed, and the ones which were
+    idle for more than ``health_check_interval`` seconds are pinged before
+    being handed out. A process forked from the one which created the pool
+    does not use the connections of its parent.
+    '''
+    def __init__(self, size=_DEFAULT_POOL_SIZE, timeout=_DEFAULT_POOL_TIMEOUT,
+                 health_check_interval=_DEFAULT_HEALTH_CHECK_INTERVAL):
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._reset()
+
+    def _reset(self):
+        if getattr(self, '_queue', None) is not None:
+            # Closing, or garbage collecting, the connections of the parent
+            # process would close them for the parent too
+            self._inherited.append(self._queue)
+        else:
+            self._inherited = []
+        self._pid = os.getpid()
+        self._queue = queue.LifoQueue(self.size)
+        # Free slots without a connection yet
+        for _ in range(self.size):
+            self._queue.put(None)
+
+    def _get(self):
+        if self._pid != os.getpid():
+            self._reset()
+        try:
+            pooled = self._queue.get(timeout=self.timeout)
+        except queue.Empty:
+            raise SaltCacheError(
+                'Timed out waiting for a MySQL connection after {0}s, all {1} '
+                'connections are in use'.format(self.timeout, self.size)
+            )
+        if pooled is None:
+            return _PooledConnection()
+        if time.time() - pooled.last_used > self.health_check_interval:
+            try:
+                pooled.conn.ping()
+            except Exception as exc:  # pylint: disable=broad-except
+                log.info("mysql_cache: dropping stale db connection: %r", exc)
+                pooled.close()
+        return pooled
+
+    def _put(self, pooled):
+        if self._pid != os.getpid():
+            return
+        if pooled is not None and pooled.conn is None:
+            pooled = None
+        elif pooled is not None:
+            pooled.last_used = time.time()
+        self._queue.put(pooled)
+
+    @contextlib.contextmanager
+    def connection(self):
+        '''
+        Check a connection out of the pool for the duration of the block
+        '''
+        pooled = self._get()
+        try:
+            yield pooled
+        except Exception:
+            # The connection may be left in the middle of a query
+            pooled.close()
+            raise
+        finally:
+            self._put(pooled)
+
+
 def run_query(conn, query, retries=3):
     '''
-    Get a cursor and run a query. Reconnect up to `retries` times if
-    needed.
+    Get a cursor and run a query on a connection of the pool. Reconnect up to
+    `retries` times if needed.
     Returns: cursor, affected rows counter
     Raises: SaltCacheError, AttributeError, MySQLdb.OperationalError
     '''
@@ -95,20 +220,19 @@ def run_query(conn, query, retries=3):
             raise
         # reconnect creating new client
         sleep(_RECONNECT_INTERVAL_SEC)
-        if conn is None:
+        if conn.conn is None:
             log.debug("mysql_cache: creating db connection")
         else:
             log.info("mysql_cache: recreating db connection due to: %r", e)
-        global client
-        client = MySQLdb.connect(**_mysql_kwargs)
-        return run_query(client, query, retries - 1)
+        conn.reconnect()
+        return run_query(conn, query, retries - 1)
     except Exception as e:
         if len(query) > 150:
             query = query[:150] + "<...>"
         raise SaltCacheError("Error running {0}: {1}".format(query, e))
 
 
-def _create_table():
+def _create_table(pool):
     '''
     Create table if needed
     '''
@@ -119,30 +243,39 @@ def _create_table():
             _mysql_kwargs['db'],
             _table_name,
         )
-    cur, _ = run_query(client, query)
-    r = cur.fetchone()
-    cur.close()
-    if r[0] == 1:
-        return
-
-    query = """CREATE TABLE IF NOT EXISTS {0} (
-      bank CHAR(255),
-      etcd_key CHAR(255),
-      data MEDIUMBLOB,
-      PRIMARY KEY(bank, etcd_key)
-    );""".format(_table_name)
-    log.info("mysql_cache: creating table %s", _table_name)
-    cur, _ = run_query(client, query)
-    cur.close()
+    with pool.connection() as conn:
+        cur, _ = run_query(conn, query)
+        r = cur.fetchone()
+        cur.close()
+        if r[0] == 1:
+            return
+
+        query = """CREATE TABLE IF NOT EXISTS {0} (
+          bank CHAR(255),
+          etcd_key CHAR(255),
+          data MEDIUMBLOB,
+          PRIMARY KEY(bank, etcd_key)
+        );""".format(_table_name)
+        log.info("mysql_cache: creating table %s", _table_name)
+        cur, _ = run_query(conn, query)
+        cur.close()
 
 
 def _init_client():
-    """Initialize connection and create table if needed
+    """Initialize the connection pool and create table if needed
     """
-    if client is not None:
+    if _pool is not None:
         return
+    with _pool_lock:
+        if _pool is None:
+            _setup_pool()
+
 
-    global _mysql_kwargs, _table_name
+def _setup_pool():
+    '''
+    Set up the connection pool from the master configuration
+    '''
+    global _pool, _mysql_kwargs, _table_name
     _mysql_kwargs = {
         'host': __opts__.get('mysql.host', '127.0.0.1'),
         'user': __opts__.get('mysql.user', None),
@@ -151,19 +284,28 @@ def _init_client():
         'port': __opts__.get('mysql.port', 3306),
         'unix_socket': __opts__.get('mysql.unix_socket', None),
         'connect_timeout': __opts__.get('mysql.connect_timeout', None),
+        'read_timeout': __opts__.get('mysql.read_timeout', None),
+        'write_timeout': __opts__.get('mysql.write_timeout', None),
         'autocommit': True,
     }
-    _table_name = __opts__.get('mysql.table_name', _table_name)
+    _table_name = __opts__.get('mysql.table_name', _DEFAULT_CACHE_TABLE_NAME)
     # TODO: handle SSL connection parameters
 
-    for k, v in _mysql_kwargs.items():
+    for k, v in list(_mysql_kwargs.items()):
         if v is None:
             _mysql_kwargs.pop(k)
     kwargs_copy = _mysql_kwargs.copy()
     kwargs_copy['passwd'] = "<hidden>"
     log.info("mysql_cache: Setting up client with params: %r", kwargs_copy)
-    # The MySQL client is created later on by run_query
-    _create_table()
+    # The MySQL connections are created later on by run_query
+    pool = ConnectionPool(
+        size=__opts__.get('mysql.pool_size', _DEFAULT_POOL_SIZE),
+        timeout=__opts__.get('mysql.pool_timeout', _DEFAULT_POOL_TIMEOUT),
+        health_check_interval=__opts__.get('mysql.health_check_interval',
+                                           _DEFAULT_HEALTH_CHECK_INTERVAL),
+    )
+    _create_table(pool)
+    _pool = pool
 
 
 def store(bank, key, data):
@@ -174,8 +316,9 @@ def store(bank, key, data):
     data = __context__['serial'].dumps(data)
     query = "REPLACE INTO {0} (bank, etcd_key, data) values('{1}', '{2}', " \
         "'{3}')".format(_table_name, bank, key, data)
-    cur, cnt = run_query(client, query)
-    cur.close()
+    with _pool.connection() as conn:
+        cur, cnt = run_query(conn, query)
+        cur.close()
     if cnt not in (1, 2):
         raise SaltCacheError(
             'Error storing {0} {1} returned {2}'.format(bank, key, cnt)
@@ -189,14 +332,83 @@ def fetch(bank, key):
     _init_client()
     query = "SELECT data FROM {0} WHERE bank='{1}' AND etcd_key='{2}'".format(
         _table_name, bank, key)
-    cur, _ = run_query(client, query)
-    r = cur.fetchone()
-    cur.close()
+    with _pool.connection() as conn:
+        cur, _ = run_query(conn, query)
+        r = cur.fetchone()
+        cur.close()
     if r is None:
         return {}
     return __context__['serial'].loads(r[0])
 
 
+def store_many(items):
+    '''
+    Store many key values with a single query per batch of keys.
+    '''
+    _init_client()
+    items = list(items.items())
+    for pos in range(0, len(items), _BATCH_SIZE):
+        batch = items[pos:pos + _BATCH_SIZE]
+        values = ", ".join(
+            "('{0}', '{1}', '{2}')".format(bank, key, __context__['serial'].dumps(data))
+            for (bank, key), data in batch
+        )
+        query = "REPLACE INTO {0} (bank, etcd_key, data) values {1}".format(
+            _table_name, values)
+        with _pool.connection() as conn:
+            cur, cnt = run_query(conn, query)
+            cur.close()
+        # A replaced row counts twice
+        if not len(batch) <= cnt <= 2 * len(batch):
+            raise SaltCacheError(
+                'Error storing {0} keys returned {1}'.format(len(batch), cnt)
+            )
+
+
+def fetch_many(items):
+    '''
+    Fetch many key values with a single query per batch of keys.
+    '''
+    _init_client()
+    items = list(items)
+    ret = dict((bank_key, {}) for bank_key in items)
+    for pos in range(0, len(items), _BATCH_SIZE):
+        query = "SELECT bank, etcd_key, data FROM {0} WHERE (bank, etcd_key) " \
+            "IN ({1})".format(
+                _table_name,
+                ", ".join("('{0}', '{1}')".format(bank, key)
+                          for bank, key in items[pos:pos + _BATCH_SIZE]))
+        with _pool.connection() as conn:
+            cur, _ = run_query(conn, query)
+            for bank, key, data in cur.fetchall():
+                ret[(bank, key)] = __context__['serial'].loads(data)
+            cur.close()
+    return ret
+
+
+def list_with_data(bank, key):
+    '''
+    Fetch the value of the key in every entry of the bank with a single query.
+    '''
+    _init_client()
+    query = "SELECT bank, data FROM {0} WHERE bank LIKE '{1}/%' " \
+        "AND etcd_key='{2}'".format(_table_name, bank, key)
+    with _pool.connection() as conn:
+        cur, _ = run_query(conn, query)
+        rows = cur.fetchall()
+        cur.close()
+    ret = {}
+    prefix = '{0}/'.format(bank)
+    for row_bank, data in rows:
+        entry = row_bank[len(prefix):]
+        # LIKE wildcards in the bank name can match other banks, and only the
+        # direct entries of the bank are returned
+        if not row_bank.startswith(prefix) or '/' in entry:
+            continue
+        ret[entry] = __context__['serial'].loads(data)
+    return ret
+
+
 def flush(bank, key=None):
     '''
     Remove the key from the cache bank with all the key content.
@@ -206,8 +418,9 @@ def flush(bank, key=None):
     if key is not None:
         query += " AND etcd_key='{0}'".format(key)
 
-    cur, _ = run_query(client, query)
-    cur.close()
+    with _pool.connection() as conn:
+        cur, _ = run_query(conn, query)
+        cur.close()
 
 
 def ls(bank):
@@ -218,9 +431,10 @@ def ls(bank):
     _init_client()
     query = "SELECT etcd_key FROM {0} WHERE bank='{1}'".format(
         _table_name, bank)
-    cur, _ = run_query(client, query)
-    out = [row[0] for row in cur.fetchall()]
-    cur.close()
+    with _pool.connection() as conn:
+        cur, _ = run_query(conn, query)
+        out = [row[0] for row in cur.fetchall()]
+        cur.close()
     return out
 
 
@@ -231,7 +445,8 @@ def contains(bank, key):
     _init_client()
     query = "SELECT COUNT(data) FROM {0} WHERE bank='{1}' " \
         "AND etcd_key='{2}'".format(_table_name, bank, key)
-    cur, _ = run_query(client, query)
-    r = cur.fetchone()
-    cur.close()
+    with _pool.connection() as conn:
+        cur, _ = run_query(conn, query)
+        r = cur.fetchone()
+        cur.close()
     return r[0] == 1
@@ -77,6 +77,29 @@ db: ``'0'``
 password:
     Redis connection password.
 
+The cache calls of all the threads of a master process share a pool of
+connections, configured using:
+
+max_connections: ``50``
+    The maximum number of connections open by a process.
+
+pool_timeout: ``20``
+    Seconds to wait for a free connection, when all of them are in use, before
+    failing the cache call.
+
+socket_timeout: ``None``
+    Seconds to wait for the answer of the Redis server to a command. No
+    timeout by default.
+
+socket_connect_timeout: ``None``
+    Seconds to wait for a connection to the Redis server to be established.
+    No timeout by default.
+
+health_check_interval: ``0``
+    Connections idle for longer than this many seconds are checked with a
+    ``PING`` before being used. Requires redis-py 3.3.0 or later, ``0``
+    disables the checks.
+
 Configuration Example:
 
 .. code-block::yaml
@@ -85,6 +108,8 @@ Configuration Example:
     cache.redis.port: 6379
     cache.redis.db: '0'
     cache.redis.password: my pass
+    cache.redis.max_connections: 100
+    cache.redis.socket_timeout: 5
     cache.redis.bank_prefix: #BANK
     cache.redis.bank_keys_prefix: #BANKEYS
     cache.redis.key_prefix: #KEY
@@ -106,7 +131,9 @@ except ImportError:
     HAS_REDIS = False
 
 # Import salt
-from salt.ext.six.moves import range
+import salt.utils
+from salt.ext import six
+from salt.ext.six.moves import range, zip  # pylint: disable=redefined-builtin
 from salt.exceptions import SaltCacheError
 
 # -----------------------------------------------------------------------------
@@ -154,24 +181,43 @@ def _get_redis_cache_opts():
         'host': __opts__.get('cache.redis.host', 'localhost'),
         'port': __opts__.get('cache.redis.port', 6379),
         'db': __opts__.get('cache.redis.db', '0'),
-        'password': __opts__.get('cache.redis.password', '')
+        'password': __opts__.get('cache.redis.password', ''),
+        'max_connections': __opts__.get('cache.redis.max_connections', 50),
+        'pool_timeout': __opts__.get('cache.redis.pool_timeout', 20),
+        'socket_timeout': __opts__.get('cache.redis.socket_timeout', None),
+        'socket_connect_timeout': __opts__.get('cache.redis.socket_connect_timeout', None),
+        'health_check_interval': __opts__.get('cache.redis.health_check_interval', 0),
     }
 
 
 def _get_redis_server(opts=None):
     '''
     Return the Redis server instance.
-    Caching the object instance.
+    Caching the object instance, its connection pool is shared by all the
+    cache calls of the process.
     '''
     global REDIS_SERVER
     if REDIS_SERVER:
         return REDIS_SERVER
     if not opts:
         opts = _get_redis_cache_opts()
-    REDIS_SERVER = redis.Redis(opts['host'],
-                               opts['port'],
-                               db=opts['db'],
-                               password=opts['password'])
+    pool_kwargs = {
+        'host': opts['host'],
+        'port': opts['port'],
+        'db': opts['db'],
+        'password': opts['password'],
+        'max_connections': opts.get('max_connections', 50),
+        'timeout': opts.get('pool_timeout', 20),
+        'socket_timeout': opts.get('socket_timeout'),
+        'socket_connect_timeout': opts.get('socket_connect_timeout'),
+    }
+    if opts.get('health_check_interval'):
+        # Only known to redis-py >= 3.3.0
+        pool_kwargs['health_check_interval'] = opts['health_check_interval']
+    # Blocks for a free connection instead of failing once max_connections
+    # are in use. The pool drops the connections inherited through a fork.
+    pool = redis.BlockingConnectionPool(**pool_kwargs)
+    REDIS_SERVER = redis.Redis(connection_pool=pool)
     return REDIS_SERVER
 
 
@@ -314,6 +360,87 @@ def fetch(bank, key):
     return __context__['serial'].loads(redis_value)
 
 
+def store_many(items):
+    '''
+    Store the data of many keys using a single Redis pipeline.
+    '''
+    redis_server = _get_redis_server()
+    redis_pipe = redis_server.pipeline()
+    banks = set()
+    try:
+        for (bank, key), data in six.iteritems(items):
+            if bank not in banks:
+                _build_bank_hier(bank, redis_pipe)
+                banks.add(bank)
+            redis_pipe.set(_get_key_redis_key(bank, key), __context__['serial'].dumps(data))
+            redis_pipe.sadd(_get_bank_keys_redis_key(bank), key)
+        log.debug('Setting the value of {0} keys'.format(len(items)))
+        redis_pipe.execute()
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = 'Cannot set the Redis cache keys: {rerr}'.format(rerr=rerr)
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+
+
+def fetch_many(items):
+    '''
+    Fetch the data of many keys from the Redis cache, using a single MGET.
+    '''
+    if not items:
+        return {}
+    redis_server = _get_redis_server()
+    redis_keys = [_get_key_redis_key(bank, key) for bank, key in items]
+    try:
+        redis_values = redis_server.mget(redis_keys)
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = 'Cannot fetch the Redis cache keys: {rerr}'.format(rerr=rerr)
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+    ret = {}
+    for bank_key, redis_value in zip(items, redis_values):
+        if redis_value is None:
+            ret[bank_key] = {}
+        else:
+            ret[bank_key] = __context__['serial'].loads(redis_value)
+    return ret
+
+
+def list_with_data(bank, key):
+    '''
+    Fetch the data of the key in every entry of the bank: one pipelined
+    request to get the entries of the bank, and one MGET for their data.
+    '''
+    redis_server = _get_redis_server()
+    redis_pipe = redis_server.pipeline()
+    redis_pipe.smembers(_get_bank_redis_key(bank))
+    redis_pipe.smembers(_get_bank_keys_redis_key(bank))
+    try:
+        sub_banks, bank_keys = redis_pipe.execute()
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = 'Cannot list the Redis cache bank {rbank}: {rerr}'.format(rbank=bank,
+                                                                          rerr=rerr)
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+    entries = sorted(set(salt.utils.to_str(entry)
+                         for entry in (sub_banks or set()) | (bank_keys or set())))
+    if not entries:
+        return {}
+    redis_keys = [_get_key_redis_key('{0}/{1}'.format(bank, entry), key)
+                  for entry in entries]
+    try:
+        redis_values = redis_server.mget(redis_keys)
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = 'Cannot fetch the Redis cache keys under {rbank}: {rerr}'.format(rbank=bank,
+                                                                                rerr=rerr)
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+    ret = {}
+    for entry, redis_value in zip(entries, redis_values):
+        if redis_value is not None:
+            ret[entry] = __context__['serial'].loads(redis_value)
+    return ret
+
+
 def flush(bank, key=None):
     '''
     Remove the key from the cache bank with all the key content. If no key is specified, remove
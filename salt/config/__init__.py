@@ -346,6 +346,15 @@ VALID_OPTS = {
     # The chunk size to use when streaming files with the file server
     'file_buffer_size': int,
 
+    # The number of chunk requests a minion keeps in flight when it fetches a
+    # file from the master
+    'file_transfer_window': int,
+
+    # Store the files fetched from the master once by hash in the minion cache,
+    # and the megabytes of blobs kept once no cached file links to them
+    'file_blob_cache': bool,
+    'file_blob_cache_size': int,
+
     # The TCP port on which minion events should be published if ipc_mode is TCP
     'tcp_pub_port': int,
 
@@ -434,6 +443,18 @@ VALID_OPTS = {
     # Fire events as state chunks are processed by the state compiler
     'state_events': bool,
 
+    # The number of worker processes running the state chunks whose requisites are met, 0 runs the
+    # chunks one after another
+    'state_workers': int,
+
+    # Cache the data rendered from the SLS and top files, and the low chunks compiled from the
+    # high data, for as long as the files and the grains and pillar they read are unchanged
+    'state_render_cache': bool,
+
+    # Cache the outcome of loading the module files, so that the modules which failed to load
+    # are not imported again, until the next saltutil.sync_* or module refresh
+    'virtual_cache': bool,
+
     # The number of seconds a minion should wait before retry when attempting authentication
     'acceptance_wait_time': float,
 
@@ -535,6 +556,21 @@ VALID_OPTS = {
     # TODO unknown option!
     'auth_mode': int,
 
+    # The cipher the master and the minions encrypt their messages with,
+    # aes-cbc or aes-gcm
+    'session_cipher': str,
+
+    # The number of authentication requests the master workers process at
+    # once, 0 for no limit. The other minions are told to retry later.
+    'auth_queue_size': int,
+
+    # The seconds the minions told to retry their authentication wait for
+    'auth_retry_after': int,
+
+    # The number of minion keys, and the AES key encrypted for them, each
+    # master worker caches
+    'auth_cache_size': int,
+
     # listen queue size / backlog
     'zmq_backlog': int,
 
@@ -542,6 +578,13 @@ VALID_OPTS = {
     # http://api.zeromq.org/3-2:zmq-setsockopt
     'pub_hwm': int,
 
+    # Seconds a master worker holds its publications, to send them to the
+    # publisher together. 0 sends each publication right away.
+    'zmq_pub_batch_window': float,
+
+    # The maximum number of publications sent to the publisher together
+    'zmq_pub_batch_size': int,
+
     # IPC buffer size
     # Refs https://github.com/saltstack/salt/issues/34215
     'ipc_write_buffer': int,
@@ -708,6 +751,10 @@ VALID_OPTS = {
     'fileserver_limit_traversal': bool,
     'fileserver_verify_config': bool,
 
+    # Track the changes below the file_roots with inotify, instead of walking them on every
+    # fileserver update, and keep the roots file lists until a file of their saltenv changes
+    'fileserver_inotify': bool,
+
     # Optionally enables keeping the calculated user's auth list in the token file.
     'keep_acl_in_token': bool,
 
@@ -749,12 +796,20 @@ VALID_OPTS = {
     # Specify whether the master should store end times for jobs as returns come in
     'job_cache_store_endtime': bool,
 
+    # Append the returns of a job to a single segment file in the local job cache instead of
+    # creating a directory and files per minion return
+    'job_cache_segments': bool,
+
     # The minion data cache is a cache of information about the minions stored on the master.
     # This information is primarily the pillar and grains data. The data is cached in the master
     # cachedir under the name of the minion and used to predetermine what minions are expected to
     # reply from executions.
     'minion_data_cache': bool,
 
+    # Maintain an inverted index of the grains and pillar held in the minion data cache and use it
+    # to resolve grain and pillar targets instead of scanning the cached data of every minion.
+    'minion_data_index': bool,
+
     # The number of seconds between AES key rotations on the master
     'publish_session': int,
 
@@ -852,6 +907,9 @@ VALID_OPTS = {
     # If set, the master will sign all publications before they are sent out
     'sign_pub_messages': bool,
 
+    # The algorithm the master signs its publications with, rsa or ed25519
+    'pub_sign_algorithm': str,
+
     # The size of key that should be generated when creating new keys
     'keysize': int,
 
@@ -946,6 +1004,14 @@ VALID_OPTS = {
     # Use zmq.SUSCRIBE to limit listening sockets to only process messages bound for them
     'zmq_filtering': bool,
 
+    # The target types the master resolves to minion ids, to only send jobs to
+    # the targeted minions. Jobs with other target types are broadcast. Types
+    # resolved with the minion data cache (grain, pillar...) are opt-in.
+    'pub_route_target_types': list,
+
+    # Broadcast jobs targeting more minions than this, 0 for no limit
+    'pub_route_max_minions': int,
+
     # Connection caching. Can greatly speed up salt performance.
     'con_cache': bool,
     'rotate_aes_key': bool,
@@ -1005,6 +1071,8 @@ VALID_OPTS = {
     'memcache_expire_seconds': int,
     # Set a memcache limit in items (bank + key) per cache storage (driver + driver_opts).
     'memcache_max_items': int,
+    # Set a memcache limit in bytes of serialized data per cache storage, 0 for no limit.
+    'memcache_max_bytes': int,
     # Each time a cache storage got full cleanup all the expired items not just the oldest one.
     'memcache_full_cleanup': bool,
     # Enable collecting the memcache stats and log it on `debug` log level.
@@ -1215,6 +1283,9 @@ DEFAULT_MINION_OPTS = {
     'ipc_write_buffer': _DFLT_IPC_WBUFFER,
     'ipv6': None,
     'file_buffer_size': 262144,
+    'file_transfer_window': 4,
+    'file_blob_cache': False,
+    'file_blob_cache_size': 512,
     'tcp_pub_port': 4510,
     'tcp_pull_port': 4511,
     'tcp_authentication_retries': 5,
@@ -1239,6 +1310,9 @@ DEFAULT_MINION_OPTS = {
     'state_auto_order': True,
     'state_events': False,
     'state_aggregate': False,
+    'state_workers': 0,
+    'state_render_cache': False,
+    'virtual_cache': False,
     'snapper_states': False,
     'snapper_states_config': 'root',
     'acceptance_wait_time': 10,
@@ -1349,7 +1423,13 @@ DEFAULT_MASTER_OPTS = {
     'publish_port': 4505,
     'zmq_backlog': 1000,
     'pub_hwm': 1000,
+    'zmq_pub_batch_window': 0.0,
+    'zmq_pub_batch_size': 100,
     'auth_mode': 1,
+    'session_cipher': 'aes-cbc',
+    'auth_queue_size': 0,
+    'auth_retry_after': 10,
+    'auth_cache_size': 10000,
     'user': _MASTER_USER,
     'worker_threads': 5,
     'sock_dir': os.path.join(salt.syspaths.SOCK_DIR, 'master'),
@@ -1487,6 +1567,7 @@ DEFAULT_MASTER_OPTS = {
     'fileserver_ignoresymlinks': False,
     'fileserver_limit_traversal': False,
     'fileserver_verify_config': True,
+    'fileserver_inotify': False,
     'max_open_files': 100000,
     'hash_type': 'sha256',
     'conf_file': os.path.join(salt.syspaths.CONFIG_DIR, 'master'),
@@ -1504,7 +1585,9 @@ DEFAULT_MASTER_OPTS = {
     'ext_job_cache': '',
     'master_job_cache': 'local_cache',
     'job_cache_store_endtime': False,
+    'job_cache_segments': False,
     'minion_data_cache': True,
+    'minion_data_index': False,
     'enforce_mine_cache': False,
     'ipc_mode': _DFLT_IPC_MODE,
     'ipc_write_buffer': _DFLT_IPC_WBUFFER,
@@ -1545,6 +1628,9 @@ DEFAULT_MASTER_OPTS = {
     'state_auto_order': True,
     'state_events': False,
     'state_aggregate': False,
+    'state_workers': 0,
+    'state_render_cache': False,
+    'virtual_cache': False,
     'search': '',
     'loop_interval': 60,
     'nodegroups': {},
@@ -1579,6 +1665,7 @@ DEFAULT_MASTER_OPTS = {
     'tcp_keepalive_cnt': -1,
     'tcp_keepalive_intvl': -1,
     'sign_pub_messages': True,
+    'pub_sign_algorithm': 'rsa',
     'keysize': 2048,
     'transport': 'zeromq',
     'gather_job_timeout': 10,
@@ -1621,6 +1708,8 @@ DEFAULT_MASTER_OPTS = {
     'master_pubkey_signature': 'master_pubkey_signature',
     'master_use_pubkey_signature': False,
     'zmq_filtering': False,
+    'pub_route_target_types': ['glob', 'pcre', 'list'],
+    'pub_route_max_minions': 0,
     'zmq_monitor': False,
     'con_cache': False,
     'rotate_aes_key': True,
@@ -1633,6 +1722,7 @@ DEFAULT_MASTER_OPTS = {
     'cache': 'localfs',
     'memcache_expire_seconds': 0,
     'memcache_max_items': 1024,
+    'memcache_max_bytes': 0,
     'memcache_full_cleanup': False,
     'memcache_debug': False,
     'thin_extra_mods': '',
@@ -9,12 +9,15 @@ from __future__ import absolute_import, print_function
 import os
 import sys
 import copy
+import collections
+import random
 import time
 import hmac
 import base64
 import hashlib
 import logging
 import stat
+import threading
 import traceback
 import binascii
 import weakref
@@ -22,7 +25,6 @@ import getpass
 
 # Import third party libs
 import salt.ext.six as six
-from salt.ext.six.moves import zip  # pylint: disable=import-error,redefined-builtin
 try:
     from Cryptodome.Cipher import AES, PKCS1_OAEP
     from Cryptodome.Hash import SHA
@@ -43,11 +45,30 @@ if not CDOME:
     except ImportError:
         # No need for crypt in local mode
         pass
+try:
+    from Cryptodome.PublicKey import ECC
+    from Cryptodome.Signature import eddsa
+    HAS_ED25519 = True
+except ImportError:
+    try:
+        from Crypto.PublicKey import ECC
+        from Crypto.Signature import eddsa
+        HAS_ED25519 = True
+    except ImportError:
+        HAS_ED25519 = False
+try:
+    if CDOME:
+        from Cryptodome import version_info as CRYPTO_VERSION
+    else:
+        from Crypto import version_info as CRYPTO_VERSION
+    # Encrypting into a buffer appeared in pycryptodome 3.9
+    HAS_GCM = hasattr(AES, 'MODE_GCM') and CRYPTO_VERSION >= (3, 9)
+except (ImportError, NameError):
+    HAS_GCM = False
 
 # Import salt libs
 import salt.defaults.exitcodes
 import salt.utils
-import salt.utils.decorators
 import salt.payload
 import salt.transport.client
 import salt.transport.frame
@@ -62,6 +83,13 @@ import tornado.gen
 
 log = logging.getLogger(__name__)
 
+# Parsed RSA keys by path: path -> ((mtime, size, inode), key)
+_RSA_KEYS = collections.OrderedDict()
+_RSA_KEYS_MAX = 1024
+_RSA_KEYS_LOCK = threading.Lock()
+# Ed25519 signers and verifiers: (seed, public key) -> signer
+_ED25519_KEYS = collections.OrderedDict()
+
 
 def dropfile(cachedir, user=None):
     '''
@@ -139,36 +167,28 @@ def gen_keys(keydir, keyname, keysize, user=None):
     return priv
 
 
-@salt.utils.decorators.memoize
-def _get_key_with_evict(path, timestamp):
+def _get_rsa_key(path):
     '''
-    Load a key from disk.  `timestamp` above is intended to be the timestamp
-    of the file's last modification. This fn is memoized so if it is called with the
-    same path and timestamp (the file's last modified time) the second time
-    the result is returned from the memoiziation.  If the file gets modified
-    then the params are different and the key is loaded from disk.
+    Read a key off the disk. The parsed key is cached per path along with the
+    mtime, size and inode of the file it was read from, the key is only read
+    again once the file was modified or replaced.
     '''
-    log.debug('salt.crypt._get_key_with_evict: Loading private key')
+    fstat = os.stat(path)
+    stamp = (fstat.st_mtime, fstat.st_size, fstat.st_ino)
+    cached = _RSA_KEYS.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    log.debug('salt.crypt._get_rsa_key: Loading key {0}'.format(path))
     with salt.utils.fopen(path) as f:
         key = RSA.importKey(f.read())
+    with _RSA_KEYS_LOCK:
+        _RSA_KEYS.pop(path, None)
+        _RSA_KEYS[path] = (stamp, key)
+        while len(_RSA_KEYS) > _RSA_KEYS_MAX:
+            _RSA_KEYS.popitem(last=False)
     return key
 
 
-def _get_rsa_key(path):
-    '''
-    Read a key off the disk.  Poor man's simple cache in effect here,
-    we memoize the result of calling _get_rsa_with_evict.  This means
-    the first time _get_key_with_evict is called with a path and a timestamp
-    the result is cached.  If the file (the private key) does not change
-    then its timestamp will not change and the next time the result is returned
-    from the cache.  If the key DOES change the next time _get_rsa_with_evict
-    is called it is called with different parameters and the fn is run fully to
-    retrieve the key from disk.
-    '''
-    log.debug('salt.crypt._get_rsa_key: Loading private key')
-    return _get_key_with_evict(path, str(os.path.getmtime(path)))
-
-
 def sign_message(privkey_path, message):
     '''
     Use Crypto.Signature.PKCS1_v1_5 to sign a message. Returns the signature.
@@ -184,14 +204,86 @@ def verify_signature(pubkey_path, message, signature):
     Use Crypto.Signature.PKCS1_v1_5 to verify the signature on a message.
     Returns True for valid signature.
     '''
-    log.debug('salt.crypt.verify_signature: Loading public key')
-    with salt.utils.fopen(pubkey_path) as f:
-        pubkey = RSA.importKey(f.read())
+    pubkey = _get_rsa_key(pubkey_path)
     log.debug('salt.crypt.verify_signature: Verifying signature')
     verifier = PKCS1_v1_5.new(pubkey)
     return verifier.verify(SHA.new(message), signature)
 
 
+def gen_ed25519_seed():
+    '''
+    Generate the hex encoded seed of an Ed25519 signing key, used by the
+    master to sign its publications when ``pub_sign_algorithm`` is
+    ``ed25519``
+    '''
+    return salt.utils.to_str(binascii.hexlify(os.urandom(32)))
+
+
+def _get_ed25519_key(seed=None, public=None):
+    '''
+    Return the Ed25519 signer of the key of the given hex encoded seed, or
+    the verifier of the given raw public key. They are cached, the key only
+    changes when the master restarts or rotates its keys.
+    '''
+    cache_key = (seed, public)
+    cached = _ED25519_KEYS.get(cache_key)
+    if cached is None:
+        if seed is not None:
+            key = _ed25519_private_key(seed)
+        else:
+            if not HAS_ED25519:
+                raise AuthenticationError(
+                    'Ed25519 signatures require pycryptodome 3.15 or newer'
+                )
+            key = eddsa.import_public_key(public)
+        cached = eddsa.new(key, 'rfc8032')
+        with _RSA_KEYS_LOCK:
+            if len(_ED25519_KEYS) >= _RSA_KEYS_MAX:
+                _ED25519_KEYS.popitem(last=False)
+            _ED25519_KEYS[cache_key] = cached
+    return cached
+
+
+def _ed25519_private_key(seed):
+    '''
+    Return the Ed25519 key of the given hex encoded seed
+    '''
+    if not HAS_ED25519:
+        raise AuthenticationError(
+            'Ed25519 signatures require pycryptodome 3.15 or newer'
+        )
+    return ECC.construct(curve='Ed25519', seed=binascii.unhexlify(seed))
+
+
+def ed25519_public_key(seed):
+    '''
+    Return the raw public key of the Ed25519 key of the given hex encoded
+    seed
+    '''
+    return _ed25519_private_key(seed).public_key().export_key(format='raw')
+
+
+def sign_message_ed25519(seed, message):
+    '''
+    Sign a message with the Ed25519 key of the given hex encoded seed.
+    Returns the signature.
+    '''
+    return _get_ed25519_key(seed=seed).sign(salt.utils.to_bytes(message))
+
+
+def verify_signature_ed25519(public, message, signature):
+    '''
+    Verify the Ed25519 signature on a message with the given raw public key.
+    Returns True for valid signature.
+    '''
+    try:
+        _get_ed25519_key(public=public).verify(salt.utils.to_bytes(message),
+                                               signature)
+    except ValueError:
+        return False
+    return True
+
+
 def gen_signature(priv_path, pub_path, sign_path):
     '''
     creates a signature for the given public-key with
@@ -428,7 +520,7 @@ class AsyncAuth(object):
         if key in AsyncAuth.creds_map:
             creds = AsyncAuth.creds_map[key]
             self._creds = creds
-            self._crypticle = Crypticle(self.opts, creds['aes'])
+            self._crypticle = Crypticle(self.opts, creds['aes'], cipher=creds.get('cipher', 'aes-cbc'))
             self._authenticate_future = tornado.concurrent.Future()
             self._authenticate_future.set_result(True)
         else:
@@ -517,6 +609,9 @@ class AsyncAuth(object):
             except SaltClientError as exc:
                 error = exc
                 break
+            if creds == 'busy':
+                # sign_in already waited for the time the master asked for
+                continue
             if creds == 'retry':
                 if self.opts.get('detect_mode') is True:
                     error = SaltClientError('Detect mode is on')
@@ -547,7 +642,7 @@ class AsyncAuth(object):
             key = self.__key(self.opts)
             AsyncAuth.creds_map[key] = creds
             self._creds = creds
-            self._crypticle = Crypticle(self.opts, creds['aes'])
+            self._crypticle = Crypticle(self.opts, creds['aes'], cipher=creds.get('cipher', 'aes-cbc'))
             self._authenticate_future.set_result(True)  # mark the sign-in as complete
             # Notify the bus about creds change
             event = salt.utils.event.get_event(self.opts.get('__role'), opts=self.opts, listen=False)
@@ -629,6 +724,15 @@ class AsyncAuth(object):
                 # has the master returned that its maxed out with minions?
                 elif payload['load']['ret'] == 'full':
                     raise tornado.gen.Return('full')
+                # is the master busy authenticating other minions?
+                elif payload['load']['ret'] == 'retry':
+                    retry_after = self._retry_after(payload['load'])
+                    log.info(
+                        'The Salt Master is busy authenticating other '
+                        'minions, retrying in {0:.1f} seconds'.format(retry_after)
+                    )
+                    yield tornado.gen.sleep(retry_after)
+                    raise tornado.gen.Return('busy')
                 else:
                     log.error(
                         'The Salt Master has cached the public key for this '
@@ -660,8 +764,43 @@ class AsyncAuth(object):
                 if salt.utils.pem_finger(m_pub_fn, sum_type=self.opts['hash_type']) != self.opts['master_finger']:
                     self._finger_fail(self.opts['master_finger'], m_pub_fn)
         auth['publish_port'] = payload['publish_port']
+        if 'cipher' in payload:
+            auth['cipher'] = payload['cipher']
+        if 'pub_sign_key' in payload:
+            pub_sign_key = self.extract_pub_sign_key(payload)
+            if pub_sign_key:
+                auth['pub_sign_key'] = pub_sign_key
         raise tornado.gen.Return(auth)
 
+    def _retry_after(self, load):
+        '''
+        Return the seconds to wait for before authenticating again when the
+        master is busy, with a random delay added to spread the retries of the
+        minions
+        '''
+        retry_after = load.get('retry_after', 0)
+        return retry_after + random.uniform(0, retry_after)
+
+    def extract_pub_sign_key(self, payload):
+        '''
+        Return the Ed25519 public key the master signs its publications with,
+        once the signature of the key by the master key validated
+
+        :param dict payload: The incoming payload
+        :rtype: bytes
+        :return: The raw public key, or None if its signature did not validate
+        '''
+        m_pub_fn = os.path.join(self.opts['pki_dir'], self.mpub)
+        if verify_signature(m_pub_fn,
+                            payload['pub_sign_key'],
+                            payload.get('pub_sign_key_sig', b'')):
+            return payload['pub_sign_key']
+        log.error(
+            'The signature of the publication signing key sent by the master '
+            'failed to validate, signed publications will be rejected'
+        )
+        return None
+
     def get_keys(self):
         '''
         Return keypair object for the minion.
@@ -720,6 +859,9 @@ class AsyncAuth(object):
             pass
         with salt.utils.fopen(self.pub_path) as f:
             payload['pub'] = f.read()
+        if HAS_GCM:
+            # The session ciphers the master may pick from
+            payload['ciphers'] = ['aes-gcm']
         return payload
 
     def decrypt_aes(self, payload, master_pub=True):
@@ -1084,6 +1226,9 @@ class SAuth(AsyncAuth):
             acceptance_wait_time_max = acceptance_wait_time
         while True:
             creds = self.sign_in(channel=channel)
+            if creds == 'busy':
+                # sign_in already waited for the time the master asked for
+                continue
             if creds == 'retry':
                 if self.opts.get('caller'):
                     print('Minion failed to authenticate with the master, '
@@ -1098,7 +1243,7 @@ class SAuth(AsyncAuth):
                 continue
             break
         self._creds = creds
-        self._crypticle = Crypticle(self.opts, creds['aes'])
+        self._crypticle = Crypticle(self.opts, creds['aes'], cipher=creds.get('cipher', 'aes-cbc'))
 
     def sign_in(self, timeout=60, safe=True, tries=1, channel=None):
         '''
@@ -1171,6 +1316,15 @@ class SAuth(AsyncAuth):
                 # has the master returned that its maxed out with minions?
                 elif payload['load']['ret'] == 'full':
                     return 'full'
+                # is the master busy authenticating other minions?
+                elif payload['load']['ret'] == 'retry':
+                    retry_after = self._retry_after(payload['load'])
+                    log.info(
+                        'The Salt Master is busy authenticating other '
+                        'minions, retrying in {0:.1f} seconds'.format(retry_after)
+                    )
+                    time.sleep(retry_after)
+                    return 'busy'
                 else:
                     log.error(
                         'The Salt Master has cached the public key for this '
@@ -1205,6 +1359,12 @@ class SAuth(AsyncAuth):
                 if salt.utils.pem_finger(m_pub_fn, sum_type=self.opts['hash_type']) != self.opts['master_finger']:
                     self._finger_fail(self.opts['master_finger'], m_pub_fn)
         auth['publish_port'] = payload['publish_port']
+        if 'cipher' in payload:
+            auth['cipher'] = payload['cipher']
+        if 'pub_sign_key' in payload:
+            pub_sign_key = self.extract_pub_sign_key(payload)
+            if pub_sign_key:
+                auth['pub_sign_key'] = pub_sign_key
         return auth
 
 
@@ -1214,17 +1374,35 @@ class Crypticle(object):
 
     Encryption algorithm: AES-CBC
     Signing algorithm: HMAC-SHA256
+
+    Or, with the ``aes-gcm`` cipher, AES-GCM with a key derived from the same
+    key string for the messages of ``GCM_MIN_SIZE`` bytes or more. Setting up
+    AES-GCM costs more than AES-CBC, which is faster on the small messages.
+    Both kinds of messages are decrypted whatever the cipher, AES-GCM messages
+    start with ``GCM_MAGIC``.
     '''
 
     PICKLE_PAD = b'pickle::'
     AES_BLOCK_SIZE = 16
     SIG_SIZE = hashlib.sha256().digest_size
-
-    def __init__(self, opts, key_string, key_size=192):
+    GCM_MAGIC = b'\x00GCM'
+    GCM_NONCE_SIZE = 12
+    GCM_TAG_SIZE = 16
+    GCM_HEADER_SIZE = len(GCM_MAGIC) + GCM_NONCE_SIZE
+    GCM_MIN_SIZE = 16384
+    CIPHERS = ('aes-cbc', 'aes-gcm')
+
+    def __init__(self, opts, key_string, key_size=192, cipher=None):
         self.key_string = key_string
         self.keys = self.extract_keys(self.key_string, key_size)
         self.key_size = key_size
         self.serial = salt.payload.Serial(opts)
+        self.cipher = cipher or opts.get('session_cipher') or 'aes-cbc'
+        # A distinct key for AES-GCM, the keys of AES-CBC are never used
+        # with another mode
+        self.gcm_key = hmac.new(self.keys[0] + self.keys[1],
+                                b'salt aes-gcm',
+                                hashlib.sha256).digest()
 
     @classmethod
     def generate_key_string(cls, key_size=192):
@@ -1245,8 +1423,11 @@ class Crypticle(object):
 
     def encrypt(self, data):
         '''
-        encrypt data with AES-CBC and sign it with HMAC-SHA256
+        encrypt data with AES-CBC and sign it with HMAC-SHA256, or encrypt
+        it with AES-GCM when large enough with the ``aes-gcm`` cipher
         '''
+        if self.cipher == 'aes-gcm' and len(data) >= self.GCM_MIN_SIZE:
+            return self._encrypt_gcm(data)
         aes_key, hmac_key = self.keys
         pad = self.AES_BLOCK_SIZE - len(data) % self.AES_BLOCK_SIZE
         if six.PY2:
@@ -1259,28 +1440,43 @@ class Crypticle(object):
         sig = hmac.new(hmac_key, data, hashlib.sha256).digest()
         return data + sig
 
+    def _encrypt_gcm(self, *chunks):
+        '''
+        Encrypt the concatenation of ``chunks`` with AES-GCM, straight into
+        the message: the magic, the nonce, the ciphertext and the tag
+        '''
+        size = sum(len(chunk) for chunk in chunks)
+        message = bytearray(self.GCM_HEADER_SIZE + size + self.GCM_TAG_SIZE)
+        view = memoryview(message)
+        nonce = os.urandom(self.GCM_NONCE_SIZE)
+        view[:len(self.GCM_MAGIC)] = self.GCM_MAGIC
+        view[len(self.GCM_MAGIC):self.GCM_HEADER_SIZE] = nonce
+        cypher = AES.new(self.gcm_key, AES.MODE_GCM, nonce=nonce)
+        offset = self.GCM_HEADER_SIZE
+        for chunk in chunks:
+            cypher.encrypt(chunk, output=view[offset:offset + len(chunk)])
+            offset += len(chunk)
+        view[offset:] = cypher.digest()
+        return bytes(message)
+
     def decrypt(self, data):
         '''
-        verify HMAC-SHA256 signature and decrypt data with AES-CBC
+        verify HMAC-SHA256 signature and decrypt data with AES-CBC, or decrypt
+        and verify data encrypted with AES-GCM
         '''
+        if six.PY3 and not isinstance(data, bytes):
+            data = salt.utils.to_bytes(data)
+        if data.startswith(self.GCM_MAGIC) and HAS_GCM:
+            try:
+                return self._decrypt_gcm(data)
+            except AuthenticationError:
+                # An AES-CBC message may start like an AES-GCM one
+                pass
         aes_key, hmac_key = self.keys
         sig = data[-self.SIG_SIZE:]
         data = data[:-self.SIG_SIZE]
-        if six.PY3 and not isinstance(data, bytes):
-            data = salt.utils.to_bytes(data)
         mac_bytes = hmac.new(hmac_key, data, hashlib.sha256).digest()
-        if len(mac_bytes) != len(sig):
-            log.debug('Failed to authenticate message')
-            raise AuthenticationError('message authentication failed')
-        result = 0
-
-        if six.PY2:
-            for zipped_x, zipped_y in zip(mac_bytes, sig):
-                result |= ord(zipped_x) ^ ord(zipped_y)
-        else:
-            for zipped_x, zipped_y in zip(mac_bytes, sig):
-                result |= zipped_x ^ zipped_y
-        if result != 0:
+        if not hmac.compare_digest(mac_bytes, sig):
             log.debug('Failed to authenticate message')
             raise AuthenticationError('message authentication failed')
         iv_bytes = data[:self.AES_BLOCK_SIZE]
@@ -1292,11 +1488,30 @@ class Crypticle(object):
         else:
             return data[:-data[-1]]
 
+    def _decrypt_gcm(self, data):
+        '''
+        Decrypt and verify an AES-GCM message
+        '''
+        view = memoryview(data)
+        if len(view) < self.GCM_HEADER_SIZE + self.GCM_TAG_SIZE:
+            raise AuthenticationError('message authentication failed')
+        nonce = view[len(self.GCM_MAGIC):self.GCM_HEADER_SIZE]
+        cypher = AES.new(self.gcm_key, AES.MODE_GCM, nonce=nonce.tobytes())
+        try:
+            return cypher.decrypt_and_verify(view[self.GCM_HEADER_SIZE:-self.GCM_TAG_SIZE],
+                                             view[-self.GCM_TAG_SIZE:])
+        except ValueError:
+            log.debug('Failed to authenticate message')
+            raise AuthenticationError('message authentication failed')
+
     def dumps(self, obj):
         '''
         Serialize and encrypt a python object
         '''
-        return self.encrypt(self.PICKLE_PAD + self.serial.dumps(obj))
+        data = self.serial.dumps(obj)
+        if self.cipher == 'aes-gcm' and len(data) >= self.GCM_MIN_SIZE:
+            return self._encrypt_gcm(self.PICKLE_PAD, data)
+        return self.encrypt(self.PICKLE_PAD + data)
 
     def loads(self, data, raw=False):
         '''
@@ -188,7 +188,8 @@ def clean_pub_auth(opts):
 
 def clean_old_jobs(opts):
     '''
-    Clean out the old jobs from the job cache
+    Clean out the old jobs from the job cache, return what the
+    ``clean_old_jobs`` function of the master job cache returned
     '''
     # TODO: better way to not require creating the masterminion every time?
     mminion = salt.minion.MasterMinion(
@@ -199,7 +200,7 @@ def clean_old_jobs(opts):
     # If the master job cache has a clean_old_jobs, call it
     fstr = '{0}.clean_old_jobs'.format(opts['master_job_cache'])
     if fstr in mminion.returners:
-        mminion.returners[fstr]()
+        return mminion.returners[fstr]()
 
 
 def mk_key(opts, user):
@@ -452,6 +453,7 @@ class RemoteFuncs(object):
         self._file_find = fs_._find_file
         self._file_hash = fs_.file_hash
         self._file_list = fs_.file_list
+        self._file_manifest = fs_.file_manifest
         self._file_list_emptydirs = fs_.file_list_emptydirs
         self._dir_list = fs_.dir_list
         self._symlink_list = fs_.symlink_list
@@ -588,12 +590,12 @@ class RemoteFuncs(object):
                 match_type,
                 greedy=False
                 )
-        for minion in minions:
-            fdata = self.cache.fetch('minions/{0}'.format(minion), 'mine')
+        cdata = self.cache.fetch_many(('minions/{0}'.format(minion), 'mine') for minion in minions)
+        for (bank, _), fdata in six.iteritems(cdata):
             if isinstance(fdata, dict):
                 fdata = fdata.get(load['fun'])
                 if fdata:
-                    ret[minion] = fdata
+                    ret[bank[len('minions/'):]] = fdata
         return ret
 
     def _mine(self, load, skip_verify=False):
@@ -721,6 +723,10 @@ class RemoteFuncs(object):
             self.cache.store('minions/{0}'.format(load['id']),
                              'data',
                              {'grains': load['grains'], 'pillar': data})
+            salt.utils.minions.update_minion_data_index(
+                self.opts,
+                load['id'],
+                {'grains': load['grains'], 'pillar': data})
             self.event.fire_event('Minion data cache refresh', tagify(load['id'], 'refresh', 'minion'))
         return data
 
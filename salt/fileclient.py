@@ -5,6 +5,7 @@ Classes that manage file clients
 from __future__ import absolute_import
 
 # Import python libs
+import collections
 import contextlib
 import errno
 import logging
@@ -12,11 +13,12 @@ import os
 import string
 import shutil
 import ftplib
+import time
 from tornado.httputil import parse_response_start_line, HTTPHeaders, HTTPInputError
 
 # Import salt libs
 from salt.exceptions import (
-    CommandExecutionError, MinionError
+    CommandExecutionError, MinionError, SaltReqTimeoutError
 )
 import salt.client
 import salt.crypt
@@ -25,6 +27,7 @@ import salt.payload
 import salt.transport
 import salt.fileserver
 import salt.utils
+import salt.utils.async
 import salt.utils.files
 import salt.utils.templates
 import salt.utils.url
@@ -78,6 +81,146 @@ def decode_dict_keys_to_str(src):
     return output
 
 
+class BlobCache(object):
+    '''
+    A store of the files of the master in the minion cache, by hash. The
+    entries of the file cache are hard links to their blob, so that a file
+    present in several saltenvs or under several paths is stored and fetched
+    once. The blobs only held by the store, once their entries changed or
+    went away, are removed least recently used first when they take more than
+    ``file_blob_cache_size`` megabytes.
+    '''
+    # The seconds between two collections of the blobs by a new process
+    GC_INTERVAL = 3600
+
+    def __init__(self, opts):
+        self.root = os.path.join(opts['cachedir'], 'blobs')
+        self.max_size = opts.get('file_blob_cache_size', 512) * 1024 * 1024
+        self.orphaned = None
+
+    def path(self, hsum):
+        '''
+        Return the path of the blob of a hash given by the master
+        '''
+        return os.path.join(self.root, hsum['hash_type'], hsum['hsum'][:2],
+                            hsum['hsum'])
+
+    @staticmethod
+    def _link(src, dest):
+        '''
+        Replace ``dest`` with a hard link to ``src``, or a copy of it where
+        hard links are not available
+        '''
+        tmp = '{0}.{1}.tmp'.format(dest, os.getpid())
+        try:
+            try:
+                os.link(src, tmp)
+            except (AttributeError, OSError):
+                shutil.copyfile(src, tmp)
+            os.rename(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def get(self, hsum, dest):
+        '''
+        Link the blob of a hash to ``dest`` and return True, or return False
+        when there is no such blob
+        '''
+        if not isinstance(hsum, dict) or not hsum.get('hsum'):
+            return False
+        blob = self.path(hsum)
+        if not os.path.isfile(blob):
+            return False
+        if salt.utils.get_hash(blob, hsum['hash_type']) != hsum['hsum']:
+            log.warning('Removing the corrupted blob %s', blob)
+            os.remove(blob)
+            return False
+        try:
+            self._link(blob, dest)
+            os.utime(blob, None)
+        except (IOError, OSError) as exc:
+            log.debug('Could not link the blob %s to %s: %s', blob, dest, exc)
+            return False
+        log.debug('Linked the blob %s to %s', blob, dest)
+        return True
+
+    def add(self, hsum, path):
+        '''
+        Store the file ``path`` of a hash, the caller checked its content
+        '''
+        if not isinstance(hsum, dict) or not hsum.get('hsum'):
+            return
+        blob = self.path(hsum)
+        try:
+            if os.path.isfile(blob):
+                self._link(blob, path)
+                os.utime(blob, None)
+            else:
+                if not os.path.isdir(os.path.dirname(blob)):
+                    os.makedirs(os.path.dirname(blob))
+                self._link(path, blob)
+        except (IOError, OSError) as exc:
+            log.debug('Could not store %s as the blob %s: %s', path, blob, exc)
+        if self.orphaned is None or self.orphaned > self.max_size / 10:
+            self.gc()
+
+    def detach(self, path):
+        '''
+        Remove a file of the cache linked to a blob before it is written, so
+        that the blob keeps its content
+        '''
+        try:
+            stat = os.stat(path)
+            if stat.st_nlink > 1:
+                os.remove(path)
+                self.orphaned = (self.orphaned or 0) + stat.st_size
+        except OSError:
+            pass
+
+    def gc(self, force=False):
+        '''
+        Remove the least recently used blobs not linked to an entry of the
+        cache until they take no more than the maximum size. A new process
+        only looks at the blobs every GC_INTERVAL seconds.
+        '''
+        stamp = os.path.join(self.root, '.gc')
+        try:
+            if not force and self.orphaned is None \
+                    and time.time() - os.path.getmtime(stamp) < self.GC_INTERVAL:
+                self.orphaned = 0
+                return
+        except OSError:
+            pass
+        blobs = []
+        total = 0
+        for root, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if stat.st_nlink == 1 and not name.endswith('.tmp') \
+                        and name != '.gc':
+                    blobs.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+        for _, size, path in sorted(blobs):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self.orphaned = 0
+        try:
+            with salt.utils.fopen(stamp, 'w'):
+                pass
+        except (IOError, OSError):
+            pass
+
+
 class Client(object):
     '''
     Base class for Salt file interactions
@@ -86,6 +229,10 @@ class Client(object):
         self.opts = opts
         self.utils = salt.loader.utils(self.opts)
         self.serial = salt.payload.Serial(self.opts)
+        if self.opts.get('file_blob_cache'):
+            self.blobs = BlobCache(self.opts)
+        else:
+            self.blobs = None
 
     # Add __setstate__ and __getstate__ so that the object may be
     # deep copied. It normally can't be deep copied because its
@@ -196,14 +343,48 @@ class Client(object):
         ret = []
         if isinstance(paths, str):
             paths = paths.split(',')
+        # Cache the files of the master found in one manifest per saltenv and
+        # top level directory in one batch, and the other ones one at a time.
+        # The top level files are not looked up in a manifest, which would
+        # list the whole saltenv.
+        keys = []
+        by_dir = {}
         for path in paths:
-            ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
+            key = None
+            if isinstance(path, six.string_types) \
+                    and path.startswith('salt://'):
+                fn_, senv = salt.utils.url.parse(path)
+                key = (fn_, senv or saltenv)
+                if '/' in fn_:
+                    by_dir.setdefault(
+                        (key[1], fn_.split('/', 1)[0]), []).append(fn_)
+            keys.append(key)
+        cached = {}
+        for (senv, _), fns in six.iteritems(by_dir):
+            prefix = os.path.commonprefix(fns).rpartition('/')[0]
+            manifest = self.file_manifest(senv, prefix)
+            if 'files' not in manifest:
+                continue
+            fns = [fn_ for fn_ in fns if fn_ in manifest['files']]
+            for fn_, dest in six.iteritems(
+                    self._cache_manifest(manifest, fns, senv, cachedir)):
+                cached[(fn_, senv)] = dest
+        for path, key in zip(paths, keys):
+            if key in cached:
+                ret.append(cached[key])
+            else:
+                ret.append(self.cache_file(path, saltenv, cachedir=cachedir))
         return ret
 
     def cache_master(self, saltenv='base', cachedir=None):
         '''
         Download and cache all files on a master in a specified environment
         '''
+        manifest = self.file_manifest(saltenv)
+        if 'files' in manifest:
+            paths = sorted(manifest['files'])
+            cached = self._cache_manifest(manifest, paths, saltenv, cachedir)
+            return [cached[path] for path in paths]
         ret = []
         for path in self.file_list(saltenv):
             ret.append(
@@ -232,16 +413,26 @@ class Client(object):
             )
         )
         # go through the list of all files finding ones that are in
-        # the target directory and caching them
-        for fn_ in self.file_list(saltenv):
-            fn_ = sdecode(fn_)
-            if fn_.strip() and fn_.startswith(path):
-                if salt.utils.check_include_exclude(
-                        fn_, include_pat, exclude_pat):
-                    fn_ = self.cache_file(
-                        salt.utils.url.create(fn_), saltenv, cachedir=cachedir)
-                    if fn_:
-                        ret.append(fn_)
+        # the target directory and caching them, in one batch when the
+        # master gives a manifest of them
+        manifest = self.file_manifest(saltenv, path)
+        if 'files' in manifest:
+            fns = [fn_ for fn_ in sorted(manifest['files'])
+                   if fn_.strip() and fn_.startswith(path)
+                   and salt.utils.check_include_exclude(
+                       fn_, include_pat, exclude_pat)]
+            cached = self._cache_manifest(manifest, fns, saltenv, cachedir)
+            ret.extend(cached[fn_] for fn_ in fns if cached[fn_])
+        else:
+            for fn_ in self.file_list(saltenv):
+                fn_ = sdecode(fn_)
+                if fn_.strip() and fn_.startswith(path):
+                    if salt.utils.check_include_exclude(
+                            fn_, include_pat, exclude_pat):
+                        fn_ = self.cache_file(
+                            salt.utils.url.create(fn_), saltenv, cachedir=cachedir)
+                        if fn_:
+                            ret.append(fn_)
 
         if include_empty:
             # Break up the path into a list containing the bottom-level
@@ -296,6 +487,51 @@ class Client(object):
         '''
         return []
 
+    def file_manifest(self, saltenv='base', prefix=''):
+        '''
+        This function must be overwritten
+        '''
+        return {}
+
+    def _cache_manifest(self, manifest, paths, saltenv='base', cachedir=None):
+        '''
+        Cache the files ``paths`` of a manifest of the master, fetching only
+        the ones whose cached copy does not match their hash. Return the
+        paths of the cached files by path, False for the ones which could not
+        be fetched.
+        '''
+        ret = {}
+        fetch = []
+        for path in paths:
+            hsum, _, size = manifest['files'][path]
+            with self._cache_loc(path, saltenv, cachedir=cachedir) as dest:
+                if os.path.isfile(dest) and salt.utils.get_hash(
+                        dest, manifest['hash_type']) == hsum:
+                    ret[path] = dest
+                elif self.blobs and self.blobs.get(
+                        {'hsum': hsum, 'hash_type': manifest['hash_type']},
+                        dest):
+                    ret[path] = dest
+                else:
+                    fetch.append((path, hsum, size))
+        if fetch:
+            ret.update(self._fetch_files(
+                fetch, manifest['hash_type'], saltenv, cachedir))
+        return ret
+
+    def _fetch_files(self, files, hash_type, saltenv='base', cachedir=None):
+        '''
+        Fetch the files ``files``, a list of path, hash and size, into the
+        minion file cache. Return the paths of the cached files by path, False
+        for the ones which could not be fetched.
+        '''
+        ret = {}
+        for path, _, _ in files:
+            ret[path] = self.get_file(
+                salt.utils.url.create(path), '', True, saltenv,
+                cachedir=cachedir)
+        return ret
+
     def dir_list(self, saltenv='base', prefix=''):
         '''
         This function must be overwritten
@@ -1017,12 +1253,67 @@ class LocalClient(Client):
         return {}
 
 
+def send_async(channel, load):
+    '''
+    Send ``load`` on the async channel under the sync request channel
+    ``channel`` and return the future of its reply
+    '''
+    with salt.utils.async.current_ioloop(channel.io_loop):
+        return channel.async.send(load, raw=True)
+
+
+class ChunkPipeline(object):
+    '''
+    Keep the ``_serve_file`` requests of the next chunks of a file in flight
+    on the async channel under a sync request channel, so that they are
+    transferred while the previous chunks are written. Up to ``window``
+    requests, the one of the chunk asked for included, are in flight.
+    '''
+    def __init__(self, channel, load, size, window):
+        self.channel = channel
+        self.load = load
+        self.size = size
+        self.window = window
+        self.pending = {}
+
+    def _send(self, loc):
+        '''
+        Send the request of the chunk at ``loc`` and return its future
+        '''
+        return send_async(self.channel, dict(self.load, loc=loc))
+
+    def send(self, loc, stride=None):
+        '''
+        Return the reply to the request of the chunk at ``loc``, after
+        requesting the chunks following it, ``stride`` bytes apart, up to the
+        empty one at the end of the file
+        '''
+        future = self.pending.pop(loc, None)
+        if future is None:
+            # The offsets requested ahead were wrong, drop their replies
+            self.pending = {}
+            future = self._send(loc)
+        if stride and loc < self.size:
+            for num in range(1, self.window):
+                next_loc = min(loc + num * stride, self.size)
+                if next_loc not in self.pending:
+                    self.pending[next_loc] = self._send(next_loc)
+                if next_loc >= self.size:
+                    break
+        return self.channel._block_future(future)
+
+
 class RemoteClient(Client):
     '''
     Interact with the salt master file server.
     '''
+    # The seconds the hashes of a manifest of the master are used for rather
+    # than asking the master for the hash of each file
+    MANIFEST_CACHE_TIME = 20
+
     def __init__(self, opts):
         Client.__init__(self, opts)
+        self.manifests = {}
         self.channel = salt.transport.Channel.factory(self.opts)
         if hasattr(self.channel, 'auth'):
             self.auth = self.channel.auth
@@ -1053,15 +1344,7 @@ class RemoteClient(Client):
         if senv:
             saltenv = senv
 
-        if not salt.utils.is_windows():
-            hash_server, stat_server = self.hash_and_stat_file(path, saltenv)
-            try:
-                mode_server = stat_server[0]
-            except (IndexError, TypeError):
-                mode_server = None
-        else:
-            hash_server = self.hash_file(path, saltenv)
-            mode_server = None
+        hash_server, size_server = self._hash_and_size_file(path, saltenv)
 
         # Check if file exists on server, before creating files and
         # directories
@@ -1114,12 +1397,16 @@ class RemoteClient(Client):
             if hash_local == hash_server:
                 return dest2check
 
+        # A file of the cache may be present under another saltenv or path
+        cache = not dest
+        if cache and self.blobs and self.blobs.get(hash_server, dest2check):
+            return dest2check
+
         log.debug(
             'Fetching file from saltenv \'%s\', ** attempting ** \'%s\'',
             saltenv, path
         )
-        d_tries = 0
-        transport_tries = 0
+        url = path
         path = self._check_proto(path)
         load = {'path': path,
                 'saltenv': saltenv,
@@ -1128,7 +1415,6 @@ class RemoteClient(Client):
             gzip = int(gzip)
             load['gzip'] = gzip
 
-        fn_ = None
         if dest:
             destdir = os.path.dirname(dest)
             if not os.path.isdir(destdir):
@@ -1136,18 +1422,103 @@ class RemoteClient(Client):
                     os.makedirs(destdir)
                 else:
                     return False
-            # We need an open filehandle here, that's why we're not using a
-            # with clause:
-            fn_ = salt.utils.fopen(dest, 'wb+')  # pylint: disable=resource-leakage
+
+        v_tries = 0
+        while True:
+            fn_ = None
+            if dest:
+                if cache and self.blobs:
+                    self.blobs.detach(dest)
+                # We need an open filehandle here, that's why we're not using a
+                # with clause:
+                fn_ = salt.utils.fopen(dest, 'wb+')  # pylint: disable=resource-leakage
+            else:
+                log.debug('No dest file found')
+            fn_, dest = self._fetch_file(load, fn_, dest, saltenv, cachedir,
+                                         size_server)
+            if not fn_:
+                break
+            fn_.close()
+            # Verify the download against the hash the master gave, the file
+            # may also have changed on the master since, so ask it again
+            # before the next attempt
+            if not isinstance(hash_server, dict) \
+                    or not hash_server.get('hsum'):
+                break
+            if salt.utils.get_hash(
+                    dest, hash_server.get('hash_type', 'md5')) == hash_server['hsum']:
+                if cache and self.blobs:
+                    self.blobs.add(hash_server, dest)
+                break
+            v_tries += 1
+            if v_tries >= 3:
+                log.error(
+                    'Bad download of file %s, the hash of %s does not match '
+                    'the hash of the file on the master, retry attempts '
+                    'exhausted', path, dest
+                )
+                os.remove(dest)
+                return False
+            log.warning(
+                'Bad download of file %s, attempt %d of 3', path, v_tries
+            )
+            self.manifests.pop(saltenv, None)
+            hash_server, size_server = self._hash_and_size_file(url, saltenv)
+
+        if fn_:
+            log.info(
+                'Fetching file from saltenv \'%s\', ** done ** \'%s\'',
+                saltenv, path
+            )
         else:
-            log.debug('No dest file found')
+            log.debug(
+                'In saltenv \'%s\', we are ** missing ** the file \'%s\'',
+                saltenv, path
+            )
+
+        return dest
+
+    def _hash_and_size_file(self, path, saltenv):
+        '''
+        Return the hash of a file on the master and its size, or None when
+        the master does not give it
+        '''
+        cached = self._manifest_hash(path, saltenv)
+        if cached:
+            return cached
+        if not salt.utils.is_windows():
+            hash_server, stat_server = self.hash_and_stat_file(path, saltenv)
+            try:
+                return hash_server, stat_server[6]
+            except (IndexError, TypeError):
+                return hash_server, None
+        return self.hash_file(path, saltenv), None
+
+    def _fetch_file(self, load, fn_, dest, saltenv, cachedir, size=None):
+        '''
+        Write the chunks of a file served by the master to the filehandle
+        ``fn_``, or to a file opened in the cache when ``fn_`` is None and the
+        file exists. Return the filehandle and its path.
+        '''
+        d_tries = 0
+        transport_tries = 0
+        window = self.opts.get('file_transfer_window', 1)
+        if size and window > 1 \
+                and isinstance(self.channel, salt.utils.async.SyncWrapper):
+            pipeline = ChunkPipeline(self.channel, load, size, window)
+        else:
+            pipeline = None
+        stride = None
 
         while True:
             if not fn_:
                 load['loc'] = 0
             else:
                 load['loc'] = fn_.tell()
-            data = self.channel.send(load, raw=True)
+            if pipeline:
+                data = pipeline.send(load['loc'], stride)
+            else:
+                data = self.channel.send(load, raw=True)
             if six.PY3:
                 # Sometimes the source is local (eg when using
                 # 'salt.fileserver.FSChan'), in which case the keys are
@@ -1164,6 +1535,8 @@ class RemoteClient(Client):
                                 saltenv,
                                 cachedir=cachedir) as cache_dest:
                             dest = cache_dest
+                            if self.blobs:
+                                self.blobs.detach(cache_dest)
                             with salt.utils.fopen(cache_dest, 'wb+') as ofile:
                                 ofile.write(data['data'])
                     if 'hsum' in data and d_tries < 3:
@@ -1174,7 +1547,7 @@ class RemoteClient(Client):
                         if hsum != data['hsum']:
                             log.warning(
                                 'Bad download of file %s, attempt %d of 3',
-                                path, d_tries
+                                load['path'], d_tries
                             )
                             continue
                     break
@@ -1188,6 +1561,8 @@ class RemoteClient(Client):
                         # remove it to avoid a traceback trying to write the file
                         if os.path.isdir(dest):
                             salt.utils.rm_rf(dest)
+                        elif self.blobs:
+                            self.blobs.detach(dest)
                         fn_ = salt.utils.fopen(dest, 'wb+')
                 if data.get('gzip', None):
                     data = salt.utils.gzip_util.uncompress(data['data'])
@@ -1196,6 +1571,10 @@ class RemoteClient(Client):
                 if six.PY3 and isinstance(data, str):
                     data = data.encode()
                 fn_.write(data)
+                # The master serves chunks of the same size up to the last
+                # one, the size of the first gives the offsets of the next
+                if stride is None:
+                    stride = len(data)
             except (TypeError, KeyError) as exc:
                 try:
                     data_type = type(data).__name__
@@ -1209,6 +1588,8 @@ class RemoteClient(Client):
                     data, data_type, exc, transport_tries
                 )
                 self._refresh_channel()
+                if pipeline:
+                    pipeline = ChunkPipeline(self.channel, load, size, window)
                 if transport_tries > 3:
                     log.error(
                         'Data transport is broken, got: %s, type: %s, '
@@ -1217,19 +1598,94 @@ class RemoteClient(Client):
                     )
                     break
 
-        if fn_:
-            fn_.close()
-            log.info(
-                'Fetching file from saltenv \'%s\', ** done ** \'%s\'',
-                saltenv, path
-            )
-        else:
-            log.debug(
-                'In saltenv \'%s\', we are ** missing ** the file \'%s\'',
-                saltenv, path
-            )
+        return fn_, dest
 
-        return dest
+    def _manifest_hash(self, path, saltenv):
+        '''
+        Return the hash of a file on the master and its size from a manifest
+        fetched in the last MANIFEST_CACHE_TIME seconds, or None
+        '''
+        if not path.startswith('salt://'):
+            return None
+        path, senv = salt.utils.url.parse(path)
+        now = time.time()
+        # The latest manifest comes last
+        for fetched, manifest in reversed(self.manifests.get(senv or saltenv, [])):
+            if now - fetched < self.MANIFEST_CACHE_TIME \
+                    and path in manifest['files']:
+                hsum, _, size = manifest['files'][path]
+                return {'hsum': hsum, 'hash_type': manifest['hash_type']}, size
+        return None
+
+    def _fetch_files(self, files, hash_type, saltenv='base', cachedir=None):
+        '''
+        Fetch the files ``files``, a list of path, hash and size, into the
+        minion file cache, keeping the requests of the first chunk of up to
+        ``file_transfer_window`` files in flight. Return the paths of the
+        cached files by path, False for the ones which could not be fetched.
+        '''
+        ret = {}
+        window = self.opts.get('file_transfer_window', 1)
+        if not isinstance(self.channel, salt.utils.async.SyncWrapper):
+            window = 1
+        queue = collections.deque(files)
+        pending = collections.deque()
+        while queue or pending:
+            while queue and len(pending) < window:
+                path, hsum, size = queue.popleft()
+                load = {'path': path,
+                        'saltenv': saltenv,
+                        'cmd': '_serve_file',
+                        'loc': 0}
+                reply = send_async(self.channel, load) if window > 1 else None
+                pending.append((load, hsum, size, reply))
+            load, hsum, size, reply = pending.popleft()
+            if reply is None:
+                data = self.channel.send(load, raw=True)
+            else:
+                data = self.channel._block_future(reply)
+            ret[load['path']] = self._cache_fetched(
+                load, data, hsum, size, hash_type, saltenv, cachedir)
+        return ret
+
+    def _cache_fetched(self, load, data, hsum, size, hash_type,
+                       saltenv='base', cachedir=None):
+        '''
+        Write the first chunk of a file served by the master to the minion
+        file cache, fetch the rest of it and check it against its hash. The
+        file is fetched again with get_file when it does not match.
+        '''
+        if six.PY3:
+            data = decode_dict_keys_to_str(data)
+        try:
+            chunk = data['data']
+        except (TypeError, KeyError):
+            chunk = None
+        if chunk is not None:
+            if six.PY3 and isinstance(chunk, str):
+                chunk = chunk.encode()
+            with self._cache_loc(
+                    load['path'], saltenv, cachedir=cachedir) as dest:
+                # If a directory was formerly cached at this path, then
+                # remove it to avoid a traceback trying to write the file
+                if os.path.isdir(dest):
+                    salt.utils.rm_rf(dest)
+                elif self.blobs:
+                    self.blobs.detach(dest)
+                fn_ = salt.utils.fopen(dest, 'wb+')  # pylint: disable=resource-leakage
+                fn_.write(chunk)
+                if chunk and len(chunk) != size:
+                    fn_, dest = self._fetch_file(
+                        load, fn_, dest, saltenv, cachedir, size)
+                fn_.close()
+            if salt.utils.get_hash(dest, hash_type) == hsum:
+                if self.blobs:
+                    self.blobs.add({'hsum': hsum, 'hash_type': hash_type}, dest)
+                return dest
+        log.warning('Bad download of file %s, fetching it again', load['path'])
+        self.manifests.pop(saltenv, None)
+        return self.get_file(salt.utils.url.create(load['path']), '', True,
+                             saltenv, cachedir=cachedir)
 
     def file_list(self, saltenv='base', prefix=''):
         '''
@@ -1241,6 +1697,36 @@ class RemoteClient(Client):
 
         return [sdecode(fn_) for fn_ in self.channel.send(load)]
 
+    def file_manifest(self, saltenv='base', prefix=''):
+        '''
+        Return the hash, mode and size of the files on the master under
+        ``prefix``, by path, in one request. The hashes are then used for a
+        while rather than asking the master for the hash of each file.
+        '''
+        load = {'saltenv': saltenv,
+                'prefix': prefix,
+                'cmd': '_file_manifest'}
+        try:
+            ret = self.channel.send(load)
+        except SaltReqTimeoutError:
+            # The files are then looked up one at a time
+            log.warning(
+                'The master did not return the file manifest of \'%s\' in '
+                'saltenv \'%s\' in time', prefix, saltenv
+            )
+            return {}
+        if not isinstance(ret, dict) or 'files' not in ret:
+            # Masters older than the manifest do not know the command
+            return {}
+        ret['files'] = dict((sdecode(path), entry)
+                            for path, entry in six.iteritems(ret['files']))
+        now = time.time()
+        self.manifests[saltenv] = [
+            (fetched, manifest)
+            for fetched, manifest in self.manifests.get(saltenv, ())
+            if now - fetched < self.MANIFEST_CACHE_TIME] + [(now, ret)]
+        return ret
+
     def file_list_emptydirs(self, saltenv='base', prefix=''):
         '''
         List the empty dirs on the master
@@ -1296,6 +1782,9 @@ class RemoteClient(Client):
         master file server prepend the path with salt://<file on server>
         otherwise, prepend the file with / for a local file.
         '''
+        cached = self._manifest_hash(path, saltenv)
+        if cached:
+            return cached[0]
         return self.__hash_and_stat_file(path, saltenv)[0]
 
     def hash_and_stat_file(self, path, saltenv='base'):
@@ -1346,6 +1835,7 @@ class FSClient(RemoteClient):
     '''
     def __init__(self, opts):  # pylint: disable=W0231
         Client.__init__(self, opts)  # pylint: disable=W0233
+        self.manifests = {}
         self.channel = salt.fileserver.FSChan(opts)
         self.auth = DumbAuth()
 
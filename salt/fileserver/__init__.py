@@ -8,6 +8,7 @@ from __future__ import absolute_import
 import collections
 import errno
 import fnmatch
+import json
 import logging
 import os
 import re
@@ -16,6 +17,7 @@ import time
 # Import salt libs
 import salt.loader
 import salt.utils
+import salt.utils.atomicfile
 import salt.utils.locales
 from salt.utils.args import get_function_argspec as _argspec
 
@@ -98,12 +100,18 @@ def wait_lock(lk_fn, dest, wait_timeout=0):
     return False
 
 
-def check_file_list_cache(opts, form, list_cache, w_lock):
+def check_file_list_cache(opts, form, list_cache, w_lock, max_age=None):
     '''
     Checks the cache file to see if there is a new enough file list cache, and
     returns the match (if found, along with booleans used by the fileserver
     backend to determine if the cache needs to be refreshed/written).
+
+    max_age
+        The age in seconds a cache is used until, defaults to the
+        ``fileserver_list_cache_time`` option
     '''
+    if max_age is None:
+        max_age = opts.get('fileserver_list_cache_time', 20)
     refresh_cache = False
     save_cache = True
     serial = salt.payload.Serial(opts)
@@ -123,8 +131,8 @@ def check_file_list_cache(opts, form, list_cache, w_lock):
                     age = time.time() - cache_stat.st_mtime
                 else:
                     # if filelist does not exists yet, mark it as expired
-                    age = opts.get('fileserver_list_cache_time', 20) + 1
-                if age < opts.get('fileserver_list_cache_time', 20):
+                    age = max_age + 1
+                if age < max_age:
                     # Young enough! Load this sucker up!
                     with salt.utils.fopen(list_cache, 'rb') as fp_:
                         log.trace('Returning file_lists cache data from '
@@ -252,6 +260,178 @@ def reap_fileserver_cache_dir(cache_base, find_func):
                     os.unlink(file_path)
 
 
+class HashIndex(object):
+    '''
+    The hashes of the files served by a fileserver backend, a mapping of
+    path -> ``[mtime, size, inode, hash]`` held in memory by each process
+    serving files. The processes share the hashes they compute through a
+    snapshot in the cache directory and a journal they append to, which the
+    backend's ``update()`` compacts into the snapshot, dropping the entries
+    of the files it found changed or removed.
+
+    An entry is only used for as long as the mtime, size and inode of its
+    file are unchanged, so a known hash costs the stat of the file.
+    '''
+    # A file modified this recently could be modified again within the same
+    # mtime tick, its hash is not kept
+    RACY_SECONDS = 2
+
+    def __init__(self, path):
+        self.path = path
+        self.journal = '{0}.journal'.format(path)
+        self.entries = {}
+        self.snapshot_stamp = None
+        self.journal_pos = 0
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime, stat.st_size)
+
+    @staticmethod
+    def _entry(path, entry):
+        if six.PY2:
+            # The byte string paths were saved as UTF-8
+            path = salt.utils.to_str(path, 'utf-8')
+            entry[3] = salt.utils.to_str(entry[3])
+        return path, entry
+
+    def _read_snapshot(self):
+        entries = {}
+        try:
+            with salt.utils.fopen(self.path, 'r') as fp_:
+                for path, entry in six.iteritems(json.load(fp_)):
+                    path, entry = self._entry(path, entry)
+                    entries[path] = entry
+        except (IOError, OSError, ValueError, TypeError, AttributeError):
+            pass
+        return entries
+
+    def _read_journal(self, path, pos):
+        '''
+        Apply the complete lines of a journal from pos, return the position
+        after the last one
+        '''
+        try:
+            with salt.utils.fopen(path, 'rb') as fp_:
+                fp_.seek(pos)
+                data = fp_.read()
+        except (IOError, OSError):
+            return pos
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            try:
+                path, entry = json.loads(salt.utils.to_str(line, 'utf-8'))
+                path, entry = self._entry(path, entry)
+            except (ValueError, TypeError, UnicodeDecodeError):
+                # A line written at the same time as a compaction
+                continue
+            self.entries[path] = entry
+        return pos + end
+
+    def refresh(self):
+        '''
+        Read the hashes the other processes computed since the last refresh
+        '''
+        stamp = self._stamp(self.path)
+        if stamp != self.snapshot_stamp:
+            self.entries = self._read_snapshot()
+            self.snapshot_stamp = stamp
+            self.journal_pos = 0
+        self.journal_pos = self._read_journal(self.journal, self.journal_pos)
+
+    def get(self, path, stat):
+        '''
+        Return the hash of a file from the ``os.stat`` result made by the
+        backend, or None if it is not known
+        '''
+        stamp = [stat[8], stat[6], stat[1]]
+        entry = self.entries.get(path)
+        if entry is None or entry[:3] != stamp:
+            self.refresh()
+            entry = self.entries.get(path)
+            if entry is None or entry[:3] != stamp:
+                return None
+        return entry[3]
+
+    def set(self, path, stat, hsum):
+        '''
+        Record the hash of a file, and share it with the other processes
+        '''
+        if time.time() - stat[8] < self.RACY_SECONDS:
+            return
+        entry = [stat[8], stat[6], stat[1], hsum]
+        self.entries[path] = entry
+        try:
+            line = json.dumps([path, entry])
+        except (TypeError, ValueError, UnicodeDecodeError):
+            return
+        try:
+            dirname = os.path.dirname(self.journal)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            with salt.utils.fopen(self.journal, 'ab') as fp_:
+                fp_.write(salt.utils.to_bytes(line + '\n'))
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write the hash index journal {0}: {1}'.format(
+                self.journal, exc))
+
+    def compact(self, changed=()):
+        '''
+        Write the snapshot of the hashes all the processes computed, without
+        the files changed since, and start a new journal
+        '''
+        self.refresh()
+        compacting = '{0}.compacting'.format(self.journal)
+        try:
+            os.rename(self.journal, compacting)
+        except OSError:
+            compacting = None
+        else:
+            self._read_journal(compacting, 0)
+        dropped = [path for path in changed
+                   if self.entries.pop(path, None) is not None]
+        if compacting is None and not dropped:
+            # nothing new to write
+            return
+        try:
+            dirname = os.path.dirname(self.path)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            with salt.utils.atomicfile.atomic_open(self.path, 'w') as fp_:
+                json.dump(self.entries, fp_)
+        except (IOError, OSError, TypeError, ValueError) as exc:
+            log.debug('Unable to write the hash index {0}: {1}'.format(
+                self.path, exc))
+        if compacting is not None:
+            try:
+                os.remove(compacting)
+            except OSError:
+                pass
+        self.snapshot_stamp = self._stamp(self.path)
+        self.journal_pos = 0
+
+
+# The hash indexes of the process, by path
+HASH_INDEXES = {}
+
+
+def hash_index(opts, backend):
+    '''
+    Return the hash index of the files served by a fileserver backend, for
+    the configured hash type
+    '''
+    path = os.path.join(opts['cachedir'],
+                        backend,
+                        'hash_index.{0}'.format(opts['hash_type']))
+    if path not in HASH_INDEXES:
+        HASH_INDEXES[path] = HashIndex(path)
+    return HASH_INDEXES[path]
+
+
 def is_file_ignored(opts, fname):
     '''
     If file_ignore_regex or file_ignore_glob were given in config,
@@ -649,6 +829,33 @@ class Fileserver(object):
         except (IndexError, TypeError):
             return '', None
 
+    def file_manifest(self, load):
+        '''
+        Return the hash, mode and size of the files under a prefix of an
+        environment, by path, so that a client can find the files it needs
+        to fetch in one request
+        '''
+        ret = {'hash_type': self.opts['hash_type'],
+               'files': {}}
+        if 'saltenv' not in load:
+            return ret
+        if not isinstance(load['saltenv'], six.string_types):
+            load['saltenv'] = six.text_type(load['saltenv'])
+
+        for path in self.file_list(dict(load)):
+            fnd = self.find_file(path, load['saltenv'])
+            fstr = '{0}.file_hash'.format(fnd.get('back'))
+            if fstr not in self.servers:
+                continue
+            hsum = self.servers[fstr](dict(load, path=path), fnd)
+            if not hsum:
+                continue
+            stat = fnd.get('stat') or []
+            ret['files'][path] = [hsum['hsum'],
+                                  stat[0] if len(stat) > 0 else None,
+                                  stat[6] if len(stat) > 6 else None]
+        return ret
+
     def clear_file_list_cache(self, load):
         '''
         Deletes the file_lists cache files
@@ -19,12 +19,15 @@ from __future__ import absolute_import
 
 # Import python libs
 import os
-import errno
+import binascii
 import logging
+import shutil
 
 # Import salt libs
 import salt.fileserver
 import salt.utils
+import salt.utils.atomicfile
+import salt.utils.inotify
 import salt.utils.path
 from salt.utils.event import tagify
 import salt.ext.six as six
@@ -143,61 +146,238 @@ def serve_file(load, fnd):
     return ret
 
 
-def update():
+# The inotify tracker of the file_roots and the mtime map it keeps up to date,
+# held by the process running the fileserver updates
+_TRACKED = {}
+
+# The seconds the file lists are kept for when update() removes the lists of
+# the saltenvs changed, in case a change was missed
+TRACKED_LIST_CACHE_TIME = 3600
+
+
+def _roots():
     '''
-    When we are asked to update (regular interval) lets reap the cache
+    Return the normalized file_roots, by saltenv
+    '''
+    return dict((saltenv, [os.path.abspath(path) for path in paths])
+                for saltenv, paths in six.iteritems(__opts__['file_roots']))
+
+
+def _root_of(path, roots):
+    '''
+    Return the root a path is below, or None
+    '''
+    for root in roots:
+        if path == root or path.startswith(root + os.sep):
+            return root
+    return None
+
+
+def _ignored(path, root, isdir):
+    '''
+    Return whether a path is below a directory the fileserver does not walk,
+    as generate_mtime_map prunes the directories matching the ignore options
+    '''
+    if path == root:
+        return False
+    parts = os.path.relpath(path, root).split(os.sep)
+    if not isdir:
+        parts = parts[:-1]
+    return any(salt.fileserver.is_file_ignored(__opts__, part) for part in parts)
+
+
+def _tracked_changes(file_roots):
+    '''
+    Bring the mtime map up to date from the paths inotify reported changed
+    below the file_roots, return the map, the previous mtimes of the files
+    changed (``None`` for the files added) and the saltenvs changed. Return
+    None when the file_roots have to be walked.
+    '''
+    roots = sorted(set(path for paths in six.itervalues(file_roots) for path in paths))
+    if _TRACKED.get('roots') != roots:
+        _TRACKED.clear()
+        _TRACKED['roots'] = roots
+        _TRACKED['tracker'] = salt.utils.inotify.ChangeTracker(roots, recursive=True)
+    changes = _TRACKED['tracker'].changes()
+    mtime_map = _TRACKED.get('mtime_map')
+    if changes is None or mtime_map is None:
+        return None
+
+    previous = {}
+
+    def _set(path, mtime):
+        old = mtime_map.get(path)
+        if old == mtime:
+            return
+        previous.setdefault(path, old)
+        if mtime is None:
+            del mtime_map[path]
+        else:
+            mtime_map[path] = mtime
+
+    def _stat(path):
+        try:
+            _set(path, os.path.getmtime(path))
+        except (OSError, IOError):
+            _set(path, None)
+
+    changed = set()
+    # the directories, which can hold files no event was reported for
+    rescan = set()
+    for path in changes:
+        root = _root_of(path, roots)
+        if root is None:
+            continue
+        isdir = os.path.isdir(path)
+        if _ignored(path, root, isdir):
+            continue
+        changed.add(path)
+        if isdir:
+            # the links to directories are not walked
+            _set(path, None)
+            if not os.path.islink(path):
+                rescan.add(path)
+        elif os.path.lexists(path):
+            _stat(path)
+        elif path in mtime_map:
+            _set(path, None)
+        else:
+            # a directory removed
+            rescan.add(path)
+    if rescan:
+        prefixes = tuple(path + os.sep for path in rescan)
+        for path in [path for path in mtime_map if path.startswith(prefixes)]:
+            _stat(path)
+        for path in rescan:
+            if os.path.isdir(path):
+                walked = salt.fileserver.generate_mtime_map(__opts__, {'': [path]})
+                for file_path, mtime in six.iteritems(walked):
+                    _set(file_path, mtime)
+
+    envs = set(saltenv for saltenv, paths in six.iteritems(file_roots)
+               if any(_root_of(path, paths) for path in changed))
+    return mtime_map, previous, envs
+
+
+def _list_cache_generation(list_cachedir, saltenv):
+    '''
+    Return the generation of the file list of a saltenv, which changes each
+    time update() removes the list, or None
     '''
     try:
-        salt.fileserver.reap_fileserver_cache_dir(
-            os.path.join(__opts__['cachedir'], 'roots/hash'),
-            find_file
-        )
+        with salt.utils.fopen(os.path.join(list_cachedir, '.{0}.gen'.format(saltenv)), 'r') as fp_:
+            return fp_.read()
     except (IOError, OSError):
-        # Hash file won't exist if no files have yet been served up
-        pass
+        return None
 
-    mtime_map_path = os.path.join(__opts__['cachedir'], 'roots/mtime_map')
-    # data to send on event
-    data = {'changed': False,
-            'files': {'changed': []},
-            'backend': 'roots'}
 
-    # generate the new map
-    new_mtime_map = salt.fileserver.generate_mtime_map(__opts__, __opts__['file_roots'])
+def _clear_list_cache(saltenvs):
+    '''
+    Remove the file lists cached for saltenvs, starting a new generation of
+    their lists first so that the lists walked before are not cached after
+    '''
+    list_cachedir = os.path.join(__opts__['cachedir'], 'file_lists', 'roots')
+    if not os.path.isdir(list_cachedir):
+        os.makedirs(list_cachedir)
+    for saltenv in saltenvs:
+        gen_path = os.path.join(list_cachedir, '.{0}.gen'.format(saltenv))
+        with salt.utils.atomicfile.atomic_open(gen_path) as fp_:
+            fp_.write(binascii.hexlify(os.urandom(8)).decode())
+        try:
+            os.remove(os.path.join(list_cachedir, '{0}.p'.format(saltenv)))
+        except OSError:
+            pass
 
-    old_mtime_map = {}
-    # if you have an old map, load that
-    if os.path.exists(mtime_map_path):
-        with salt.utils.fopen(mtime_map_path, 'r') as fp_:
-            for line in fp_:
-                try:
-                    file_path, mtime = line.replace('\n', '').split(':', 1)
-                    old_mtime_map[file_path] = mtime
-                    if mtime != str(new_mtime_map.get(file_path, mtime)):
-                        data['files']['changed'].append(file_path)
-                except ValueError:
-                    # Document the invalid entry in the log
-                    log.warning('Skipped invalid cache mtime entry in {0}: {1}'
-                                .format(mtime_map_path, line))
-
-    # compare the maps, set changed to the return value
-    data['changed'] = salt.fileserver.diff_mtime_map(old_mtime_map, new_mtime_map)
-
-    # compute files that were removed and added
-    old_files = set(old_mtime_map.keys())
-    new_files = set(new_mtime_map.keys())
-    data['files']['removed'] = list(old_files - new_files)
-    data['files']['added'] = list(new_files - old_files)
-
-    # write out the new map
+
+def _write_mtime_map(mtime_map_path, mtime_map):
+    '''
+    Write out the mtime map
+    '''
     mtime_map_path_dir = os.path.dirname(mtime_map_path)
     if not os.path.exists(mtime_map_path_dir):
         os.makedirs(mtime_map_path_dir)
     with salt.utils.fopen(mtime_map_path, 'w') as fp_:
-        for file_path, mtime in six.iteritems(new_mtime_map):
+        for file_path, mtime in six.iteritems(mtime_map):
             fp_.write('{file_path}:{mtime}\n'.format(file_path=file_path,
                                                      mtime=mtime))
 
+
+def update():
+    '''
+    When we are asked to update (regular interval) lets reap the cache
+    '''
+    # The hashes were kept in one file per served file before the hash index
+    legacy_hash_dir = os.path.join(__opts__['cachedir'], 'roots', 'hash')
+    if os.path.isdir(legacy_hash_dir):
+        shutil.rmtree(legacy_hash_dir, ignore_errors=True)
+
+    mtime_map_path = os.path.join(__opts__['cachedir'], 'roots/mtime_map')
+    # data to send on event
+    data = {'changed': False,
+            'files': {'changed': []},
+            'backend': 'roots'}
+
+    tracked = None
+    if __opts__.get('fileserver_inotify', False):
+        file_roots = _roots()
+        tracked = _tracked_changes(file_roots)
+
+    if tracked is not None:
+        # only the paths inotify reported changed were stated again
+        new_mtime_map, previous, envs = tracked
+        data['files'].update({'removed': [], 'added': []})
+        for file_path, mtime in six.iteritems(previous):
+            if mtime is None:
+                data['files']['added'].append(file_path)
+            elif file_path not in new_mtime_map:
+                data['files']['removed'].append(file_path)
+            else:
+                data['files']['changed'].append(file_path)
+        data['changed'] = bool(previous)
+        if previous:
+            _write_mtime_map(mtime_map_path, new_mtime_map)
+        _clear_list_cache(envs)
+    else:
+        # generate the new map
+        if __opts__.get('fileserver_inotify', False):
+            new_mtime_map = salt.fileserver.generate_mtime_map(__opts__, file_roots)
+            _TRACKED['mtime_map'] = dict(new_mtime_map)
+            # the changes since the file lists were cached are not known
+            _clear_list_cache(file_roots)
+        else:
+            new_mtime_map = salt.fileserver.generate_mtime_map(__opts__, __opts__['file_roots'])
+
+        old_mtime_map = {}
+        # if you have an old map, load that
+        if os.path.exists(mtime_map_path):
+            with salt.utils.fopen(mtime_map_path, 'r') as fp_:
+                for line in fp_:
+                    try:
+                        file_path, mtime = line.replace('\n', '').split(':', 1)
+                        old_mtime_map[file_path] = mtime
+                        if mtime != str(new_mtime_map.get(file_path, mtime)):
+                            data['files']['changed'].append(file_path)
+                    except ValueError:
+                        # Document the invalid entry in the log
+                        log.warning('Skipped invalid cache mtime entry in {0}: {1}'
+                                    .format(mtime_map_path, line))
+
+        # compare the maps, set changed to the return value
+        data['changed'] = salt.fileserver.diff_mtime_map(old_mtime_map, new_mtime_map)
+
+        # compute files that were removed and added
+        old_files = set(old_mtime_map.keys())
+        new_files = set(new_mtime_map.keys())
+        data['files']['removed'] = list(old_files - new_files)
+        data['files']['added'] = list(new_files - old_files)
+
+        # write out the new map
+        _write_mtime_map(mtime_map_path, new_mtime_map)
+
+    # drop the hashes of the files changed or removed since the last update
+    salt.fileserver.hash_index(__opts__, 'roots').compact(
+        data['files']['changed'] + data['files']['removed'])
+
     if __opts__.get('fileserver_events', False):
         # if there is a change, fire an event
         event = salt.utils.event.get_event(
@@ -234,58 +414,15 @@ def file_hash(load, fnd):
     # set the hash_type as it is determined by config-- so mechanism won't change that
     ret['hash_type'] = __opts__['hash_type']
 
-    # check if the hash is cached
-    # cache file's contents should be "hash:mtime"
-    cache_path = os.path.join(__opts__['cachedir'],
-                              'roots/hash',
-                              load['saltenv'],
-                              u'{0}.hash.{1}'.format(fnd['rel'],
-                              __opts__['hash_type']))
-    # if we have a cache, serve that if the mtime hasn't changed
-    if os.path.exists(cache_path):
-        try:
-            with salt.utils.fopen(cache_path, 'r') as fp_:
-                try:
-                    hsum, mtime = fp_.read().split(':')
-                except ValueError:
-                    log.debug('Fileserver attempted to read incomplete cache file. Retrying.')
-                    # Delete the file since its incomplete (either corrupted or incomplete)
-                    try:
-                        os.unlink(cache_path)
-                    except OSError:
-                        pass
-                    return file_hash(load, fnd)
-                if os.path.getmtime(path) == mtime:
-                    # check if mtime changed
-                    ret['hsum'] = hsum
-                    return ret
-        except (os.error, IOError):  # Can't use Python select() because we need Windows support
-            log.debug("Fileserver encountered lock when reading cache file. Retrying.")
-            # Delete the file since its incomplete (either corrupted or incomplete)
-            try:
-                os.unlink(cache_path)
-            except OSError:
-                pass
-            return file_hash(load, fnd)
-
-    # if we don't have a cache entry-- lets make one
-    ret['hsum'] = salt.utils.get_hash(path, __opts__['hash_type'])
-    cache_dir = os.path.dirname(cache_path)
-    # make cache directory if it doesn't exist
-    if not os.path.exists(cache_dir):
-        try:
-            os.makedirs(cache_dir)
-        except OSError as err:
-            if err.errno == errno.EEXIST:
-                # rarely, the directory can be already concurrently created between
-                # the os.path.exists and the os.makedirs lines above
-                pass
-            else:
-                raise
-    # save the cache object "hash:mtime"
-    cache_object = '{0}:{1}'.format(ret['hsum'], os.path.getmtime(path))
-    with salt.utils.flopen(cache_path, 'w') as fp_:
-        fp_.write(cache_object)
+    # serve the hash from the index if the file is unchanged since it was
+    # hashed, find_file already made the stat
+    stat = fnd.get('stat') or list(os.stat(path))
+    index = salt.fileserver.hash_index(__opts__, 'roots')
+    hsum = index.get(path, stat)
+    if hsum is None:
+        hsum = salt.utils.get_hash(path, __opts__['hash_type'])
+        index.set(path, stat, hsum)
+    ret['hsum'] = hsum
     return ret
 
 
@@ -314,9 +451,16 @@ def _file_lists(load, form):
             return []
     list_cache = os.path.join(list_cachedir, '{0}.p'.format(load['saltenv']))
     w_lock = os.path.join(list_cachedir, '.{0}.w'.format(load['saltenv']))
+    max_age = None
+    generation = None
+    if __opts__.get('fileserver_inotify', False) \
+            and __opts__.get('__role') == 'master':
+        # update() removes the file lists of the saltenvs changed
+        max_age = TRACKED_LIST_CACHE_TIME
+        generation = _list_cache_generation(list_cachedir, load['saltenv'])
     cache_match, refresh_cache, save_cache = \
         salt.fileserver.check_file_list_cache(
-            __opts__, form, list_cache, w_lock
+            __opts__, form, list_cache, w_lock, max_age=max_age
         )
     if cache_match is not None:
         return cache_match
@@ -408,6 +552,13 @@ def _file_lists(load, form):
             except NameError:
                 # Catch msgpack error in salt-ssh
                 pass
+            if max_age is not None and \
+                    _list_cache_generation(list_cachedir, load['saltenv']) != generation:
+                # update() removed the list while it was walked
+                try:
+                    os.remove(list_cache)
+                except OSError:
+                    pass
         return ret.get(form, [])
     # Shouldn't get here, but if we do, this prevents a TypeError
     return []
@@ -25,6 +25,7 @@ import salt.minion
 import salt.utils
 import salt.utils.event
 import salt.utils.kinds
+import salt.utils.minions
 
 # pylint: disable=import-error,no-name-in-module,redefined-builtin
 import salt.ext.six as six
@@ -501,6 +502,8 @@ class Key(object):
                 for minion in clist:
                     if minion not in minions and minion not in preserve_minions:
                         cache.flush('{0}/{1}'.format(self.ACC, minion))
+                        salt.utils.minions.update_minion_data_index(
+                            self.opts, minion)
 
     def check_master(self):
         '''
@@ -979,6 +982,8 @@ class RaetKey(Key):
                 for minion in clist:
                     if minion not in minions and minion not in preserve_minions:
                         cache.flush('{0}/{1}'.format(self.ACC, minion))
+                        salt.utils.minions.update_minion_data_index(
+                            self.opts, minion)
 
         kind = self.opts.get('__role', '')  # application kind
         if kind not in salt.utils.kinds.APPL_KINDS:
@@ -12,6 +12,9 @@ import sys
 import time
 import logging
 import inspect
+import json
+import shutil
+import hashlib
 import tempfile
 import functools
 import types
@@ -21,10 +24,12 @@ from zipimport import zipimporter
 # Import salt libs
 import salt.config
 import salt.syspaths
+import salt.utils.atomicfile
 import salt.utils.context
 import salt.utils.lazy
 import salt.utils.event
 import salt.utils.odict
+import salt.version
 from salt.exceptions import LoaderError
 from salt.template import check_render_pipe_str
 from salt.utils.decorators import Depends
@@ -96,6 +101,281 @@ LIBCLOUD_FUNCS_NOT_SUPPORTED = (
 pyximport = None
 
 
+class ModuleDirCache(object):
+    '''
+    The sorted listings of the module directories, shared by the loaders of a
+    process and persisted in the cache directory, so that building a loader
+    does not list the same directories again.
+
+    A listing is reused for as long as the mtime and ctime of its directory
+    are unchanged. The directories of the salt package itself are only
+    checked the first time a process uses them.
+    '''
+    # A listing of a directory modified this recently could miss a file
+    # created within the same timestamp tick, it is not kept
+    RACY_SECONDS = 2
+
+    def __init__(self):
+        self.listings = {}
+        self.checked = set()
+        self.file_mappings = {}
+        self.path = None
+        self.dirty = False
+
+    def load(self, opts):
+        '''
+        Load the listings persisted in the cache directory of the first
+        options used
+        '''
+        if self.path is not None or not opts.get('cachedir'):
+            return
+        self.path = os.path.join(opts['cachedir'], 'module_dirs.cache')
+        try:
+            with salt.utils.fopen(self.path, 'r') as fp_:
+                listings = json.load(fp_)
+            for path, (stamp, files) in six.iteritems(listings):
+                if six.PY2:
+                    # The listings of byte string paths were saved as UTF-8
+                    path = salt.utils.to_str(path, 'utf-8')
+                    files = [salt.utils.to_str(name, 'utf-8') for name in files]
+                self.listings.setdefault(path, (tuple(stamp), files))
+        except (IOError, OSError, ValueError, TypeError):
+            pass
+
+    def save(self):
+        '''
+        Persist the listings if new ones were made
+        '''
+        if not self.dirty or self.path is None:
+            return
+        self.dirty = False
+        try:
+            with salt.utils.atomicfile.atomic_open(self.path, 'w') as fp_:
+                json.dump(self.listings, fp_)
+        except (IOError, OSError, ValueError) as exc:
+            log.debug('Unable to write the module dirs cache {0}: {1}'.format(
+                self.path, exc))
+
+    def listing(self, path):
+        '''
+        Return the ``(stamp, sorted files)`` listing of a directory, raise
+        OSError if it cannot be listed
+        '''
+        listing = self.listings.get(path)
+        if listing is not None and path in self.checked:
+            return listing
+        stat = os.stat(path)
+        stamp = (stat.st_mtime, stat.st_ctime)
+        if listing is None or listing[0] != stamp:
+            listing = (stamp, sorted(os.listdir(path)))
+            if time.time() - max(stamp) < self.RACY_SECONDS:
+                return listing
+            self.listings[path] = listing
+            self.dirty = True
+        if path.startswith(SALT_BASE_PATH + os.sep):
+            self.checked.add(path)
+        return listing
+
+    def listdir(self, path, used=None):
+        '''
+        Return the sorted listing of a directory, raise OSError if it cannot
+        be listed. The listing is appended to the ``used`` list.
+        '''
+        try:
+            listing = self.listing(path)
+        except OSError:
+            if used is not None:
+                used.append((path, None))
+            raise
+        if used is not None:
+            used.append((path, listing))
+        return listing[1]
+
+    def file_mapping(self, key):
+        '''
+        Return the file mapping a loader made for the same key from the
+        current listings, or None
+        '''
+        if key not in self.file_mappings:
+            return None
+        used, mapping = self.file_mappings[key]
+        for path, listing in used:
+            try:
+                current = self.listing(path)
+            except OSError:
+                current = None
+            if current is not listing:
+                return None
+        return mapping
+
+    def set_file_mapping(self, key, used, mapping):
+        '''
+        Share the file mapping a loader made from the ``used`` listings, if
+        they are all kept
+        '''
+        for path, listing in used:
+            if listing is not None and self.listings.get(path) is not listing:
+                return
+        self.file_mappings[key] = (used, mapping)
+
+
+MODULE_DIR_CACHE = ModuleDirCache()
+
+
+class VirtualCache(object):
+    '''
+    The outcome of loading the module files of a loader, persisted in the
+    cache directory: the names a module was loaded under, or the reason it
+    could not be loaded. A new process does not import the modules which
+    failed to load again, and goes straight to the module providing a virtual
+    name.
+
+    The cache is only used for the same salt version and a same digest of
+    what the ``__virtual__`` functions check: the options, which hold the
+    grains and the pillar, the python interpreter and the ``PATH``. An
+    outcome is only reused for as long as the size and mtime of its module
+    file are unchanged.
+    '''
+    # The per invocation options and per process grains, which the
+    # __virtual__ functions do not check
+    VOLATILE_OPTS = frozenset(('fun', 'arg', 'jid', 'kwarg'))
+    VOLATILE_GRAINS = frozenset(('pid',))
+    # The number of digests kept per loader tag, the loaders of a same tag
+    # are built with the options before and after the pillar is compiled
+    KEEP_DIGESTS = 4
+
+    def __init__(self, path, digest):
+        self.path = path
+        self.digest = digest
+        self.outcomes = dict(self._read()).get(digest, {})
+        self.checked = {}
+        self.dirty = False
+
+    def _read(self):
+        '''
+        Return the ``[digest, outcomes]`` pairs of the cache file, the most
+        recent last
+        '''
+        try:
+            with salt.utils.fopen(self.path, 'r') as fp_:
+                data = json.load(fp_)
+            if data.get('version') == salt.version.__version__:
+                return [tuple(pair) for pair in data['digests']]
+        except (IOError, OSError, ValueError, TypeError, KeyError):
+            pass
+        return []
+
+    @classmethod
+    def digest_opts(cls, opts):
+        '''
+        Return a digest of the options and of the environment the
+        ``__virtual__`` functions check
+        '''
+        data = [sys.version, sys.executable, sys.platform, sys.path,
+                os.environ.get('PATH', '')]
+        for key in sorted(opts):
+            if key in cls.VOLATILE_OPTS:
+                continue
+            value = opts[key]
+            if key == 'grains' and isinstance(value, dict):
+                value = dict((name, val) for name, val in six.iteritems(value)
+                             if name not in cls.VOLATILE_GRAINS)
+            data.append([key, value])
+        try:
+            data = json.dumps(data, sort_keys=True, default=repr)
+        except (TypeError, ValueError):
+            data = repr(data)
+        return hashlib.sha256(salt.utils.to_bytes(data)).hexdigest()
+
+    @staticmethod
+    def _stamp(fpath):
+        try:
+            stat = os.stat(fpath)
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime]
+
+    def get(self, fpath):
+        '''
+        Return the ``[loaded, names or reason]`` outcome of loading a module
+        file, or None if it is unknown
+        '''
+        if fpath not in self.checked:
+            outcome = self.outcomes.get(fpath)
+            if outcome is not None and outcome[0] != self._stamp(fpath):
+                outcome = None
+            self.checked[fpath] = outcome and outcome[1:]
+        return self.checked[fpath]
+
+    def set(self, fpath, loaded, value):
+        '''
+        Record the names a module file was loaded under, or the reason it
+        could not be loaded
+        '''
+        stamp = self._stamp(fpath)
+        if stamp is None \
+                or time.time() - stamp[1] < ModuleDirCache.RACY_SECONDS:
+            return
+        if not loaded:
+            value = str(value) if value is not None else None
+        self.checked[fpath] = [loaded, value]
+        if self.outcomes.get(fpath) != [stamp, loaded, value]:
+            self.outcomes[fpath] = [stamp, loaded, value]
+            self.dirty = True
+
+    def save(self):
+        '''
+        Persist the outcomes if new ones were recorded
+        '''
+        if not self.dirty:
+            return
+        self.dirty = False
+        digests = [pair for pair in self._read() if pair[0] != self.digest]
+        digests.append((self.digest, self.outcomes))
+        try:
+            dirname = os.path.dirname(self.path)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname, 0o700)
+            with salt.utils.atomicfile.atomic_open(self.path, 'w') as fp_:
+                json.dump({'version': salt.version.__version__,
+                           'digests': digests[-self.KEEP_DIGESTS:]}, fp_)
+        except (IOError, OSError, ValueError, TypeError) as exc:
+            log.debug('Unable to write the virtual cache {0}: {1}'.format(
+                self.path, exc))
+
+
+# The virtual caches of the process, by path and digest
+VIRTUAL_CACHES = {}
+
+
+def virtual_cache(opts, tag):
+    '''
+    Return the virtual cache of the loaders of a tag, or None if the
+    ``virtual_cache`` option is not set
+    '''
+    if not opts.get('virtual_cache') or not opts.get('cachedir'):
+        return None
+    path = os.path.join(opts['cachedir'], 'virtual', '{0}.cache'.format(tag))
+    digest = VirtualCache.digest_opts(opts)
+    if (path, digest) not in VIRTUAL_CACHES:
+        VIRTUAL_CACHES[(path, digest)] = VirtualCache(path, digest)
+    return VIRTUAL_CACHES[(path, digest)]
+
+
+def clear_virtual_cache(opts):
+    '''
+    Remove the virtual caches, once the modules or what their ``__virtual__``
+    functions check may have changed
+    '''
+    VIRTUAL_CACHES.clear()
+    if not opts.get('cachedir'):
+        return
+    path = os.path.join(opts['cachedir'], 'virtual')
+    if os.path.isdir(path):
+        log.debug('Clearing the virtual cache')
+        shutil.rmtree(path, ignore_errors=True)
+
+
 def static_loader(
         opts,
         ext_type,
@@ -1100,6 +1380,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         self.virtual_funcs = virtual_funcs
 
         self.disabled = set(self.opts.get('disable_{0}s'.format(self.tag), []))
+        self._virtual_cache = False
 
         self.refresh_file_mapping()
 
@@ -1140,6 +1421,8 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             for name in self._iter_files(mod_name):
                 if name in self.loaded_files:
                     continue
+                if self._cached_failure(name):
+                    continue
                 # if we got what we wanted, we are done
                 if self._load_module(name) and mod_name in self.loaded_modules:
                     break
@@ -1199,15 +1482,37 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         else:
             self.suffix_map[''] = ('', '', imp.PKG_DIRECTORY)
 
+        # The loaders of a process share the mappings made from the same
+        # directory listings
+        MODULE_DIR_CACHE.load(self.opts)
+        mapping_key = (tuple(self.module_dirs),
+                       tuple(suffix_order),
+                       tuple(sorted(self.suffix_map)),
+                       tuple(sorted(self.disabled)))
+        self.file_mapping = MODULE_DIR_CACHE.file_mapping(mapping_key)
+        if self.file_mapping is None:
+            self._map_files(suffix_order, mapping_key)
+            MODULE_DIR_CACHE.save()
+        if self.static_modules:
+            self.file_mapping = self.file_mapping.copy()
+        for smod in self.static_modules:
+            f_noext = smod.split('.')[-1]
+            self.file_mapping[f_noext] = (smod, '.o')
+
+    def _map_files(self, suffix_order, mapping_key):
+        '''
+        Map the module names to the files of the module directories
+        '''
         # create mapping of filename (without suffix) to (path, suffix)
         # The files are added in order of priority, so order *must* be retained.
         self.file_mapping = salt.utils.odict.OrderedDict()
+        used = []
 
         for mod_dir in self.module_dirs:
             files = []
             try:
                 # Make sure we have a sorted listdir in order to have expectable override results
-                files = sorted(os.listdir(mod_dir))
+                files = MODULE_DIR_CACHE.listdir(mod_dir, used)
             except OSError:
                 continue  # Next mod_dir
             for filename in files:
@@ -1231,7 +1536,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     # if its a directory, lets allow us to load that
                     if ext == '':
                         # is there something __init__?
-                        subfiles = os.listdir(fpath)
+                        subfiles = MODULE_DIR_CACHE.listdir(fpath, used)
                         for suffix in suffix_order:
                             if '' == suffix:
                                 continue  # Next suffix (__init__ must have a suffix)
@@ -1258,9 +1563,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
 
                 except OSError:
                     continue
-        for smod in self.static_modules:
-            f_noext = smod.split('.')[-1]
-            self.file_mapping[f_noext] = (smod, '.o')
+        MODULE_DIR_CACHE.set_file_mapping(mapping_key, used, self.file_mapping)
 
     def clear(self):
         '''
@@ -1295,10 +1598,42 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             mod_opts[key] = val
         return mod_opts
 
+    @property
+    def virtual_cache(self):
+        '''
+        The virtual cache of the loader, or None, looked up the first time
+        a module is loaded
+        '''
+        if self._virtual_cache is False:
+            self._virtual_cache = virtual_cache(self.opts, self.tag)
+        return self._virtual_cache
+
     def _iter_files(self, mod_name):
         '''
         Iterate over all file_mapping files in order of closeness to mod_name
         '''
+        if self.virtual_cache is None:
+            for name in self._iter_close_files(mod_name):
+                yield name
+            return
+        # the files known to provide mod_name or to fail to load, which are
+        # not imported, come first, then the files never loaded. The files
+        # known to provide other modules are skipped.
+        unknown = []
+        for name in self._iter_close_files(mod_name):
+            outcome = self.virtual_cache.get(self.file_mapping[name][0])
+            if outcome is None:
+                unknown.append(name)
+            elif not outcome[0] or mod_name in outcome[1]:
+                yield name
+        for name in unknown:
+            yield name
+
+    def _iter_close_files(self, mod_name):
+        '''
+        Iterate over all file_mapping files in order of closeness to mod_name,
+        regardless of the virtual cache
+        '''
         # do we have an exact match?
         if mod_name in self.file_mapping:
             yield mod_name
@@ -1326,6 +1661,27 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 reload_module(submodule)
                 self._reload_submodules(submodule)
 
+    def _cached_failure(self, name):
+        '''
+        Mark a module file as missing, without importing it, if the virtual
+        cache knows it fails to load
+        '''
+        if self.virtual_cache is None:
+            return False
+        outcome = self.virtual_cache.get(self.file_mapping[name][0])
+        if outcome is None or outcome[0]:
+            return False
+        self.loaded_files.add(name)
+        self.missing_modules[name] = outcome[1]
+        return True
+
+    def _cache_outcome(self, name, loaded, value):
+        '''
+        Record the outcome of loading a module file in the virtual cache
+        '''
+        if self.virtual_cache is not None:
+            self.virtual_cache.set(self.file_mapping[name][0], loaded, value)
+
     def _load_module(self, name):
         mod = None
         fpath, suffix = self.file_mapping[name]
@@ -1413,6 +1769,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 exc_info=True
             )
             self.missing_modules[name] = exc
+            self._cache_outcome(name, False, exc)
             return False
         except Exception as error:
             log.error(
@@ -1423,6 +1780,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 exc_info=True
             )
             self.missing_modules[name] = error
+            self._cache_outcome(name, False, error)
             return False
         except SystemExit as error:
             log.error(
@@ -1432,6 +1790,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 exc_info=True
             )
             self.missing_modules[name] = error
+            self._cache_outcome(name, False, error)
             return False
         finally:
             sys.path.remove(fpath_dirname)
@@ -1462,6 +1821,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 )
                 self.missing_modules[module_name] = err_string
                 self.missing_modules[name] = err_string
+                self._cache_outcome(name, False, err_string)
                 return False
 
         # if virtual modules are enabled, we need to look for the
@@ -1483,6 +1843,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     # If a module has information about why it could not be loaded, record it
                     self.missing_modules[module_name] = virtual_err
                     self.missing_modules[name] = virtual_err
+                    self._cache_outcome(name, False, virtual_err)
                     return False
         else:
             virtual_aliases = ()
@@ -1500,6 +1861,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     err_string = 'not a proxy_minion enabled module'
                     self.missing_modules[module_name] = err_string
                     self.missing_modules[name] = err_string
+                    self._cache_outcome(name, False, err_string)
                     return False
 
         if getattr(mod, '__load__', False) is not False:
@@ -1557,6 +1919,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
 
         for tgt_mod in mod_names:
             self.loaded_modules[tgt_mod] = mod_dict[tgt_mod]
+        self._cache_outcome(name, True, mod_names)
         return True
 
     def _load(self, key):
@@ -1577,6 +1940,8 @@ class LazyLoader(salt.utils.lazy.LazyDict):
             for name in self._iter_files(mod_name):
                 if name in self.loaded_files:
                     continue
+                if self._cached_failure(name):
+                    continue
                 # if we got what we wanted, we are done
                 if self._load_module(name) and key in self._dict:
                     return True
@@ -1601,6 +1966,8 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     reloaded = True
                 continue
 
+        if self.virtual_cache is not None:
+            self.virtual_cache.save()
         return ret
 
     def _load_all(self):
@@ -1610,8 +1977,12 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         for name in self.file_mapping:
             if name in self.loaded_files or name in self.missing_modules:
                 continue
+            if self._cached_failure(name):
+                continue
             self._load_module(name)
 
+        if self.virtual_cache is not None:
+            self.virtual_cache.save()
         self.loaded = True
 
     def reload_modules(self):
@@ -232,7 +232,7 @@ class Maintenance(SignalHandlingMultiprocessingProcess):
         while True:
             now = int(time.time())
             if (now - last) >= self.loop_interval:
-                salt.daemons.masterapi.clean_old_jobs(self.opts)
+                self.handle_clean()
                 salt.daemons.masterapi.clean_expired_tokens(self.opts)
                 salt.daemons.masterapi.clean_pub_auth(self.opts)
             self.handle_git_pillar()
@@ -245,26 +245,29 @@ class Maintenance(SignalHandlingMultiprocessingProcess):
             last = now
             time.sleep(self.loop_interval)
 
+    def handle_clean(self):
+        '''
+        Clean out the old jobs from the job cache, fire the number of jobs
+        removed and the duration of the pass reported by the job cache
+        '''
+        stats = salt.daemons.masterapi.clean_old_jobs(self.opts)
+        if isinstance(stats, dict):
+            self.event.fire_event(stats, tagify('clean', 'job_cache'))
+
     def handle_key_cache(self):
         '''
         Evaluate accepted keys and create a msgpack file
         which contains a list
         '''
         if self.opts['key_cache'] == 'sched':
-            keys = []
             #TODO DRY from CKMinions
             if self.opts['transport'] in ('zeromq', 'tcp'):
                 acc = 'minions'
             else:
                 acc = 'accepted'
 
-            for fn_ in os.listdir(os.path.join(self.opts['pki_dir'], acc)):
-                if not fn_.startswith('.') and os.path.isfile(os.path.join(self.opts['pki_dir'], acc, fn_)):
-                    keys.append(fn_)
-            log.debug('Writing master key cache')
-            # Write a temporary file securely
-            with salt.utils.atomicfile.atomic_open(os.path.join(self.opts['pki_dir'], acc, '.key_cache')) as cache_file:
-                self.serial.dump(keys, cache_file)
+            if salt.utils.minions.get_accepted_keys(self.opts, acc).write_key_cache():
+                log.debug('Wrote master key cache')
 
     def handle_key_rotate(self, now):
         '''
@@ -464,6 +467,30 @@ class Master(SMaster):
         if not self.opts['fileserver_backend']:
             errors.append('No fileserver backends are configured')
 
+        pub_sign_algorithm = self.opts.get('pub_sign_algorithm', 'rsa')
+        if pub_sign_algorithm not in ('rsa', 'ed25519'):
+            errors.append(
+                'Invalid pub_sign_algorithm {0}, it must be rsa or '
+                'ed25519'.format(pub_sign_algorithm)
+            )
+        elif pub_sign_algorithm == 'ed25519' and not salt.crypt.HAS_ED25519:
+            errors.append(
+                'pub_sign_algorithm is ed25519 but pycryptodome 3.15 or '
+                'newer is not installed'
+            )
+
+        session_cipher = self.opts.get('session_cipher', 'aes-cbc')
+        if session_cipher not in salt.crypt.Crypticle.CIPHERS:
+            errors.append(
+                'Invalid session_cipher {0}, it must be one of {1}'.format(
+                    session_cipher, ', '.join(salt.crypt.Crypticle.CIPHERS))
+            )
+        elif session_cipher == 'aes-gcm' and not salt.crypt.HAS_GCM:
+            errors.append(
+                'session_cipher is aes-gcm but pycryptodome 3.9 or newer is '
+                'not installed'
+            )
+
         # Check to see if we need to create a pillar cache dir
         if self.opts['pillar_cache'] and not os.path.isdir(os.path.join(self.opts['cachedir'], 'pillar_cache')):
             try:
@@ -532,6 +559,14 @@ class Master(SMaster):
                                                 six.b(salt.crypt.Crypticle.generate_key_string())),
                                       'reload': salt.crypt.Crypticle.generate_key_string
                                      }
+            if self.opts.get('sign_pub_messages') and \
+                    self.opts.get('pub_sign_algorithm', 'rsa') == 'ed25519':
+                # Rotated along with the AES key
+                SMaster.secrets['pub_sign'] = {
+                    'secret': multiprocessing.Array(ctypes.c_char,
+                                                    six.b(salt.crypt.gen_ed25519_seed())),
+                    'reload': salt.crypt.gen_ed25519_seed
+                }
             log.info('Creating master process manager')
             # Since there are children having their own ProcessManager we should wait for kill more time.
             self.process_manager = salt.utils.process.ProcessManager(wait_for_kill=5)
@@ -967,6 +1002,7 @@ class AESFuncs(object):
         self._file_hash = self.fs_.file_hash
         self._file_hash_and_stat = self.fs_.file_hash_and_stat
         self._file_list = self.fs_.file_list
+        self._file_manifest = self.fs_.file_manifest
         self._file_list_emptydirs = self.fs_.file_list_emptydirs
         self._dir_list = self.fs_.dir_list
         self._symlink_list = self.fs_.symlink_list
@@ -1340,6 +1376,10 @@ class AESFuncs(object):
                                        'data',
                                        {'grains': load['grains'],
                                         'pillar': data})
+            salt.utils.minions.update_minion_data_index(
+                self.opts,
+                load['id'],
+                {'grains': load['grains'], 'pillar': data})
             self.event.fire_event({'Minion data cache refresh': load['id']}, tagify(load['id'], 'refresh', 'minion'))
         return data
 
@@ -1678,6 +1718,8 @@ class ClearFuncs(object):
         self.wheel_ = salt.wheel.Wheel(opts)
         # Make a masterapi object
         self.masterapi = salt.daemons.masterapi.LocalFuncs(opts, key)
+        # The publisher channels, created on first publication
+        self.pub_channels = None
 
     def runner(self, clear_load):
         '''
@@ -1989,7 +2031,7 @@ class ClearFuncs(object):
         payload = self._prep_pub(minions, jid, clear_load, extra)
 
         # Send it!
-        self._send_pub(payload)
+        self._send_pub(payload, minions)
 
         return {
             'enc': 'clear',
@@ -2024,13 +2066,19 @@ class ClearFuncs(object):
             return {'error': msg}
         return jid
 
-    def _send_pub(self, load):
+    def _send_pub(self, load, minions=None):
         '''
         Take a load and send it across the network to connected minions
         '''
-        for transport, opts in iter_transport_opts(self.opts):
-            chan = salt.transport.server.PubServerChannel.factory(opts)
-            chan.publish(load)
+        if self.pub_channels is None:
+            # Kept for the life of the worker, to reuse their connection to
+            # the publisher
+            self.pub_channels = [
+                salt.transport.server.PubServerChannel.factory(opts)
+                for transport, opts in iter_transport_opts(self.opts)
+            ]
+        for chan in self.pub_channels:
+            chan.publish(load, minions=minions)
 
     def _prep_pub(self, minions, jid, clear_load, extra):
         '''
@@ -607,6 +607,22 @@ def list_master(saltenv='base', prefix=''):
     return _client().file_list(saltenv, prefix)
 
 
+def list_master_manifest(saltenv='base', prefix=''):
+    '''
+    .. versionadded:: Oxygen
+
+    Return the hash, mode and size of the files stored on the master, by path,
+    with the type of the hashes
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' cp.list_master_manifest prefix=files/
+    '''
+    return _client().file_manifest(saltenv, prefix)
+
+
 def list_master_dirs(saltenv='base', prefix=''):
     '''
     List all of the directories stored on the master
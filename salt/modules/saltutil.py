@@ -42,6 +42,7 @@ import salt
 import salt.config
 import salt.client
 import salt.client.ssh.client
+import salt.loader
 import salt.payload
 import salt.runner
 import salt.state
@@ -103,6 +104,9 @@ def _sync(form, saltenv=None, extmod_whitelist=None, extmod_blacklist=None):
         saltenv = saltenv.split(',')
     ret, touched = salt.utils.extmods.sync(__opts__, form, saltenv=saltenv, extmod_whitelist=extmod_whitelist,
                                            extmod_blacklist=extmod_blacklist)
+    # The synced modules may change what the other modules' __virtual__
+    # functions find
+    salt.loader.clear_virtual_cache(__opts__)
     # Dest mod_dir is touched? trigger reload if requested
     if touched:
         mod_file = os.path.join(__opts__['cachedir'], 'module_refresh')
@@ -2,21 +2,31 @@
 '''
 Return data to local job cache
 
+By default every minion return is stored in its own directory below the
+directory of the job. With :conf_master:`job_cache_segments` enabled, the
+returns of a job are instead appended to a single segment file in the job
+directory, along with a small index of the offsets of the returns in it.
 '''
 from __future__ import absolute_import
 
 # Import python libs
+import contextlib
+import datetime
 import errno
+import fnmatch
 import glob
 import logging
 import os
 import shutil
+import struct
+import tempfile
 import time
-import bisect
+from collections import OrderedDict
 
 # Import salt libs
 import salt.payload
 import salt.utils
+import salt.utils.atomicfile
 import salt.utils.files
 import salt.utils.jid
 import salt.exceptions
@@ -24,6 +34,12 @@ import salt.exceptions
 # Import 3rd-party libs
 import msgpack
 import salt.ext.six as six
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    # fcntl is not available on windows
+    HAS_FCNTL = False
 
 
 log = logging.getLogger(__name__)
@@ -42,6 +58,26 @@ RETURN_P = 'return.p'
 OUT_P = 'out.p'
 # endtime is the end time for a job, not stored as msgpack
 ENDTIME = 'endtime'
+# the returns of a job, appended one after the other (job_cache_segments)
+RETURNS_SEG = '.returns.seg'
+# index of the returns in the segment file, each entry is a header followed by
+# the minion id
+RETURNS_IDX = '.returns.idx'
+# index entry header: offset and length of the return, length of the minion id
+IDX_HEADER = struct.Struct('>QIH')
+# index of the jobs in the cache (jid, function, target, user...), appended to
+# by save_load and pruned by clean_old_jobs
+JID_INDEX = '.jid_index'
+# directory of the hour buckets listing the job directories created in each
+# hour, clean_old_jobs only has to read the buckets of the expired hours
+JID_BUCKETS = '.jid_buckets'
+# touched by the last full scan of the job cache done by clean_old_jobs
+JID_BUCKETS_SCAN = '.scan'
+
+# Per-process view of the segment indexes of the jobs being returned to:
+# jid_dir -> [index bytes read, set of minion ids]
+_SEGMENT_INDEXES = {}
+_SEGMENT_INDEXES_MAX = 128
 
 
 def _job_dir():
@@ -75,6 +111,162 @@ def _walk_through(job_dir):
                 yield jid, job, t_path, final
 
 
+def _jid_index_path():
+    '''
+    Return the path of the index of the jobs in the cache
+    '''
+    return os.path.join(__opts__['cachedir'], JID_INDEX)
+
+
+@contextlib.contextmanager
+def _jid_index_lock():
+    '''
+    Serialize the writers of the jid index
+    '''
+    if not os.path.isdir(__opts__['cachedir']):
+        try:
+            os.makedirs(__opts__['cachedir'])
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+    lock_path = _jid_index_path() + '.lock'
+    with salt.utils.fopen(lock_path, 'a+b') as lock_fh:
+        with _locked(lock_fh, lock_path):
+            yield
+
+
+def _jid_index_record(jid, load):
+    '''
+    Return the compact record of a job kept in the jid index, holding what
+    format_job_instance needs
+    '''
+    record = {'jid': jid}
+    for key in ('fun', 'arg', 'tgt', 'tgt_type', 'user'):
+        if key in load:
+            record[key] = load[key]
+    if 'metadata' in load:
+        record['metadata'] = load['metadata']
+    elif isinstance(load.get('kwargs'), dict) and 'metadata' in load['kwargs']:
+        record['metadata'] = load['kwargs']['metadata']
+    return record
+
+
+def _pack_jid_index_record(serial, record):
+    payload = serial.dumps(record)
+    return struct.pack('>I', len(payload)) + payload
+
+
+def _write_jid_index(serial, records):
+    '''
+    Replace the jid index with the passed records. Must be called with the
+    index lock held.
+    '''
+    tmpfh, tmpfn = tempfile.mkstemp(dir=__opts__['cachedir'])
+    with os.fdopen(tmpfh, 'wb') as fh_:
+        for record in records:
+            fh_.write(_pack_jid_index_record(serial, record))
+    salt.utils.files.rename(tmpfn, _jid_index_path())
+
+
+def _read_jid_index():
+    '''
+    Return an ordered dict of the records of the jid index, keyed by jid. The
+    index is built by walking the job cache if it does not exist yet.
+    '''
+    serial = salt.payload.Serial(__opts__)
+    ret = OrderedDict()
+    try:
+        with salt.utils.fopen(_jid_index_path(), 'rb') as fh_:
+            buf = fh_.read()
+    except IOError as exc:
+        if exc.errno != errno.ENOENT:
+            raise
+        with _jid_index_lock():
+            if not os.path.exists(_jid_index_path()):
+                log.debug('Building the jid index of the job cache')
+                if os.path.isdir(_job_dir()):
+                    for jid, job, _, _ in _walk_through(_job_dir()):
+                        ret[jid] = _jid_index_record(jid, job)
+                _write_jid_index(serial, six.itervalues(ret))
+                return ret
+        return _read_jid_index()
+    pos = 0
+    while pos + 4 <= len(buf):
+        size = struct.unpack('>I', buf[pos:pos + 4])[0]
+        if pos + 4 + size > len(buf):
+            break
+        record = serial.loads(buf[pos + 4:pos + 4 + size])
+        # A job saved again replaces its previous record
+        ret.pop(record['jid'], None)
+        ret[record['jid']] = record
+        pos += 4 + size
+    return ret
+
+
+def _update_jid_index(jid, load):
+    '''
+    Append the record of a job to the jid index
+    '''
+    serial = salt.payload.Serial(__opts__)
+    record = _pack_jid_index_record(serial, _jid_index_record(jid, load))
+    with _jid_index_lock():
+        # Without an index, the next reader builds it from the job cache
+        if os.path.exists(_jid_index_path()):
+            with salt.utils.fopen(_jid_index_path(), 'ab') as fh_:
+                fh_.write(record)
+
+
+def _prune_jid_index(cutoff):
+    '''
+    Drop the jobs removed from the job cache from the jid index. Only jobs
+    started before the ``cutoff`` jid can have expired and are checked.
+    '''
+    serial = salt.payload.Serial(__opts__)
+    if not os.path.exists(_jid_index_path()):
+        return
+    with _jid_index_lock():
+        if not os.path.exists(_jid_index_path()):
+            return
+        records = _read_jid_index()
+        expired = [
+            jid for jid in records
+            if (jid < cutoff or not salt.utils.jid.is_jid(jid))
+            and not os.path.isdir(salt.utils.jid.jid_dir(jid, _job_dir(), __opts__['hash_type']))
+        ]
+        if expired:
+            for jid in expired:
+                del records[jid]
+            _write_jid_index(serial, six.itervalues(records))
+
+
+def _bucket_dir():
+    '''
+    Return the directory of the hour buckets of the job cache
+    '''
+    return os.path.join(__opts__['cachedir'], JID_BUCKETS)
+
+
+def _add_to_bucket(jid_dir):
+    '''
+    Record a job directory in the bucket of the current hour
+    '''
+    bucket = salt.utils.jid.datetime_to_jid(datetime.datetime.now())[:10]
+    try:
+        if not os.path.isdir(_bucket_dir()):
+            try:
+                os.makedirs(_bucket_dir())
+            except OSError as exc:
+                if exc.errno != errno.EEXIST:
+                    raise
+        # A single short append, not interleaved with the appends of the
+        # other processes
+        with salt.utils.fopen(os.path.join(_bucket_dir(), bucket), 'a') as fh_:
+            fh_.write(os.path.relpath(jid_dir, _job_dir()) + '\n')
+    except (IOError, OSError) as exc:
+        # The job is still removed by the next full scan
+        log.warning('Unable to add {0} to the job cache buckets: {1}'.format(jid_dir, exc))
+
+
 #TODO: add to returner docs-- this is a new one
 def prep_jid(nocache=False, passed_jid=None, recurse_count=0):
     '''
@@ -114,6 +306,7 @@ def prep_jid(nocache=False, passed_jid=None, recurse_count=0):
         if nocache:
             with salt.utils.fopen(os.path.join(jid_dir, 'nocache'), 'wb+') as fn_:
                 fn_.write(b'')
+        _add_to_bucket(jid_dir)
     except IOError:
         log.warning('Could not write out jid file for job {0}. Retrying.'.format(jid))
         time.sleep(0.1)
@@ -123,6 +316,99 @@ def prep_jid(nocache=False, passed_jid=None, recurse_count=0):
     return jid
 
 
+@contextlib.contextmanager
+def _locked(fh_, path):
+    '''
+    Hold an exclusive lock on an open file
+    '''
+    if HAS_FCNTL:
+        fcntl.flock(fh_.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh_.fileno(), fcntl.LOCK_UN)
+    else:
+        with salt.utils.files.wait_lock(path):
+            yield
+
+
+def _parse_segment_index(buf):
+    '''
+    Parse the complete entries of a segment index, return the list of
+    ``(minion_id, offset, length)`` entries and the number of bytes consumed
+    '''
+    entries = []
+    pos = 0
+    while pos + IDX_HEADER.size <= len(buf):
+        offset, length, id_len = IDX_HEADER.unpack_from(buf, pos)
+        end = pos + IDX_HEADER.size + id_len
+        if end > len(buf):
+            break
+        minion_id = salt.utils.to_str(buf[pos + IDX_HEADER.size:end])
+        entries.append((minion_id, offset, length))
+        pos = end
+    return entries, pos
+
+
+def _append_return(jid_dir, minion_id, ret):
+    '''
+    Append the return of a minion to the segment file of a job. Returns False
+    if the minion already returned for the job.
+    '''
+    serial = salt.payload.Serial(__opts__)
+    payload = serial.dumps(ret)
+    id_bytes = salt.utils.to_bytes(minion_id)
+    idx_path = os.path.join(jid_dir, RETURNS_IDX)
+    with salt.utils.fopen(idx_path, 'a+b') as idx_fh:
+        with _locked(idx_fh, idx_path):
+            # Catch up with the returns appended by the other workers
+            known = _SEGMENT_INDEXES.get(jid_dir)
+            if known is None or known[0] > os.fstat(idx_fh.fileno()).st_size:
+                if len(_SEGMENT_INDEXES) >= _SEGMENT_INDEXES_MAX:
+                    _SEGMENT_INDEXES.clear()
+                known = _SEGMENT_INDEXES[jid_dir] = [0, set()]
+            idx_fh.seek(known[0])
+            buf = idx_fh.read()
+            entries, consumed = _parse_segment_index(buf)
+            known[0] += consumed
+            known[1].update(entry[0] for entry in entries)
+            if consumed < len(buf):
+                # Drop an entry left incomplete by an interrupted writer
+                idx_fh.truncate(known[0])
+            if minion_id in known[1]:
+                return False
+            with salt.utils.fopen(os.path.join(jid_dir, RETURNS_SEG), 'ab') as seg_fh:
+                seg_fh.seek(0, os.SEEK_END)
+                offset = seg_fh.tell()
+                seg_fh.write(payload)
+            entry = IDX_HEADER.pack(offset, len(payload), len(id_bytes)) + id_bytes
+            idx_fh.seek(0, os.SEEK_END)
+            idx_fh.write(entry)
+            known[0] += len(entry)
+            known[1].add(minion_id)
+    return True
+
+
+def _read_returns(jid_dir):
+    '''
+    Yield the minion id and the return data of the returns appended to the
+    segment file of a job
+    '''
+    serial = salt.payload.Serial(__opts__)
+    try:
+        with salt.utils.fopen(os.path.join(jid_dir, RETURNS_IDX), 'rb') as idx_fh:
+            entries = _parse_segment_index(idx_fh.read())[0]
+        if not entries:
+            return
+        with salt.utils.fopen(os.path.join(jid_dir, RETURNS_SEG), 'rb') as seg_fh:
+            for minion_id, offset, length in entries:
+                seg_fh.seek(offset)
+                yield minion_id, serial.loads(seg_fh.read(length))
+    except IOError as exc:
+        if exc.errno != errno.ENOENT:
+            raise
+
+
 def returner(load):
     '''
     Return data to the local job cache
@@ -137,6 +423,25 @@ def returner(load):
     if os.path.exists(os.path.join(jid_dir, 'nocache')):
         return
 
+    if __opts__.get('job_cache_segments', False):
+        if not os.path.isdir(jid_dir):
+            log.error(
+                'An inconsistency occurred, a job was received with a job id '
+                'that is not present in the local cache: {jid}'.format(**load)
+            )
+            return False
+        ret = dict((key, load[key]) for key in ['return', 'retcode', 'success', 'out'] if key in load)
+        if not _append_return(jid_dir, load['id'], ret):
+            # Minion has already returned this jid and it should be dropped
+            log.error(
+                'An extra return was detected from minion {0}, please verify '
+                'the minion, this could be a replay attack'.format(
+                    load['id']
+                )
+            )
+            return False
+        return
+
     hn_dir = os.path.join(jid_dir, load['id'])
 
     try:
@@ -201,6 +506,7 @@ def save_load(jid, clear_load, minions=None, recurse_count=0):
     try:
         if not os.path.exists(jid_dir):
             os.makedirs(jid_dir)
+            _add_to_bucket(jid_dir)
     except OSError as exc:
         if exc.errno == errno.EEXIST:
             # rarely, the directory can be already concurrently created between
@@ -219,6 +525,11 @@ def save_load(jid, clear_load, minions=None, recurse_count=0):
         return save_load(jid=jid, clear_load=clear_load,
                          recurse_count=recurse_count+1)
 
+    try:
+        _update_jid_index(jid, clear_load)
+    except (IOError, OSError) as exc:
+        log.warning('Could not update the jid index: %s', exc)
+
     # if you have a tgt, save that for the UI etc
     if 'tgt' in clear_load and clear_load['tgt'] != '':
         if minions is None:
@@ -325,6 +636,8 @@ def get_jid(jid):
     # Check to see if the jid is real, if not return the empty dict
     if not os.path.isdir(jid_dir):
         return ret
+    for minion_id, ret_data in _read_returns(jid_dir):
+        ret[minion_id] = ret_data
     for fn_ in os.listdir(jid_dir):
         if fn_.startswith('.'):
             continue
@@ -356,8 +669,30 @@ def get_jids():
     '''
     Return a dict mapping all job ids to job information
     '''
+    return search_jids()
+
+
+def search_jids(functions=None, start=None, end=None):
+    '''
+    Return a dict mapping the job ids to job information of the jobs matching
+    the given criteria, looked up in the jid index.
+
+    :param list functions: only return jobs running a function matching one
+                           of these globs
+    :param str start: only return jobs started at or after the time of this
+                      jid
+    :param str end: only return jobs started at or before the time of this
+                    jid
+    '''
     ret = {}
-    for jid, job, _, _ in _walk_through(_job_dir()):
+    for jid, job in six.iteritems(_read_jid_index()):
+        if start is not None and jid < start:
+            continue
+        if end is not None and jid > end:
+            continue
+        if functions and not any(
+                fnmatch.fnmatch(job.get('fun', ''), fun) for fun in functions):
+            continue
         ret[jid] = salt.utils.jid.format_jid_instance(jid, job)
 
         if __opts__.get('job_cache_store_endtime'):
@@ -374,26 +709,118 @@ def get_jids_filter(count, filter_find_job=True):
     :param int count: show not more than the count of most recent jobs
     :param bool filter_find_jobs: filter out 'saltutil.find_job' jobs
     '''
-    keys = []
     ret = []
-    for jid, job, _, _ in _walk_through(_job_dir()):
-        job = salt.utils.jid.format_jid_instance_ext(jid, job)
-        if filter_find_job and job['Function'] == 'saltutil.find_job':
+    for jid, job in sorted(six.iteritems(_read_jid_index()), reverse=True):
+        if filter_find_job and job.get('fun') == 'saltutil.find_job':
             continue
-        i = bisect.bisect(keys, jid)
-        if len(keys) == count and i == 0:
-            continue
-        keys.insert(i, jid)
-        ret.insert(i, job)
-        if len(keys) > count:
-            del keys[0]
-            del ret[0]
+        if len(ret) >= count:
+            break
+        ret.append(salt.utils.jid.format_jid_instance_ext(jid, job))
+    ret.reverse()
     return ret
 
 
+def _clean_old_jobs_scan(cur):
+    '''
+    Walk the whole job cache and remove the jobs older than keep_jobs, return
+    the number of jobs removed
+    '''
+    jid_root = _job_dir()
+    pruned = 0
+
+    # Keep track of any empty t_path dirs that need to be removed later
+    dirs_to_remove = set()
+
+    for top in os.listdir(jid_root):
+        t_path = os.path.join(jid_root, top)
+
+        if not os.path.exists(t_path):
+            continue
+
+        # Check if there are any stray/empty JID t_path dirs
+        t_path_dirs = os.listdir(t_path)
+        if not t_path_dirs and t_path not in dirs_to_remove:
+            dirs_to_remove.add(t_path)
+            continue
+
+        for final in t_path_dirs:
+            f_path = os.path.join(t_path, final)
+            jid_file = os.path.join(f_path, 'jid')
+            if not os.path.isfile(jid_file) and os.path.exists(t_path):
+                # No jid file means corrupted cache entry, scrub it
+                # by removing the entire t_path directory
+                shutil.rmtree(t_path)
+                pruned += len(t_path_dirs)
+                break
+            elif os.path.isfile(jid_file):
+                jid_ctime = os.stat(jid_file).st_ctime
+                hours_difference = (cur - jid_ctime) / 3600.0
+                if hours_difference > __opts__['keep_jobs'] and os.path.exists(t_path):
+                    # Remove the entire t_path from the original JID dir
+                    shutil.rmtree(t_path)
+                    pruned += len(t_path_dirs)
+                    break
+
+    # Remove empty JID dirs from job cache, if they're old enough.
+    # JID dirs may be empty either from a previous cache-clean with the bug
+    # Listed in #29286 still present, or the JID dir was only recently made
+    # And the jid file hasn't been created yet.
+    if dirs_to_remove:
+        for t_path in dirs_to_remove:
+            # Checking the time again prevents a possible race condition where
+            # t_path JID dirs were created, but not yet populated by a jid file.
+            t_path_ctime = os.stat(t_path).st_ctime
+            hours_difference = (cur - t_path_ctime) / 3600.0
+            if hours_difference > __opts__['keep_jobs']:
+                shutil.rmtree(t_path)
+    return pruned
+
+
+def _clean_old_jobs_buckets(cutoff):
+    '''
+    Remove the jobs listed in the hour buckets before the ``cutoff`` jid,
+    return the number of jobs removed
+    '''
+    jid_root = _job_dir()
+    pruned = 0
+    for bucket in sorted(os.listdir(_bucket_dir())):
+        if bucket.startswith('.'):
+            continue
+        if bucket >= cutoff[:10]:
+            # Buckets are named after their hour, the remaining ones are newer
+            break
+        bucket_path = os.path.join(_bucket_dir(), bucket)
+        with salt.utils.fopen(bucket_path, 'r') as fh_:
+            jid_dirs = set(line.strip() for line in fh_)
+        for jid_dir in jid_dirs:
+            if not jid_dir:
+                continue
+            f_path = os.path.join(jid_root, jid_dir)
+            if os.path.isdir(f_path):
+                shutil.rmtree(f_path)
+                pruned += 1
+                try:
+                    # Drop the t_path dir once its last job is gone
+                    os.rmdir(os.path.dirname(f_path))
+                except OSError:
+                    pass
+        os.remove(bucket_path)
+    return pruned
+
+
 def clean_old_jobs():
     '''
     Clean out the old jobs from the job cache
+
+    The jobs are removed using the hour buckets the job directories are
+    recorded in when they are created, so a pass only reads the buckets of
+    the hours that expired. A job is removed within the hour after it is
+    ``keep_jobs`` hours old. Once every ``keep_jobs`` hours the whole job
+    cache is walked instead, to remove the jobs which are not in a bucket
+    (stray directories, jobs cached before the buckets existed).
+
+    Returns the number of jobs removed and the duration of the pass in
+    seconds.
     '''
     if __opts__['keep_jobs'] != 0:
         cur = time.time()
@@ -402,47 +829,35 @@ def clean_old_jobs():
         if not os.path.exists(jid_root):
             return
 
-        # Keep track of any empty t_path dirs that need to be removed later
-        dirs_to_remove = set()
-
-        for top in os.listdir(jid_root):
-            t_path = os.path.join(jid_root, top)
-
-            if not os.path.exists(t_path):
-                continue
-
-            # Check if there are any stray/empty JID t_path dirs
-            t_path_dirs = os.listdir(t_path)
-            if not t_path_dirs and t_path not in dirs_to_remove:
-                dirs_to_remove.add(t_path)
-                continue
-
-            for final in t_path_dirs:
-                f_path = os.path.join(t_path, final)
-                jid_file = os.path.join(f_path, 'jid')
-                if not os.path.isfile(jid_file) and os.path.exists(t_path):
-                    # No jid file means corrupted cache entry, scrub it
-                    # by removing the entire t_path directory
-                    shutil.rmtree(t_path)
-                elif os.path.isfile(jid_file):
-                    jid_ctime = os.stat(jid_file).st_ctime
-                    hours_difference = (cur - jid_ctime) / 3600.0
-                    if hours_difference > __opts__['keep_jobs'] and os.path.exists(t_path):
-                        # Remove the entire t_path from the original JID dir
-                        shutil.rmtree(t_path)
-
-        # Remove empty JID dirs from job cache, if they're old enough.
-        # JID dirs may be empty either from a previous cache-clean with the bug
-        # Listed in #29286 still present, or the JID dir was only recently made
-        # And the jid file hasn't been created yet.
-        if dirs_to_remove:
-            for t_path in dirs_to_remove:
-                # Checking the time again prevents a possible race condition where
-                # t_path JID dirs were created, but not yet populated by a jid file.
-                t_path_ctime = os.stat(t_path).st_ctime
-                hours_difference = (cur - t_path_ctime) / 3600.0
-                if hours_difference > __opts__['keep_jobs']:
-                    shutil.rmtree(t_path)
+        cutoff = salt.utils.jid.datetime_to_jid(
+            datetime.datetime.fromtimestamp(cur) -
+            datetime.timedelta(hours=__opts__['keep_jobs']))
+        scan_marker = os.path.join(_bucket_dir(), JID_BUCKETS_SCAN)
+        try:
+            last_scan = os.stat(scan_marker).st_mtime
+        except OSError:
+            last_scan = 0
+        if (cur - last_scan) / 3600.0 > __opts__['keep_jobs']:
+            full_scan = True
+            pruned = _clean_old_jobs_scan(cur)
+            if not os.path.isdir(_bucket_dir()):
+                os.makedirs(_bucket_dir())
+            with salt.utils.fopen(scan_marker, 'w'):
+                pass
+            os.utime(scan_marker, (cur, cur))
+        else:
+            full_scan = False
+            pruned = _clean_old_jobs_buckets(cutoff)
+
+        _prune_jid_index(cutoff)
+
+        duration = time.time() - cur
+        log.debug(
+            'Removed {0} jobs from the job cache in {1:.3f}s{2}'.format(
+                pruned, duration, ' (full scan)' if full_scan else ''))
+        return {'pruned': pruned,
+                'duration': duration,
+                'full_scan': full_scan}
 
 
 def update_endtime(jid, time):
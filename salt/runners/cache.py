@@ -413,6 +413,23 @@ def cloud(tgt, provider=None):
     return ret
 
 
+def memcache_stats():
+    '''
+    .. versionadded:: Oxygen
+
+    Return the memcache hits, misses and evictions of the master processes,
+    along with the number of items kept in memory and their size, per top level
+    bank of the minion data cache.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run cache.memcache_stats
+    '''
+    return salt.cache.memcache_stats(__opts__)
+
+
 def store(bank, key, data, cachedir=None):
     '''
     Lists entries stored in the specified bank.
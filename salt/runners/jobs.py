@@ -302,7 +302,26 @@ def list_jobs(ext_source=None,
         )
     mminion = salt.minion.MasterMinion(__opts__)
 
-    ret = mminion.returners['{0}.get_jids'.format(returner)]()
+    fstr = '{0}.search_jids'.format(returner)
+    if fstr in mminion.returners:
+        # The returner keeps an index of the jobs, let it apply the function
+        # and time range filters
+        kwargs = {}
+        if search_function:
+            kwargs['functions'] = salt.utils.split_input(search_function)
+            search_function = None
+        if DATEUTIL_SUPPORT:
+            if start_time:
+                kwargs['start'] = salt.utils.jid.datetime_to_jid(
+                    dateutil_parser.parse(start_time))
+                start_time = None
+            if end_time:
+                kwargs['end'] = salt.utils.jid.datetime_to_jid(
+                    dateutil_parser.parse(end_time))
+                end_time = None
+        ret = mminion.returners[fstr](**kwargs)
+    else:
+        ret = mminion.returners['{0}.get_jids'.format(returner)]()
 
     mret = {}
     for item in ret:
@@ -21,7 +21,11 @@ import site
 import fnmatch
 import logging
 import datetime
+import hashlib
+import heapq
+import select
 import traceback
+import multiprocessing
 import re
 import time
 import random
@@ -32,11 +36,13 @@ import salt.loader
 import salt.minion
 import salt.pillar
 import salt.fileclient
+import salt.utils.atomicfile
 import salt.utils.crypt
 import salt.utils.dictupdate
 import salt.utils.event
 import salt.utils.url
 import salt.utils.process
+import salt.utils.rendercache
 import salt.syspaths as syspaths
 from salt.utils import immutabletypes
 from salt.template import compile_template, compile_template_str
@@ -118,6 +124,10 @@ STATE_RUNTIME_KEYWORDS = frozenset([
 
 STATE_INTERNAL_KEYWORDS = STATE_REQUISITE_KEYWORDS.union(STATE_REQUISITE_IN_KEYWORDS).union(STATE_RUNTIME_KEYWORDS)
 
+# The first order given to the states by state_auto_order, the lower orders
+# are left to the explicit orders of the states
+STATE_AUTO_ORDER_START = 10000
+
 
 def _odict_hashable(self):
     return id(self)
@@ -163,6 +173,85 @@ def trim_req(req):
     return req
 
 
+class RequisiteGraph(object):
+    '''
+    Index of the low chunks of a state run by ``__id__``, ``name`` and
+    ``__sls__``, to find the chunks matched by a requisite without scanning
+    all the chunks for each requisite of each chunk.
+    '''
+    GLOB = re.compile(r'[*?[]')
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.size = len(chunks)
+        self._ids = {}
+        self._names = {}
+        self._sls = {}
+        self._found = {}
+        for pos, chunk in enumerate(chunks):
+            for index, key in ((self._ids, '__id__'),
+                               (self._names, 'name'),
+                               (self._sls, '__sls__')):
+                value = chunk.get(key)
+                if isinstance(value, six.string_types):
+                    index.setdefault(os.path.normcase(value), []).append(pos)
+
+    def current(self, chunks):
+        '''
+        Return True if the graph indexes this list of chunks
+        '''
+        return self.chunks is chunks and self.size == len(chunks)
+
+    def find(self, req):
+        '''
+        Return the chunks matched by a trimmed requisite, such as
+        ``{'file': '/etc/hosts'}``, ``{'id': 'apache'}`` or ``{'sls':
+        'web.*'}``, in the order of the chunks. Glob requisites are matched
+        against the chunks once per state run.
+        '''
+        req_key = next(iter(req))
+        req_val = req[req_key]
+        if req_val is None:
+            return []
+        if not isinstance(req_val, six.string_types):
+            raise TypeError(
+                'Requisite value {0!r} is not a string'.format(req_val))
+        try:
+            return self._found[(req_key, req_val)]
+        except KeyError:
+            pass
+        if self.GLOB.search(req_val):
+            found = self._glob(req_key, req_val)
+        else:
+            val = os.path.normcase(req_val)
+            if req_key == 'sls':
+                found = [self.chunks[pos] for pos in self._sls.get(val, ())]
+            else:
+                positions = set(self._ids.get(val, ()))
+                positions.update(self._names.get(val, ()))
+                found = [self.chunks[pos] for pos in sorted(positions)
+                         if req_key == 'id' or self.chunks[pos]['state'] == req_key]
+        self._found[(req_key, req_val)] = found
+        return found
+
+    def _glob(self, req_key, req_val):
+        '''
+        Match a glob requisite against all the chunks
+        '''
+        found = []
+        for chunk in self.chunks:
+            if req_key == 'sls':
+                # Allow requisite tracking of entire sls files
+                if fnmatch.fnmatch(chunk['__sls__'], req_val):
+                    found.append(chunk)
+                continue
+            if (fnmatch.fnmatch(chunk['name'], req_val) or
+                    fnmatch.fnmatch(chunk['__id__'], req_val)):
+                if req_key == 'id' or chunk['state'] == req_key:
+                    found.append(chunk)
+        return found
+
+
 def state_args(id_, state, high):
     '''
     Return a set of the arguments passed to the named state
@@ -685,6 +774,8 @@ class State(object):
         self.mod_init = set()
         self.pre = {}
         self.__run_num = 0
+        self._requisite_graph = None
+        self._parallel_procs = 0
         self.jid = jid
         self.instance_id = str(id(self))
         self.inject_globals = {}
@@ -910,6 +1001,7 @@ class State(object):
                 log.error('Error encountered during module reload. Modules were not reloaded.')
             except TypeError:
                 log.error('Error encountered during module reload. Modules were not reloaded.')
+        salt.loader.clear_virtual_cache(self.opts)
         self.load_modules()
         if not self.opts.get('local', False) and self.opts.get('multiprocessing', True):
             self.functions['saltutil.refresh_modules']()
@@ -1704,6 +1796,7 @@ class State(object):
                 target=self._call_parallel_target,
                 args=(cdata, low))
         proc.start()
+        self._parallel_procs += 1
         ret = {'name': cdata['args'][0],
                 'result': None,
                 'changes': {},
@@ -1962,6 +2055,16 @@ class State(object):
             validated_retry_data = retry_defaults
         return validated_retry_data
 
+    def requisite_graph(self, chunks):
+        '''
+        Return the requisite graph of the chunks of the state run, built once
+        per list of chunks
+        '''
+        if self._requisite_graph is None or \
+                not self._requisite_graph.current(chunks):
+            self._requisite_graph = RequisiteGraph(chunks)
+        return self._requisite_graph
+
     def call_chunks(self, chunks):
         '''
         Iterate over a list of chunks and call them, checking for requires.
@@ -1989,7 +2092,14 @@ class State(object):
                         self.__run_num += 1
                         chunks.remove(low)
                         break
-        running = {}
+        self.requisite_graph(chunks)
+        if self.opts.get('state_workers', 0) > 1:
+            running = self.call_chunks_pool(chunks)
+            if '__FAILHARD__' in running:
+                running.pop('__FAILHARD__')
+                return running
+        else:
+            running = {}
         for low in chunks:
             if '__FAILHARD__' in running:
                 running.pop('__FAILHARD__')
@@ -2007,6 +2117,285 @@ class State(object):
         ret = dict(list(disabled.items()) + list(running.items()))
         return ret
 
+    def call_chunks_pool(self, chunks):
+        '''
+        Call the chunks on a pool of ``state_workers`` worker processes,
+        starting each chunk as soon as the chunks it requires, watches,
+        onfails or onchanges have run. The chunks are started in the order of
+        the chunk list, and the chunks of each order level (see
+        ``_order_level``) all run before the chunks of the next one.
+
+        Chunks with a prereq or a prerequired requisite run in this process,
+        once no worker is busy. The results are numbered in the order the
+        chunks finished.
+        '''
+        size = self.opts['state_workers']
+        graph = self.requisite_graph(chunks)
+        tags = [_gen_tag(low) for low in chunks]
+        positions = dict((tag, pos) for pos, tag in enumerate(tags))
+        levels = [self._order_level(low) for low in chunks]
+        unfinished = {}
+        for level in levels:
+            unfinished[level] = unfinished.get(level, 0) + 1
+        waiting = [0] * len(chunks)
+        dependents = [[] for low in chunks]
+        for pos, low in enumerate(chunks):
+            deps = set()
+            for r_state in ('require', 'watch', 'onfail', 'onchanges'):
+                for req in low.get(r_state) or ():
+                    if isinstance(req, six.string_types):
+                        req = {'id': req}
+                    try:
+                        found = graph.find(trim_req(req))
+                    except TypeError:
+                        # call_chunk reports the invalid requisite
+                        continue
+                    deps.update(positions[_gen_tag(chunk)] for chunk in found)
+            waiting[pos] = len(deps)
+            for dep in deps:
+                dependents[dep].append(pos)
+        ready = [pos for pos in range(len(chunks)) if not waiting[pos]]
+        heapq.heapify(ready)
+        started = set()
+        finished = set()
+        running = {}
+        # The tags in the order they were added to the running dict, the
+        # workers are sent the results they have not seen with each chunk
+        done = []
+        pool = []
+
+        def finish(pos):
+            if pos is None or pos in finished:
+                return
+            finished.add(pos)
+            unfinished[levels[pos]] -= 1
+            for dependent in dependents[pos]:
+                waiting[dependent] -= 1
+                if not waiting[dependent] and dependent not in started:
+                    heapq.heappush(ready, dependent)
+
+        def add(tag, ret):
+            running[tag] = ret
+            done.append(tag)
+            finish(positions.get(tag))
+
+        def collect():
+            # Add the results of the idle workers to the running dict
+            failhard = False
+            for low, rets in self._reconcile_workers(pool):
+                for tag, ret in six.iteritems(rets):
+                    if tag not in running:
+                        ret['__run_num__'] = self.__run_num
+                        self.__run_num += 1
+                        add(tag, ret)
+                ret = running[_gen_tag(low)]
+                self.check_refresh(low, ret)
+                self.event(ret, len(chunks), fire_event=low.get('fire_event'))
+                if self.check_failhard(low, running):
+                    failhard = True
+            return failhard
+
+        def call_here(pos):
+            # Run the chunk, and the requisites call_chunk finds missing, in
+            # this process
+            started.add(pos)
+            before = set(running)
+            self.call_chunk(chunks[pos], running, chunks)
+            self.active = set()
+            for tag in set(running) - before:
+                add(tag, running[tag])
+            finish(pos)
+            return '__FAILHARD__' in running or \
+                self.check_failhard(chunks[pos], running)
+
+        failhard = False
+        try:
+            while len(finished) < len(chunks) and not failhard:
+                failhard = collect()
+                if failhard or len(finished) == len(chunks):
+                    break
+                level = min(lvl for lvl in unfinished if unfinished[lvl])
+                busy = [worker for worker in pool if worker['low']]
+                while ready and len(busy) < size and levels[ready[0]] <= level:
+                    pos = ready[0]
+                    low = chunks[pos]
+                    if pos in started or pos in finished:
+                        heapq.heappop(ready)
+                        continue
+                    if tags[pos] in running:
+                        heapq.heappop(ready)
+                        finish(pos)
+                        continue
+                    if 'prereq' in low or 'prerequired' in low:
+                        if busy:
+                            break
+                        heapq.heappop(ready)
+                        failhard = call_here(pos)
+                        break
+                    heapq.heappop(ready)
+                    started.add(pos)
+                    # Load the state module, and aggregate the chunk, here
+                    # rather than in each worker
+                    low = self._mod_aggregate(low, running, chunks)
+                    self._mod_init(low)
+                    worker = self._idle_worker(pool, running, chunks, len(done))
+                    worker['conn'].send(
+                        (low, dict((tag, running[tag]) for tag in done[worker['done']:])))
+                    worker['done'] = len(done)
+                    worker['low'] = low
+                    busy.append(worker)
+                if busy:
+                    self._wait_workers(busy)
+                elif not failhard and len(finished) < len(chunks) and \
+                        not (ready and levels[ready[0]] <= level):
+                    # The remaining chunks wait for each other, let
+                    # call_chunk sort out the recursive requisites
+                    failhard = call_here(min(pos for pos in range(len(chunks))
+                                             if pos not in finished))
+            while [worker for worker in pool if worker['low']]:
+                self._wait_workers(pool)
+                failhard = collect() or failhard
+        finally:
+            for worker in pool:
+                self._stop_worker(worker)
+        if failhard:
+            running['__FAILHARD__'] = True
+        return running
+
+    def _order_level(self, low):
+        '''
+        Return the order level of a chunk, the chunks of a level all run before
+        the chunks of the next one. The levels follow the order of the chunk
+        list: each explicit numeric order below the ones of state_auto_order,
+        ``first`` included, is a level of its own, the unordered and
+        auto-ordered chunks share a level, and each order of the chunks ordered
+        ``last`` or with a negative order is a level of its own after it.
+        '''
+        order = low.get('order', STATE_AUTO_ORDER_START)
+        if not isinstance(order, (int, float)):
+            return STATE_AUTO_ORDER_START
+        if STATE_AUTO_ORDER_START <= order < 1000000:
+            return STATE_AUTO_ORDER_START
+        # Drop the fraction added for the names of a state
+        return int(order)
+
+    def _idle_worker(self, pool, running, chunks, synced):
+        '''
+        Return an idle worker of the pool, starting a new worker process when
+        none is idle or the modules were reloaded since the idle one started.
+        A new worker starts with the first ``synced`` results of the state run.
+        '''
+        for worker in pool:
+            if worker['low'] is None:
+                if worker['states'] is self.states:
+                    return worker
+                self._stop_worker(worker)
+                pool.remove(worker)
+                break
+        conn, child_conn = multiprocessing.Pipe()
+        proc = salt.utils.process.MultiprocessingProcess(
+                target=self._worker_target,
+                args=(child_conn, running, chunks))
+        proc.start()
+        child_conn.close()
+        worker = {'proc': proc,
+                  'conn': conn,
+                  'states': self.states,
+                  'done': synced,
+                  'low': None}
+        pool.append(worker)
+        return worker
+
+    def _worker_target(self, conn, running, chunks):
+        '''
+        The target function of the worker processes of call_chunks_pool,
+        calling the chunks the parent process sends until it sends None
+        '''
+        # The events and the module refreshes are left to the parent process,
+        # which numbers the results
+        self.event = lambda *args, **kwargs: None
+        self.check_refresh = lambda *args, **kwargs: None
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                break
+            if msg is None:
+                break
+            low, rets = msg
+            running.update(rets)
+            before = set(running)
+            tag = _gen_tag(low)
+            try:
+                self.call_chunk(low, running, chunks)
+                while not self.reconcile_procs(running):
+                    time.sleep(0.01)
+                rets = dict((rtag, running[rtag]) for rtag in running
+                            if rtag not in before)
+            except Exception:
+                rets = {tag: {'result': False,
+                              'name': low['name'],
+                              'changes': {},
+                              'comment': 'An exception occurred in this state: {0}'.format(
+                                  traceback.format_exc()),
+                              '__sls__': low['__sls__']}}
+            self.active = set()
+            conn.send(rets)
+        conn.close()
+
+    def _wait_workers(self, pool):
+        '''
+        Wait up to 10 milliseconds for a busy worker to send its results
+        '''
+        if salt.utils.is_windows():
+            time.sleep(0.01)
+            return
+        select.select([worker['conn'] for worker in pool if worker['low']],
+                      [], [], 0.01)
+
+    def _reconcile_workers(self, pool):
+        '''
+        Yield the chunks the busy workers finished, with the results they
+        added to the running dict
+        '''
+        for worker in list(pool):
+            low = worker['low']
+            if low is None:
+                continue
+            alive = worker['proc'].is_alive()
+            if worker['conn'].poll():
+                try:
+                    rets = worker['conn'].recv()
+                except EOFError:
+                    rets = None
+            elif alive:
+                continue
+            else:
+                rets = None
+            tag = _gen_tag(low)
+            if not rets or tag not in rets:
+                # The worker died, start a new one for the next chunk
+                rets = {tag: {'result': False,
+                              'comment': 'Parallel process failed to return',
+                              'name': low['name'],
+                              'changes': {},
+                              '__sls__': low['__sls__']}}
+                self._stop_worker(worker)
+                pool.remove(worker)
+            worker['low'] = None
+            yield low, rets
+
+    def _stop_worker(self, worker):
+        '''
+        Tell a worker process to exit and wait for it
+        '''
+        try:
+            worker['conn'].send(None)
+        except (IOError, OSError):
+            pass
+        worker['conn'].close()
+        worker['proc'].join()
+
     def check_failhard(self, low, running):
         '''
         Check if the low data chunk should send a failhard signal
@@ -2024,6 +2413,9 @@ class State(object):
         '''
         Check the running dict for processes and resolve them
         '''
+        if not self._parallel_procs:
+            # No state runs in parallel, do not walk the running dict
+            return True
         retset = set()
         for tag in running:
             proc = running[tag].get('proc')
@@ -2045,6 +2437,7 @@ class State(object):
                                'changes': {}}
                     running[tag].update(ret)
                     running[tag].pop('proc')
+                    self._parallel_procs -= 1
                 else:
                     retset.add(False)
         return False not in retset
@@ -2085,50 +2478,32 @@ class State(object):
                 'onchanges': []}
         if pre:
             reqs['prerequired'] = []
+        graph = self.requisite_graph(chunks)
         for r_state in reqs:
             if r_state in low and low[r_state] is not None:
                 for req in low[r_state]:
                     if isinstance(req, six.string_types):
                         req = {'id': req}
                     req = trim_req(req)
-                    found = False
-                    for chunk in chunks:
-                        req_key = next(iter(req))
-                        req_val = req[req_key]
-                        if req_val is None:
-                            continue
-                        if req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                found = True
-                                reqs[r_state].append(chunk)
-                            continue
-                        try:
-                            if (fnmatch.fnmatch(chunk['name'], req_val) or
-                                fnmatch.fnmatch(chunk['__id__'], req_val)):
-                                if req_key == 'id' or chunk['state'] == req_key:
-                                    found = True
-                                    reqs[r_state].append(chunk)
-                        except KeyError as exc:
-                            raise SaltRenderError(
-                                'Could not locate requisite of [{0}] present in state with name [{1}]'.format(
-                                    req_key, chunk['name']))
-                        except TypeError:
-                            # On Python 2, the above req_val, being an OrderedDict, will raise a KeyError,
-                            # however on Python 3 it will raise a TypeError
-                            # This was found when running tests.unit.test_state.StateCompilerTestCase.test_render_error_on_invalid_requisite
-                            raise SaltRenderError(
-                                'Could not locate requisite of [{0}] present in state with name [{1}]'.format(
-                                    req_key, chunk['name']))
+                    try:
+                        found = graph.find(req)
+                    except TypeError:
+                        # The requisite value is not a string, such as an
+                        # OrderedDict
+                        # This was found when running tests.unit.test_state.StateCompilerTestCase.test_render_error_on_invalid_requisite
+                        raise SaltRenderError(
+                            'Could not locate requisite of [{0}] present in state with name [{1}]'.format(
+                                next(iter(req)), low['name']))
                     if not found:
                         return 'unmet', ()
+                    reqs[r_state].extend(found)
         fun_stats = set()
-        for r_state, chunks in six.iteritems(reqs):
+        for r_state, req_chunks in six.iteritems(reqs):
             if r_state == 'prereq':
                 run_dict = self.pre
             else:
                 run_dict = running
-            for chunk in chunks:
+            for chunk in req_chunks:
                 tag = _gen_tag(chunk)
                 if tag not in run_dict:
                     fun_stats.add('unmet')
@@ -2239,6 +2614,7 @@ class State(object):
         if status == 'unmet':
             lost = {}
             reqs = []
+            graph = self.requisite_graph(chunks)
             for requisite in requisites:
                 lost[requisite] = []
                 if requisite not in low:
@@ -2247,29 +2623,13 @@ class State(object):
                     if isinstance(req, six.string_types):
                         req = {'id': req}
                     req = trim_req(req)
-                    found = False
-                    req_key = next(iter(req))
-                    req_val = req[req_key]
-                    for chunk in chunks:
-                        if req_val is None:
-                            continue
-                        if req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                reqs.append(chunk)
-                                found = True
-                            continue
-                        if (fnmatch.fnmatch(chunk['name'], req_val) or
-                            fnmatch.fnmatch(chunk['__id__'], req_val)):
-                            if req_key == 'id' or chunk['state'] == req_key:
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                elif requisite == 'prerequired':
-                                    chunk['__prerequired__'] = True
-                                reqs.append(chunk)
-                                found = True
+                    found = graph.find(req)
+                    for chunk in found:
+                        if requisite == 'prereq':
+                            chunk['__prereq__'] = True
+                        elif requisite == 'prerequired' and next(iter(req)) != 'sls':
+                            chunk['__prerequired__'] = True
+                    reqs.extend(found)
                     if not found:
                         lost[requisite].append(req)
             if lost['require'] or lost['watch'] or lost['prereq'] or lost['onfail'] or lost['onchanges'] or lost.get('prerequired'):
@@ -2484,25 +2844,32 @@ class State(object):
         Process a high data call and ensure the defined states.
         '''
         errors = []
-        # If there is extension data reconcile it
-        high, ext_errors = self.reconcile_extend(high)
-        errors += ext_errors
-        errors += self.verify_high(high)
-        if errors:
-            return errors
-        high, req_in_errors = self.requisite_in(high)
-        errors += req_in_errors
-        high = self.apply_exclude(high)
-        # Verify that the high data is structurally sound
-        if errors:
-            return errors
-        # Compile and verify the raw chunks
-        chunks = self.compile_high_data(high, orchestration_jid)
-
-        # If there are extensions in the highstate, process them and update
-        # the low data chunks
-        if errors:
-            return errors
+        digest = None
+        chunks = None
+        if self.opts.get('state_render_cache', False):
+            digest, chunks = self._load_chunks(high, orchestration_jid)
+        if chunks is None:
+            # If there is extension data reconcile it
+            high, ext_errors = self.reconcile_extend(high)
+            errors += ext_errors
+            errors += self.verify_high(high)
+            if errors:
+                return errors
+            high, req_in_errors = self.requisite_in(high)
+            errors += req_in_errors
+            high = self.apply_exclude(high)
+            # Verify that the high data is structurally sound
+            if errors:
+                return errors
+            # Compile and verify the raw chunks
+            chunks = self.compile_high_data(high, orchestration_jid)
+
+            # If there are extensions in the highstate, process them and update
+            # the low data chunks
+            if errors:
+                return errors
+            if digest is not None:
+                self._store_chunks(digest, chunks)
         ret = self.call_chunks(chunks)
         ret = self.call_listen(chunks, ret)
 
@@ -2524,6 +2891,54 @@ class State(object):
 
         return ret
 
+    def _load_chunks(self, high, orchestration_jid=None):
+        '''
+        Return the digest of the high data, and the low chunks compiled from
+        the same high data by the last run, or None
+        '''
+        try:
+            digest = hashlib.sha256(salt.utils.rendercache.dumps(
+                [high, orchestration_jid])).hexdigest()
+        except Exception:
+            # Can't serialize pydsl
+            return None, None
+        try:
+            with salt.utils.fopen(self._chunks_path(), 'rb') as fp_:
+                cached = salt.utils.rendercache.loads(fp_.read())
+            if cached['digest'] == digest:
+                log.debug('Using the low chunks compiled by the last run')
+                return digest, cached['chunks']
+        except (IOError, OSError):
+            pass
+        except Exception as exc:
+            log.debug('Discarding the cached low chunks: {0}'.format(exc))
+        return digest, None
+
+    def _store_chunks(self, digest, chunks):
+        '''
+        Cache the low chunks compiled from the high data of the given digest
+        '''
+        path = self._chunks_path()
+        try:
+            data = salt.utils.rendercache.dumps({'digest': digest,
+                                                 'chunks': chunks})
+        except Exception:
+            return
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path), 0o700)
+            with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+                fp_.write(data)
+        except (IOError, OSError) as exc:
+            log.error('Unable to write the low chunks cache file {0}: {1}'.format(
+                path, exc))
+
+    def _chunks_path(self):
+        '''
+        Return the path of the low chunks cache file
+        '''
+        return os.path.join(self.opts['cachedir'], 'state_render', 'low_chunks.p')
+
     def render_template(self, high, template):
         errors = []
         if not high:
@@ -2646,7 +3061,7 @@ class BaseHighState(object):
     '''
     def __init__(self, opts):
         self.opts = self.__gen_opts(opts)
-        self.iorder = 10000
+        self.iorder = STATE_AUTO_ORDER_START
         self.avail = self.__gather_avail()
         self.serial = salt.payload.Serial(self.opts)
         self.building_highstate = OrderedDict()
@@ -2727,6 +3142,26 @@ class BaseHighState(object):
             envs.extend([env for env in client_envs if env not in envs])
             return envs
 
+    def compile_template(self, template, saltenv='base', sls='', **kwargs):
+        '''
+        Render a state or top file template, through the render cache when
+        the ``state_render_cache`` option is set
+        '''
+        if self.opts.get('state_render_cache', False):
+            cache = salt.utils.rendercache.RenderCache(self.state.opts,
+                                                       self.client,
+                                                       self.state.rend,
+                                                       self.state.functions)
+            return cache.compile_template(template, saltenv, sls, **kwargs)
+        return compile_template(template,
+                                self.state.rend,
+                                self.state.opts['renderer'],
+                                self.state.opts['renderer_blacklist'],
+                                self.state.opts['renderer_whitelist'],
+                                saltenv,
+                                sls,
+                                **kwargs)
+
     def get_tops(self):
         '''
         Gather the top files
@@ -2752,12 +3187,8 @@ class BaseHighState(object):
             if contents:
                 found = 1
                 tops[self.opts['environment']] = [
-                    compile_template(
+                    self.compile_template(
                         contents,
-                        self.state.rend,
-                        self.state.opts['renderer'],
-                        self.state.opts['renderer_blacklist'],
-                        self.state.opts['renderer_whitelist'],
                         saltenv=self.opts['environment']
                     )
                 ]
@@ -2780,12 +3211,8 @@ class BaseHighState(object):
                 if contents:
                     found = found + 1
                     tops[saltenv].append(
-                        compile_template(
+                        self.compile_template(
                             contents,
-                            self.state.rend,
-                            self.state.opts['renderer'],
-                            self.state.opts['renderer_blacklist'],
-                            self.state.opts['renderer_whitelist'],
                             saltenv=saltenv
                         )
                     )
@@ -2831,15 +3258,11 @@ class BaseHighState(object):
                         if sls in done[saltenv]:
                             continue
                         tops[saltenv].append(
-                            compile_template(
+                            self.compile_template(
                                 self.client.get_state(
                                     sls,
                                     saltenv
                                 ).get('dest', False),
-                                self.state.rend,
-                                self.state.opts['renderer'],
-                                self.state.opts['renderer_blacklist'],
-                                self.state.opts['renderer_whitelist'],
                                 saltenv
                             )
                         )
@@ -3181,15 +3604,11 @@ class BaseHighState(object):
             )
         state = None
         try:
-            state = compile_template(fn_,
-                                     self.state.rend,
-                                     self.state.opts['renderer'],
-                                     self.state.opts['renderer_blacklist'],
-                                     self.state.opts['renderer_whitelist'],
-                                     saltenv,
-                                     sls,
-                                     rendered_sls=mods
-                                     )
+            state = self.compile_template(fn_,
+                                          saltenv,
+                                          sls,
+                                          rendered_sls=mods
+                                          )
         except SaltRenderError as exc:
             msg = 'Rendering SLS \'{0}:{1}\' failed: {2}'.format(
                 saltenv, sls, exc
@@ -3391,6 +3391,24 @@ def recurse(name,
         maxdepth,
         include_empty)
 
+    # Get the hashes of the files from the master in one request, which
+    # file.managed then uses rather than asking for them one at a time, and
+    # fetch the files which differ from their destination in one batch
+    manifest = None
+    if not __opts__['test']:
+        manifest = __salt__['cp.list_master_manifest'](senv, srcpath)
+    if manifest:
+        fetch = []
+        for dest, src in mng_files:
+            entry = manifest['files'].get(salt.utils.url.parse(src)[0])
+            if entry and (template
+                          or not os.path.isfile(dest)
+                          or salt.utils.get_hash(
+                              dest, manifest['hash_type']) != entry[0]):
+                fetch.append(src)
+        if fetch:
+            __salt__['cp.cache_files'](fetch, senv)
+
     for srelpath, ltarget in mng_symlinks:
         _ret = symlink(os.path.join(name, srelpath),
                        ltarget,
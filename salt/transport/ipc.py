@@ -24,6 +24,7 @@ from tornado.iostream import IOStream
 # Import Salt libs
 import salt.transport.client
 import salt.transport.frame
+import salt.utils
 import salt.ext.six as six
 
 log = logging.getLogger(__name__)
@@ -491,6 +492,9 @@ class IPCMessagePublisher(object):
         self.io_loop = io_loop or IOLoop.current()
         self._closing = False
         self.streams = set()
+        # The tag prefixes subscribed to by each stream, streams without an
+        # entry receive every message
+        self.tag_filters = {}
 
     def start(self):
         '''
@@ -529,10 +533,48 @@ class IPCMessagePublisher(object):
             if not stream.closed():
                 stream.close()
             self.streams.discard(stream)
+            self.tag_filters.pop(stream, None)
 
-    def publish(self, msg):
+    @tornado.gen.coroutine
+    def _read_tag_filter(self, stream):
+        '''
+        Read the tag filters sent by a subscriber, until it disconnects
+        '''
+        if six.PY2:
+            encoding = None
+        else:
+            encoding = 'utf-8'
+        unpacker = msgpack.Unpacker(encoding=encoding)
+        while not stream.closed():
+            try:
+                wire_bytes = yield stream.read_bytes(4096, partial=True)
+            except Exception as exc:
+                if not isinstance(exc, tornado.iostream.StreamClosedError):
+                    log.error('Exception occurred while handling stream: {0}'.format(exc))
+                    stream.close()
+                break
+            unpacker.feed(wire_bytes)
+            for framed_msg in unpacker:
+                body = framed_msg['body']
+                if not isinstance(body, dict) or 'tag_filter' not in body:
+                    continue
+                if body['tag_filter']:
+                    self.tag_filters[stream] = tuple(
+                        salt.utils.to_bytes(prefix) for prefix in body['tag_filter'])
+                else:
+                    self.tag_filters.pop(stream, None)
+                log.trace('IPC subscriber tag filter set to {0}'.format(body['tag_filter']))
+        log.trace('Client disconnected from IPC {0}'.format(self.socket_path))
+        self.streams.discard(stream)
+        self.tag_filters.pop(stream, None)
+
+    def publish(self, msg, tag=None):
         '''
         Send message to all connected sockets
+
+        :param tag: The tag of the message. When passed, the message is only
+                    sent to the sockets which did not set a tag filter or
+                    whose filter has a prefix of the tag.
         '''
         if not len(self.streams):
             return
@@ -540,6 +582,9 @@ class IPCMessagePublisher(object):
         pack = salt.transport.frame.frame_msg_ipc(msg, raw_body=True)
 
         for stream in self.streams:
+            if tag is not None and stream in self.tag_filters \
+                    and not tag.startswith(self.tag_filters[stream]):
+                continue
             self.io_loop.spawn_callback(self._write, stream, pack)
 
     def handle_connection(self, connection, address):
@@ -558,6 +603,7 @@ class IPCMessagePublisher(object):
                     io_loop=self.io_loop
                 )
             self.streams.add(stream)
+            self.io_loop.spawn_callback(self._read_tag_filter, stream)
         except Exception as exc:
             log.error('IPC streaming error: {0}'.format(exc))
 
@@ -573,6 +619,7 @@ class IPCMessagePublisher(object):
         for stream in self.streams:
             stream.close()
         self.streams.clear()
+        self.tag_filters.clear()
         if hasattr(self.sock, 'close'):
             self.sock.close()
 
@@ -621,6 +668,34 @@ class IPCMessageSubscriber(IPCClient):
         self._sync_ioloop_running = False
         self.saved_data = []
         self._sync_read_in_progress = Semaphore()
+        self._tag_filter = None
+
+    @tornado.gen.coroutine
+    def _connect(self, timeout=None):
+        yield super(IPCMessageSubscriber, self)._connect(timeout=timeout)
+        if self._tag_filter is not None and self.connected():
+            yield self._send_tag_filter()
+
+    @tornado.gen.coroutine
+    def _send_tag_filter(self):
+        pack = salt.transport.frame.frame_msg_ipc({'tag_filter': self._tag_filter})
+        try:
+            yield self.stream.write(pack)
+        except tornado.iostream.StreamClosedError:
+            log.trace('Subscriber disconnected from IPC {0}'.format(self.socket_path))
+
+    @tornado.gen.coroutine
+    def set_tag_filter(self, prefixes=None):
+        '''
+        Ask the publisher to only send the messages with a tag starting with
+        one of ``prefixes``, or every message when ``prefixes`` is empty.
+
+        The filter is kept across reconnections. Messages published before
+        the publisher received the filter are not filtered.
+        '''
+        self._tag_filter = list(prefixes) if prefixes else None
+        if self.connected():
+            yield self._send_tag_filter()
 
     @tornado.gen.coroutine
     def _read_sync(self, timeout):
@@ -676,9 +751,9 @@ class IPCMessageSubscriber(IPCClient):
             # read_sync().
             self.io_loop.spawn_callback(self.io_loop.stop)
 
+        self._sync_read_in_progress.release()
         if exc_to_raise is not None:
             raise exc_to_raise  # pylint: disable=E0702
-        self._sync_read_in_progress.release()
         raise tornado.gen.Return(ret)
 
     def read_sync(self, timeout=None):
@@ -703,6 +778,21 @@ class IPCMessageSubscriber(IPCClient):
         self._read_sync_future = None
         return ret_future.result()
 
+    @tornado.gen.coroutine
+    def read(self, timeout=None):
+        '''
+        Read a message from an IPC socket, within a running IO Loop
+
+        The socket must already be connected. Do not mix with read_async().
+        :param int timeout: Timeout when receiving message
+        :return: message data if successful. None if timed out. Will raise an
+                 exception for all other error conditions.
+        '''
+        if self.saved_data:
+            raise tornado.gen.Return(self.saved_data.pop(0))
+        ret = yield self._read_sync(timeout)
+        raise tornado.gen.Return(ret)
+
     @tornado.gen.coroutine
     def _read_async(self, callback):
         while not self.stream.closed():
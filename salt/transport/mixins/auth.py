@@ -2,6 +2,7 @@
 
 # Import Python Libs
 from __future__ import absolute_import
+import collections
 import multiprocessing
 import ctypes
 import logging
@@ -40,16 +41,32 @@ class AESPubClientMixin(object):
                 raise salt.crypt.AuthenticationError('Message signing is enabled but the payload has no signature.')
 
             # Verify that the signature is valid
-            master_pubkey_path = os.path.join(self.opts['pki_dir'], 'minion_master.pub')
-            if not salt.crypt.verify_signature(master_pubkey_path, payload['load'], payload.get('sig')):
-                raise salt.crypt.AuthenticationError('Message signature failed to validate.')
+            if payload.get('sig_alg') == 'ed25519':
+                # The key the master signs with was handed out at auth time
+                pub_sign_key = self.auth.creds.get('pub_sign_key')
+                if not pub_sign_key or not salt.crypt.verify_signature_ed25519(pub_sign_key,
+                                                                             payload['load'],
+                                                                             payload['sig']):
+                    raise salt.crypt.AuthenticationError('Message signature failed to validate.')
+            else:
+                master_pubkey_path = os.path.join(self.opts['pki_dir'], 'minion_master.pub')
+                if not salt.crypt.verify_signature(master_pubkey_path, payload['load'], payload.get('sig')):
+                    raise salt.crypt.AuthenticationError('Message signature failed to validate.')
 
     @tornado.gen.coroutine
     def _decode_payload(self, payload):
         # we need to decrypt it
         log.trace('Decoding payload: {0}'.format(payload))
         if payload['enc'] == 'aes':
-            self._verify_master_signature(payload)
+            try:
+                self._verify_master_signature(payload)
+            except salt.crypt.AuthenticationError:
+                if payload.get('sig_alg') != 'ed25519':
+                    raise
+                # The master signs with a new key once it restarted or
+                # rotated its keys, fetch it
+                yield self.auth.authenticate()
+                self._verify_master_signature(payload)
             try:
                 payload['load'] = self.auth.crypticle.loads(payload['load'])
             except salt.crypt.AuthenticationError:
@@ -78,11 +95,21 @@ class AESReqServerMixin(object):
                               six.b(salt.crypt.Crypticle.generate_key_string())),
                 'reload': salt.crypt.Crypticle.generate_key_string
             }
+        if self.opts.get('auth_queue_size', 0) > 0:
+            # Shared by the workers forked after this
+            self.auth_slots = multiprocessing.BoundedSemaphore(self.opts['auth_queue_size'])
 
     def post_fork(self, _, __):
         self.serial = salt.payload.Serial(self.opts)
         self.crypticle = salt.crypt.Crypticle(self.opts, salt.master.SMaster.secrets['aes']['secret'].value)
 
+        # The minion keys and the AES key encrypted for them, by fingerprint
+        # of the minion key, for the current AES key
+        self.auth_cache = collections.OrderedDict()
+        self.auth_cache_aes = None
+        self._auth_sig = None
+        self._master_pub_sig = None
+
         # other things needed for _auth
         # Create the event manager
         self.event = salt.utils.event.get_master_event(self.opts, self.opts['sock_dir'], listen=False)
@@ -98,6 +125,22 @@ class AESReqServerMixin(object):
 
         self.master_key = salt.crypt.MasterKeys(self.opts)
 
+    def _pub_sign_key(self):
+        '''
+        Return the Ed25519 public key the publications are signed with and its
+        signature by the master key, for the auth replies
+        '''
+        seed = salt.master.SMaster.secrets['pub_sign']['secret'].value
+        if getattr(self, '_pub_sign_seed', None) != seed:
+            pub_sign_key = salt.crypt.ed25519_public_key(seed)
+            self._pub_sign_reply = {
+                'pub_sign_key': pub_sign_key,
+                'pub_sign_key_sig': salt.crypt.sign_message(
+                    os.path.join(self.opts['pki_dir'], 'master.pem'),
+                    pub_sign_key)}
+            self._pub_sign_seed = seed
+        return self._pub_sign_reply
+
     def _encrypt_private(self, ret, dictkey, target):
         '''
         The server equivalent of ReqChannel.crypted_transfer_decode_dictentry
@@ -152,6 +195,57 @@ class AESReqServerMixin(object):
         return payload
 
     def _auth(self, load):
+        '''
+        Authenticate the client if fewer than ``auth_queue_size``
+        authentication requests are in progress in the workers, else tell it
+        to retry later.
+
+        Telling the minion to retry costs no RSA operation, the workers keep
+        answering during a reconnect storm instead of queuing requests the
+        minions stopped waiting for.
+        '''
+        slots = getattr(self, 'auth_slots', None)
+        if slots is None:
+            return self._handle_auth(load)
+        if not slots.acquire(False):
+            log.debug(
+                'Deferring authentication request from {0}, {1} requests are '
+                'already in progress'.format(load.get('id'),
+                                             self.opts['auth_queue_size'])
+            )
+            return {'enc': 'clear',
+                    'load': {'ret': 'retry',
+                             'retry_after': self.opts['auth_retry_after']}}
+        try:
+            return self._handle_auth(load)
+        finally:
+            slots.release()
+
+    def _auth_cache_entry(self, pubfn):
+        '''
+        Return the cache entry of the minion key stored in ``pubfn``, holding
+        the parsed key and, once computed, the AES key encrypted for it.
+
+        The entries are dropped when the AES key changes, the AES key the
+        entries are valid for is in ``self.auth_cache_aes``.
+        '''
+        aes = salt.master.SMaster.secrets['aes']['secret'].value
+        if aes != self.auth_cache_aes:
+            self.auth_cache.clear()
+            self.auth_cache_aes = aes
+        with salt.utils.fopen(pubfn) as f:
+            pub_str = f.read()
+        fingerprint = hashlib.sha256(salt.utils.to_bytes(pub_str)).hexdigest()
+        entry = self.auth_cache.pop(fingerprint, None)
+        if entry is None:
+            entry = {'pub': RSA.importKey(pub_str)}
+        if self.opts.get('auth_cache_size', 0) > 0:
+            self.auth_cache[fingerprint] = entry
+            while len(self.auth_cache) > self.opts['auth_cache_size']:
+                self.auth_cache.popitem(last=False)
+        return entry
+
+    def _handle_auth(self, load):
         '''
         Authenticate the client, use the sent public key to encrypt the AES key
         which was generated at start up.
@@ -408,8 +502,6 @@ class AESReqServerMixin(object):
                 with salt.utils.fopen(pubfn, 'w+') as fp_:
                     fp_.write(load['pub'])
 
-        pub = None
-
         # the con_cache is enabled, send the minion id to the cache
         if self.cache_cli:
             self.cache_cli.put_cache([load['id']])
@@ -417,14 +509,13 @@ class AESReqServerMixin(object):
         # The key payload may sometimes be corrupt when using auto-accept
         # and an empty request comes in
         try:
-            with salt.utils.fopen(pubfn) as f:
-                pub = RSA.importKey(f.read())
+            entry = self._auth_cache_entry(pubfn)
         except (ValueError, IndexError, TypeError) as err:
             log.error('Corrupt public key "{0}": {1}'.format(pubfn, err))
             return {'enc': 'clear',
                     'load': {'ret': False}}
 
-        cipher = PKCS1_OAEP.new(pub)
+        cipher = PKCS1_OAEP.new(entry['pub'])
         ret = {'enc': 'pub',
                'pub_key': self.master_key.get_pub_str(),
                'publish_port': self.opts['publish_port']}
@@ -440,10 +531,12 @@ class AESReqServerMixin(object):
             else:
                 # the master has its own signing-keypair, compute the master.pub's
                 # signature and append that to the auth-reply
-                log.debug("Signing master public key before sending")
-                pub_sign = salt.crypt.sign_message(self.master_key.get_sign_paths()[1],
-                                                   ret['pub_key'])
-                ret.update({'pub_sig': binascii.b2a_base64(pub_sign)})
+                if self._master_pub_sig is None:
+                    log.debug("Signing master public key before sending")
+                    pub_sign = salt.crypt.sign_message(self.master_key.get_sign_paths()[1],
+                                                       ret['pub_key'])
+                    self._master_pub_sig = binascii.b2a_base64(pub_sign)
+                ret.update({'pub_sig': self._master_pub_sig})
 
         mcipher = PKCS1_OAEP.new(self.master_key.key)
         if self.opts['auth_mode'] >= 2:
@@ -469,11 +562,28 @@ class AESReqServerMixin(object):
                     # support older minions
                     pass
 
-            aes = salt.master.SMaster.secrets['aes']['secret'].value
-            ret['aes'] = cipher.encrypt(salt.master.SMaster.secrets['aes']['secret'].value)
+            aes = self.auth_cache_aes
+            if 'aes' not in entry:
+                entry['aes'] = cipher.encrypt(aes)
+            ret['aes'] = entry['aes']
+        session_cipher = self.opts.get('session_cipher', 'aes-cbc')
+        if session_cipher != 'aes-cbc':
+            if session_cipher in load.get('ciphers', ()):
+                ret['cipher'] = session_cipher
+            else:
+                log.warning(
+                    'Minion {0} does not support the {1} session cipher, it '
+                    'cannot decrypt the messages of the master'.format(
+                        load['id'], session_cipher)
+                )
+        if self.opts.get('sign_pub_messages') and \
+                self.opts.get('pub_sign_algorithm') == 'ed25519':
+            ret.update(self._pub_sign_key())
         # Be aggressive about the signature
-        digest = hashlib.sha256(aes).hexdigest()
-        ret['sig'] = salt.crypt.private_encrypt(self.master_key.key, digest)
+        if self._auth_sig is None or self._auth_sig[0] != aes:
+            digest = hashlib.sha256(aes).hexdigest()
+            self._auth_sig = (aes, salt.crypt.private_encrypt(self.master_key.key, digest))
+        ret['sig'] = self._auth_sig[1]
         eload = {'result': True,
                  'act': 'accept',
                  'id': load['id'],
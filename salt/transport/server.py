@@ -7,6 +7,13 @@ This includes server side transport, for the ReqServer and the Publisher
 
 # Import Python Libs
 from __future__ import absolute_import
+import logging
+import os
+
+# Import Salt Libs
+from salt.defaults import DEFAULT_TARGET_DELIM
+
+log = logging.getLogger(__name__)
 
 
 class ReqServerChannel(object):
@@ -100,10 +107,64 @@ class PubServerChannel(object):
         '''
         pass
 
-    def publish(self, load):
+    def publish(self, load, minions=None):
         '''
         Publish "load" to minions
+
+        :param list minions: The minions the master resolved the target of
+                             the load to, if it did
         '''
         raise NotImplementedError()
 
+    def publish_targets(self, load, minions=None):
+        '''
+        Return the ids of the minions to send "load" to, or None to send it
+        to all the minions
+
+        The target is only resolved on the master for the target types listed
+        in ``pub_route_target_types``, and the load is broadcast when the
+        target resolves to no minion or to more than
+        ``pub_route_max_minions`` minions.
+
+        :param list minions: The minions the master resolved the target to,
+                             resolved again when not passed
+        '''
+        if self.opts.get('order_masters'):
+            # The minions of the syndics are unknown to this master
+            return None
+        tgt_type = load.get('tgt_type', 'glob')
+        if tgt_type not in self.opts.get('pub_route_target_types', ()):
+            return None
+        if minions is None:
+            if not hasattr(self, 'ckminions'):
+                import salt.utils.minions
+                self.ckminions = salt.utils.minions.CkMinions(self.opts)
+            minions = self.ckminions.check_minions(
+                load['tgt'],
+                tgt_type,
+                load.get('delimiter', DEFAULT_TARGET_DELIM)
+            )
+        max_minions = self.opts.get('pub_route_max_minions', 0)
+        if not minions or 0 < max_minions < len(minions):
+            # check_minions also returns no minion when it fails
+            return None
+        return list(minions)
+
+    def sign_payload(self, payload):
+        '''
+        Sign the encrypted load of a publication payload, with the master key
+        or with the Ed25519 key of the master when ``pub_sign_algorithm`` is
+        ``ed25519``
+        '''
+        import salt.crypt
+        log.debug('Signing data packet')
+        if self.opts.get('pub_sign_algorithm') == 'ed25519':
+            import salt.master
+            seed = salt.master.SMaster.secrets['pub_sign']['secret'].value
+            payload['sig'] = salt.crypt.sign_message_ed25519(seed, payload['load'])
+            payload['sig_alg'] = 'ed25519'
+        else:
+            master_pem_path = os.path.join(self.opts['pki_dir'], 'master.pem')
+            payload['sig'] = salt.crypt.sign_message(master_pem_path, payload['load'])
+
 # EOF
@@ -1373,18 +1373,18 @@ class TCPPubServerChannel(salt.transport.server.PubServerChannel):
 
         process_manager.add_process(self._publish_daemon, kwargs=kwargs)
 
-    def publish(self, load):
+    def publish(self, load, minions=None):
         '''
         Publish "load" to minions
+
+        :param list minions: The minions the master resolved the target to
         '''
         payload = {'enc': 'aes'}
 
         crypticle = salt.crypt.Crypticle(self.opts, salt.master.SMaster.secrets['aes']['secret'].value)
         payload['load'] = crypticle.dumps(load)
         if self.opts['sign_pub_messages']:
-            master_pem_path = os.path.join(self.opts['pki_dir'], 'master.pem')
-            log.debug("Signing data packet")
-            payload['sig'] = salt.crypt.sign_message(master_pem_path, payload['load'])
+            self.sign_payload(payload)
         # Use the Salt IPC server
         if self.opts.get('ipc_mode', '') == 'tcp':
             pull_uri = int(self.opts.get('tcp_master_publish_pull', 4514))
@@ -1400,8 +1400,10 @@ class TCPPubServerChannel(salt.transport.server.PubServerChannel):
 
         int_payload = {'payload': self.serial.dumps(payload)}
 
-        # add some targeting stuff for lists only (for now)
-        if load['tgt_type'] == 'list':
-            int_payload['topic_lst'] = load['tgt']
+        # Only send the load to the connections of the targeted minions
+        match_ids = self.publish_targets(load, minions)
+        log.debug('Publish Side Match: {0}'.format(match_ids))
+        if match_ids is not None:
+            int_payload['topic_lst'] = match_ids
         # Send it over IPC!
         pub_sock.send(int_payload)
@@ -43,6 +43,7 @@ except ImportError:
 # Import Tornado Libs
 import tornado
 import tornado.gen
+import tornado.ioloop
 import tornado.concurrent
 
 # Import third party libs
@@ -694,10 +695,29 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
         self.opts = opts
         self.serial = salt.payload.Serial(self.opts)  # TODO: in init?
         self.ckminions = salt.utils.minions.CkMinions(self.opts)
+        # The connection of this process to the publisher daemon
+        self.context = None
+        self.pub_sock = None
+        self._sock_pid = None
+        # The packages held to be sent together, see zmq_pub_batch_window
+        self._batch = []
+        self._crypticle = None
 
     def connect(self):
         return tornado.gen.sleep(5)
 
+    def _pull_uri(self):
+        '''
+        Return the URI of the pull socket of the publisher daemon
+        '''
+        if self.opts.get('ipc_mode', '') == 'tcp':
+            return 'tcp://127.0.0.1:{0}'.format(
+                self.opts.get('tcp_master_publish_pull', 4514)
+                )
+        return 'ipc://{0}'.format(
+            os.path.join(self.opts['sock_dir'], 'publish_pull.ipc')
+            )
+
     def _publish_daemon(self):
         '''
         Bind to the interface specified in the configuration file
@@ -725,14 +745,7 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
         # Prepare minion pull socket
         pull_sock = context.socket(zmq.PULL)
 
-        if self.opts.get('ipc_mode', '') == 'tcp':
-            pull_uri = 'tcp://127.0.0.1:{0}'.format(
-                self.opts.get('tcp_master_publish_pull', 4514)
-                )
-        else:
-            pull_uri = 'ipc://{0}'.format(
-                os.path.join(self.opts['sock_dir'], 'publish_pull.ipc')
-                )
+        pull_uri = self._pull_uri()
         salt.utils.zeromq.check_ipc_path_max_len(pull_uri)
 
         # Start the minion command publisher
@@ -752,27 +765,29 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
                 # Catch and handle EINTR from when this process is sent
                 # SIGUSR1 gracefully so we don't choke and die horribly
                 try:
-                    package = pull_sock.recv()
-                    unpacked_package = salt.payload.unpackage(package)
-                    if six.PY3:
-                        unpacked_package = salt.transport.frame.decode_embedded_strs(unpacked_package)
-                    payload = unpacked_package['payload']
-                    if self.opts['zmq_filtering']:
-                        # if you have a specific topic list, use that
-                        if 'topic_lst' in unpacked_package:
-                            for topic in unpacked_package['topic_lst']:
-                                # zmq filters are substring match, hash the topic
-                                # to avoid collisions
-                                htopic = hashlib.sha1(topic).hexdigest()
-                                pub_sock.send(htopic, flags=zmq.SNDMORE)
+                    # The workers send the packages of a batch as the parts
+                    # of a single message
+                    for package in pull_sock.recv_multipart():
+                        unpacked_package = salt.payload.unpackage(package)
+                        if six.PY3:
+                            unpacked_package = salt.transport.frame.decode_embedded_strs(unpacked_package)
+                        payload = unpacked_package['payload']
+                        if self.opts['zmq_filtering']:
+                            # if you have a specific topic list, use that
+                            if 'topic_lst' in unpacked_package:
+                                for topic in unpacked_package['topic_lst']:
+                                    # zmq filters are substring match, hash the topic
+                                    # to avoid collisions
+                                    htopic = hashlib.sha1(topic).hexdigest()
+                                    pub_sock.send(htopic, flags=zmq.SNDMORE)
+                                    pub_sock.send(payload)
+                                    # otherwise its a broadcast
+                            else:
+                                # TODO: constants file for "broadcast"
+                                pub_sock.send('broadcast', flags=zmq.SNDMORE)
                                 pub_sock.send(payload)
-                                # otherwise its a broadcast
                         else:
-                            # TODO: constants file for "broadcast"
-                            pub_sock.send('broadcast', flags=zmq.SNDMORE)
                             pub_sock.send(payload)
-                    else:
-                        pub_sock.send(payload)
                 except zmq.ZMQError as exc:
                     if exc.errno == errno.EINTR:
                         continue
@@ -799,52 +814,93 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
         '''
         process_manager.add_process(self._publish_daemon)
 
-    def publish(self, load):
+    def publish(self, load, minions=None):
         '''
         Publish "load" to minions
 
         :param dict load: A load to be sent across the wire to minions
+        :param list minions: The minions the master resolved the target to
         '''
         payload = {'enc': 'aes'}
 
-        crypticle = salt.crypt.Crypticle(self.opts, salt.master.SMaster.secrets['aes']['secret'].value)
-        payload['load'] = crypticle.dumps(load)
+        payload['load'] = self._get_crypticle().dumps(load)
         if self.opts['sign_pub_messages']:
-            master_pem_path = os.path.join(self.opts['pki_dir'], 'master.pem')
-            log.debug("Signing data packet")
-            payload['sig'] = salt.crypt.sign_message(master_pem_path, payload['load'])
-        # Send 0MQ to the publisher
-        context = zmq.Context(1)
-        pub_sock = context.socket(zmq.PUSH)
-        if self.opts.get('ipc_mode', '') == 'tcp':
-            pull_uri = 'tcp://127.0.0.1:{0}'.format(
-                self.opts.get('tcp_master_publish_pull', 4514)
-                )
-        else:
-            pull_uri = 'ipc://{0}'.format(
-                os.path.join(self.opts['sock_dir'], 'publish_pull.ipc')
-                )
-        pub_sock.connect(pull_uri)
+            self.sign_payload(payload)
         int_payload = {'payload': self.serial.dumps(payload)}
 
-        # add some targeting stuff for lists only (for now)
-        if load['tgt_type'] == 'list':
-            int_payload['topic_lst'] = load['tgt']
-
         # If zmq_filtering is enabled, target matching has to happen master side
-        match_targets = ["pcre", "glob", "list"]
-        if self.opts['zmq_filtering'] and load['tgt_type'] in match_targets:
-            # Fetch a list of minions that match
-            match_ids = self.ckminions.check_minions(load['tgt'],
-                                                     tgt_type=load['tgt_type'])
-
+        if self.opts['zmq_filtering']:
+            match_ids = self.publish_targets(load, minions)
             log.debug("Publish Side Match: {0}".format(match_ids))
-            # Send list of miions thru so zmq can target them
-            int_payload['topic_lst'] = match_ids
+            if match_ids is not None:
+                # Send list of miions thru so zmq can target them
+                int_payload['topic_lst'] = match_ids
+
+        self._send(self.serial.dumps(int_payload))
 
-        pub_sock.send(self.serial.dumps(int_payload))
-        pub_sock.close()
-        context.term()
+    def _get_crypticle(self):
+        '''
+        Return a Crypticle for the current AES key, which the master rotates
+        '''
+        key = salt.master.SMaster.secrets['aes']['secret'].value
+        if self._crypticle is None or self._crypticle[0] != key:
+            self._crypticle = (key, salt.crypt.Crypticle(self.opts, key))
+        return self._crypticle[1]
+
+    def pub_connect(self):
+        '''
+        Return the socket of this process to the publisher daemon, connecting
+        it on first use
+        '''
+        if self._sock_pid != os.getpid():
+            # zmq sockets do not survive a fork, leave the ones of the parent
+            # process alone
+            self.context = zmq.Context(1)
+            self.pub_sock = self.context.socket(zmq.PUSH)
+            self.pub_sock.connect(self._pull_uri())
+            self._sock_pid = os.getpid()
+            self._batch = []
+        return self.pub_sock
+
+    def pub_close(self):
+        '''
+        Send the held packages and disconnect from the publisher daemon
+        '''
+        if self._sock_pid != os.getpid():
+            return
+        self.flush()
+        self.pub_sock.close()
+        self.context.term()
+        self.pub_sock = None
+        self.context = None
+        self._sock_pid = None
+
+    def _send(self, package):
+        '''
+        Send a package to the publisher daemon, or hold it to send it with
+        the next ones when batching is enabled
+        '''
+        window = self.opts.get('zmq_pub_batch_window')
+        # Batching needs an IOLoop to send the batch at the end of the window
+        io_loop = tornado.ioloop.IOLoop.current(instance=False) if window else None
+        if io_loop is None:
+            self.pub_connect().send(package)
+            return
+        self.pub_connect()
+        self._batch.append(package)
+        if len(self._batch) >= self.opts.get('zmq_pub_batch_size', 100):
+            self.flush()
+        elif len(self._batch) == 1:
+            io_loop.call_later(window, self.flush)
+
+    def flush(self):
+        '''
+        Send the held packages to the publisher daemon, in a single message
+        '''
+        if not self._batch or self._sock_pid != os.getpid():
+            return
+        batch, self._batch = self._batch, []
+        self.pub_sock.send_multipart(batch)
 
 
 class AsyncReqMessageClientPool(salt.transport.MessageClientPool):
@@ -65,6 +65,7 @@ from salt.ext.six.moves import range
 
 # Import third party libs
 import salt.ext.six as six
+import tornado.gen
 import tornado.ioloop
 import tornado.iostream
 
@@ -91,6 +92,7 @@ SUB_EVENT = set([
 ])
 
 TAGEND = '\n\n'  # long tag delimiter
+_TAGEND_BYTES = salt.utils.to_bytes(TAGEND)
 TAGPARTER = '/'  # name spaced tag delimiter
 SALT = 'salt'  # base prefix for all salt/ events
 # dict map of namespaced base tag prefixes for salt events
@@ -160,6 +162,16 @@ def get_master_event(opts, sock_dir, listen=True, io_loop=None, raise_errors=Fal
         )
 
 
+def _event_tag(package):
+    '''
+    Return the tag of a packed event, without unpacking its data
+    '''
+    end = package.find(_TAGEND_BYTES)
+    if end < 0:
+        return package
+    return package[:end]
+
+
 def fire_args(opts, jid, tag_data, prefix=''):
     '''
     Fire an event containing the arguments passed to an orchestration job
@@ -251,6 +263,7 @@ class SaltEvent(object):
         if salt.utils.is_windows() and 'ipc_mode' not in opts:
             self.opts['ipc_mode'] = 'tcp'
         self.puburi, self.pulluri = self.__load_uri(sock_dir, node)
+        self.tag_filter = None
         self.pending_tags = []
         self.pending_events = []
         self.__load_cache_regex()
@@ -347,6 +360,32 @@ class SaltEvent(object):
             if any(pmatch_func(evt['tag'], ptag) for ptag, pmatch_func in self.pending_tags):
                 self.pending_events.append(evt)
 
+    def set_tag_filter(self, prefixes=None):
+        '''
+        Only receive the events with a tag starting with one of ``prefixes``,
+        or all the events when ``prefixes`` is empty.
+
+        Unlike the tags passed to get_event() and subscribe(), the filter is
+        applied by the event publisher: the events it drops are never sent to,
+        nor unpacked by, this process. It is a prefix match whatever the
+        match_type. A few events published while the filter is being set may
+        still be received.
+
+        Event objects created on the same io_loop share their connection to
+        the publisher, and so the filter.
+
+        .. versionadded:: Oxygen
+        '''
+        self.tag_filter = list(prefixes) if prefixes else None
+        if self.subscriber is None:
+            return
+        if self._run_io_loop_sync:
+            with salt.utils.async.current_ioloop(self.io_loop):
+                self.io_loop.run_sync(
+                    lambda: self.subscriber.set_tag_filter(self.tag_filter))
+        else:
+            self.subscriber.set_tag_filter(self.tag_filter)
+
     def connect_pub(self, timeout=None):
         '''
         Establish the publish connection
@@ -361,6 +400,7 @@ class SaltEvent(object):
                     self.puburi,
                     io_loop=self.io_loop
                 )
+                    self.subscriber.set_tag_filter(self.tag_filter)
                 try:
                     self.io_loop.run_sync(
                         lambda: self.subscriber.connect(timeout=timeout))
@@ -373,6 +413,7 @@ class SaltEvent(object):
                 self.puburi,
                 io_loop=self.io_loop
             )
+                self.subscriber.set_tag_filter(self.tag_filter)
 
             # For the async case, the connect will be defered to when
             # set_event_handler() is invoked.
@@ -643,6 +684,62 @@ class SaltEvent(object):
         else:
             return ret['data']
 
+    @tornado.gen.coroutine
+    def get_event_async(self,
+                        wait=5,
+                        tag='',
+                        full=False,
+                        match_type=None):
+        '''
+        Coroutine version of get_event(), for event objects created with an
+        io_loop. Waits for a matching event without blocking the io_loop.
+
+        The arguments and the handling of the events not matching the tag are
+        the same as for get_event(). Do not use it together with
+        set_event_handler() on the same event object.
+
+        .. versionadded:: Oxygen
+        '''
+        assert not self._run_io_loop_sync
+
+        match_func = self._get_match_func(match_type)
+
+        ret = self._check_pending(tag, match_func)
+        if ret is None:
+            timeout_at = time.time() + wait if wait else None
+            try:
+                if not self.cpub:
+                    self.connect_pub()
+                if not self.subscriber.connected():
+                    yield self.subscriber.connect(timeout=wait or None)
+                while True:
+                    timeout = None
+                    if timeout_at is not None:
+                        timeout = max(timeout_at - time.time(), 0)
+                    raw = yield self.subscriber.read(timeout=timeout)
+                    if raw is None:
+                        break
+                    mtag, data = self.unpack(raw, self.serial)
+                    evt = {'data': data, 'tag': mtag}
+                    if match_func(mtag, tag):
+                        log.trace('get_event_async() received = {0}'.format(evt))
+                        ret = evt
+                        break
+                    if any(pmatch_func(mtag, ptag) for ptag, pmatch_func in self.pending_tags):
+                        log.trace('get_event_async() caching unwanted event = {0}'.format(evt))
+                        self.pending_events.append(evt)
+            except tornado.iostream.StreamClosedError:
+                if self.raise_errors:
+                    raise
+            except Exception as exc:
+                if self.raise_errors:
+                    raise
+                log.debug('Unable to read an event: {0}'.format(exc))
+
+        if ret is None or full:
+            raise tornado.gen.Return(ret)
+        raise tornado.gen.Return(ret['data'])
+
     def get_event_noblock(self):
         '''Get the raw event without blocking or any other niceties
         '''
@@ -1028,7 +1125,8 @@ class AsyncEventPublisher(object):
         Get something from epull, publish it out epub, and return the package (or None)
         '''
         try:
-            self.publisher.publish(package)
+            tag = _event_tag(package) if self.publisher.tag_filters else None
+            self.publisher.publish(package, tag=tag)
             return package
         # Add an extra fallback in case a forked process leeks through
         except Exception:
@@ -1127,7 +1225,8 @@ class EventPublisher(salt.utils.process.SignalHandlingMultiprocessingProcess):
         Get something from epull, publish it out epub, and return the package (or None)
         '''
         try:
-            self.publisher.publish(package)
+            tag = _event_tag(package) if self.publisher.tag_filters else None
+            self.publisher.publish(package, tag=tag)
             return package
         # Add an extra fallback in case a forked process leeks through
         except Exception:
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+'''
+Track changes below directories using inotify
+
+.. versionadded:: Oxygen
+
+:depends: - pyinotify Python module >= 0.9.5
+
+Used to invalidate in-process caches of directory contents without having to
+stat or walk the directories on every lookup. When pyinotify is not available
+(or not on Linux) the tracker reports that it can not vouch for anything and
+callers fall back to their stat based checks.
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import logging
+import os
+
+# Import third party libs
+try:
+    import pyinotify
+    HAS_PYINOTIFY = True
+    DEFAULT_MASK = (pyinotify.IN_CREATE | pyinotify.IN_DELETE |
+                    pyinotify.IN_MODIFY | pyinotify.IN_ATTRIB |
+                    pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MOVED_FROM |
+                    pyinotify.IN_MOVED_TO | pyinotify.IN_DELETE_SELF |
+                    pyinotify.IN_MOVE_SELF)
+except ImportError:
+    HAS_PYINOTIFY = False
+    DEFAULT_MASK = None
+
+log = logging.getLogger(__name__)
+
+
+class ChangeTracker(object):
+    '''
+    Record the paths changed below a set of directories.
+
+    :py:meth:`changes` returns the set of paths changed since its last call,
+    or ``None`` when the tracker can not tell what changed: on the first
+    call, after an event queue overflow, when a watched directory went away,
+    or when pyinotify is not available. ``None`` means callers have to assume
+    that everything changed.
+
+    inotify watches are not shared across a fork, a tracker used in a forked
+    child transparently sets up its own watches (reporting ``None`` once).
+    '''
+    def __init__(self, paths, recursive=False, mask=None):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.recursive = recursive
+        self.mask = mask if mask is not None else DEFAULT_MASK
+        self._pid = None
+        self._notifier = None
+        self._changed = set()
+        self._valid = False
+
+    def _start(self):
+        '''
+        Set up the watches, reporting a failure as an invalid state
+        '''
+        self.stop()
+        self._pid = os.getpid()
+        self._changed = set()
+        if not HAS_PYINOTIFY:
+            return
+        tracker = self
+
+        class _Recorder(pyinotify.ProcessEvent):
+            '''
+            Record the path of every event
+            '''
+            def process_default(self, event):  # pylint: disable=no-self-use
+                if event.mask & pyinotify.IN_Q_OVERFLOW:
+                    log.debug('inotify event queue overflowed')
+                    tracker._valid = False
+                    return
+                if event.mask & (pyinotify.IN_DELETE_SELF |
+                                 pyinotify.IN_MOVE_SELF |
+                                 pyinotify.IN_IGNORED) \
+                        and event.pathname in tracker.paths:
+                    tracker._valid = False
+                tracker._changed.add(event.pathname)
+
+        try:
+            wmgr = pyinotify.WatchManager()
+            self._notifier = pyinotify.Notifier(wmgr, _Recorder())
+            for path in self.paths:
+                ret = wmgr.add_watch(path,
+                                     self.mask,
+                                     rec=self.recursive,
+                                     auto_add=self.recursive)
+                if any(wd < 0 for wd in ret.values()):
+                    raise OSError('Unable to watch {0}'.format(path))
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug('Unable to track changes with inotify: {0}'.format(exc))
+            self.stop()
+            return
+        self._valid = True
+
+    def stop(self):
+        '''
+        Remove the watches
+        '''
+        if self._notifier is not None and self._pid == os.getpid():
+            try:
+                self._notifier.stop()
+            except Exception:  # pylint: disable=broad-except
+                pass
+        self._notifier = None
+        self._valid = False
+
+    def changes(self):
+        '''
+        Return the set of paths changed since the last call, or ``None`` when
+        everything has to be assumed changed
+        '''
+        if self._pid != os.getpid() or not self._valid:
+            self._start()
+            return None
+        try:
+            while self._notifier.check_events(timeout=0):
+                self._notifier.read_events()
+                self._notifier.process_events()
+        except Exception as exc:  # pylint: disable=broad-except
+            log.debug('Failed to read inotify events: {0}'.format(exc))
+            self._valid = False
+        if not self._valid:
+            self._start()
+            return None
+        changed, self._changed = self._changed, set()
+        return changed
@@ -14,7 +14,15 @@ def gen_jid():
     '''
     Generate a jid
     '''
-    return '{0:%Y%m%d%H%M%S%f}'.format(datetime.datetime.now())
+    return datetime_to_jid(datetime.datetime.now())
+
+
+def datetime_to_jid(when):
+    '''
+    Convert a datetime into the jid of a job invoked at that time. Since jids
+    are fixed width timestamps, comparing jids compares the invocation times.
+    '''
+    return '{0:%Y%m%d%H%M%S%f}'.format(when)
 
 
 def is_jid(jid):
@@ -66,6 +66,10 @@ class SaltCacheLoader(BaseLoader):
     '''
     def __init__(self, opts, saltenv='base', encoding='utf-8',
                  pillar_rend=False):
+        # The state render cache records the templates a rendering includes,
+        # and passes the options in a recording copy
+        self.recorder = getattr(opts, '_recorder', None)
+        opts = getattr(opts, '_data', opts)
         self.opts = opts
         self.saltenv = saltenv
         self.encoding = encoding
@@ -115,6 +119,8 @@ class SaltCacheLoader(BaseLoader):
             raise TemplateNotFound(template)
 
         self.check_cache(template)
+        if self.recorder is not None:
+            self.recorder.templates.add((self.saltenv, template))
 
         if environment and template:
             tpldir = path.dirname(template).replace('\\', '/')
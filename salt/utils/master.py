@@ -113,6 +113,18 @@ class MasterPillarUtil(object):
             )
         )
 
+    def _fetch_cached(self, key, minion_ids):
+        # Return the cached data under key of the minions, all the cached
+        # minions if none are passed, fetched in bulk from the cache
+        if not minion_ids:
+            return self.cache.list_with_data('minions', key)
+        cdata = self.cache.fetch_many(
+            ('minions/{0}'.format(minion_id), key)
+            for minion_id in minion_ids
+            if salt.utils.verify.valid_id(self.opts, minion_id))
+        return dict((bank[len('minions/'):], mdata)
+                    for (bank, _), mdata in six.iteritems(cdata))
+
     def _get_cached_mine_data(self, *minion_ids):
         # Return one dict with the cached mine data of the targeted minions
         mine_data = dict([(minion_id, {}) for minion_id in minion_ids])
@@ -121,12 +133,9 @@ class MasterPillarUtil(object):
             log.debug('Skipping cached mine data minion_data_cache'
                       'and enfore_mine_cache are both disabled.')
             return mine_data
-        if not minion_ids:
-            minion_ids = self.cache.ls('minions')
-        for minion_id in minion_ids:
+        for minion_id, mdata in six.iteritems(self._fetch_cached('mine', minion_ids)):
             if not salt.utils.verify.valid_id(self.opts, minion_id):
                 continue
-            mdata = self.cache.fetch('minions/{0}'.format(minion_id), 'mine')
             if isinstance(mdata, dict):
                 mine_data[minion_id] = mdata
         return mine_data
@@ -140,12 +149,9 @@ class MasterPillarUtil(object):
             log.debug('Skipping cached data because minion_data_cache is not '
                       'enabled.')
             return grains, pillars
-        if not minion_ids:
-            minion_ids = self.cache.ls('minions')
-        for minion_id in minion_ids:
+        for minion_id, mdata in six.iteritems(self._fetch_cached('data', minion_ids)):
             if not salt.utils.verify.valid_id(self.opts, minion_id):
                 continue
-            mdata = self.cache.fetch('minions/{0}'.format(minion_id), 'data')
             if not isinstance(mdata, dict):
                 log.warning(
                     'cache.fetch should always return a dict. ReturnedType: {0}, MinionId: {1}'.format(
@@ -380,10 +386,16 @@ class MasterPillarUtil(object):
                     (clear_grains and not minion_pillar)):
                     # Not saving pillar or grains, so just delete the cache file
                     self.cache.flush(bank, 'data')
+                    salt.utils.minions.update_minion_data_index(
+                        self.opts, minion_id)
                 elif clear_pillar and minion_grains:
                     self.cache.store(bank, 'data', {'grains': minion_grains})
+                    salt.utils.minions.update_minion_data_index(
+                        self.opts, minion_id, {'grains': minion_grains})
                 elif clear_grains and minion_pillar:
                     self.cache.store(bank, 'data', {'pillar': minion_pillar})
+                    salt.utils.minions.update_minion_data_index(
+                        self.opts, minion_id, {'pillar': minion_pillar})
                 if clear_mine:
                     # Delete the whole mine file
                     self.cache.flush(bank, 'mine')
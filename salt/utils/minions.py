@@ -6,14 +6,22 @@ expected to return
 
 # Import python libs
 from __future__ import absolute_import
+import contextlib
+import errno
 import os
 import fnmatch
 import re
 import logging
+import struct
+import tempfile
+import time
 
 # Import salt libs
 import salt.payload
 import salt.utils
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.inotify
 from salt.defaults import DEFAULT_TARGET_DELIM
 from salt.exceptions import CommandExecutionError, SaltCacheError
 import salt.auth.ldap
@@ -26,6 +34,11 @@ if six.PY3:
     import ipaddress
 else:
     import salt.ext.ipaddress as ipaddress
+try:
+    import fcntl
+except ImportError:
+    # fcntl is not available on windows
+    pass
 HAS_RANGE = False
 try:
     import seco.range  # pylint: disable=import-error
@@ -168,6 +181,635 @@ def nodegroup_comp(nodegroup, nodegroups, skip=None, first_call=True):
         return ret
 
 
+# Registry of the shared per-process AcceptedKeys instances
+_ACCEPTED_KEYS = {}
+
+
+def get_accepted_keys(opts, acc='minions'):
+    '''
+    Return the AcceptedKeys listing shared by everything in this process
+    which looks at the ``acc`` directory of the master pki_dir
+    '''
+    key = os.path.join(opts['pki_dir'], acc)
+    if key not in _ACCEPTED_KEYS:
+        _ACCEPTED_KEYS[key] = AcceptedKeys(opts, acc)
+    return _ACCEPTED_KEYS[key]
+
+
+class AcceptedKeys(object):
+    '''
+    Cached listing of the accepted minion keys.
+
+    The directory is only listed again when it changed: inotify is used to
+    find out when it is available, otherwise the mtime of the directory is
+    checked. With ``key_cache: sched`` the listing is instead read from the
+    ``.key_cache`` file the Maintenance process writes for all the workers,
+    and only when that file has been replaced.
+
+    ``generation`` is bumped every time the set of accepted keys changes.
+    '''
+    KEY_CACHE_FILE = '.key_cache'
+
+    def __init__(self, opts, acc='minions'):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.keydir = os.path.join(opts['pki_dir'], acc)
+        self.key_cache_fn = os.path.join(self.keydir, self.KEY_CACHE_FILE)
+        self.generation = 0
+        self._minions = []
+        self._stat = None
+        self._tracker = salt.utils.inotify.ChangeTracker([self.keydir])
+
+    @staticmethod
+    def _stat_sig(path):
+        '''
+        Return what identifies the state of a file or directory
+        '''
+        fstat = os.stat(path)
+        return (fstat.st_ino, fstat.st_size, fstat.st_mtime)
+
+    def _set(self, minions):
+        if minions != self._minions:
+            self._minions = minions
+            self.generation += 1
+
+    def _list(self):
+        '''
+        List the accepted keys from the directory
+        '''
+        minions = []
+        for fn_ in salt.utils.isorted(os.listdir(self.keydir)):
+            if not fn_.startswith('.') and os.path.isfile(os.path.join(self.keydir, fn_)):
+                minions.append(fn_)
+        return minions
+
+    def _refresh_from_key_cache(self):
+        '''
+        Load the listing from the key cache file if it has been replaced
+        '''
+        stat_sig = self._stat_sig(self.key_cache_fn)
+        if stat_sig != self._stat:
+            log.debug('Loading cached minion list')
+            with salt.utils.fopen(self.key_cache_fn, 'rb') as fn_:
+                self._set(self.serial.load(fn_))
+            self._stat = stat_sig
+
+    def _refresh_from_dir(self):
+        '''
+        List the directory again if it changed since it was last listed
+        '''
+        changes = self._tracker.changes()
+        if changes is not None and self._stat is not None:
+            if changes:
+                self._stat = None
+            else:
+                return
+        stat_sig = self._stat_sig(self.keydir)
+        if stat_sig == self._stat:
+            return
+        listed = time.time()
+        self._set(self._list())
+        # A change in the same (coarse) mtime tick as the listing would go
+        # unnoticed, so do not trust the listing until the tick has passed
+        self._stat = stat_sig if listed - stat_sig[2] > 2 else None
+
+    def minions(self):
+        '''
+        Return the sorted list of accepted minion ids
+        '''
+        if self.opts.get('key_cache') and os.path.exists(self.key_cache_fn):
+            self._refresh_from_key_cache()
+        else:
+            self._refresh_from_dir()
+        return self._minions
+
+    def write_key_cache(self):
+        '''
+        Write the listing of the directory to the key cache file, used by the
+        Maintenance process. The file is only replaced when the listing
+        changed so that workers do not reload it needlessly. Returns whether
+        the file was written.
+        '''
+        minions = self._list()
+        if os.path.exists(self.key_cache_fn) and minions == self._minions:
+            return False
+        with salt.utils.atomicfile.atomic_open(self.key_cache_fn, 'wb') as cache_file:
+            self.serial.dump(minions, cache_file)
+        self._set(minions)
+        return True
+
+
+# Operators of the compound matcher
+_COMPOUND_OPERS = ('and', 'or', 'not', '(', ')')
+
+# Compiled compound targets, keyed by the target expression
+_COMPOUND_CACHE = {}
+_COMPOUND_CACHE_MAX = 1024
+
+
+class _CompoundParser(object):
+    '''
+    Recursive descent parser turning the words of a compound target into a
+    tree of tuples:
+
+    - ``('term', engine, pattern, delimiter, word)``
+    - ``('not', node)``
+    - ``('and', (node, ...))``
+    - ``('or', (node, ...))``
+
+    Precedence is ``not`` over ``and`` over ``or``. A ``not`` directly
+    following a term implies an ``and`` and unclosed parentheses are closed at
+    the end of the expression, as the compound matcher always allowed.
+    '''
+    def __init__(self, words):
+        self.words = words
+        self.pos = 0
+
+    def _peek(self):
+        if self.pos < len(self.words):
+            return self.words[self.pos]
+        return None
+
+    def parse(self):
+        if not self.words:
+            raise ValueError('empty expression')
+        node = self._or()
+        if self.pos < len(self.words):
+            raise ValueError(
+                'unexpected "{0}"'.format(self.words[self.pos])
+            )
+        return node
+
+    def _or(self):
+        nodes = [self._and()]
+        while self._peek() == 'or':
+            self.pos += 1
+            nodes.append(self._and())
+        if len(nodes) == 1:
+            return nodes[0]
+        return ('or', tuple(nodes))
+
+    def _and(self):
+        nodes = [self._unary()]
+        while True:
+            word = self._peek()
+            if word == 'and':
+                self.pos += 1
+            elif word != 'not':
+                break
+            nodes.append(self._unary())
+        if len(nodes) == 1:
+            return nodes[0]
+        return ('and', tuple(nodes))
+
+    def _unary(self):
+        word = self._peek()
+        if word is None:
+            raise ValueError('unexpected end of expression')
+        self.pos += 1
+        if word == 'not':
+            return ('not', self._unary())
+        if word == '(':
+            node = self._or()
+            if self._peek() == ')':
+                self.pos += 1
+            elif self._peek() is not None:
+                raise ValueError(
+                    'unexpected "{0}"'.format(self._peek())
+                )
+            return node
+        if word in _COMPOUND_OPERS:
+            raise ValueError('unexpected operator "{0}"'.format(word))
+        target_info = parse_target(word)
+        if target_info['engine'] == 'N':
+            # Nodegroups should already be expanded/resolved to other engines
+            raise ValueError(
+                'nodegroup expansion failure of "{0}"'.format(word)
+            )
+        return ('term',
+                target_info['engine'],
+                target_info['pattern'],
+                target_info['delimiter'],
+                word)
+
+
+def compile_compound(expr):
+    '''
+    Compile a compound target (a string or a list of words) into a tree
+    which can be evaluated against sets of minion ids. Compiled targets are
+    cached, ``None`` is returned for invalid targets.
+    '''
+    if isinstance(expr, six.string_types):
+        key = expr
+        words = expr.split()
+    else:
+        key = tuple(expr)
+        words = [word if isinstance(word, six.string_types) else str(word)
+                 for word in expr]
+    try:
+        return _COMPOUND_CACHE[key]
+    except KeyError:
+        pass
+    try:
+        compiled = _CompoundParser(words).parse()
+    except ValueError as exc:
+        log.error('Invalid compound target {0}: {1}'.format(expr, exc))
+        compiled = None
+    if len(_COMPOUND_CACHE) >= _COMPOUND_CACHE_MAX:
+        _COMPOUND_CACHE.clear()
+    _COMPOUND_CACHE[key] = compiled
+    return compiled
+
+
+# Kinds of entries stored in the minion data index
+_IDX_LEAF = 'leaf'    # A scalar (or a scalar member of a list) at a key path
+_IDX_PATH = 'path'    # A key path exists, whatever its value is
+_IDX_DICT = 'dict'    # A non-empty dict lives at a key path
+_IDX_LIST = 'list'    # A list lives at a key path, deeper paths index into it
+_IDX_SCAN = 'scan'    # A value at a key path the index can not answer for
+
+# Scalars longer than this are not indexed, matches against them fall back to
+# a scan of the cached data of the minions holding them
+_IDX_MAX_VALUE_LEN = 256
+
+# Search types held in the index
+_IDX_SEARCH_TYPES = ('grains', 'pillar')
+
+# Registry of the shared per-process MinionDataIndex instances
+_MINION_DATA_INDEXES = {}
+
+
+def _index_entries(data):
+    '''
+    Flatten the grains and pillar of a minion data cache entry into the set of
+    index entries describing it. Each entry is a tuple of
+    ``(search_type, kind, path, value)``.
+    '''
+    entries = set()
+    if not isinstance(data, dict):
+        return entries
+    for search_type in _IDX_SEARCH_TYPES:
+        stack = [((), data.get(search_type))]
+        while stack:
+            path, node = stack.pop()
+            if path:
+                entries.add((search_type, _IDX_PATH, path, None))
+            if isinstance(node, dict):
+                if path and node:
+                    entries.add((search_type, _IDX_DICT, path, None))
+                for key, val in six.iteritems(node):
+                    # Only string keys can be reached by a target expression
+                    if isinstance(key, six.string_types):
+                        stack.append((path + (key,), val))
+                continue
+            if not path:
+                continue
+            if isinstance(node, (list, tuple)):
+                entries.add((search_type, _IDX_LIST, path, None))
+                members = node
+            else:
+                members = (node,)
+            for member in members:
+                if isinstance(member, (dict, list, tuple)):
+                    entries.add((search_type, _IDX_SCAN, path, None))
+                    continue
+                try:
+                    value = str(member).lower()
+                except Exception:  # pylint: disable=broad-except
+                    value = None
+                if value is None or len(value) > _IDX_MAX_VALUE_LEN:
+                    entries.add((search_type, _IDX_SCAN, path, None))
+                else:
+                    entries.add((search_type, _IDX_LEAF, path, value))
+    return entries
+
+
+def _index_match(value, pattern, regex_match=False, exact_match=False):
+    '''
+    Match an indexed (lowercased) value the same way ``subdict_match`` does
+    '''
+    if regex_match:
+        try:
+            return re.match(pattern.lower(), value)
+        except Exception:
+            log.error('Invalid regex \'{0}\' in match'.format(pattern))
+            return False
+    elif exact_match:
+        return value == pattern.lower()
+    return fnmatch.fnmatch(value, pattern.lower())
+
+
+def get_minion_data_index(opts, cache=None):
+    '''
+    Return the MinionDataIndex shared by everything in this process which
+    targets minions using the same master cachedir
+    '''
+    key = os.path.join(opts['cachedir'], MinionDataIndex.INDEX_FILE)
+    if key not in _MINION_DATA_INDEXES:
+        _MINION_DATA_INDEXES[key] = MinionDataIndex(opts, cache=cache)
+    return _MINION_DATA_INDEXES[key]
+
+
+def update_minion_data_index(opts, minion_id, data=None):
+    '''
+    Record a write of the ``data`` key of the ``minions/<minion_id>`` cache
+    bank in the minion data index. Passing ``None`` as ``data`` records that
+    the cached data of the minion has been removed.
+    '''
+    if not opts.get('minion_data_cache', False) \
+            or not opts.get('minion_data_index', False):
+        return
+    try:
+        index = get_minion_data_index(opts)
+        if data is None:
+            index.remove(minion_id)
+        else:
+            index.update(minion_id, data)
+    except Exception as exc:  # pylint: disable=broad-except
+        log.error(
+            'Failed to update the minion data index for {0}: {1}'.format(
+                minion_id, exc
+            )
+        )
+
+
+class MinionDataIndex(object):
+    '''
+    Inverted index of the grains and pillar held in the minion data cache,
+    mapping key paths to values to the set of minions holding them.
+
+    The index is persisted in the master cachedir as an append-only journal of
+    per-minion records, which every process sharing the cachedir replays
+    incrementally before answering a lookup. Writers serialize on a lock file
+    and compact the journal into a snapshot once it holds too many superseded
+    records. If the journal does not exist yet it is bootstrapped from the
+    minion data cache.
+    '''
+    INDEX_FILE = '.minion_data_index'
+    # Every snapshot starts with a random generation marker so that readers
+    # can tell a compacted journal from the one they have been replaying
+    GENERATION_LEN = 16
+    # Number of superseded records tolerated in the journal before compacting
+    COMPACT_SLACK = 1024
+
+    def __init__(self, opts, cache=None):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.cache = cache if cache is not None else salt.cache.factory(opts)
+        self.index_file = os.path.join(opts['cachedir'], self.INDEX_FILE)
+        self.lock_file = self.index_file + '.lock'
+        self._reset()
+
+    def _reset(self):
+        '''
+        Drop the in-memory state, the journal will be replayed from the start
+        '''
+        self._generation = None
+        self._fstat = None
+        self._offset = 0
+        self._records = 0
+        # minion id -> set of index entries
+        self.minions = {}
+        # (search_type, path) -> {value: set of minion ids}
+        self._leaves = {}
+        # (search_type, kind, path) -> set of minion ids
+        self._marks = {}
+
+    @contextlib.contextmanager
+    def _lock(self):
+        '''
+        Serialize writers to the journal across processes
+        '''
+        if not salt.utils.is_fcntl_available(check_sunos=True):
+            with salt.utils.files.wait_lock(self.index_file, self.lock_file):
+                yield
+            return
+        with salt.utils.fopen(self.lock_file, 'w') as fh_:
+            fcntl.flock(fh_.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh_.fileno(), fcntl.LOCK_UN)
+
+    def _apply(self, minion_id, entries):
+        '''
+        Replace the index entries of a minion, ``None`` removes the minion
+        '''
+        for search_type, kind, path, value in self.minions.pop(minion_id, ()):
+            if kind == _IDX_LEAF:
+                values = self._leaves.get((search_type, path), {})
+                ids = values.get(value)
+                if ids is not None:
+                    ids.discard(minion_id)
+                    if not ids:
+                        del values[value]
+                        if not values:
+                            del self._leaves[(search_type, path)]
+            else:
+                ids = self._marks.get((search_type, kind, path))
+                if ids is not None:
+                    ids.discard(minion_id)
+                    if not ids:
+                        del self._marks[(search_type, kind, path)]
+        if entries is None:
+            return
+        self.minions[minion_id] = entries
+        for search_type, kind, path, value in entries:
+            if kind == _IDX_LEAF:
+                self._leaves.setdefault(
+                    (search_type, path), {}
+                ).setdefault(value, set()).add(minion_id)
+            else:
+                self._marks.setdefault(
+                    (search_type, kind, path), set()
+                ).add(minion_id)
+
+    def _pack(self, minion_id, entries):
+        '''
+        Serialize a journal record, prefixed with its length
+        '''
+        if entries is not None:
+            entries = [[search_type, kind, list(path), value]
+                       for search_type, kind, path, value in entries]
+        payload = self.serial.dumps({'id': minion_id, 'entries': entries},
+                                    use_bin_type=True)
+        return struct.pack('>I', len(payload)) + payload
+
+    def _replay(self, buf):
+        '''
+        Apply the complete records found in ``buf``, return the number of
+        bytes consumed
+        '''
+        pos = 0
+        while pos + 4 <= len(buf):
+            size = struct.unpack('>I', buf[pos:pos + 4])[0]
+            if pos + 4 + size > len(buf):
+                # Partially written record, pick it up on the next sync
+                break
+            record = self.serial.loads(buf[pos + 4:pos + 4 + size],
+                                       encoding='utf-8')
+            entries = record['entries']
+            if entries is not None:
+                entries = set((search_type, kind, tuple(path), value)
+                              for search_type, kind, path, value in entries)
+            self._apply(record['id'], entries)
+            self._records += 1
+            pos += 4 + size
+        return pos
+
+    def _sync(self, locked=False):
+        '''
+        Replay the records appended to the journal since the last sync
+        '''
+        try:
+            fstat = os.stat(self.index_file)
+        except OSError as exc:
+            if exc.errno != errno.ENOENT:
+                raise
+            self._bootstrap(locked=locked)
+            return
+        fstat = (fstat.st_ino, fstat.st_size, fstat.st_mtime)
+        if fstat == self._fstat:
+            return
+        with salt.utils.fopen(self.index_file, 'rb') as fp_:
+            generation = fp_.read(self.GENERATION_LEN)
+            if generation != self._generation:
+                # The journal has been compacted, start over
+                self._reset()
+                self._generation = generation
+                self._offset = len(generation)
+            fp_.seek(self._offset)
+            self._offset += self._replay(fp_.read())
+            fstat = os.fstat(fp_.fileno())
+            if fstat.st_size == self._offset:
+                self._fstat = (fstat.st_ino, fstat.st_size, fstat.st_mtime)
+
+    def _bootstrap(self, locked=False):
+        '''
+        Build the index from the minion data cache and persist it
+        '''
+        if not locked:
+            with self._lock():
+                if os.path.exists(self.index_file):
+                    self._sync(locked=True)
+                else:
+                    self._bootstrap(locked=True)
+            return
+        log.debug('Building the minion data index from the minion data cache')
+        self._reset()
+        for id_, mdata in six.iteritems(self.cache.list_with_data('minions', 'data')):
+            if mdata is not None:
+                self._apply(id_, _index_entries(mdata))
+        self._compact()
+
+    def _compact(self):
+        '''
+        Write a snapshot of the index in place of the journal. Must be called
+        with the lock held and the index synced.
+        '''
+        cachedir = os.path.dirname(self.index_file)
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        tmpfh, tmpfn = tempfile.mkstemp(dir=cachedir)
+        generation = os.urandom(self.GENERATION_LEN)
+        with os.fdopen(tmpfh, 'wb') as fp_:
+            fp_.write(generation)
+            for minion_id, entries in six.iteritems(self.minions):
+                fp_.write(self._pack(minion_id, entries))
+            size = fp_.tell()
+        salt.utils.files.rename(tmpfn, self.index_file)
+        self._generation = generation
+        self._fstat = None
+        self._offset = size
+        self._records = len(self.minions)
+
+    def _write(self, minion_id, entries):
+        '''
+        Append a record to the journal
+        '''
+        record = self._pack(minion_id, entries)
+        with self._lock():
+            self._sync(locked=True)
+            with salt.utils.fopen(self.index_file, 'ab') as fp_:
+                fp_.write(record)
+            self._apply(minion_id, entries)
+            self._fstat = None
+            self._offset += len(record)
+            self._records += 1
+            if self._records > 2 * len(self.minions) + self.COMPACT_SLACK:
+                self._compact()
+
+    def update(self, minion_id, data):
+        '''
+        Index the cached data (a dict with grains and pillar) of a minion
+        '''
+        self._write(minion_id, _index_entries(data))
+
+    def remove(self, minion_id):
+        '''
+        Drop a minion from the index
+        '''
+        self._write(minion_id, None)
+
+    def indexed(self):
+        '''
+        Return the set of minions present in the index
+        '''
+        self._sync()
+        return set(self.minions)
+
+    def lookup(self,
+               search_type,
+               expr,
+               delimiter=DEFAULT_TARGET_DELIM,
+               regex_match=False,
+               exact_match=False):
+        '''
+        Evaluate a ``subdict_match`` expression against the index.
+
+        Returns a tuple of the set of minions known to match and the set of
+        minions whose cached data has to be scanned to decide whether they
+        match, because it holds structures (lists of dicts, indexed list
+        access, wildcards) the index does not answer for.
+        '''
+        self._sync()
+        matched = set()
+        scan = set()
+        splits = expr.split(delimiter)
+        for idx in range(1, len(splits)):
+            path = tuple(splits[:idx])
+            matchstr = delimiter.join(splits[idx:])
+            # Traversing through a list (by index or into embedded dicts)
+            for plen in range(1, idx):
+                scan.update(
+                    self._marks.get((search_type, _IDX_LIST, path[:plen]), ())
+                )
+            scan.update(self._marks.get((search_type, _IDX_SCAN, path), ()))
+            for value, ids in six.iteritems(
+                    self._leaves.get((search_type, path), {})):
+                if _index_match(value,
+                                matchstr,
+                                regex_match=regex_match,
+                                exact_match=exact_match):
+                    matched.update(ids)
+            dict_ids = self._marks.get((search_type, _IDX_DICT, path))
+            if not dict_ids:
+                continue
+            if matchstr.startswith('*:'):
+                scan.update(dict_ids)
+            elif matchstr == '*':
+                matched.update(dict_ids)
+            else:
+                # Key lookups; nested matches are covered by longer paths
+                matched.update(dict_ids.intersection(
+                    self._marks.get(
+                        (search_type, _IDX_PATH, path + (matchstr,)), ()
+                    )
+                ))
+        scan.difference_update(matched)
+        return matched, scan
+
+
 class CkMinions(object):
     '''
     Used to check what minions should respond from a target
@@ -181,6 +823,8 @@ class CkMinions(object):
         self.opts = opts
         self.serial = salt.payload.Serial(opts)
         self.cache = salt.cache.factory(opts)
+        # Accepted minions pinned while evaluating a compound target
+        self._pinned_minions = None
         # TODO: this is actually an *auth* check
         if self.opts.get('transport', 'zeromq') in ('zeromq', 'tcp'):
             self.acc = 'minions'
@@ -207,7 +851,7 @@ class CkMinions(object):
         '''
         if isinstance(expr, six.string_types):
             expr = [m for m in expr.split(',') if m]
-        minions = self._pki_minions()
+        minions = set(self._pki_minions())
         return [x for x in expr if x in minions]
 
     def _check_pcre_minions(self, expr, greedy):  # pylint: disable=unused-argument
@@ -222,21 +866,13 @@ class CkMinions(object):
         Retreive complete minion list from PKI dir.
         Respects cache if configured
         '''
-        minions = []
-        pki_cache_fn = os.path.join(self.opts['pki_dir'], self.acc, '.key_cache')
+        if self._pinned_minions is not None:
+            return self._pinned_minions
         try:
-            if self.opts['key_cache'] and os.path.exists(pki_cache_fn):
-                log.debug('Returning cached minion list')
-                with salt.utils.fopen(pki_cache_fn) as fn_:
-                    return self.serial.load(fn_)
-            else:
-                for fn_ in salt.utils.isorted(os.listdir(os.path.join(self.opts['pki_dir'], self.acc))):
-                    if not fn_.startswith('.') and os.path.isfile(os.path.join(self.opts['pki_dir'], self.acc, fn_)):
-                        minions.append(fn_)
-            return minions
-        except OSError as exc:
+            return list(get_accepted_keys(self.opts, self.acc).minions())
+        except (IOError, OSError) as exc:
             log.error('Encountered OSError while evaluating  minions in PKI dir: {0}'.format(exc))
-            return minions
+            return []
 
     def _check_cache_minions(self,
                              expr,
@@ -256,15 +892,21 @@ class CkMinions(object):
             return self.cache.list('minions')
 
         if greedy:
-            minions = []
-            for fn_ in salt.utils.isorted(os.listdir(os.path.join(self.opts['pki_dir'], self.acc))):
-                if not fn_.startswith('.') and os.path.isfile(os.path.join(self.opts['pki_dir'], self.acc, fn_)):
-                    minions.append(fn_)
+            minions = self._pki_minions()
         elif cache_enabled:
             minions = list_cached_minions()
         else:
             return []
 
+        if cache_enabled and self.opts.get('minion_data_index', False):
+            return self._check_index_minions(minions,
+                                             expr,
+                                             delimiter,
+                                             greedy,
+                                             search_type,
+                                             regex_match=regex_match,
+                                             exact_match=exact_match)
+
         if cache_enabled:
             if greedy:
                 cminions = list_cached_minions()
@@ -273,10 +915,15 @@ class CkMinions(object):
             if not cminions:
                 return minions
             minions = set(minions)
-            for id_ in cminions:
-                if greedy and id_ not in minions:
-                    continue
-                mdata = self.cache.fetch('minions/{0}'.format(id_), 'data')
+            if greedy:
+                cdata = self.cache.fetch_many(
+                    ('minions/{0}'.format(id_), 'data')
+                    for id_ in cminions if id_ in minions)
+            else:
+                cdata = self.cache.fetch_many(
+                    ('minions/{0}'.format(id_), 'data') for id_ in cminions)
+            for (bank, _), mdata in six.iteritems(cdata):
+                id_ = bank[len('minions/'):]
                 if mdata is None:
                     if not greedy:
                         minions.remove(id_)
@@ -291,6 +938,42 @@ class CkMinions(object):
             minions = list(minions)
         return minions
 
+    def _check_index_minions(self,
+                             minions,
+                             expr,
+                             delimiter,
+                             greedy,
+                             search_type,
+                             regex_match=False,
+                             exact_match=False):
+        '''
+        Helper function for _check_cache_minions which answers the search
+        from the minion data index, only fetching the cached data of the
+        minions the index can not decide on.
+        '''
+        index = get_minion_data_index(self.opts, cache=self.cache)
+        matched, scan = index.lookup(search_type,
+                                     expr,
+                                     delimiter=delimiter,
+                                     regex_match=regex_match,
+                                     exact_match=exact_match)
+        cdata = self.cache.fetch_many(('minions/{0}'.format(id_), 'data') for id_ in scan)
+        for (bank, _), mdata in six.iteritems(cdata):
+            id_ = bank[len('minions/'):]
+            if mdata is None:
+                continue
+            if salt.utils.subdict_match(mdata.get(search_type),
+                                        expr,
+                                        delimiter=delimiter,
+                                        regex_match=regex_match,
+                                        exact_match=exact_match):
+                matched.add(id_)
+        if greedy:
+            # Keep the accepted minions which matched or have no cached data
+            unmatched = index.indexed().difference(matched)
+            return [id_ for id_ in minions if id_ not in unmatched]
+        return [id_ for id_ in minions if id_ in matched]
+
     def _check_grain_minions(self, expr, delimiter, greedy):
         '''
         Return the minions found by looking via grains
@@ -368,8 +1051,9 @@ class CkMinions(object):
             proto = 'ipv{0}'.format(tgt.version)
 
             minions = set(minions)
-            for id_ in cminions:
-                mdata = self.cache.fetch('minions/{0}'.format(id_), 'data')
+            cdata = self.cache.fetch_many(('minions/{0}'.format(id_), 'data') for id_ in cminions)
+            for (bank, _), mdata in six.iteritems(cdata):
+                id_ = bank[len('minions/'):]
                 if mdata is None:
                     if not greedy:
                         minions.remove(id_)
@@ -406,11 +1090,7 @@ class CkMinions(object):
             )
             cache_enabled = self.opts.get('minion_data_cache', False)
             if greedy:
-                mlist = []
-                for fn_ in salt.utils.isorted(os.listdir(os.path.join(self.opts['pki_dir'], self.acc))):
-                    if not fn_.startswith('.') and os.path.isfile(os.path.join(self.opts['pki_dir'], self.acc, fn_)):
-                        mlist.append(fn_)
-                return mlist
+                return self._pki_minions()
             elif cache_enabled:
                 return self.cache.ls('minions')
             else:
@@ -439,16 +1119,18 @@ class CkMinions(object):
         if not isinstance(expr, six.string_types) and not isinstance(expr, (list, tuple)):
             log.error('Compound target that is neither string, list nor tuple')
             return []
-        minions = set(self._pki_minions())
+        minions = self._pki_minions()
         log.debug('minions: {0}'.format(minions))
 
         if self.opts.get('minion_data_cache', False):
+            compiled = compile_compound(expr)
+            if compiled is None:
+                return []
             ref = {'G': self._check_grain_minions,
                    'P': self._check_grain_pcre_minions,
                    'I': self._check_pillar_minions,
                    'J': self._check_pillar_pcre_minions,
                    'L': self._check_list_minions,
-                   'N': None,    # nodegroups should already be expanded
                    'S': self._check_ipcidr_minions,
                    'E': self._check_pcre_minions,
                    'R': self._all_minions}
@@ -456,118 +1138,65 @@ class CkMinions(object):
                 ref['I'] = self._check_pillar_exact_minions
                 ref['J'] = self._check_pillar_exact_minions
 
-            results = []
-            unmatched = []
-            opers = ['and', 'or', 'not', '(', ')']
-
-            if isinstance(expr, six.string_types):
-                words = expr.split()
-            else:
-                words = expr
-
-            for word in words:
-                target_info = parse_target(word)
-
-                # Easy check first
-                if word in opers:
-                    if results:
-                        if results[-1] == '(' and word in ('and', 'or'):
-                            log.error('Invalid beginning operator after "(": {0}'.format(word))
-                            return []
-                        if word == 'not':
-                            if not results[-1] in ('&', '|', '('):
-                                results.append('&')
-                            results.append('(')
-                            results.append(str(set(minions)))
-                            results.append('-')
-                            unmatched.append('-')
-                        elif word == 'and':
-                            results.append('&')
-                        elif word == 'or':
-                            results.append('|')
-                        elif word == '(':
-                            results.append(word)
-                            unmatched.append(word)
-                        elif word == ')':
-                            if not unmatched or unmatched[-1] != '(':
-                                log.error('Invalid compound expr (unexpected '
-                                          'right parenthesis): {0}'
-                                          .format(expr))
-                                return []
-                            results.append(word)
-                            unmatched.pop()
-                            if unmatched and unmatched[-1] == '-':
-                                results.append(')')
-                                unmatched.pop()
-                        else:  # Won't get here, unless oper is added
-                            log.error('Unhandled oper in compound expr: {0}'
-                                      .format(expr))
-                            return []
-                    else:
-                        # seq start with oper, fail
-                        if word == 'not':
-                            results.append('(')
-                            results.append(str(set(minions)))
-                            results.append('-')
-                            unmatched.append('-')
-                        elif word == '(':
-                            results.append(word)
-                            unmatched.append(word)
-                        else:
-                            log.error(
-                                'Expression may begin with'
-                                ' binary operator: {0}'.format(word)
-                            )
-                            return []
-
-                elif target_info and target_info['engine']:
-                    if 'N' == target_info['engine']:
-                        # Nodegroups should already be expanded/resolved to other engines
-                        log.error('Detected nodegroup expansion failure of "{0}"'.format(word))
-                        return []
-                    engine = ref.get(target_info['engine'])
-                    if not engine:
-                        # If an unknown engine is called at any time, fail out
-                        log.error(
-                            'Unrecognized target engine "{0}" for'
-                            ' target expression "{1}"'.format(
-                                target_info['engine'],
-                                word,
-                            )
-                        )
-                        return []
-
-                    engine_args = [target_info['pattern']]
-                    if target_info['engine'] in ('G', 'P', 'I', 'J'):
-                        engine_args.append(target_info['delimiter'] or ':')
-                    engine_args.append(greedy)
-
-                    results.append(str(set(engine(*engine_args))))
-                    if unmatched and unmatched[-1] == '-':
-                        results.append(')')
-                        unmatched.pop()
-
-                else:
-                    # The match is not explicitly defined, evaluate as a glob
-                    results.append(str(set(self._check_glob_minions(word, True))))
-                    if unmatched and unmatched[-1] == '-':
-                        results.append(')')
-                        unmatched.pop()
-
-            # Add a closing ')' for each item left in unmatched
-            results.extend([')' for item in unmatched])
-
-            results = ' '.join(results)
-            log.debug('Evaluating final compound matching expr: {0}'
-                      .format(results))
+            # Every sub-matcher works from the same accepted minions, and
+            # terms repeated across the expression are only matched once
+            self._pinned_minions = minions
             try:
-                return list(eval(results))  # pylint: disable=W0123
-            except Exception:
-                log.error('Invalid compound target: {0}'.format(expr))
-                return []
+                return list(self._eval_compound(compiled,
+                                                frozenset(minions),
+                                                ref,
+                                                greedy,
+                                                {}))
+            finally:
+                self._pinned_minions = None
 
         return list(minions)
 
+    def _eval_compound(self, node, minions, ref, greedy, terms):
+        '''
+        Evaluate a compiled compound target against the set of accepted
+        minions, ``terms`` holds the results of the terms matched so far
+        '''
+        kind = node[0]
+        if kind == 'term':
+            if node not in terms:
+                terms[node] = frozenset(
+                    self._eval_compound_term(node, ref, greedy)
+                )
+            return terms[node]
+        if kind == 'not':
+            return minions.difference(
+                self._eval_compound(node[1], minions, ref, greedy, terms)
+            )
+        children = iter(node[1])
+        ret = self._eval_compound(next(children), minions, ref, greedy, terms)
+        for child in children:
+            if kind == 'and':
+                if not ret:
+                    break
+                ret = ret.intersection(
+                    self._eval_compound(child, minions, ref, greedy, terms)
+                )
+            else:
+                ret = ret.union(
+                    self._eval_compound(child, minions, ref, greedy, terms)
+                )
+        return ret
+
+    def _eval_compound_term(self, node, ref, greedy):
+        '''
+        Return the minions matching a single term of a compound target
+        '''
+        engine, pattern, tgt_delimiter, word = node[1:]
+        if not engine:
+            # The match is not explicitly defined, evaluate as a glob
+            return self._check_glob_minions(word, True)
+        engine_args = [pattern]
+        if engine in ('G', 'P', 'I', 'J'):
+            engine_args.append(tgt_delimiter or ':')
+        engine_args.append(greedy)
+        return ref[engine](*engine_args)
+
     def connected_ids(self, subset=None, show_ipv4=False, include_localhost=False):
         '''
         Return a set of all connected minion ids, optionally within a subset
@@ -614,11 +1243,7 @@ class CkMinions(object):
         '''
         Return a list of all minions that have auth'd
         '''
-        mlist = []
-        for fn_ in salt.utils.isorted(os.listdir(os.path.join(self.opts['pki_dir'], self.acc))):
-            if not fn_.startswith('.') and os.path.isfile(os.path.join(self.opts['pki_dir'], self.acc, fn_)):
-                mlist.append(fn_)
-        return mlist
+        return self._pki_minions()
 
     def check_minions(self,
                       expr,
@@ -1094,11 +1719,11 @@ def mine_get(tgt, fun, tgt_type='glob', opts=None):
             tgt,
             tgt_type)
     cache = salt.cache.factory(opts)
-    for minion in minions:
-        mdata = cache.fetch('minions/{0}'.format(minion), 'mine')
+    cdata = cache.fetch_many(('minions/{0}'.format(minion), 'mine') for minion in minions)
+    for (bank, _), mdata in six.iteritems(cdata):
         if mdata is None:
             continue
         fdata = mdata.get(fun)
         if fdata:
-            ret[minion] = fdata
+            ret[bank[len('minions/'):]] = fdata
     return ret
@@ -5,6 +5,7 @@ from __future__ import absolute_import
 import fnmatch
 import glob
 import logging
+import re
 
 # Import salt libs
 import salt.runner
@@ -145,6 +146,25 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
             react_map = self.minion.opts['reactor']
         return react_map
 
+    def tag_prefixes(self):
+        '''
+        Return the tag prefixes of the events the reactor acts on, or None
+        when it needs to see all the events
+        '''
+        if isinstance(self.opts['reactor'], six.string_types):
+            # The reactor map is read again for each event
+            return None
+        # The reactors management events are fired by the reactor runner
+        prefixes = ['salt/reactors/manage/', 'salt/run/']
+        for ropt in self.opts['reactor']:
+            if not isinstance(ropt, dict) or len(ropt) != 1:
+                continue
+            prefix = re.split(r'[*?[]', str(next(six.iterkeys(ropt))), 1)[0]
+            if not prefix:
+                return None
+            prefixes.append(prefix)
+        return prefixes
+
     def add_reactor(self, tag, reaction):
         '''
         Add a reactor
@@ -214,6 +234,8 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                 opts=self.opts,
                 listen=True)
         self.wrap = ReactWrap(self.opts)
+        if hasattr(self.event, 'set_tag_filter'):
+            self.event.set_tag_filter(self.tag_prefixes())
 
         for data in self.event.iter_events(full=True):
             # skip all events fired by ourselves
@@ -222,6 +244,8 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
             if data['tag'].endswith('salt/reactors/manage/add'):
                 _data = data['data']
                 res = self.add_reactor(_data['event'], _data['reactors'])
+                if hasattr(self.event, 'set_tag_filter'):
+                    self.event.set_tag_filter(self.tag_prefixes())
                 self.event.fire_event({'reactors': self.list_all(),
                                        'result': res},
                                       'salt/reactors/manage/add-complete')
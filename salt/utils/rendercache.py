@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+'''
+Cache the data rendered from state templates
+
+The rendering of a template is recorded: the grains, pillar and options keys
+it reads, the templates it includes and the execution module functions it
+calls. The rendered data is then served from the cache for as long as the
+template, its renderer pipeline and everything the rendering read are
+unchanged.
+
+.. versionadded:: Oxygen
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import os
+import hashlib
+import logging
+
+# Import salt libs
+import salt.loader
+import salt.utils
+import salt.utils.atomicfile
+import salt.utils.url
+from salt.defaults import DEFAULT_TARGET_DELIM
+from salt.template import compile_template, template_shebang
+from salt.utils.odict import OrderedDict
+
+# Import third party libs
+import msgpack
+import salt.ext.six as six
+
+log = logging.getLogger(__name__)
+
+# The renderers whose output only depends on the template and on what the
+# rendering reads from the grains, the pillar, the options and the fileserver
+CACHEABLE_RENDERERS = frozenset(('jinja', 'yaml', 'yamlex', 'json'))
+
+# The execution module functions a cached rendering may call, which only read
+# the in-memory options, grains or pillar, and the names of the data they read
+READERS = {
+    'config.get': ('opts', 'grains', 'pillar'),
+    'grains.get': ('grains',),
+    'grains.item': ('grains',),
+    'grains.items': ('grains',),
+    'grains.filter_by': ('grains',),
+    'pillar.get': ('pillar',),
+    'pillar.raw': ('pillar',),
+}
+
+# The readers which read a single key, passed as their first argument
+KEYED_READERS = frozenset(('config.get', 'grains.get', 'pillar.get'))
+
+
+def digest(value):
+    '''
+    Return a digest of a value read by a rendering, objects msgpack cannot
+    serialize are digested by their representation
+    '''
+    return hashlib.sha256(
+        msgpack.dumps(value, use_bin_type=True, default=repr)).hexdigest()
+
+
+def dumps(data):
+    '''
+    Serialize a cache entry
+    '''
+    return msgpack.dumps(data, use_bin_type=True)
+
+
+def loads(data):
+    '''
+    Deserialize a cache entry, keeping the order of the rendered mappings
+    '''
+    if msgpack.version >= (0, 5, 2):
+        return msgpack.loads(data, use_list=True, raw=False,
+                             object_pairs_hook=OrderedDict)
+    return msgpack.loads(data, use_list=True, encoding='utf-8',
+                         object_pairs_hook=OrderedDict)
+
+
+class RenderRecorder(object):
+    '''
+    Collect what a rendering reads
+    '''
+    def __init__(self):
+        # The keys read from the grains, the pillar and the options
+        self.keys = {'grains': set(), 'pillar': set(), 'opts': set()}
+        # The names of the data read as a whole
+        self.whole = set()
+        # The (saltenv, template) pairs of the templates included
+        self.templates = set()
+        # The execution module functions which keep the rendering from being
+        # cached
+        self.volatile = set()
+
+
+class RecordingDict(dict):
+    '''
+    A copy of the grains, the pillar or the options which records the keys
+    read from it. The attributes are private, Jinja looks keys up as
+    attributes first.
+    '''
+    def __init__(self, data, recorder, name):
+        dict.__init__(self, data)
+        self._data = data
+        self._recorder = recorder
+        self._name = name
+
+    def _read(self, key=None):
+        if key is None:
+            self._recorder.whole.add(self._name)
+        else:
+            self._recorder.keys[self._name].add(key)
+
+    def __getitem__(self, key):
+        self._read(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        self._read(key)
+        return dict.get(self, key, default)
+
+    def __contains__(self, key):
+        self._read(key)
+        return dict.__contains__(self, key)
+
+    def __iter__(self):
+        self._read()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._read()
+        return dict.__len__(self)
+
+    def __eq__(self, other):
+        self._read()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        self._read()
+        return dict.__ne__(self, other)
+
+    def __repr__(self):
+        self._read()
+        return dict.__repr__(self)
+
+    __str__ = __repr__
+    __hash__ = None
+
+    def keys(self):
+        self._read()
+        return dict.keys(self)
+
+    def values(self):
+        self._read()
+        return dict.values(self)
+
+    def items(self):
+        self._read()
+        return dict.items(self)
+
+    def copy(self):
+        self._read()
+        return dict(dict.items(self))
+
+    if six.PY2:
+        def has_key(self, key):
+            return self.__contains__(key)
+
+        def iterkeys(self):
+            self._read()
+            return dict.iterkeys(self)
+
+        def itervalues(self):
+            self._read()
+            return dict.itervalues(self)
+
+        def iteritems(self):
+            self._read()
+            return dict.iteritems(self)
+
+
+class RecordingFunctions(object):
+    '''
+    A view of the execution modules which records the functions a rendering
+    calls, both as ``salt['mod.fun']`` and as ``salt.mod.fun``
+    '''
+    def __init__(self, functions, recorder):
+        self.functions = functions
+        self.recorder = recorder
+
+    def __getitem__(self, name):
+        func = self.functions[name]
+        if name not in READERS:
+            self.recorder.volatile.add(name)
+            return func
+        recorder = self.recorder
+
+        def reader(*args, **kwargs):
+            if name == 'pillar.get':
+                if len(args) > 5 or kwargs.get('pillarenv'):
+                    # Fresh pillar data from the master
+                    recorder.volatile.add(name)
+                recorder.keys['opts'].update(('pillar_raise_on_missing',
+                                              'pillar_merge_lists'))
+            elif name == 'config.get':
+                if len(args) > 3 or kwargs.get('merge'):
+                    # Merged with the master configuration file
+                    recorder.volatile.add(name)
+                recorder.keys['pillar'].add('master')
+            key = args[0] if args else kwargs.get('key')
+            for data in READERS[name]:
+                if name in KEYED_READERS and len(args) < 3 \
+                        and isinstance(key, six.string_types):
+                    delimiter = kwargs.get('delimiter', DEFAULT_TARGET_DELIM)
+                    recorder.keys[data].add(key.split(delimiter)[0])
+                else:
+                    recorder.whole.add(data)
+            return func(*args, **kwargs)
+        return reader
+
+    def __contains__(self, name):
+        return name in self.functions
+
+    def __iter__(self):
+        return iter(self.functions)
+
+    def __len__(self):
+        return len(self.functions)
+
+    def __getattr__(self, mod_name):
+        if mod_name.startswith('__'):
+            raise AttributeError(mod_name)
+        return RecordingModule(self, mod_name)
+
+
+class RecordingModule(object):
+    '''
+    The functions of one execution module in a ``RecordingFunctions`` view
+    '''
+    def __init__(self, functions, mod_name):
+        self.functions = functions
+        self.mod_name = mod_name
+
+    def __getattr__(self, fun):
+        try:
+            return self.functions['{0}.{1}'.format(self.mod_name, fun)]
+        except KeyError:
+            raise AttributeError(fun)
+
+
+class RecordingRenderers(object):
+    '''
+    The renderers, injected with the recording grains, pillar, options and
+    execution modules
+    '''
+    def __init__(self, renderers, inject):
+        self.renderers = renderers
+        self.inject = inject
+
+    def __getitem__(self, name):
+        return salt.loader.global_injector_decorator(self.inject)(
+            self.renderers[name])
+
+    def __contains__(self, name):
+        return name in self.renderers
+
+    def __iter__(self):
+        return iter(self.renderers)
+
+    def __len__(self):
+        return len(self.renderers)
+
+
+class RenderCache(object):
+    '''
+    Render templates with ``compile_template``, and serve the rendered data
+    from the cache when nothing the last rendering read changed
+
+    opts
+        The options of the state compiler, holding the grains and the pillar
+    client
+        The file client the templates were cached with
+    renderers
+        The render modules
+    functions
+        The execution modules
+    '''
+    def __init__(self, opts, client, renderers, functions):
+        self.opts = opts
+        self.client = client
+        self.renderers = renderers
+        self.functions = functions
+        self.cachedir = os.path.join(opts['cachedir'], 'state_render')
+
+    def _sources(self):
+        return {'grains': self.opts.get('grains', {}),
+                'pillar': self.opts.get('pillar', {}),
+                'opts': self.opts}
+
+    def _hash(self, template, saltenv):
+        return self.client.hash_file(template, saltenv).get('hsum')
+
+    def _pipe(self, template):
+        '''
+        Return the names and arguments of the renderers in the pipeline of a
+        template, or None if the pipeline cannot be cached
+        '''
+        pipe = template_shebang(template,
+                                self.renderers,
+                                self.opts['renderer'],
+                                self.opts['renderer_blacklist'],
+                                self.opts['renderer_whitelist'],
+                                '')
+        names = [render.__module__.split('.')[-1] for render, _ in pipe]
+        if not names or not CACHEABLE_RENDERERS.issuperset(names):
+            return None
+        return ['{0} {1}'.format(name, argline).strip()
+                for name, (_, argline) in zip(names, pipe)]
+
+    def _valid(self, entry, hsum, pipe):
+        '''
+        Return whether a cache entry was rendered from the same template, with
+        the same pipeline, and whether what it read is unchanged
+        '''
+        if entry.get('hsum') != hsum or entry.get('pipe') != pipe:
+            return False
+        sources = self._sources()
+        for name, value in entry['whole']:
+            if digest(sources[name]) != value:
+                return False
+        for name, key, value in entry['keys']:
+            if key not in sources[name]:
+                if value is not None:
+                    return False
+            elif digest(sources[name][key]) != value:
+                return False
+        for saltenv, template, value in entry['templates']:
+            if self._hash(salt.utils.url.create(template), saltenv) != value:
+                return False
+        return True
+
+    def _record(self, recorder):
+        '''
+        Return the digests of what a recorded rendering read
+        '''
+        sources = self._sources()
+        whole = [[name, digest(sources[name])]
+                 for name in sorted(recorder.whole)]
+        keys = []
+        for name in sorted(recorder.keys):
+            if name in recorder.whole:
+                continue
+            for key in recorder.keys[name]:
+                if key in sources[name]:
+                    keys.append([name, key, digest(sources[name][key])])
+                else:
+                    keys.append([name, key, None])
+        templates = [
+            [saltenv, template,
+             self._hash(salt.utils.url.create(template), saltenv)]
+            for saltenv, template in sorted(recorder.templates)]
+        return whole, keys, templates
+
+    def compile_template(self, template, saltenv='base', sls='', **kwargs):
+        '''
+        Return the data rendered from a template, the arguments are those of
+        ``salt.template.compile_template``
+        '''
+        args = (self.renderers,
+                self.opts['renderer'],
+                self.opts['renderer_blacklist'],
+                self.opts['renderer_whitelist'],
+                saltenv,
+                sls)
+        if not isinstance(template, six.string_types) \
+                or not os.path.isfile(template):
+            return compile_template(template, *args, **kwargs)
+        pipe = self._pipe(template)
+        if pipe is None:
+            return compile_template(template, *args, **kwargs)
+        hsum = self._hash(template, saltenv)
+        path = os.path.join(
+            self.cachedir,
+            hashlib.sha256(
+                salt.utils.to_bytes('{0}|{1}|{2}'.format(saltenv, sls, template))
+            ).hexdigest())
+        try:
+            with salt.utils.fopen(path, 'rb') as fp_:
+                entry = loads(fp_.read())
+            if self._valid(entry, hsum, pipe):
+                log.debug('Using the cached rendering of {0}'.format(template))
+                return entry['data']
+        except (IOError, OSError):
+            pass
+        except Exception as exc:
+            log.debug('Discarding the cached rendering of {0}: {1}'.format(
+                template, exc))
+
+        recorder = RenderRecorder()
+        renderers = RecordingRenderers(
+            self.renderers,
+            {'__grains__': RecordingDict(self.opts.get('grains', {}), recorder, 'grains'),
+             '__pillar__': RecordingDict(self.opts.get('pillar', {}), recorder, 'pillar'),
+             '__opts__': RecordingDict(self.opts, recorder, 'opts'),
+             '__salt__': RecordingFunctions(self.functions, recorder)})
+        data = compile_template(template, renderers, *args[1:], **kwargs)
+        if recorder.volatile:
+            log.debug('Not caching the rendering of {0}, it calls {1}'.format(
+                template, ', '.join(sorted(recorder.volatile))))
+            return data
+        if not isinstance(data, dict):
+            return data
+        whole, keys, templates = self._record(recorder)
+        try:
+            entry = dumps({'hsum': hsum,
+                           'pipe': pipe,
+                           'whole': whole,
+                           'keys': keys,
+                           'templates': templates,
+                           'data': data})
+        except Exception as exc:
+            log.debug('Not caching the rendering of {0}: {1}'.format(
+                template, exc))
+            return data
+        try:
+            if not os.path.isdir(self.cachedir):
+                os.makedirs(self.cachedir, 0o700)
+            with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+                fp_.write(entry)
+        except (IOError, OSError) as exc:
+            log.error('Unable to write the render cache file {0}: {1}'.format(
+                path, exc))
+        return data
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the caching of a directory of many small files from a salt-master
+started for the run, one file at a time as with masters older than the file
+manifest, and with the manifest. Each is timed with an empty minion file cache
+and again with all the files already cached. The requests sent are counted.
+
+    python tests/perf/cache_dir.py --dirs 100 --files 100
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import collections
+import getpass
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.fileclient
+import salt.minion
+import salt.utils
+import salt.utils.verify
+
+SALT_MASTER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'scripts', 'salt-master')
+
+
+class PerFileClient(salt.fileclient.RemoteClient):
+    '''
+    A file client of a master which does not give file manifests
+    '''
+    def file_manifest(self, saltenv='base', prefix=''):
+        return {}
+
+
+class Counter(object):
+    '''
+    Count the requests sent on a channel, by command
+    '''
+    def __init__(self, send):
+        self.send = send
+        self.calls = collections.Counter()
+
+    def __call__(self, load, *args, **kwargs):
+        self.calls[load['cmd']] += 1
+        return self.send(load, *args, **kwargs)
+
+
+def master(root_dir, args):
+    '''
+    Write a master configuration serving ``args.dirs`` directories of
+    ``args.files`` files, start the master and return its process
+    '''
+    conf_dir = os.path.join(root_dir, 'master-conf')
+    file_root = os.path.join(root_dir, 'states')
+    os.makedirs(conf_dir)
+    for num in range(args.dirs):
+        path = os.path.join(file_root, 'tree', 'dir{0}'.format(num))
+        os.makedirs(path)
+        for fnum in range(args.files):
+            with salt.utils.fopen(os.path.join(path, 'file{0}'.format(fnum)), 'w') as fp_:
+                fp_.write('{0}\n'.format(fnum))
+    with salt.utils.fopen(os.path.join(conf_dir, 'master'), 'w') as fp_:
+        fp_.write('root_dir: {0}\n'
+                  'user: {1}\n'
+                  'interface: 127.0.0.1\n'
+                  'publish_port: {2}\n'
+                  'ret_port: {3}\n'
+                  'auto_accept: True\n'
+                  'worker_threads: 3\n'
+                  'file_roots:\n'
+                  '  base:\n'
+                  '    - {4}\n'.format(
+                      os.path.join(root_dir, 'master-root'), getpass.getuser(),
+                      args.port, args.port + 1, file_root))
+    proc = subprocess.Popen(
+        [sys.executable, SALT_MASTER, '-c', conf_dir, '-l', 'quiet'])
+    time.sleep(args.startup)
+    return proc
+
+
+def client(root_dir, args, cls):
+    '''
+    Return a file client of a minion of the master, with its own cache
+    '''
+    conf_dir = os.path.join(root_dir, 'minion-conf-{0}'.format(cls.__name__))
+    os.makedirs(conf_dir)
+    with salt.utils.fopen(os.path.join(conf_dir, 'minion'), 'w') as fp_:
+        fp_.write('id: bench-{0}\n'
+                  'root_dir: {1}\n'
+                  'master: 127.0.0.1\n'
+                  'master_port: {2}\n'.format(
+                      cls.__name__,
+                      os.path.join(root_dir, 'minion-root-{0}'.format(cls.__name__)),
+                      args.port + 1))
+    opts = salt.config.minion_config(os.path.join(conf_dir, 'minion'))
+    opts.update(salt.minion.resolve_dns(opts))
+    salt.utils.verify.verify_env([opts['pki_dir'], opts['cachedir']],
+                                 getpass.getuser())
+    fileclient = cls(opts)
+    # The sync channel sends its requests on the async one too
+    async_channel = getattr(fileclient.channel, 'async')
+    async_channel.send = Counter(async_channel.send)
+    return fileclient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dirs', type=int, default=100,
+                        help='Number of directories in the cached directory')
+    parser.add_argument('--files', type=int, default=100,
+                        help='Number of files in each directory')
+    parser.add_argument('--port', type=int, default=14505,
+                        help='Publish port of the master, the next one is its ret port')
+    parser.add_argument('--startup', type=float, default=10,
+                        help='Seconds given to the master to start')
+    args = parser.parse_args()
+
+    root_dir = tempfile.mkdtemp()
+    proc = master(root_dir, args)
+    try:
+        for label, cls in (('per file', PerFileClient),
+                           ('manifest', salt.fileclient.RemoteClient)):
+            fileclient = client(root_dir, args, cls)
+            for cache in ('cold', 'warm'):
+                calls = getattr(fileclient.channel, 'async').send.calls
+                calls.clear()
+                start = time.time()
+                ret = fileclient.cache_dir('salt://tree')
+                elapsed = time.time() - start
+                assert len(ret) == args.dirs * args.files, len(ret)
+                print('{0:<9} {1} {2:>8.2f}s {3:>6} requests'.format(
+                    label, cache, elapsed, sum(calls.values())))
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(root_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+'''
+Load test of the connection pools of the redis and mysql minion data cache
+drivers: threads storing and fetching minion data concurrently through
+``salt.cache``, the way the threads of a master process do.
+
+Run it against a local server, for instance:
+
+    docker run -d -p 6379:6379 redis
+    python tests/perf/cache_pool.py --driver redis --pool-sizes 1,10
+
+    docker run -d -p 3306:3306 -e MYSQL_ALLOW_EMPTY_PASSWORD=yes \\
+        -e MYSQL_DATABASE=salt_cache mysql:5.7
+    python tests/perf/cache_pool.py --driver mysql --user root --pool-sizes 1,10
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import threading
+import time
+
+# Import salt libs
+import salt.cache
+import salt.config
+
+
+def worker(cache, ops, num, latencies):
+    '''
+    Store and fetch the data of ``ops`` minions
+    '''
+    data = {'grains': {'os': 'Linux', 'num': num, 'pad': 'x' * 2048}}
+    for op in range(ops):
+        bank = 'minions/perf-{0}-{1}'.format(num, op)
+        start = time.time()
+        cache.store(bank, 'data', data)
+        cache.fetch(bank, 'data')
+        latencies.append(time.time() - start)
+
+
+def bench(opts, threads, ops):
+    '''
+    Return the store + fetch pairs done per second and their median and 99th
+    percentile latency
+    '''
+    # A new Cache loads its own copy of the driver, with its own pool
+    cache = salt.cache.Cache(opts)
+    cache.fetch('minions/perf', 'data')
+    latencies = []
+    workers = [threading.Thread(target=worker, args=(cache, ops, num, latencies))
+               for num in range(threads)]
+    start = time.time()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.time() - start
+    cache.flush('minions')
+    latencies.sort()
+    return (len(latencies) / elapsed,
+            latencies[len(latencies) // 2],
+            latencies[int(len(latencies) * 0.99)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--driver', choices=('redis', 'mysql'), default='redis')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--user', default=None, help='MySQL user')
+    parser.add_argument('--password', default=None)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=500,
+                        help='Store and fetch pairs done by each thread')
+    parser.add_argument('--pool-sizes', default='1,4,16',
+                        help='Comma separated pool sizes to compare')
+    args = parser.parse_args()
+
+    opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+    opts['cache'] = args.driver
+    if args.driver == 'redis':
+        opts['cache.redis.host'] = args.host
+        opts['cache.redis.port'] = args.port or 6379
+        opts['cache.redis.password'] = args.password or ''
+    else:
+        opts['mysql.host'] = args.host
+        opts['mysql.port'] = args.port or 3306
+        opts['mysql.user'] = args.user
+        opts['mysql.password'] = args.password
+
+    for size in [int(size) for size in args.pool_sizes.split(',')]:
+        if args.driver == 'redis':
+            opts['cache.redis.max_connections'] = size
+        else:
+            opts['mysql.pool_size'] = size
+        rate, median, p99 = bench(opts, args.threads, args.ops)
+        print('pool size {0:>4} {1:>10.0f} store+fetch/s  median {2:.2f}ms  '
+              'p99 {3:.2f}ms'.format(size, rate, median * 1000, p99 * 1000))
+
+
+if __name__ == '__main__':
+    main()
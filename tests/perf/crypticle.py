@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the encryption of the messages between the master and the minions
+with the session ciphers of ``salt.crypt.Crypticle``: AES-CBC with
+HMAC-SHA256 and AES-GCM, enabled by the ``session_cipher`` master option.
+
+    python tests/perf/crypticle.py --sizes 1024,65536,1048576,10485760
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import os
+import time
+
+# Import salt libs
+import salt.crypt
+
+
+def bench(cipher, size, seconds):
+    '''
+    Return the megabytes per second serialized and encrypted, and decrypted
+    and deserialized, for messages of ``size`` bytes
+    '''
+    crypticle = salt.crypt.Crypticle({}, salt.crypt.Crypticle.generate_key_string(),
+                                     cipher=cipher)
+    load = {'fun': 'cp.push', 'data': os.urandom(size)}
+    rounds = 0
+    start = time.time()
+    while time.time() - start < seconds:
+        data = crypticle.dumps(load)
+        rounds += 1
+    dumped = time.time() - start
+    rounds_loaded = 0
+    start = time.time()
+    while rounds_loaded < rounds:
+        crypticle.loads(data)
+        rounds_loaded += 1
+    loaded = time.time() - start
+    megabytes = size * rounds / 1048576.0
+    return megabytes / dumped, megabytes / loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1024,65536,1048576,10485760',
+                        help='Comma separated message sizes in bytes')
+    parser.add_argument('--seconds', type=float, default=2.0,
+                        help='Seconds to encrypt messages of each size for')
+    args = parser.parse_args()
+
+    ciphers = ['aes-cbc']
+    if salt.crypt.HAS_GCM:
+        ciphers.append('aes-gcm')
+    for size in [int(size) for size in args.sizes.split(',')]:
+        for cipher in ciphers:
+            dumped, loaded = bench(cipher, size, args.seconds)
+            print('{0:>9} bytes {1:<8} {2:>8.1f} MB/s dumps {3:>8.1f} MB/s loads'.format(
+                size, cipher, dumped, loaded))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the transfer of a large file from a salt-master started for the run
+to a minion file client, for a few ``file_transfer_window`` settings.
+
+    python tests/perf/file_transfer.py --size 100 --windows 1 4 8 --transport zeromq
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import getpass
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.fileclient
+import salt.minion
+import salt.utils
+import salt.utils.verify
+
+SALT_MASTER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'scripts', 'salt-master')
+
+
+def master(root_dir, args):
+    '''
+    Write a master configuration serving a file of ``args.size`` megabytes,
+    start the master and return its process
+    '''
+    conf_dir = os.path.join(root_dir, 'master-conf')
+    file_root = os.path.join(root_dir, 'states')
+    os.makedirs(conf_dir)
+    os.makedirs(file_root)
+    with salt.utils.fopen(os.path.join(file_root, 'artifact.bin'), 'wb') as fp_:
+        for _ in range(args.size):
+            fp_.write(os.urandom(1024 * 1024))
+    with salt.utils.fopen(os.path.join(conf_dir, 'master'), 'w') as fp_:
+        fp_.write('root_dir: {0}\n'
+                  'user: {1}\n'
+                  'interface: 127.0.0.1\n'
+                  'publish_port: {2}\n'
+                  'ret_port: {3}\n'
+                  'transport: {4}\n'
+                  'auto_accept: True\n'
+                  'worker_threads: 3\n'
+                  'file_roots:\n'
+                  '  base:\n'
+                  '    - {5}\n'.format(
+                      os.path.join(root_dir, 'master-root'), getpass.getuser(),
+                      args.port, args.port + 1, args.transport, file_root))
+    proc = subprocess.Popen(
+        [sys.executable, SALT_MASTER, '-c', conf_dir, '-l', 'quiet'])
+    time.sleep(args.startup)
+    return proc
+
+
+def client(root_dir, args, window):
+    '''
+    Return a file client of a minion of the master
+    '''
+    conf_dir = os.path.join(root_dir, 'minion-conf')
+    if not os.path.isdir(conf_dir):
+        os.makedirs(conf_dir)
+    with salt.utils.fopen(os.path.join(conf_dir, 'minion'), 'w') as fp_:
+        fp_.write('id: bench\n'
+                  'root_dir: {0}\n'
+                  'master: 127.0.0.1\n'
+                  'master_port: {1}\n'
+                  'transport: {2}\n'
+                  'file_transfer_window: {3}\n'.format(
+                      os.path.join(root_dir, 'minion-root'), args.port + 1,
+                      args.transport, window))
+    opts = salt.config.minion_config(os.path.join(conf_dir, 'minion'))
+    opts.update(salt.minion.resolve_dns(opts))
+    salt.utils.verify.verify_env([opts['pki_dir'], opts['cachedir']],
+                                 getpass.getuser())
+    return salt.fileclient.RemoteClient(opts)
+
+
+def bench(fileclient, dest, runs):
+    '''
+    Return the seconds spent by each of ``runs`` transfers of the file
+    '''
+    times = []
+    for _ in range(runs):
+        if os.path.exists(dest):
+            os.remove(dest)
+        start = time.time()
+        assert fileclient.get_file('salt://artifact.bin', dest) == dest
+        times.append(time.time() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=100,
+                        help='Size of the file in megabytes')
+    parser.add_argument('--windows', type=int, nargs='+', default=[1, 4, 8],
+                        help='Values of the file_transfer_window minion option')
+    parser.add_argument('--runs', type=int, default=3,
+                        help='Number of transfers for each window')
+    parser.add_argument('--transport', default='zeromq',
+                        choices=('zeromq', 'tcp'),
+                        help='Transport of the master')
+    parser.add_argument('--port', type=int, default=14505,
+                        help='Publish port of the master, the next one is its ret port')
+    parser.add_argument('--startup', type=float, default=10,
+                        help='Seconds given to the master to start')
+    args = parser.parse_args()
+
+    root_dir = tempfile.mkdtemp()
+    proc = master(root_dir, args)
+    try:
+        dest = os.path.join(root_dir, 'artifact.bin')
+        for window in args.windows:
+            times = bench(client(root_dir, args, window), dest, args.runs)
+            best = min(times)
+            print('file_transfer_window: {0:<3} {1:>7.2f}s {2:>7.1f}MB/s'.format(
+                window, best, args.size / best))
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(root_dir)
+
+
+if __name__ == '__main__':
+    main()
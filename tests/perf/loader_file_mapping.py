@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the construction of the loaders a minion job builds, with the
+module directory listings cache: cold, loaded from the persisted cache as a
+new process does, and shared by the loaders of one process. The directory
+listings and stats made are counted.
+
+    python tests/perf/loader_file_mapping.py --rounds 20
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.loader
+
+
+class Counter(object):
+    '''
+    Count the calls of a function
+    '''
+    def __init__(self, func):
+        self.func = func
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.func(*args, **kwargs)
+
+
+def build(opts):
+    '''
+    Build the loaders of a job
+    '''
+    utils = salt.loader.utils(opts)
+    functions = salt.loader.minion_mods(opts, utils=utils)
+    salt.loader.returners(opts, functions)
+    salt.loader.states(opts, functions, utils, {})
+    salt.loader.render(opts, functions)
+    salt.loader.serializers(opts)
+
+
+def bench(opts, rounds, reset):
+    '''
+    Return the seconds, listings and stats per job
+    '''
+    listdir, stat = Counter(os.listdir), Counter(os.stat)
+    elapsed = 0
+    os.listdir, os.stat = listdir, stat
+    try:
+        for _ in range(rounds):
+            if reset:
+                salt.loader.MODULE_DIR_CACHE = salt.loader.ModuleDirCache()
+            start = time.time()
+            build(opts)
+            elapsed += time.time() - start
+    finally:
+        os.listdir, os.stat = listdir.func, stat.func
+    return elapsed / rounds, listdir.calls / rounds, stat.calls / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=20,
+                        help='Number of jobs to build the loaders of')
+    args = parser.parse_args()
+
+    cachedir = tempfile.mkdtemp()
+    opts = salt.config.DEFAULT_MINION_OPTS.copy()
+    opts.update({'cachedir': cachedir,
+                 'extension_modules': os.path.join(cachedir, 'extmods'),
+                 'grains': {},
+                 'pillar': {}})
+    cache = os.path.join(cachedir, 'module_dirs.cache')
+    try:
+        results = []
+        for _ in range(args.rounds):
+            if os.path.exists(cache):
+                os.remove(cache)
+            results.append(bench(opts, 1, True))
+        results = [sum(column) / len(column) for column in zip(*results)]
+        print('{0:<16} {1:>8.1f}ms {2:>6.0f} listdir {3:>6.0f} stat'.format(
+            'cold', results[0] * 1000, results[1], results[2]))
+        for label, reset in (('new process', True), ('same process', False)):
+            results = bench(opts, args.rounds, reset)
+            print('{0:<16} {1:>8.1f}ms {2:>6.0f} listdir {3:>6.0f} stat'.format(
+                label, results[0] * 1000, results[1], results[2]))
+    finally:
+        shutil.rmtree(cachedir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark storing minion returns in the local job cache, comparing the
+directory per return layout with the segment file layout enabled by the
+``job_cache_segments`` master option.
+
+    python tests/perf/local_cache_returns.py --returns 10000 --cachedir /var/tmp
+
+Use a cachedir on the filesystem the master job cache lives on, results on a
+tmpfs are not representative.
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.returners.local_cache as local_cache
+
+
+def bench(cachedir, segments, returns, size):
+    '''
+    Store ``returns`` returns of ``size`` bytes for a single job, return the
+    number of returns stored and read back per second
+    '''
+    local_cache.__opts__ = {'cachedir': cachedir,
+                            'hash_type': 'sha256',
+                            'job_cache_segments': segments}
+    local_cache._SEGMENT_INDEXES.clear()
+    jid = local_cache.prep_jid()
+    payload = 'x' * size
+    start = time.time()
+    for num in range(returns):
+        local_cache.returner({'jid': jid,
+                              'id': 'minion{0}'.format(num),
+                              'return': payload,
+                              'retcode': 0,
+                              'success': True})
+    stored = time.time() - start
+    start = time.time()
+    assert len(local_cache.get_jid(jid)) == returns
+    read = time.time() - start
+    return returns / stored, returns / read
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--returns', type=int, default=10000,
+                        help='Number of minion returns to store for the job')
+    parser.add_argument('--size', type=int, default=256,
+                        help='Size in bytes of each return')
+    parser.add_argument('--cachedir', default=None,
+                        help='Directory to create the temporary job cache in')
+    args = parser.parse_args()
+
+    for segments in (False, True):
+        cachedir = tempfile.mkdtemp(dir=args.cachedir)
+        try:
+            stored, read = bench(cachedir, segments, args.returns, args.size)
+        finally:
+            shutil.rmtree(cachedir)
+        print('{0:<20} {1:>10.0f} returns/s stored {2:>10.0f} returns/s read'.format(
+            'segments' if segments else 'directory per return',
+            stored,
+            read))
+
+
+if __name__ == '__main__':
+    main()
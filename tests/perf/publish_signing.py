@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the signature of the publications by the master and its
+verification by the minions: RSA with the key read for each publication (how
+minions verified the signatures before), RSA with the cached keys, and the
+Ed25519 signatures enabled by the ``pub_sign_algorithm`` master option.
+
+    python tests/perf/publish_signing.py --publishes 2000 --size 1024
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.crypt
+
+
+def bench(mode, pki_dir, publishes, size):
+    '''
+    Return the publications signed per second and verified per second
+    '''
+    priv = os.path.join(pki_dir, 'master.pem')
+    pub = os.path.join(pki_dir, 'master.pub')
+    seed = salt.crypt.gen_ed25519_seed()
+    public = salt.crypt.ed25519_public_key(seed)
+    load = os.urandom(size)
+
+    if mode == 'ed25519':
+        def sign():
+            return salt.crypt.sign_message_ed25519(seed, load)
+
+        def verify(sig):
+            assert salt.crypt.verify_signature_ed25519(public, load, sig)
+    else:
+        def sign():
+            if mode == 'rsa uncached':
+                salt.crypt._RSA_KEYS.clear()
+            return salt.crypt.sign_message(priv, load)
+
+        def verify(sig):
+            if mode == 'rsa uncached':
+                salt.crypt._RSA_KEYS.clear()
+            assert salt.crypt.verify_signature(pub, load, sig)
+
+    start = time.time()
+    sigs = [sign() for _ in range(publishes)]
+    signed = time.time() - start
+    start = time.time()
+    for sig in sigs:
+        verify(sig)
+    verified = time.time() - start
+    return publishes / signed, publishes / verified
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--publishes', type=int, default=2000,
+                        help='Number of publications to sign and verify')
+    parser.add_argument('--size', type=int, default=1024,
+                        help='Size in bytes of the encrypted publications')
+    parser.add_argument('--keysize', type=int, default=2048,
+                        help='Size of the RSA master key')
+    args = parser.parse_args()
+
+    pki_dir = tempfile.mkdtemp()
+    try:
+        salt.crypt.gen_keys(pki_dir, 'master', args.keysize)
+        for mode in ('rsa uncached', 'rsa', 'ed25519'):
+            signed, verified = bench(mode, pki_dir, args.publishes, args.size)
+            print('{0:<15} {1:>10.0f} signed/s {2:>10.0f} verified/s'.format(
+                mode, signed, verified))
+    finally:
+        shutil.rmtree(pki_dir)
+
+
+if __name__ == '__main__':
+    main()
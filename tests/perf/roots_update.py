@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the roots fileserver update of a large file_roots tree, walking it
+and with the ``fileserver_inotify`` master option, after a few files changed.
+
+    python tests/perf/roots_update.py --dirs 200 --files 100 --changes 10
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.fileserver.roots
+import salt.utils
+import salt.utils.inotify
+
+
+def file_tree(root_dir, dirs, files):
+    '''
+    Write the file_roots tree and return its path
+    '''
+    tree = os.path.join(root_dir, 'states')
+    for num in range(dirs):
+        path = os.path.join(tree, 'dir{0}'.format(num))
+        os.makedirs(path)
+        for fnum in range(files):
+            with salt.utils.fopen(os.path.join(path, 'file{0}'.format(fnum)), 'w') as fp_:
+                fp_.write('{0}\n'.format(fnum))
+    return tree
+
+
+def bench(opts, tree, changes, runs):
+    '''
+    Return the seconds spent by each of ``runs`` updates following changes
+    '''
+    roots = salt.fileserver.roots
+    roots.__opts__ = opts
+    roots._TRACKED.clear()
+    roots.update()
+    times = []
+    for run in range(runs):
+        for num in range(changes):
+            path = os.path.join(tree, 'dir{0}'.format(num), 'file0')
+            with salt.utils.fopen(path, 'w') as fp_:
+                fp_.write('{0}\n'.format(run))
+            os.utime(path, (run, run))
+        start = time.time()
+        roots.update()
+        times.append(time.time() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dirs', type=int, default=200,
+                        help='Number of directories in the file_roots')
+    parser.add_argument('--files', type=int, default=100,
+                        help='Number of files in each directory')
+    parser.add_argument('--changes', type=int, default=10,
+                        help='Number of files changed before each update')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Number of updates')
+    args = parser.parse_args()
+
+    root_dir = tempfile.mkdtemp()
+    try:
+        tree = file_tree(root_dir, args.dirs, args.files)
+        modes = [False]
+        if salt.utils.inotify.HAS_PYINOTIFY:
+            modes.append(True)
+        for inotify in modes:
+            opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+            opts.update({'cachedir': os.path.join(root_dir, 'cache-{0}'.format(inotify)),
+                         'file_roots': {'base': [tree]},
+                         'fileserver_inotify': inotify})
+            times = bench(opts, tree, args.changes, args.runs)
+            print('fileserver_inotify: {0!s:<5} {1:>8.1f}ms/update'.format(
+                inotify, sum(times) / len(times) * 1000))
+    finally:
+        shutil.rmtree(root_dir)
+
+
+if __name__ == '__main__':
+    main()
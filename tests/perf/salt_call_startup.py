@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the startup of ``salt-call --local test.ping`` with and without the
+``virtual_cache`` minion option. Each run is a new process, the first run
+with the cache enabled fills it.
+
+    python tests/perf/salt_call_startup.py --runs 10
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import salt libs
+import salt.utils
+
+SALT_CALL = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'scripts', 'salt-call')
+
+
+def config(root_dir, cache):
+    '''
+    Write a masterless minion configuration and return its directory
+    '''
+    conf_dir = os.path.join(root_dir, 'conf-{0}'.format(cache))
+    os.makedirs(conf_dir)
+    with salt.utils.fopen(os.path.join(conf_dir, 'minion'), 'w') as fp_:
+        fp_.write('id: bench\n'
+                  'root_dir: {0}\n'
+                  'file_client: local\n'
+                  'virtual_cache: {1}\n'.format(
+                      os.path.join(root_dir, 'root-{0}'.format(cache)), cache))
+    return conf_dir
+
+
+def bench(conf_dir, runs):
+    '''
+    Return the seconds spent by each of ``runs`` salt-call processes
+    '''
+    times = []
+    for _ in range(runs):
+        start = time.time()
+        out = subprocess.check_output(
+            [sys.executable, SALT_CALL, '-c', conf_dir, '--local',
+             '--out', 'json', 'test.ping'])
+        times.append(time.time() - start)
+        assert b'true' in out, out
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10,
+                        help='Number of salt-call processes to start')
+    args = parser.parse_args()
+
+    root_dir = tempfile.mkdtemp()
+    try:
+        for cache in (False, True):
+            times = bench(config(root_dir, cache), args.runs)
+            print('virtual_cache: {0!s:<5} first {1:>6.3f}s then {2:>6.3f}s/run'.format(
+                cache, times[0], sum(times[1:]) / max(len(times) - 1, 1)))
+    finally:
+        shutil.rmtree(root_dir)
+
+
+if __name__ == '__main__':
+    main()
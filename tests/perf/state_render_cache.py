@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the ``state_render_cache`` minion option: repeated ``test=True``
+highstates of a tree of Jinja SLS files reading grains and pillar keys and
+importing a map file, rendered every time and served from the render cache.
+
+    python tests/perf/state_render_cache.py --sls 50 --states 20 --runs 5
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.state
+import salt.utils
+
+MAP = '''\
+{% set settings = {'mode': '0644', 'user': 'root'} %}
+'''
+
+SLS = '''\
+{% from 'map.jinja' import settings %}
+{% for num in range(STATES) %}
+sls{{ sls }}_state{{ num }}:
+  test.succeed_without_changes:
+    - name: {{ grains['os'] }}-{{ pillar.get('role', 'none') }}-{{ num }}
+    - mode: {{ settings.mode }}
+    - user: {{ salt['pillar.get']('users:admin', settings.user) }}
+{% endfor %}
+'''
+
+
+def state_tree(root_dir, sls, states):
+    '''
+    Write the state tree and return its path
+    '''
+    tree = os.path.join(root_dir, 'states')
+    os.makedirs(tree)
+    with salt.utils.fopen(os.path.join(tree, 'map.jinja'), 'w') as fp_:
+        fp_.write(MAP)
+    for num in range(sls):
+        with salt.utils.fopen(os.path.join(tree, 'sls{0}.sls'.format(num)), 'w') as fp_:
+            fp_.write('{{% set sls = {0} %}}\n'.format(num))
+            fp_.write(SLS.replace('STATES', str(states)))
+    with salt.utils.fopen(os.path.join(tree, 'top.sls'), 'w') as fp_:
+        fp_.write('base:\n  \'*\':\n')
+        for num in range(sls):
+            fp_.write('    - sls{0}\n'.format(num))
+    return tree
+
+
+def bench(opts, runs):
+    '''
+    Return the seconds spent by each of ``runs`` test highstates
+    '''
+    times = []
+    for _ in range(runs):
+        start = time.time()
+        highstate = salt.state.HighState(opts)
+        highstate.push_active()
+        try:
+            ret = highstate.call_highstate()
+        finally:
+            highstate.pop_active()
+        times.append(time.time() - start)
+        assert isinstance(ret, dict), ret
+        assert all(item['result'] for item in ret.values())
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sls', type=int, default=50,
+                        help='Number of SLS files in the highstate')
+    parser.add_argument('--states', type=int, default=20,
+                        help='Number of states in each SLS file')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Number of highstates to run')
+    args = parser.parse_args()
+
+    root_dir = tempfile.mkdtemp()
+    try:
+        for cache in (False, True):
+            cachedir = os.path.join(root_dir, 'cache-{0}'.format(cache))
+            opts = salt.config.DEFAULT_MINION_OPTS.copy()
+            opts.update({'root_dir': root_dir,
+                         'cachedir': cachedir,
+                         'file_client': 'local',
+                         'file_roots': {'base': [os.path.join(root_dir, 'states')]},
+                         'pillar_roots': {'base': [os.path.join(root_dir, 'pillar')]},
+                         'state_events': False,
+                         'autoload_dynamic_modules': False,
+                         'state_render_cache': cache,
+                         'test': True,
+                         'grains': {'os': 'Linux'},
+                         'pillar': {'role': 'web'}})
+            if not os.path.isdir(os.path.join(root_dir, 'states')):
+                state_tree(root_dir, args.sls, args.states)
+            times = bench(opts, args.runs)
+            print('state_render_cache: {0!s:<5} first {1:>6.2f}s then {2:>6.2f}s/run'.format(
+                cache, times[0], sum(times[1:]) / max(len(times) - 1, 1)))
+    finally:
+        shutil.rmtree(root_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the execution of large synthetic highstates with requisites: the
+states of each SLS file require a state of the first SLS file by ID, by name
+or by glob, and every tenth state watches the first SLS file.
+
+    python tests/perf/state_requisites.py --states 1000,2000,4000,8000
+
+The time spent per state should stay flat as the highstate grows.
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.state
+from salt.utils.odict import OrderedDict
+
+
+def highstate(states, per_sls=50):
+    '''
+    Return the high data of a highstate of ``states`` states
+    '''
+    high = OrderedDict()
+    for num in range(states):
+        sls = 'sls{0}'.format(num // per_sls)
+        args = [{'name': 'name{0}'.format(num)}, 'succeed_without_changes']
+        if num >= per_sls:
+            req = num % per_sls
+            if num % 3 == 0:
+                args.append({'require': [{'test': 'name{0}'.format(req)}]})
+            elif num % 3 == 1:
+                args.append({'require': ['id{0}'.format(req)]})
+            else:
+                args.append({'require': [{'test': '[i]d{0}'.format(req)}]})
+            if num % 10 == 0:
+                args.append({'watch': [{'sls': 'sls0'}]})
+        high['id{0}'.format(num)] = {'test': args,
+                                     '__sls__': sls,
+                                     '__env__': 'base'}
+    return high
+
+
+def bench(state, states):
+    '''
+    Return the seconds spent compiling and running a highstate of ``states``
+    states
+    '''
+    chunks = state.compile_high_data(highstate(states))
+    start = time.time()
+    ret = state.call_chunks(chunks)
+    elapsed = time.time() - start
+    assert len(ret) == states
+    assert all(item['result'] for item in ret.values())
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--states', default='1000,2000,4000,8000',
+                        help='Comma separated numbers of states in the highstate')
+    args = parser.parse_args()
+
+    root_dir = tempfile.mkdtemp()
+    opts = salt.config.DEFAULT_MINION_OPTS.copy()
+    opts.update({'root_dir': root_dir,
+                 'cachedir': root_dir,
+                 'file_client': 'local',
+                 'state_events': False,
+                 'grains': {},
+                 'pillar': {}})
+    try:
+        state = salt.state.State(opts)
+        for states in [int(states) for states in args.states.split(',')]:
+            elapsed = bench(state, states)
+            print('{0:>7} states {1:>8.2f}s {2:>8.0f}us/state'.format(
+                states, elapsed, elapsed / states * 1000000))
+    finally:
+        shutil.rmtree(root_dir)
+
+
+if __name__ == '__main__':
+    main()
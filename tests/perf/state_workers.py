@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the ``state_workers`` minion option: a highstate of I/O bound
+states, commands sleeping for a while, run one after another and on pools of
+worker processes. Every fifth state requires the state before it.
+
+    python tests/perf/state_workers.py --states 40 --sleep 0.2 --workers 0,2,4,8
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import shutil
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.state
+from salt.utils.odict import OrderedDict
+
+
+def highstate(states, sleep):
+    '''
+    Return the high data of a highstate of ``states`` sleeping commands
+    '''
+    high = OrderedDict()
+    for num in range(states):
+        args = [{'name': 'sleep {0}'.format(sleep)}, 'run']
+        if num % 5 == 4:
+            args.append({'require': ['id{0}'.format(num - 1)]})
+        high['id{0}'.format(num)] = {'cmd': args,
+                                     '__sls__': 'sls{0}'.format(num // 10),
+                                     '__env__': 'base'}
+    return high
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--states', type=int, default=40,
+                        help='Number of states in the highstate')
+    parser.add_argument('--sleep', type=float, default=0.2,
+                        help='Seconds each state sleeps for')
+    parser.add_argument('--workers', default='0,2,4,8',
+                        help='Comma separated state_workers values to compare')
+    args = parser.parse_args()
+
+    root_dir = tempfile.mkdtemp()
+    opts = salt.config.DEFAULT_MINION_OPTS.copy()
+    opts.update({'root_dir': root_dir,
+                 'cachedir': root_dir,
+                 'file_client': 'local',
+                 'state_events': False,
+                 'grains': {'shell': '/bin/sh'},
+                 'pillar': {}})
+    try:
+        for workers in [int(workers) for workers in args.workers.split(',')]:
+            opts['state_workers'] = workers
+            state = salt.state.State(opts)
+            start = time.time()
+            ret = state.call_high(highstate(args.states, args.sleep))
+            elapsed = time.time() - start
+            assert len(ret) == args.states
+            assert all(item['result'] for item in ret.values())
+            print('{0:>3} workers {1:>8.2f}s'.format(workers, elapsed))
+    finally:
+        shutil.rmtree(root_dir)
+
+
+if __name__ == '__main__':
+    main()
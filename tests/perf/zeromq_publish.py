@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark the publications a master worker hands to the zeromq publisher
+daemon: connecting for each publication (how it used to work), keeping the
+connection, and batching the publications with ``zmq_pub_batch_window``.
+
+    python tests/perf/zeromq_publish.py --publishes 20000
+
+A thread stands in for the publisher daemon, a publication is counted once
+the daemon received it.
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function
+import argparse
+import ctypes
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Import 3rd-party libs
+import zmq
+import zmq.eventloop.ioloop
+
+# Import salt libs
+import salt.config
+import salt.crypt
+import salt.master
+import salt.transport.server
+import salt.ext.six as six
+
+
+def drain(pull_sock, count):
+    '''
+    Receive ``count`` publications
+    '''
+    received = 0
+    while received < count:
+        received += len(pull_sock.recv_multipart())
+
+
+def bench(opts, mode, publishes):
+    '''
+    Return the publications handed to the daemon per second
+    '''
+    context = zmq.Context()
+    pull_sock = context.socket(zmq.PULL)
+    pull_sock.bind('ipc://{0}'.format(os.path.join(opts['sock_dir'], 'publish_pull.ipc')))
+    daemon = threading.Thread(target=drain, args=(pull_sock, publishes))
+    daemon.start()
+
+    opts = opts.copy()
+    if mode == 'batched':
+        opts['zmq_pub_batch_window'] = 0.001
+    channel = salt.transport.server.PubServerChannel.factory(opts)
+    load = {'fun': 'test.ping', 'arg': [], 'tgt': '*', 'tgt_type': 'glob',
+            'jid': '20170101000000000000', 'user': 'root'}
+    io_loop = zmq.eventloop.ioloop.ZMQIOLoop()
+
+    def run():
+        for _ in range(publishes):
+            channel.publish(load)
+            if mode == 'connect per publish':
+                channel.pub_close()
+                channel._crypticle = None
+
+    start = time.time()
+    io_loop.run_sync(run)
+    channel.pub_close()
+    daemon.join()
+    elapsed = time.time() - start
+    io_loop.close(all_fds=True)
+    pull_sock.close()
+    context.term()
+    return publishes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--publishes', type=int, default=20000,
+                        help='Number of publications to hand to the daemon')
+    args = parser.parse_args()
+
+    salt.master.SMaster.secrets['aes'] = {
+        'secret': multiprocessing.Array(
+            ctypes.c_char, six.b(salt.crypt.Crypticle.generate_key_string()))}
+    sock_dir = tempfile.mkdtemp()
+    opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+    opts.update({'sock_dir': sock_dir,
+                 'cachedir': sock_dir,
+                 'ipc_mode': 'ipc',
+                 'sign_pub_messages': False})
+    try:
+        for mode in ('connect per publish', 'persistent', 'batched'):
+            print('{0:<20} {1:>10.0f} publishes/s'.format(
+                mode, bench(opts, mode, args.publishes)))
+    finally:
+        shutil.rmtree(sock_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,16 @@ unit tests for the localfs cache
 
 # Import Python libs
 from __future__ import absolute_import
+import os
+import shutil
+import tempfile
 
 # Import Salt Testing libs
 # import integration
+from tests.support.paths import TMP
 from tests.support.unit import skipIf, TestCase
 from tests.support.mock import (
+    MagicMock,
     NO_MOCK,
     NO_MOCK_REASON,
     patch,
@@ -50,13 +55,21 @@ class MemCacheTest(TestCase):
     @patch('salt.payload.Serial')
     def setUp(self, serial_mock):  # pylint: disable=W0221
         salt.cache.MemCache.data = {}
+        salt.cache.MemCache.sizes = {}
+        salt.cache.MemCache.stats = {}
+        salt.cache.MemCache._stats_written = 0
+        self.cachedir = tempfile.mkdtemp(dir=TMP)
         self.opts = {'cache': 'fake_driver',
+                     'cachedir': self.cachedir,
                      'memcache_expire_seconds': 10,
                      'memcache_max_items': 3,
                      'memcache_full_cleanup': False,
                      'memcache_debug': False}
         self.cache = salt.cache.factory(self.opts)
 
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+
     @patch('salt.cache.Cache.fetch', return_value='fake_data')
     @patch('salt.loader.cache', return_value={})
     def test_fetch(self, loader_mock, cache_fetch_mock):
@@ -218,3 +231,118 @@ class MemCacheTest(TestCase):
         # Check debug data
         self.assertEqual(self.cache.call, 6)
         self.assertEqual(self.cache.hit, 3)
+
+    @patch('salt.cache.Cache.store')
+    @patch('salt.cache.Cache.fetch_many')
+    @patch('salt.loader.cache', return_value={})
+    def test_fetch_many(self, loader_mock, cache_fetch_many_mock, cache_store_mock):
+        cache_fetch_many_mock.return_value = {('bank', 'key2'): 'fake_data2'}
+        with patch('time.time', return_value=0):
+            self.cache.store('bank', 'key1', 'fake_data1')
+        with patch('time.time', return_value=1):
+            ret = self.cache.fetch_many([('bank', 'key1'), ('bank', 'key2')])
+        self.assertEqual(ret, {('bank', 'key1'): 'fake_data1',
+                               ('bank', 'key2'): 'fake_data2'})
+        # Only the keys not kept in memory are fetched
+        cache_fetch_many_mock.assert_called_once_with([('bank', 'key2')])
+        self.assertDictEqual(salt.cache.MemCache.data['fake_driver'], {
+            ('bank', 'key1'): [1, 'fake_data1'],
+            ('bank', 'key2'): [1, 'fake_data2'],
+            })
+
+    @patch('salt.cache.Cache.store')
+    @patch('salt.loader.cache', return_value={})
+    def test_max_bytes(self, loader_mock, cache_store_mock):
+        self.cache.serial = salt.payload.Serial({})
+        self.cache.max_bytes = len(self.cache.serial.dumps('x' * 100)) * 2
+        with patch('time.time', return_value=0):
+            self.cache.store('bank1', 'key1', 'x' * 100)
+        with patch('time.time', return_value=1):
+            self.cache.store('bank1', 'key2', 'x' * 100)
+        with patch('time.time', return_value=2):
+            self.cache.fetch('bank1', 'key1')
+        # The least recently used value makes room for the new one
+        with patch('time.time', return_value=3):
+            self.cache.store('bank2', 'key1', 'x' * 100)
+        self.assertEqual(list(salt.cache.MemCache.data['fake_driver']),
+                         [('bank1', 'key1'), ('bank2', 'key1')])
+        self.assertEqual(salt.cache.MemCache.sizes['fake_driver'][0],
+                         self.cache.max_bytes)
+        # A value larger than the limit is not kept
+        with patch('time.time', return_value=4):
+            self.cache.store('bank2', 'key2', 'x' * 1000)
+        self.assertEqual(len(salt.cache.MemCache.data['fake_driver']), 2)
+        self.assertEqual(salt.cache.MemCache.stats['bank1']['evictions'], 1)
+
+    @patch('salt.cache.Cache.store')
+    @patch('salt.cache.Cache.fetch', return_value='fake_data')
+    @patch('salt.loader.cache', return_value={})
+    def test_stats(self, loader_mock, cache_fetch_mock, cache_store_mock):
+        self.cache.serial = salt.payload.Serial({})
+        with patch('time.time', return_value=0):
+            self.cache.fetch('minions/m1', 'data')
+            self.cache.fetch('minions/m1', 'data')
+            self.cache.fetch('minions/m2', 'data')
+            self.cache.store('cloud/ec2', 'key', 'fake_data')
+            self.cache.store('cloud/ec2', 'key2', 'fake_data')
+        with patch('time.time', return_value=salt.cache.MEMCACHE_STATS_INTERVAL):
+            self.cache.fetch('cloud/ec2', 'key')
+        stats = salt.cache.memcache_stats(self.opts)
+        self.assertEqual(stats['minions'], {'hits': 1, 'misses': 2, 'evictions': 1,
+                                            'items': 1, 'bytes': 0,
+                                            'hit_rate': 1.0 / 3})
+        self.assertEqual(stats['cloud']['items'], 2)
+        self.assertEqual(stats['cloud']['hits'], 1)
+
+        # The counters of the processes which are gone are removed
+        with patch('salt.utils.process.os_is_running', return_value=False):
+            self.assertEqual(salt.cache.memcache_stats(self.opts), {})
+        self.assertEqual(os.listdir(os.path.join(self.cachedir,
+                                                 salt.cache.MEMCACHE_STATS_DIR)),
+                         [])
+
+
+class CacheBulkTest(TestCase):
+    '''
+    Validate the bulk methods of the Cache class
+    '''
+    def setUp(self):
+        self.opts = {'cache': 'fake_driver'}
+        self.cache = salt.cache.Cache(self.opts)
+        self.data = {('minions/m1', 'data'): {'grains': {'id': 'm1'}},
+                     ('minions/m2', 'data'): {'grains': {'id': 'm2'}}}
+        self.modules = {
+            'fake_driver.fetch': lambda bank, key: self.data.get((bank, key), {}),
+            'fake_driver.store': lambda bank, key, data: self.data.__setitem__((bank, key), data),
+            'fake_driver.ls': lambda bank: ['m1', 'm2', 'm3'],
+            'fake_driver.contains': lambda bank, key: (bank, key) in self.data,
+        }
+
+    def test_fetch_many_fallback(self):
+        with patch('salt.loader.cache', return_value=self.modules):
+            ret = self.cache.fetch_many([('minions/m1', 'data'), ('minions/m3', 'data')])
+        self.assertEqual(ret, {('minions/m1', 'data'): {'grains': {'id': 'm1'}},
+                               ('minions/m3', 'data'): {}})
+
+    def test_store_many_fallback(self):
+        with patch('salt.loader.cache', return_value=self.modules):
+            self.cache.store_many({('minions/m3', 'data'): {'grains': {'id': 'm3'}}})
+        self.assertEqual(self.data[('minions/m3', 'data')], {'grains': {'id': 'm3'}})
+
+    def test_list_with_data_fallback(self):
+        with patch('salt.loader.cache', return_value=self.modules):
+            ret = self.cache.list_with_data('minions', 'data')
+        self.assertEqual(ret, {'m1': {'grains': {'id': 'm1'}},
+                               'm2': {'grains': {'id': 'm2'}}})
+
+    def test_native(self):
+        fetch_many = MagicMock(return_value={})
+        list_with_data = MagicMock(return_value={})
+        self.modules['fake_driver.fetch_many'] = fetch_many
+        self.modules['fake_driver.list_with_data'] = list_with_data
+        self.modules['fake_driver.fetch'] = MagicMock(side_effect=AssertionError)
+        with patch('salt.loader.cache', return_value=self.modules):
+            self.cache.fetch_many(iter([('minions/m1', 'data')]))
+            self.cache.list_with_data('minions', 'data')
+        fetch_many.assert_called_once_with([('minions/m1', 'data')])
+        list_with_data.assert_called_once_with('minions', 'data')
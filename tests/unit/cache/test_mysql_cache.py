@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+'''
+unit tests for the connection pool of the mysql cache
+'''
+
+# Import Python libs
+from __future__ import absolute_import
+
+# Import Salt Testing libs
+from tests.support.unit import skipIf, TestCase
+from tests.support.mock import (
+    MagicMock,
+    NO_MOCK,
+    NO_MOCK_REASON,
+    patch
+)
+
+# Import Salt libs
+import salt.cache.mysql_cache as mysql_cache
+from salt.exceptions import SaltCacheError
+
+
+class OperationalError(Exception):
+    pass
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ConnectionPoolTest(TestCase):
+    '''
+    Validate the connection pool of the mysql cache
+    '''
+    def setUp(self):
+        self.connect = MagicMock(side_effect=lambda **kwargs: MagicMock())
+        mysqldb = MagicMock(connect=self.connect, OperationalError=OperationalError)
+        patcher = patch.object(mysql_cache, 'MySQLdb', mysqldb, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(mysql_cache, '_mysql_kwargs', {}, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = mysql_cache.ConnectionPool(size=2, timeout=0.01,
+                                               health_check_interval=30)
+
+    def _query(self):
+        with self.pool.connection() as conn:
+            mysql_cache.run_query(conn, 'SELECT 1')
+            return conn.conn
+
+    def test_connections_reused(self):
+        '''
+        Test that connections are created on first use and reused
+        '''
+        first = self._query()
+        self.assertEqual(self._query(), first)
+        self.assertEqual(self.connect.call_count, 1)
+
+    def test_pool_size(self):
+        '''
+        Test that a cache call fails once all the connections are in use
+        '''
+        with self.pool.connection():
+            with self.pool.connection():
+                with self.assertRaises(SaltCacheError):
+                    with self.pool.connection():
+                        pass
+        # The connections were handed back
+        with self.pool.connection():
+            with self.pool.connection():
+                pass
+
+    def test_health_check(self):
+        '''
+        Test that an idle connection failing its ping is replaced
+        '''
+        first = self._query()
+        first.ping.side_effect = OperationalError('gone away')
+        with patch('time.time', return_value=self.pool._queue.queue[-1].last_used + 60):
+            second = self._query()
+        self.assertNotEqual(second, first)
+        first.close.assert_called_once_with()
+
+    def test_reconnect(self):
+        '''
+        Test that a query failing on a broken connection is retried on a new
+        connection
+        '''
+        first = self._query()
+        first.cursor.side_effect = OperationalError('gone away')
+        with patch.object(mysql_cache, 'sleep'):
+            self.assertNotEqual(self._query(), first)
+
+    def test_fork(self):
+        '''
+        Test that a forked process does not use the connections of its parent
+        '''
+        first = self._query()
+        with patch('os.getpid', return_value=-1):
+            second = self._query()
+        self.assertNotEqual(second, first)
+        first.close.assert_not_called()
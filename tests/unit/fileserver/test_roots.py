@@ -6,7 +6,9 @@
 # Import Python libs
 from __future__ import absolute_import
 import os
+import shutil
 import tempfile
+import time
 
 # Import Salt Testing libs
 from tests.integration import AdaptedConfigurationTestCaseMixin
@@ -18,7 +20,10 @@ from tests.support.mock import patch, NO_MOCK, NO_MOCK_REASON
 # Import salt libs
 from salt.fileserver import roots
 from salt import fileclient
+import salt.fileserver
 import salt.utils
+import salt.utils.inotify
+import salt.ext.six as six
 
 try:
     import win32file
@@ -156,6 +161,24 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
             }
         )
 
+    def test_file_hash_index(self):
+        path = os.path.join(self.tmp_cachedir, 'hashed')
+        with salt.utils.fopen(path, 'w') as fp_:
+            fp_.write('hello world!\n')
+        # Older than the mtime tick of the index
+        os.utime(path, (0, 0))
+        load = {'saltenv': 'base', 'path': path}
+        fnd = {'path': path, 'rel': 'hashed'}
+        with patch('salt.utils.get_hash', wraps=salt.utils.get_hash) as get_hash:
+            first = roots.file_hash(load, fnd)
+            self.assertEqual(roots.file_hash(load, fnd), first)
+            self.assertEqual(get_hash.call_count, 1)
+            with salt.utils.fopen(path, 'w') as fp_:
+                fp_.write('hello again!\n')
+            os.utime(path, (1, 1))
+            self.assertNotEqual(roots.file_hash(load, fnd), first)
+            self.assertEqual(get_hash.call_count, 2)
+
     def test_file_list_emptydirs(self):
         ret = roots.file_list_emptydirs({'saltenv': 'base'})
         self.assertIn('empty_dir', ret)
@@ -171,6 +194,132 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
         self.assertDictEqual(ret, {'dest_sym': 'source_sym'})
 
 
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+@skipIf(not salt.utils.inotify.HAS_PYINOTIFY, 'pyinotify is not available')
+class RootsInotifyUpdateTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMixin):
+    '''
+    Test the fileserver updates tracking the changes with inotify
+    '''
+    def setup_loader_modules(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.roots = {}
+        for saltenv in ('base', 'dev'):
+            self.roots[saltenv] = os.path.join(self.tmp_dir, saltenv)
+            os.makedirs(os.path.join(self.roots[saltenv], 'sub'))
+            with salt.utils.fopen(os.path.join(self.roots[saltenv], 'sub', 'file'), 'w') as fp_:
+                fp_.write(saltenv)
+        self.opts = self.get_temp_config('master')
+        self.opts.update({'cachedir': os.path.join(self.tmp_dir, 'cache'),
+                          'file_roots': dict((saltenv, [path]) for saltenv, path
+                                             in six.iteritems(self.roots)),
+                          'fileserver_inotify': True})
+        return {roots: {'__opts__': self.opts}}
+
+    def setUp(self):
+        patcher = patch.dict(roots._TRACKED, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _mtime_map(self):
+        mtime_map = {}
+        with salt.utils.fopen(os.path.join(self.opts['cachedir'], 'roots', 'mtime_map')) as fp_:
+            for line in fp_:
+                path, mtime = line.rstrip('\n').split(':', 1)
+                mtime_map[path] = mtime
+        return mtime_map
+
+    def _list_caches(self):
+        list_cachedir = os.path.join(self.opts['cachedir'], 'file_lists', 'roots')
+        return sorted(fn_ for fn_ in os.listdir(list_cachedir) if fn_.endswith('.p'))
+
+    def test_update(self):
+        roots.update()
+        for saltenv in ('base', 'dev'):
+            self.assertEqual(roots.file_list({'saltenv': saltenv}), ['sub/file'])
+        self.assertEqual(self._list_caches(), ['base.p', 'dev.p'])
+
+        new_dir = os.path.join(self.roots['dev'], 'new')
+        os.makedirs(new_dir)
+        with salt.utils.fopen(os.path.join(new_dir, 'file'), 'w') as fp_:
+            fp_.write('new')
+        os.remove(os.path.join(self.roots['dev'], 'sub', 'file'))
+        with patch('salt.fileserver.generate_mtime_map',
+                   wraps=salt.fileserver.generate_mtime_map) as generate_mtime_map:
+            roots.update()
+        # only the new directory was walked
+        self.assertEqual(generate_mtime_map.call_args[0][1], {'': [new_dir]})
+        self.assertEqual(self._list_caches(), ['base.p'])
+        self.assertEqual(sorted(self._mtime_map()),
+                         [os.path.join(self.roots['base'], 'sub', 'file'),
+                          os.path.join(new_dir, 'file')])
+        self.assertEqual(roots.file_list({'saltenv': 'dev'}), ['new/file'])
+
+    def test_update_during_walk(self):
+        '''
+        Test a file list walked before update() removed it is not cached
+        '''
+        roots.update()
+        walk = os.walk
+
+        def _walk(*args, **kwargs):
+            # The change happens, and update() runs, after the walk started
+            ret = list(walk(*args, **kwargs))
+            with salt.utils.fopen(os.path.join(self.roots['dev'], 'new'), 'w') as fp_:
+                fp_.write('new')
+            roots.update()
+            return ret
+
+        with patch('os.walk', _walk):
+            self.assertEqual(roots.file_list({'saltenv': 'dev'}), ['sub/file'])
+        self.assertEqual(self._list_caches(), [])
+        self.assertEqual(roots.file_list({'saltenv': 'dev'}), ['new', 'sub/file'])
+        self.assertEqual(self._list_caches(), ['dev.p'])
+
+
+class HashIndexTest(TestCase):
+    '''
+    Test the hash index shared by the processes serving files
+    '''
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.index_path = os.path.join(self.tmp_dir, 'hash_index.sha256')
+        self.stat = list(os.stat(self.tmp_dir))
+        # Older than the mtime tick of the index
+        self.stat[8] = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_shared(self):
+        first = salt.fileserver.HashIndex(self.index_path)
+        second = salt.fileserver.HashIndex(self.index_path)
+        first.set('/srv/salt/a', self.stat, 'abc')
+        self.assertEqual(second.get('/srv/salt/a', self.stat), 'abc')
+        changed = list(self.stat)
+        changed[6] += 1
+        self.assertIsNone(second.get('/srv/salt/a', changed))
+
+    def test_racy(self):
+        index = salt.fileserver.HashIndex(self.index_path)
+        recent = list(self.stat)
+        recent[8] = int(time.time())
+        index.set('/srv/salt/a', recent, 'abc')
+        self.assertIsNone(index.get('/srv/salt/a', recent))
+
+    def test_compact(self):
+        first = salt.fileserver.HashIndex(self.index_path)
+        first.set('/srv/salt/a', self.stat, 'abc')
+        first.set('/srv/salt/b', self.stat, 'def')
+        first.compact(['/srv/salt/b'])
+        self.assertFalse(os.path.exists(first.journal))
+        second = salt.fileserver.HashIndex(self.index_path)
+        self.assertEqual(second.get('/srv/salt/a', self.stat), 'abc')
+        self.assertIsNone(second.get('/srv/salt/b', self.stat))
+
+
 class RootsLimitTraversalTest(TestCase, AdaptedConfigurationTestCaseMixin):
 
     def test_limit_traversal(self):
@@ -31,7 +31,8 @@ import salt.ext.six as six
 from salt.ext.six.moves import range
 # pylint: enable=no-name-in-module,redefined-builtin
 
-from salt.loader import LazyLoader, _module_dirs, grains, utils, proxy, minion_mods
+from salt.loader import LazyLoader, ModuleDirCache, _module_dirs, grains, utils, proxy, minion_mods
+from salt.loader import clear_virtual_cache
 
 log = logging.getLogger(__name__)
 
@@ -116,6 +117,162 @@ class LazyLoaderTest(TestCase):
         self.assertTrue(self.module_name + '.not_loaded' not in self.loader)
 
 
+class ModuleDirCacheTest(TestCase):
+    '''
+    Test the cache of the module directory listings
+    '''
+    def setUp(self):
+        self.module_dir = tempfile.mkdtemp(dir=TMP)
+        self.cachedir = tempfile.mkdtemp(dir=TMP)
+        for name in ('b.py', 'a.py'):
+            salt.utils.fopen(os.path.join(self.module_dir, name), 'w').close()
+        self.cache = ModuleDirCache()
+        self.cache.load({'cachedir': self.cachedir})
+        # Keep the listings of the directories modified by the tests
+        self.cache.RACY_SECONDS = -1
+
+    def tearDown(self):
+        shutil.rmtree(self.module_dir)
+        shutil.rmtree(self.cachedir)
+
+    def test_listdir(self):
+        with patch('os.listdir', wraps=os.listdir) as listdir:
+            self.assertEqual(self.cache.listdir(self.module_dir), ['a.py', 'b.py'])
+            self.assertEqual(self.cache.listdir(self.module_dir), ['a.py', 'b.py'])
+            self.assertEqual(listdir.call_count, 1)
+            salt.utils.fopen(os.path.join(self.module_dir, 'c.py'), 'w').close()
+            os.utime(self.module_dir, (0, 0))
+            self.assertEqual(self.cache.listdir(self.module_dir),
+                             ['a.py', 'b.py', 'c.py'])
+            self.assertEqual(listdir.call_count, 2)
+
+    def test_listdir_racy(self):
+        self.cache.RACY_SECONDS = ModuleDirCache.RACY_SECONDS
+        with patch('os.listdir', wraps=os.listdir) as listdir:
+            for _ in range(2):
+                self.assertEqual(self.cache.listdir(self.module_dir), ['a.py', 'b.py'])
+            self.assertEqual(listdir.call_count, 2)
+
+    def test_listdir_missing(self):
+        self.assertRaises(OSError, self.cache.listdir,
+                          os.path.join(self.module_dir, 'missing'))
+
+    def test_file_mapping(self):
+        opts = {'cachedir': self.cachedir}
+        with patch('salt.loader.MODULE_DIR_CACHE', self.cache):
+            first = LazyLoader([self.module_dir], opts)
+            second = LazyLoader([self.module_dir], opts)
+            self.assertIs(first.file_mapping, second.file_mapping)
+            self.assertEqual(list(first.file_mapping), ['a', 'b'])
+            salt.utils.fopen(os.path.join(self.module_dir, 'c.py'), 'w').close()
+            os.utime(self.module_dir, (0, 0))
+            third = LazyLoader([self.module_dir], opts)
+            self.assertEqual(list(third.file_mapping), ['a', 'b', 'c'])
+
+    def test_save(self):
+        self.cache.listdir(self.module_dir)
+        self.cache.save()
+        cache = ModuleDirCache()
+        cache.load({'cachedir': self.cachedir})
+        with patch('os.listdir', wraps=os.listdir) as listdir:
+            self.assertEqual(cache.listdir(self.module_dir), ['a.py', 'b.py'])
+            self.assertEqual(listdir.call_count, 0)
+
+
+VIRTUAL_MODULES = {
+    'broken': """
+def __virtual__():
+    return (False, 'missing dependency')
+""",
+    'other': """
+def ping():
+    return 'other'
+""",
+    'provider': """
+__virtualname__ = 'virt'
+
+def __virtual__():
+    return __virtualname__
+
+def ping():
+    return True
+""",
+}
+
+
+class VirtualCacheTest(TestCase):
+    '''
+    Test the cache of the outcome of loading the module files
+    '''
+    def setUp(self):
+        self.module_dir = tempfile.mkdtemp(dir=TMP)
+        self.cachedir = tempfile.mkdtemp(dir=TMP)
+        for name, source in six.iteritems(VIRTUAL_MODULES):
+            path = os.path.join(self.module_dir, '{0}.py'.format(name))
+            with salt.utils.fopen(path, 'w') as fp_:
+                fp_.write(source)
+            # Older than the timestamp tick of the cache
+            os.utime(path, (0, 0))
+        self.opts = {'cachedir': self.cachedir,
+                     'virtual_cache': True,
+                     'grains': {'os': 'Linux'}}
+
+    def tearDown(self):
+        shutil.rmtree(self.module_dir)
+        shutil.rmtree(self.cachedir)
+
+    def _loader(self, opts=None):
+        return LazyLoader([self.module_dir], opts or self.opts, tag='virtual_test')
+
+    def _loaded(self, func):
+        '''
+        Return the names of the module files a new process loads when calling
+        func with a new loader
+        '''
+        with patch('salt.loader.VIRTUAL_CACHES', {}), \
+                patch('salt.loader.LazyLoader._load_module', autospec=True,
+                      side_effect=LazyLoader._load_module) as load_module:
+            func(self._loader())
+        return [call[0][1] for call in load_module.call_args_list]
+
+    def _fill(self):
+        with patch('salt.loader.VIRTUAL_CACHES', {}):
+            self.assertEqual(len(self._loader()), 2)
+
+    def test_virtual_name(self):
+        self.assertEqual(self._loaded(lambda loader: loader['virt.ping']()),
+                         ['broken', 'other', 'provider'])
+        self._fill()
+        self.assertEqual(self._loaded(lambda loader: loader['virt.ping']()),
+                         ['provider'])
+
+    def test_failure(self):
+        self._fill()
+        missing = {}
+
+        def load_all(loader):
+            self.assertEqual(len(loader), 2)
+            missing.update(loader.missing_modules)
+        self.assertEqual(self._loaded(load_all), ['other', 'provider'])
+        self.assertEqual(missing, {'broken': 'missing dependency'})
+
+    def test_modified(self):
+        self._fill()
+        os.utime(os.path.join(self.module_dir, 'broken.py'), (1, 1))
+        self.assertEqual(self._loaded(len), ['broken', 'other', 'provider'])
+
+    def test_digest(self):
+        self._fill()
+        self.opts['grains'] = {'os': 'Windows'}
+        self.assertEqual(self._loaded(len), ['broken', 'other', 'provider'])
+
+    def test_clear(self):
+        self._fill()
+        clear_virtual_cache(self.opts)
+        self.assertFalse(os.path.exists(os.path.join(self.cachedir, 'virtual')))
+        self.assertEqual(self._loaded(len), ['broken', 'other', 'provider'])
+
+
 class LazyLoaderVirtualEnabledTest(TestCase):
     '''
     Test the base loader of salt.
@@ -12,6 +12,7 @@ import os
 import shutil
 import logging
 import tempfile
+import time
 
 # Import Salt Testing libs
 from tests.integration import AdaptedConfigurationTestCaseMixin
@@ -246,7 +247,7 @@ class Local_CacheTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleM
         self._add_job()
 
         # remove job
-        self.assertEqual(local_cache.clean_old_jobs(), None)
+        self.assertEqual(local_cache.clean_old_jobs()['pruned'], 1)
 
         self._check_dir_files('job cache was not removed: ',
                               self.JOB_CACHE_DIR_FILES,
@@ -260,7 +261,7 @@ class Local_CacheTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleM
         self._add_job()
 
         with patch.dict(local_cache.__opts__, {'keep_jobs': 24}):
-            self.assertEqual(local_cache.clean_old_jobs(), None)
+            self.assertEqual(local_cache.clean_old_jobs()['pruned'], 0)
 
             self._check_dir_files('job cache was removed: ',
                                   self.JOB_CACHE_DIR_FILES,
@@ -303,9 +304,241 @@ class Local_CacheTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleM
                               status='present')
 
         # remove job
-        self.assertEqual(local_cache.clean_old_jobs(), None)
+        self.assertEqual(local_cache.clean_old_jobs()['pruned'], 0)
 
         # check jid dir is removed
         self._check_dir_files('new_jid_dir was not removed',
                               self.EMPTY_JID_DIR,
                               status='removed')
+
+
+class LocalCacheSegmentsTestCase(TestCase, LoaderModuleMockMixin):
+    '''
+    Tests for the segment file storage of job returns
+    '''
+    def setup_loader_modules(self):
+        return {local_cache: {'__opts__': {'cachedir': TMP_CACHE_DIR,
+                                           'hash_type': 'sha256',
+                                           'job_cache_segments': True}}}
+
+    def tearDown(self):
+        if os.path.exists(TMP_CACHE_DIR):
+            shutil.rmtree(TMP_CACHE_DIR)
+
+    def _return(self, jid, minion_id, **kwargs):
+        load = {'jid': jid, 'id': minion_id, 'return': minion_id,
+                'retcode': 0, 'success': True}
+        load.update(kwargs)
+        return local_cache.returner(load)
+
+    def test_returner(self):
+        '''
+        Test that returns are appended to a single segment file
+        '''
+        jid = local_cache.prep_jid()
+        for minion_id in ('minion1', 'minion2', 'minion3'):
+            self.assertEqual(self._return(jid, minion_id), None)
+        self._return(jid, 'minion4', out='highstate')
+        jid_dir = salt.utils.jid.jid_dir(jid,
+                                         os.path.join(TMP_CACHE_DIR, 'jobs'),
+                                         'sha256')
+        self.assertEqual(sorted(os.listdir(jid_dir)),
+                         [local_cache.RETURNS_IDX, local_cache.RETURNS_SEG,
+                          'jid'])
+        ret = local_cache.get_jid(jid)
+        self.assertEqual(sorted(ret), ['minion1', 'minion2', 'minion3',
+                                       'minion4'])
+        self.assertEqual(ret['minion2'],
+                         {'return': 'minion2', 'retcode': 0, 'success': True})
+        self.assertEqual(ret['minion4']['out'], 'highstate')
+
+    def test_returner_duplicate(self):
+        '''
+        Test that a second return from the same minion is dropped, even when
+        seen by another process
+        '''
+        jid = local_cache.prep_jid()
+        self.assertEqual(self._return(jid, 'minion1'), None)
+        self.assertFalse(self._return(jid, 'minion1', **{'return': 'replay'}))
+        local_cache._SEGMENT_INDEXES.clear()
+        self.assertFalse(self._return(jid, 'minion1', **{'return': 'replay'}))
+        self.assertEqual(local_cache.get_jid(jid)['minion1']['return'],
+                         'minion1')
+
+    def test_returner_unknown_jid(self):
+        '''
+        Test that returns for a job missing from the cache are dropped
+        '''
+        self.assertFalse(self._return('20170101000000000000', 'minion1'))
+
+    def test_truncated_index(self):
+        '''
+        Test that an index entry left incomplete is dropped
+        '''
+        jid = local_cache.prep_jid()
+        self._return(jid, 'minion1')
+        jid_dir = salt.utils.jid.jid_dir(jid,
+                                         os.path.join(TMP_CACHE_DIR, 'jobs'),
+                                         'sha256')
+        with salt.utils.fopen(os.path.join(jid_dir, local_cache.RETURNS_IDX), 'ab') as fh_:
+            fh_.write(b'\x00\x00\x00')
+        self.assertEqual(sorted(local_cache.get_jid(jid)), ['minion1'])
+        self._return(jid, 'minion2')
+        self.assertEqual(sorted(local_cache.get_jid(jid)),
+                         ['minion1', 'minion2'])
+
+
+class LocalCacheJidIndexTestCase(TestCase, LoaderModuleMockMixin):
+    '''
+    Tests for the jid index of the local job cache
+    '''
+    def setup_loader_modules(self):
+        return {local_cache: {'__opts__': {'cachedir': TMP_CACHE_DIR,
+                                           'hash_type': 'sha256',
+                                           'keep_jobs': 1}}}
+
+    def tearDown(self):
+        if os.path.exists(TMP_CACHE_DIR):
+            shutil.rmtree(TMP_CACHE_DIR)
+
+    def _save_load(self, jid, fun, **kwargs):
+        load = {'jid': jid, 'fun': fun, 'arg': [], 'tgt': 'minion1',
+                'tgt_type': 'glob', 'user': 'root'}
+        load.update(kwargs)
+        local_cache.prep_jid(passed_jid=jid)
+        local_cache.save_load(jid, load, minions=['minion1'])
+
+    def test_get_jids(self):
+        '''
+        Test that get_jids is answered from the index, built on first use
+        '''
+        self._save_load('20170101000000000000', 'test.ping')
+        self.assertFalse(os.path.exists(os.path.join(TMP_CACHE_DIR, local_cache.JID_INDEX)))
+        self.assertEqual(sorted(local_cache.get_jids()), ['20170101000000000000'])
+        self.assertTrue(os.path.exists(os.path.join(TMP_CACHE_DIR, local_cache.JID_INDEX)))
+        self._save_load('20170102000000000000', 'state.apply',
+                        kwargs={'metadata': {'foo': 'bar'}})
+        with patch.object(local_cache, '_walk_through', MagicMock(side_effect=AssertionError)):
+            ret = local_cache.get_jids()
+        self.assertEqual(
+            ret['20170102000000000000'],
+            {'Function': 'state.apply', 'Arguments': [], 'Target': 'minion1',
+             'Target-type': 'glob', 'User': 'root', 'Metadata': {'foo': 'bar'},
+             'StartTime': '2017, Jan 02 00:00:00.000000'})
+
+    def test_search_jids(self):
+        '''
+        Test the function and time range filters of the index
+        '''
+        local_cache.get_jids()
+        self._save_load('20170101000000000000', 'test.ping')
+        self._save_load('20170102000000000000', 'state.apply')
+        self._save_load('20170103000000000000', 'test.version')
+        self.assertEqual(sorted(local_cache.search_jids(functions=['test.*'])),
+                         ['20170101000000000000', '20170103000000000000'])
+        self.assertEqual(sorted(local_cache.search_jids(start='20170102000000000000')),
+                         ['20170102000000000000', '20170103000000000000'])
+        self.assertEqual(sorted(local_cache.search_jids(functions=['test.*'],
+                                                        end='20170102000000000000')),
+                         ['20170101000000000000'])
+
+    def test_get_jids_filter(self):
+        '''
+        Test that get_jids_filter returns the most recent jobs
+        '''
+        local_cache.get_jids()
+        self._save_load('20170101000000000000', 'test.ping')
+        self._save_load('20170102000000000000', 'saltutil.find_job')
+        self._save_load('20170103000000000000', 'test.version')
+        ret = local_cache.get_jids_filter(2)
+        self.assertEqual([job['JID'] for job in ret],
+                         ['20170101000000000000', '20170103000000000000'])
+        ret = local_cache.get_jids_filter(1, filter_find_job=False)
+        self.assertEqual([job['JID'] for job in ret], ['20170103000000000000'])
+
+    def test_clean_old_jobs_prunes_index(self):
+        '''
+        Test that clean_old_jobs drops the removed jobs from the index
+        '''
+        local_cache.get_jids()
+        self._save_load('20170101000000000000', 'test.ping')
+        new_jid = salt.utils.jid.gen_jid()
+        self._save_load(new_jid, 'test.ping')
+        jid_dir = salt.utils.jid.jid_dir('20170101000000000000', TMP_JID_DIR, 'sha256')
+        shutil.rmtree(os.path.dirname(jid_dir))
+        local_cache.clean_old_jobs()
+        with patch.object(local_cache, '_walk_through', MagicMock(side_effect=AssertionError)):
+            self.assertEqual(list(local_cache.get_jids()), [new_jid])
+
+
+class LocalCacheBucketsTestCase(TestCase, LoaderModuleMockMixin):
+    '''
+    Tests for the hour buckets used by local_cache.clean_old_jobs
+    '''
+    def setup_loader_modules(self):
+        return {local_cache: {'__opts__': {'cachedir': TMP_CACHE_DIR,
+                                           'hash_type': 'sha256',
+                                           'keep_jobs': 1}}}
+
+    def tearDown(self):
+        if os.path.exists(TMP_CACHE_DIR):
+            shutil.rmtree(TMP_CACHE_DIR)
+
+    def _move_to_bucket(self, bucket):
+        '''
+        Move the jobs of the current hour bucket to an other hour
+        '''
+        bucket_dir = os.path.join(TMP_CACHE_DIR, local_cache.JID_BUCKETS)
+        current = [name for name in os.listdir(bucket_dir) if not name.startswith('.')]
+        self.assertEqual(len(current), 1)
+        os.rename(os.path.join(bucket_dir, current[0]),
+                  os.path.join(bucket_dir, bucket))
+
+    def test_prep_jid_adds_to_bucket(self):
+        '''
+        Test that the job directories are recorded in the bucket of the hour
+        '''
+        jid = local_cache.prep_jid()
+        bucket = os.path.join(TMP_CACHE_DIR, local_cache.JID_BUCKETS, jid[:10])
+        with salt.utils.fopen(bucket) as fh_:
+            jid_dir = os.path.join(TMP_JID_DIR, fh_.read().strip())
+        self.assertEqual(
+            jid_dir,
+            salt.utils.jid.jid_dir(jid, TMP_JID_DIR, 'sha256'))
+
+    def test_clean_old_jobs_buckets(self):
+        '''
+        Test that once the job cache was scanned, only the expired buckets
+        are read
+        '''
+        self.assertEqual(local_cache.clean_old_jobs(), None)
+        old_jid = local_cache.prep_jid()
+        self._move_to_bucket('2017010100')
+        new_jid = local_cache.prep_jid()
+
+        ret = local_cache.clean_old_jobs()
+        self.assertTrue(ret['full_scan'])
+        self.assertEqual(ret['pruned'], 0)
+
+        with patch.object(local_cache, '_clean_old_jobs_scan', MagicMock(side_effect=AssertionError)):
+            ret = local_cache.clean_old_jobs()
+        self.assertFalse(ret['full_scan'])
+        self.assertEqual(ret['pruned'], 1)
+        self.assertFalse(os.path.isdir(salt.utils.jid.jid_dir(old_jid, TMP_JID_DIR, 'sha256')))
+        self.assertTrue(os.path.isdir(salt.utils.jid.jid_dir(new_jid, TMP_JID_DIR, 'sha256')))
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(TMP_CACHE_DIR, local_cache.JID_BUCKETS))),
+            sorted([local_cache.JID_BUCKETS_SCAN, new_jid[:10]]))
+
+    def test_clean_old_jobs_rescans(self):
+        '''
+        Test that the whole job cache is scanned again after keep_jobs hours
+        '''
+        local_cache.prep_jid()
+        self.assertTrue(local_cache.clean_old_jobs()['full_scan'])
+        scan_marker = os.path.join(TMP_CACHE_DIR, local_cache.JID_BUCKETS,
+                                   local_cache.JID_BUCKETS_SCAN)
+        past = time.time() - 7200
+        os.utime(scan_marker, (past, past))
+        self.assertTrue(local_cache.clean_old_jobs()['full_scan'])
+        self.assertFalse(local_cache.clean_old_jobs()['full_scan'])
@@ -10,6 +10,7 @@ from __future__ import absolute_import
 from tests.support.mixins import LoaderModuleMockMixin
 from tests.support.unit import skipIf, TestCase
 from tests.support.mock import (
+    MagicMock,
     NO_MOCK,
     NO_MOCK_REASON,
     patch
@@ -78,3 +79,32 @@ class JobsTest(TestCase, LoaderModuleMockMixin):
 
             self.assertEqual(jobs.list_jobs(search_target='non-existant'),
                              returns['non-existant'])
+
+    def test_list_jobs_with_search_jids(self):
+        '''
+        test jobs.list_jobs runner passing the function filter to a returner
+        indexing its jobs
+        '''
+        mock_jobs_cache = {
+            '20160524035503086853': {'Arguments': [],
+                                     'Function': 'test.ping',
+                                     'StartTime': '2016, May 24 03:55:03.086853',
+                                     'Target': 'node-1-1.com',
+                                     'Target-type': 'glob',
+                                     'User': 'root'},
+        }
+        search_jids = MagicMock(return_value=mock_jobs_cache)
+
+        class MockMasterMinion(object):
+
+            returners = {'local_cache.get_jids': MagicMock(side_effect=AssertionError),
+                         'local_cache.search_jids': search_jids}
+
+            def __init__(self, *args, **kwargs):
+                pass
+
+        with patch.object(salt.minion, 'MasterMinion', MockMasterMinion):
+            self.assertEqual(jobs.list_jobs(search_function='test.*,pkg.*',
+                                            search_target='node-1-1.com'),
+                             mock_jobs_cache)
+        search_jids.assert_called_once_with(functions=['test.*', 'pkg.*'])
@@ -838,13 +838,16 @@ class TestFileState(TestCase, LoaderModuleMockMixin):
         mock_l = MagicMock(return_value=[])
         mock_emt = MagicMock(side_effect=[[], ['code/flask'], ['code/flask']])
         mock_lst = MagicMock(side_effect=[CommandExecutionError, (source, ''),
-                                          (source, ''), (source, '')])
+                                          (source, ''), (source, ''),
+                                          (source, '')])
+        mock_manifest = MagicMock(return_value={})
         with patch.dict(filestate.__salt__, {'config.manage_mode': mock_t,
                                              'file.user_to_uid': mock_uid,
                                              'file.group_to_gid': mock_gid,
                                              'file.source_list': mock_lst,
                                              'cp.list_master_dirs': mock_emt,
-                                             'cp.list_master': mock_l}):
+                                             'cp.list_master': mock_l,
+                                             'cp.list_master_manifest': mock_manifest}):
             comt = ('User salt is not available Group saltstack'
                     ' is not available')
             ret.update({'comment': comt})
@@ -889,6 +892,13 @@ class TestFileState(TestCase, LoaderModuleMockMixin):
                             .format(name))
                     ret.update({'comment': comt, 'result': True})
                     self.assertDictEqual(filestate.recurse(name, source), ret)
+                    self.assertEqual(mock_manifest.call_count, 1)
+
+                    # No file is fetched in test mode
+                    mock_emt.side_effect = [['code/flask']]
+                    with patch.dict(filestate.__opts__, {'test': True}):
+                        self.assertDictEqual(filestate.recurse(name, source), ret)
+                    self.assertEqual(mock_manifest.call_count, 1)
 
     # 'replace' function tests: 1
 
@@ -123,7 +123,7 @@ class MasterACLTestCase(ModuleCase):
         self.addCleanup(delattr, self, 'clear')
 
         # overwrite the _send_pub method so we don't have to serialize MagicMock
-        self.clear._send_pub = lambda payload: True
+        self.clear._send_pub = lambda payload, minions=None: True
 
         # make sure to return a JID, instead of a mock
         self.clear.mminion.returners = {'.prep_jid': lambda x: 1}
@@ -536,7 +536,7 @@ class AuthACLTestCase(ModuleCase):
         self.addCleanup(delattr, self, 'clear')
 
         # overwrite the _send_pub method so we don't have to serialize MagicMock
-        self.clear._send_pub = lambda payload: True
+        self.clear._send_pub = lambda payload, minions=None: True
 
         # make sure to return a JID, instead of a mock
         self.clear.mminion.returners = {'.prep_jid': lambda x: 1}
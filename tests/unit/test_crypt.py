@@ -3,8 +3,11 @@
 # python libs
 from __future__ import absolute_import
 import os
+import shutil
+import tempfile
 
 # salt testing libs
+from tests.support.paths import TMP
 from tests.support.unit import TestCase, skipIf
 from tests.support.mock import patch, call, mock_open, NO_MOCK, NO_MOCK_REASON, MagicMock
 
@@ -108,5 +111,98 @@ class CryptTestCase(TestCase):
             self.assertEqual(SIG, salt.crypt.sign_message('/keydir/keyname.pem', MSG))
 
     def test_verify_signature(self):
-        with patch('salt.utils.fopen', mock_open(read_data=PUBKEY_DATA)):
+        key = RSA.importKey(PUBKEY_DATA)
+        with patch('salt.crypt._get_rsa_key', return_value=key):
             self.assertTrue(crypt.verify_signature('/keydir/keyname.pub', MSG, SIG))
+
+    def test_get_rsa_key(self):
+        '''
+        Test parsed keys are cached until their file is modified
+        '''
+        tmpdir = tempfile.mkdtemp(dir=TMP)
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'keyname.pub')
+        with salt.utils.fopen(path, 'w') as fp_:
+            fp_.write(PUBKEY_DATA)
+        key = crypt._get_rsa_key(path)
+        with patch('salt.utils.fopen') as fopen:
+            self.assertIs(crypt._get_rsa_key(path), key)
+            self.assertFalse(fopen.called)
+            self.assertTrue(crypt.verify_signature(path, MSG, SIG))
+
+        with salt.utils.fopen(path, 'w') as fp_:
+            fp_.write(PRIVKEY_DATA)
+        self.assertTrue(crypt._get_rsa_key(path).has_private())
+
+    @skipIf(not crypt.HAS_ED25519, 'pycryptodome >= 3.15 is not available')
+    def test_sign_message_ed25519(self):
+        seed = crypt.gen_ed25519_seed()
+        public = crypt.ed25519_public_key(seed)
+        sig = crypt.sign_message_ed25519(seed, MSG)
+        self.assertTrue(crypt.verify_signature_ed25519(public, MSG, sig))
+        self.assertFalse(crypt.verify_signature_ed25519(public, MSG + b'!', sig))
+        other = crypt.ed25519_public_key(crypt.gen_ed25519_seed())
+        self.assertFalse(crypt.verify_signature_ed25519(other, MSG, sig))
+        self.assertFalse(crypt.verify_signature_ed25519(b'garbage', MSG, sig))
+
+    def test_authenticate_busy(self):
+        '''
+        Test the sign in is sent again straight away when the master is busy
+        '''
+        auth = object.__new__(crypt.SAuth)
+        auth.opts = {'acceptance_wait_time': 10,
+                     'acceptance_wait_time_max': 0,
+                     'caller': True}
+        creds = {'aes': crypt.Crypticle.generate_key_string()}
+        sign_in = MagicMock(side_effect=['busy', creds])
+        with patch('salt.transport.client.ReqChannel.factory', MagicMock()), \
+                patch.object(auth, 'sign_in', sign_in), \
+                patch('time.sleep', MagicMock()) as sleep:
+            auth.authenticate()
+        self.assertFalse(sleep.called)
+        self.assertEqual(sign_in.call_count, 2)
+        self.assertEqual(auth.creds, creds)
+
+
+@skipIf(not HAS_PYCRYPTO_RSA, 'pycrypto >= 2.6 is not available')
+class CrypticleTestCase(TestCase):
+
+    def setUp(self):
+        self.key = crypt.Crypticle.generate_key_string()
+        self.data = {'fun': 'cp.push', 'data': 'x' * crypt.Crypticle.GCM_MIN_SIZE}
+
+    @skipIf(not crypt.HAS_GCM, 'pycryptodome >= 3.9 is not available')
+    def test_ciphers(self):
+        cbc = crypt.Crypticle({}, self.key)
+        gcm = crypt.Crypticle({}, self.key, cipher='aes-gcm')
+        self.assertTrue(gcm.dumps(self.data).startswith(crypt.Crypticle.GCM_MAGIC))
+        # Small messages are still encrypted with AES-CBC
+        self.assertEqual(len(gcm.encrypt(MSG)), len(cbc.encrypt(MSG)))
+        # Both kinds of messages are decrypted whatever the cipher
+        for src in (cbc, gcm):
+            for dst in (cbc, gcm):
+                self.assertEqual(dst.loads(src.dumps(self.data)), self.data)
+                self.assertEqual(dst.loads(src.dumps({})), {})
+
+    @skipIf(not crypt.HAS_GCM, 'pycryptodome >= 3.9 is not available')
+    def test_gcm_tampered(self):
+        gcm = crypt.Crypticle({}, self.key, cipher='aes-gcm')
+        data = bytearray(gcm.dumps(self.data))
+        data[-20] ^= 1
+        with self.assertRaises(crypt.AuthenticationError):
+            gcm.loads(bytes(data))
+        other = crypt.Crypticle({}, crypt.Crypticle.generate_key_string(), cipher='aes-gcm')
+        with self.assertRaises(crypt.AuthenticationError):
+            other.loads(gcm.dumps(self.data))
+
+    def test_cbc(self):
+        cbc = crypt.Crypticle({}, self.key)
+        for data in (self.data, {}, {'fun': 'test.ping', 'arg': [1]}):
+            self.assertEqual(cbc.loads(cbc.dumps(data)), data)
+
+    def test_cbc_tampered(self):
+        cbc = crypt.Crypticle({}, self.key)
+        data = bytearray(cbc.dumps(self.data))
+        data[20] ^= 1
+        with self.assertRaises(crypt.AuthenticationError):
+            cbc.loads(bytes(data))
@@ -5,15 +5,29 @@
 
 # Import Python libs
 from __future__ import absolute_import
+import collections
 import errno
+import hashlib
+import os
+import shutil
+import tempfile
+
+# Import 3rd-party libs
+import tornado.gen
 
 # Import Salt Testing libs
-from tests.support.mock import patch, Mock
+from tests.support.mock import patch, Mock, MagicMock
+from tests.support.paths import TMP
 from tests.support.unit import TestCase
 
 # Import Salt libs
+import salt.config
+import salt.utils
+import salt.ext.six as six
+from salt.exceptions import SaltReqTimeoutError
 from salt.ext.six.moves import range
-from salt.fileclient import Client
+from salt.fileclient import BlobCache, Client, RemoteClient
+from salt.utils.async import SyncWrapper
 
 
 class FileclientTestCase(TestCase):
@@ -49,3 +63,261 @@ class FileclientTestCase(TestCase):
                 with self.assertRaises(OSError):
                     with Client(self.opts)._cache_loc('testfile') as c_ref_itr:
                         assert c_ref_itr == '/__test__/files/base/testfile'
+
+
+class FakeReqChannel(object):
+    '''
+    An async request channel serving files in chunks of ``buf_size`` bytes,
+    counting the requests by command and the requests in flight. The
+    requests of the commands in ``timeouts`` time out.
+    '''
+    def __init__(self, files, hsums, buf_size, io_loop=None):
+        self.files = files
+        self.hsums = hsums
+        self.buf_size = buf_size
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = collections.Counter()
+        self.timeouts = set()
+
+    @tornado.gen.coroutine
+    def send(self, load, tries=3, timeout=60, raw=False):
+        self.requests[load['cmd']] += 1
+        if load['cmd'] in self.timeouts:
+            raise SaltReqTimeoutError('Message timed out')
+        if load['cmd'] == '_file_manifest':
+            raise tornado.gen.Return(
+                {'hash_type': 'sha256',
+                 'files': dict((path, [self.hsums[path], 0o100644, len(data)])
+                               for path, data in six.iteritems(self.files)
+                               if path.startswith(load['prefix']))})
+        if load['cmd'] == '_file_hash_and_stat':
+            raise tornado.gen.Return(
+                [{'hsum': self.hsums[load['path']], 'hash_type': 'sha256'},
+                 [0o100644, 1, 1, 1, 0, 0, len(self.files[load['path']]),
+                  1, 1, 1]])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        yield tornado.gen.moment
+        self.in_flight -= 1
+        loc = load['loc']
+        raise tornado.gen.Return(
+            {'data': self.files[load['path']][loc:loc + self.buf_size],
+             'dest': load['path']})
+
+
+class RemoteClientTransferTest(TestCase):
+    '''
+    Test the transfer of files from the master
+    '''
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.dest = os.path.join(self.tmp_dir, 'file.bin')
+        self.files = {'file.bin': os.urandom(10 * 1024 + 100)}
+        for num in range(10):
+            self.files['dir/file{0}'.format(num)] = os.urandom(100 * num)
+        self.files['dir/big'] = os.urandom(3 * 1024)
+        self.hsums = dict((path, hashlib.sha256(data).hexdigest())
+                          for path, data in six.iteritems(self.files))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _client(self, window, blobs=False):
+        opts = salt.config.DEFAULT_MINION_OPTS.copy()
+        opts.update({'cachedir': self.tmp_dir,
+                     'file_transfer_window': window,
+                     'file_blob_cache': blobs})
+        client = RemoteClient.__new__(RemoteClient)
+        Client.__init__(client, opts)
+        client.manifests = {}
+        client.channel = SyncWrapper(
+            FakeReqChannel, (self.files, self.hsums, 1024))
+        client.auth = ''
+        return client
+
+    def _read(self, path):
+        with salt.utils.fopen(path, 'rb') as fp_:
+            return fp_.read()
+
+    def test_get_file(self):
+        '''
+        The chunks are requested one after the other with a window of 1
+        '''
+        client = self._client(1)
+        self.assertEqual(client.get_file('salt://file.bin', self.dest), self.dest)
+        self.assertEqual(self._read(self.dest), self.files['file.bin'])
+        self.assertEqual(client.channel.max_in_flight, 1)
+        self.assertEqual(client.channel.requests['_serve_file'], 12)
+
+    def test_get_file_pipelined(self):
+        '''
+        Up to the window of chunk requests are in flight at once, and none
+        past the end of the file
+        '''
+        client = self._client(4)
+        self.assertEqual(client.get_file('salt://file.bin', self.dest), self.dest)
+        self.assertEqual(self._read(self.dest), self.files['file.bin'])
+        self.assertEqual(client.channel.max_in_flight, 4)
+        self.assertEqual(client.channel.requests['_serve_file'], 12)
+
+    def test_get_file_bad_hash(self):
+        '''
+        A download not matching the hash of the master is attempted 3 times
+        then removed
+        '''
+        client = self._client(4)
+        self.hsums['file.bin'] = '0' * 64
+        self.assertFalse(client.get_file('salt://file.bin', self.dest))
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertEqual(client.channel.requests['_serve_file'], 36)
+
+    def test_cache_dir(self):
+        '''
+        A directory is cached with one manifest request and the requests of
+        the files in flight at once, then only the changed files are fetched
+        again, and the manifest gives the hashes
+        '''
+        client = self._client(4)
+        ret = client.cache_dir('salt://dir')
+        self.assertEqual(len(ret), 11)
+        for path in ret:
+            rel = os.path.relpath(path, os.path.join(self.tmp_dir, 'files', 'base'))
+            self.assertEqual(self._read(path), self.files[rel])
+        requests = client.channel.requests
+        self.assertEqual(requests['_file_manifest'], 1)
+        self.assertNotIn('_file_list', requests)
+        self.assertNotIn('_file_hash_and_stat', requests)
+        # The first chunk of each file, then the 2 next chunks of the big one
+        # and the empty one past its end
+        self.assertEqual(requests['_serve_file'], 14)
+        self.assertEqual(client.channel.max_in_flight, 4)
+
+        self.files['dir/file3'] = b'changed'
+        self.hsums['dir/file3'] = hashlib.sha256(b'changed').hexdigest()
+        requests.clear()
+        self.assertEqual(client.cache_files(['salt://dir/file3', 'salt://dir/file4']),
+                         [os.path.join(self.tmp_dir, 'files', 'base', 'dir', 'file3'),
+                          os.path.join(self.tmp_dir, 'files', 'base', 'dir', 'file4')])
+        self.assertEqual(requests['_file_manifest'], 1)
+        self.assertEqual(requests['_serve_file'], 1)
+        self.assertEqual(client.hash_file('salt://dir/file3'),
+                         {'hsum': self.hsums['dir/file3'], 'hash_type': 'sha256'})
+        self.assertNotIn('_file_hash_and_stat', requests)
+
+        # A top level file is not looked up in a manifest of the saltenv
+        requests.clear()
+        self.assertEqual(client.cache_files(['salt://file.bin']),
+                         [os.path.join(self.tmp_dir, 'files', 'base', 'file.bin')])
+        self.assertNotIn('_file_manifest', requests)
+
+    def test_cache_dir_manifest_timeout(self):
+        '''
+        The files are cached one at a time when the manifest times out
+        '''
+        client = self._client(4)
+        getattr(client.channel, 'async').timeouts.add('_file_manifest')
+        with patch.object(client, 'file_list',
+                          MagicMock(return_value=sorted(self.files))):
+            ret = client.cache_dir('salt://dir')
+        self.assertEqual(len(ret), 11)
+        requests = client.channel.requests
+        self.assertEqual(requests['_file_manifest'], 1)
+        self.assertEqual(requests['_file_hash_and_stat'], 11)
+
+    def test_blob_cache(self):
+        '''
+        A file cached in a saltenv is linked from its blob into another one
+        rather than fetched again
+        '''
+        client = self._client(4, blobs=True)
+        base = client.cache_dir('salt://dir')
+        requests = client.channel.requests
+        requests.clear()
+        self.assertEqual(client.get_file('salt://dir/big?saltenv=dev'),
+                         os.path.join(self.tmp_dir, 'files', 'dev', 'dir', 'big'))
+        self.assertEqual(client.cache_dir('salt://dir', saltenv='prod'),
+                         [path.replace(os.sep + 'base' + os.sep, os.sep + 'prod' + os.sep)
+                          for path in base])
+        self.assertEqual(requests['_serve_file'], 0)
+        # The base, dev and prod entries of dir/big and its blob
+        self.assertEqual(os.path.basename(base[0]), 'big')
+        self.assertEqual(os.stat(base[0]).st_nlink, 4)
+
+        # Fetching a changed file leaves the other saltenvs and the blob as is
+        old = self.files['dir/file3']
+        self.files['dir/file3'] = b'changed'
+        self.hsums['dir/file3'] = hashlib.sha256(b'changed').hexdigest()
+        client.manifests.clear()
+        path = client.cache_file('salt://dir/file3')
+        self.assertEqual(self._read(path), b'changed')
+        self.assertEqual(
+            self._read(os.path.join(self.tmp_dir, 'files', 'prod', 'dir', 'file3')),
+            old)
+
+
+class BlobCacheTest(TestCase):
+    '''
+    Test the store of the cached files by hash
+    '''
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.blobs = BlobCache({'cachedir': self.tmp_dir,
+                                'file_blob_cache_size': 1})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmp_dir, name)
+        with salt.utils.fopen(path, 'wb') as fp_:
+            fp_.write(data)
+        return path, {'hsum': hashlib.sha256(data).hexdigest(),
+                      'hash_type': 'sha256'}
+
+    def test_add_get(self):
+        '''
+        A stored file is linked to other paths, and kept when they are
+        written
+        '''
+        path, hsum = self._write('file', b'data')
+        dest = os.path.join(self.tmp_dir, 'dest')
+        self.assertFalse(self.blobs.get(hsum, dest))
+        self.blobs.add(hsum, path)
+        self.assertTrue(self.blobs.get(hsum, dest))
+        self.assertEqual(os.stat(dest).st_nlink, 3)
+        self.blobs.detach(dest)
+        self.assertFalse(os.path.exists(dest))
+        with salt.utils.fopen(self.blobs.path(hsum), 'rb') as fp_:
+            self.assertEqual(fp_.read(), b'data')
+
+    def test_corrupted(self):
+        '''
+        A blob not matching its hash is removed rather than linked
+        '''
+        path, hsum = self._write('file', b'data')
+        self.blobs.add(hsum, path)
+        os.remove(path)
+        with salt.utils.fopen(self.blobs.path(hsum), 'wb') as fp_:
+            fp_.write(b'changed')
+        self.assertFalse(self.blobs.get(hsum, os.path.join(self.tmp_dir, 'dest')))
+        self.assertFalse(os.path.exists(self.blobs.path(hsum)))
+
+    def test_gc(self):
+        '''
+        The least recently used blobs no cached file links to are removed
+        once they take more than the maximum size
+        '''
+        hsums = []
+        for num in range(3):
+            path, hsum = self._write('file{0}'.format(num), os.urandom(600 * 1024))
+            self.blobs.add(hsum, path)
+            os.utime(self.blobs.path(hsum), (num, num))
+            hsums.append(hsum)
+        # The blob of file0 is the oldest, but file0 still links to it
+        os.remove(os.path.join(self.tmp_dir, 'file1'))
+        os.remove(os.path.join(self.tmp_dir, 'file2'))
+        self.blobs.gc(force=True)
+        self.assertTrue(os.path.exists(self.blobs.path(hsums[0])))
+        self.assertFalse(os.path.exists(self.blobs.path(hsums[1])))
+        self.assertTrue(os.path.exists(self.blobs.path(hsums[2])))
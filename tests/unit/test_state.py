@@ -18,6 +18,8 @@ from tests.support.mixins import AdaptedConfigurationTestCaseMixin
 # Import Salt libs
 import salt.state
 import salt.exceptions
+import salt.template
+import salt.utils
 from salt.utils.odict import OrderedDict, DefaultOrderedDict
 
 
@@ -62,6 +64,190 @@ class StateCompilerTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
             with self.assertRaises(salt.exceptions.SaltRenderError):
                 state_obj.call_high(high_data)
 
+    def test_call_high_requisites(self):
+        '''
+        Test the requisites by ID, name, glob and SLS are resolved from the
+        requisite graph
+        '''
+        with patch('salt.state.State._gather_pillar'):
+            high_data = OrderedDict([
+                ('last', {'test': [{'name': 'last_name'}, 'succeed_without_changes',
+                                   {'require': [{'sls': 'first'}, 'middle']}],
+                          '__sls__': 'last', '__env__': 'base'}),
+                ('middle', {'test': [{'name': 'middle_name'}, 'succeed_with_changes',
+                                     {'require': [{'test': 'first_*'}]}],
+                            '__sls__': 'middle', '__env__': 'base'}),
+                ('first', {'test': [{'name': 'first_name'}, 'succeed_without_changes'],
+                           '__sls__': 'first', '__env__': 'base'}),
+                ('watcher', {'test': [{'name': 'watcher_name'}, 'succeed_without_changes',
+                                      {'watch': [{'test': 'middle_name'}]}],
+                             '__sls__': 'last', '__env__': 'base'}),
+                ('missing', {'test': [{'name': 'missing_name'}, 'succeed_without_changes',
+                                      {'require': [{'file': 'middle_name'}]}],
+                             '__sls__': 'last', '__env__': 'base'})])
+            minion_opts = self.get_temp_config('minion')
+            state_obj = salt.state.State(minion_opts)
+            ret = state_obj.call_high(high_data)
+        order = [item['name'] for item in sorted(
+            [item for item in ret.values() if 'name' in item],
+            key=lambda item: item['__run_num__'])]
+        self.assertLess(order.index('first_name'), order.index('middle_name'))
+        self.assertLess(order.index('middle_name'), order.index('last_name'))
+        watcher = ret['test_|-watcher_|-watcher_name_|-succeed_without_changes']
+        self.assertTrue(watcher['result'])
+        self.assertIn('Watch statement fired', watcher['comment'])
+        missing = ret['test_|-missing_|-missing_name_|-succeed_without_changes']
+        self.assertFalse(missing['result'])
+        self.assertIn('requisites were not found', missing['comment'])
+
+    def _state_workers_high(self):
+        high_data = OrderedDict()
+
+        def test_state(id_, fun, *args):
+            high_data[id_] = {'test': [{'name': id_}, fun] + list(args),
+                              '__sls__': 'workers', '__env__': 'base'}
+
+        test_state('first', 'succeed_with_changes', {'order': 'first'})
+        test_state('last', 'succeed_without_changes', {'order': 'last'})
+        test_state('independent', 'succeed_without_changes')
+        test_state('failing', 'fail_without_changes')
+        test_state('requires_failing', 'succeed_without_changes',
+                   {'require': ['failing']})
+        test_state('onfail', 'succeed_with_changes', {'onfail': ['failing']})
+        test_state('onchanges', 'succeed_without_changes',
+                   {'onchanges': ['first']})
+        test_state('onchanges_unchanged', 'succeed_without_changes',
+                   {'onchanges': ['independent']})
+        test_state('watch', 'succeed_without_changes', {'watch': ['first']})
+        test_state('pre_state', 'succeed_without_changes',
+                   {'prereq': ['prereq_target']})
+        test_state('prereq_target', 'succeed_with_changes')
+        return high_data
+
+    def test_call_high_state_workers(self):
+        '''
+        Test the states run on the worker pool return what they return when
+        they run one after another
+        '''
+        minion_opts = self.get_temp_config('minion')
+        rets = []
+        for workers in (0, 2):
+            minion_opts['state_workers'] = workers
+            with patch('salt.state.State._gather_pillar'):
+                state_obj = salt.state.State(minion_opts)
+                rets.append(state_obj.call_high(self._state_workers_high()))
+        serial, pool = rets
+        self.assertEqual(sorted(serial), sorted(pool))
+        for tag in serial:
+            self.assertEqual((serial[tag]['result'], serial[tag]['comment']),
+                             (pool[tag]['result'], pool[tag]['comment']))
+        run_nums = dict((pool[tag]['__run_num__'], tag) for tag in pool)
+        self.assertEqual(sorted(run_nums), list(range(len(pool))))
+        self.assertEqual(run_nums[0], 'test_|-first_|-first_|-succeed_with_changes')
+        self.assertEqual(run_nums[len(pool) - 1],
+                         'test_|-last_|-last_|-succeed_without_changes')
+
+    def test_call_high_state_workers_order(self):
+        '''
+        Test the states with different numeric orders do not run together
+        '''
+        minion_opts = self.get_temp_config('minion')
+        minion_opts['state_workers'] = 2
+        high_data = OrderedDict([
+            ('third', {'test': [{'name': 'third'}, 'succeed_without_changes',
+                                {'order': 3}],
+                       '__sls__': 'workers', '__env__': 'base'}),
+            ('second', {'module': [{'name': 'test.sleep'}, 'run', {'length': 1},
+                                   {'order': 2}],
+                        '__sls__': 'workers', '__env__': 'base'})])
+        with patch('salt.state.State._gather_pillar'):
+            state_obj = salt.state.State(minion_opts)
+            ret = state_obj.call_high(high_data)
+        self.assertTrue(ret['module_|-second_|-test.sleep_|-run']['result'])
+        self.assertEqual(ret['module_|-second_|-test.sleep_|-run']['__run_num__'], 0)
+        self.assertEqual(ret['test_|-third_|-third_|-succeed_without_changes']['__run_num__'], 1)
+
+    def test_call_high_state_workers_failhard(self):
+        '''
+        Test failhard stops the worker pool from starting more states
+        '''
+        minion_opts = self.get_temp_config('minion')
+        minion_opts['state_workers'] = 2
+        high_data = OrderedDict([
+            ('failing', {'test': [{'name': 'failing'}, 'fail_without_changes',
+                                  {'failhard': True}],
+                         '__sls__': 'workers', '__env__': 'base'}),
+            ('after', {'test': [{'name': 'after'}, 'succeed_without_changes',
+                                {'require': ['failing']}],
+                       '__sls__': 'workers', '__env__': 'base'})])
+        with patch('salt.state.State._gather_pillar'):
+            state_obj = salt.state.State(minion_opts)
+            ret = state_obj.call_high(high_data)
+        self.assertEqual(list(ret), ['test_|-failing_|-failing_|-fail_without_changes'])
+
+    def test_call_high_chunks_cache(self):
+        '''
+        Test the low chunks compiled from the same high data are cached
+        '''
+        minion_opts = self.get_temp_config('minion')
+        minion_opts['state_render_cache'] = True
+        rets = []
+        with patch('salt.state.State._gather_pillar'):
+            state_obj = salt.state.State(minion_opts)
+            with patch.object(state_obj, 'compile_high_data',
+                              wraps=state_obj.compile_high_data) as compile_mock:
+                for _ in range(2):
+                    rets.append(state_obj.call_high(self._state_workers_high()))
+                self.assertEqual(compile_mock.call_count, 1)
+                high_data = self._state_workers_high()
+                high_data['independent']['test'].append({'order': 1})
+                state_obj.call_high(high_data)
+                self.assertEqual(compile_mock.call_count, 2)
+        first, second = [sorted(ret, key=lambda tag: ret[tag]['__run_num__'])
+                         for ret in rets]
+        self.assertEqual(first, second)
+
+
+class RequisiteGraphTestCase(TestCase):
+    '''
+    TestCase for the index of the requisites of a state run
+    '''
+    def setUp(self):
+        self.chunks = [
+            {'state': 'pkg', '__id__': 'apache', 'name': 'httpd', '__sls__': 'web'},
+            {'state': 'file', '__id__': 'conf', 'name': '/etc/httpd.conf', '__sls__': 'web.conf'},
+            {'state': 'service', '__id__': 'httpd', 'name': 'httpd', '__sls__': 'web'},
+            {'state': 'file', '__id__': 'motd', 'name': '/etc/motd', '__sls__': 'base'},
+        ]
+        self.graph = salt.state.RequisiteGraph(self.chunks)
+
+    def test_find_exact(self):
+        self.assertEqual(self.graph.find({'id': 'httpd'}),
+                         [self.chunks[0], self.chunks[2]])
+        self.assertEqual(self.graph.find({'service': 'httpd'}), [self.chunks[2]])
+        self.assertEqual(self.graph.find({'file': '/etc/motd'}), [self.chunks[3]])
+        self.assertEqual(self.graph.find({'pkg': '/etc/motd'}), [])
+        self.assertEqual(self.graph.find({'sls': 'web'}),
+                         [self.chunks[0], self.chunks[2]])
+        self.assertEqual(self.graph.find({'id': None}), [])
+
+    def test_find_glob(self):
+        self.assertEqual(self.graph.find({'file': '/etc/*'}),
+                         [self.chunks[1], self.chunks[3]])
+        self.assertEqual(self.graph.find({'sls': 'web*'}), self.chunks[:3])
+        self.assertEqual(self.graph.find({'id': 'ht?pd'}),
+                         [self.chunks[0], self.chunks[2]])
+
+    def test_find_invalid(self):
+        with self.assertRaises(TypeError):
+            self.graph.find({'id': OrderedDict([('test1', 'test')])})
+
+    def test_current(self):
+        self.assertTrue(self.graph.current(self.chunks))
+        self.assertFalse(self.graph.current(list(self.chunks)))
+        self.chunks.pop()
+        self.assertFalse(self.graph.current(self.chunks))
+
 
 class HighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
     def setUp(self):
@@ -138,6 +324,59 @@ class HighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
         self.assertEqual(state_usage_dict['base']['used'], ['state.a', 'state.b'])
         self.assertEqual(state_usage_dict['base']['unused'], ['state.c'])
 
+    def test_render_state_cache(self):
+        '''
+        Test a state file is rendered again only when it, the templates it
+        includes, or the grains or pillar keys it read change
+        '''
+        state_tree = self.config['file_roots']['base'][0]
+
+        def write(name, contents):
+            with salt.utils.fopen(os.path.join(state_tree, name), 'w') as fp_:
+                fp_.write(contents)
+
+        write('map.jinja', "{% set pkg = 'vim' %}")
+        write('cached.sls', (
+            "{% from 'map.jinja' import pkg %}\n"
+            "cached:\n"
+            "  test.succeed_without_changes:\n"
+            "    - name: {{ grains['cache_grain'] }}-{{ pillar.get('role') }}-"
+            "{{ salt['pillar.get']('tier:name', 'dev') }}-{{ pkg }}\n"))
+        write('volatile.sls', (
+            "volatile:\n"
+            "  test.succeed_without_changes:\n"
+            "    - name: {{ salt['test.echo']('volatile') }}\n"))
+        self.highstate.opts['state_render_cache'] = True
+        self.highstate.state.opts['grains']['cache_grain'] = 'grain'
+        pillar = self.highstate.state.opts['pillar']
+        pillar['role'] = 'web'
+
+        def render(sls):
+            high, errors = self.highstate.render_state(sls, 'base', set(), {})
+            self.assertEqual(errors, [])
+            return high[sls]['test'][0]['name']
+
+        with patch('salt.utils.rendercache.compile_template',
+                   wraps=salt.template.compile_template) as compile_mock:
+            self.assertEqual(render('cached'), 'grain-web-dev-vim')
+            self.assertEqual(render('cached'), 'grain-web-dev-vim')
+            self.assertEqual(compile_mock.call_count, 1)
+            pillar['unrelated'] = True
+            self.assertEqual(render('cached'), 'grain-web-dev-vim')
+            self.assertEqual(compile_mock.call_count, 1)
+            pillar['role'] = 'db'
+            self.assertEqual(render('cached'), 'grain-db-dev-vim')
+            self.assertEqual(compile_mock.call_count, 2)
+            pillar['tier'] = {'name': 'prod'}
+            self.assertEqual(render('cached'), 'grain-db-prod-vim')
+            self.assertEqual(compile_mock.call_count, 3)
+            write('map.jinja', "{% set pkg = 'emacs' %}")
+            self.assertEqual(render('cached'), 'grain-db-prod-emacs')
+            self.assertEqual(compile_mock.call_count, 4)
+            for _ in range(2):
+                self.assertEqual(render('volatile'), 'volatile')
+            self.assertEqual(compile_mock.call_count, 6)
+
 
 class TopFileMergeTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
     '''
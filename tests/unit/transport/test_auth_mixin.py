@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+'''
+Unit tests for the authentication of the minions by the master workers
+'''
+
+# Import python libs
+from __future__ import absolute_import
+import ctypes
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Import 3rd-party libs
+try:
+    from Cryptodome.Cipher import PKCS1_OAEP
+    from Cryptodome.PublicKey import RSA
+except ImportError:
+    from Crypto.Cipher import PKCS1_OAEP
+    from Crypto.PublicKey import RSA
+
+# Import Salt libs
+import salt.config
+import salt.crypt
+import salt.master
+import salt.ext.six as six
+import salt.utils
+from salt.transport.mixins.auth import AESReqServerMixin
+
+# Import Salt Testing libs
+from tests.support.paths import TMP
+from tests.support.unit import TestCase
+from tests.support.mock import MagicMock, patch
+
+
+class AuthServer(AESReqServerMixin):
+    def __init__(self, opts):
+        self.opts = opts
+
+
+class AESReqServerMixinAuthTest(TestCase):
+    '''
+    Test the authentication of the minions by a master worker
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls.minion_key = RSA.generate(2048)
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(dir=TMP)
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+        self.opts.update({'pki_dir': self.tmpdir,
+                          'cachedir': self.tmpdir,
+                          'sock_dir': self.tmpdir,
+                          'user': salt.utils.get_user()})
+        for subdir in ('minions', 'minions_pre', 'minions_rejected', 'minions_denied'):
+            os.makedirs(os.path.join(self.tmpdir, subdir))
+        self.pub = salt.utils.to_str(self.minion_key.publickey().exportKey())
+        with salt.utils.fopen(os.path.join(self.tmpdir, 'minions', 'minion'), 'w') as fp_:
+            fp_.write(self.pub)
+        self.secret = multiprocessing.Array(
+            ctypes.c_char, six.b(salt.crypt.Crypticle.generate_key_string()))
+        patcher = patch.dict(salt.master.SMaster.secrets, {'aes': {'secret': self.secret}})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.load = {'cmd': '_auth', 'id': 'minion', 'pub': self.pub}
+
+    def _server(self):
+        server = AuthServer(self.opts)
+        server.pre_fork(None)
+        with patch('salt.utils.event.get_master_event', MagicMock()):
+            server.post_fork(None, None)
+        return server
+
+    def _aes(self, ret):
+        return PKCS1_OAEP.new(self.minion_key).decrypt(ret['aes'])
+
+    def test_auth_cache(self):
+        '''
+        Test the AES key encrypted for a minion is reused until it is rotated
+        '''
+        server = self._server()
+        first = server._auth(self.load)
+        self.assertEqual(self._aes(first), self.secret.value)
+        with patch.object(RSA, 'importKey') as import_key:
+            second = server._auth(self.load)
+        self.assertFalse(import_key.called)
+        self.assertEqual(second['aes'], first['aes'])
+        self.assertEqual(second['sig'], first['sig'])
+
+        self.secret.value = six.b(salt.crypt.Crypticle.generate_key_string())
+        third = server._auth(self.load)
+        self.assertNotEqual(third['sig'], first['sig'])
+        self.assertEqual(self._aes(third), self.secret.value)
+
+    def test_auth_queue(self):
+        '''
+        Test minions are told to retry when auth_queue_size requests are in
+        progress
+        '''
+        self.opts['auth_queue_size'] = 1
+        server = self._server()
+        server.auth_slots.acquire()
+        self.assertEqual(server._auth(self.load),
+                         {'enc': 'clear',
+                          'load': {'ret': 'retry',
+                                   'retry_after': self.opts['auth_retry_after']}})
+        server.auth_slots.release()
+        self.assertEqual(server._auth(self.load)['enc'], 'pub')
+        # The slot was handed back
+        self.assertTrue(server.auth_slots.acquire(False))
+
+    def test_auth_session_cipher(self):
+        '''
+        Test minions are told the session cipher when they support it
+        '''
+        self.opts['session_cipher'] = 'aes-gcm'
+        server = self._server()
+        self.assertNotIn('cipher', server._auth(self.load))
+        self.load['ciphers'] = ['aes-gcm']
+        self.assertEqual(server._auth(self.load)['cipher'], 'aes-gcm')
@@ -151,3 +151,51 @@ class IPCMessageClient(BaseIPCReqCase):
         self.channel.send({'stop': True})
         self.wait()
         self.assertEqual(self.payloads[:-1], [None, None, 'foo', 'foo'])
+
+
+class IPCMessagePubSubCase(tornado.testing.AsyncTestCase):
+    '''
+    Test the publisher/subscriber pair
+    '''
+    def setUp(self):
+        super(IPCMessagePubSubCase, self).setUp()
+        self.socket_path = os.path.join(TMP, 'ipc_pubsub_test.ipc')
+        self.pub_channel = salt.transport.ipc.IPCMessagePublisher(
+            {'ipc_write_buffer': 0},
+            self.socket_path,
+            io_loop=self.io_loop,
+        )
+        self.pub_channel.start()
+        self.sub_channel = salt.transport.ipc.IPCMessageSubscriber(
+            socket_path=self.socket_path,
+            io_loop=self.io_loop,
+        )
+
+    def tearDown(self):
+        self.sub_channel.close()
+        self.pub_channel.close()
+        os.unlink(self.socket_path)
+        super(IPCMessagePubSubCase, self).tearDown()
+
+    @tornado.gen.coroutine
+    def _wait_tag_filters(self, count):
+        while len(self.pub_channel.tag_filters) != count:
+            yield tornado.gen.sleep(0.01)
+
+    @tornado.testing.gen_test
+    def test_tag_filter(self):
+        yield self.sub_channel.set_tag_filter(['salt/job/'])
+        yield self.sub_channel.connect()
+        yield self._wait_tag_filters(1)
+        for tag in ('salt/auth', 'salt/job/1/ret/minion'):
+            tag = salt.utils.to_bytes(tag)
+            self.pub_channel.publish(tag, tag=tag)
+        ret = yield self.sub_channel.read(timeout=5)
+        self.assertEqual(ret, salt.utils.to_bytes('salt/job/1/ret/minion'))
+
+        yield self.sub_channel.set_tag_filter(None)
+        yield self._wait_tag_filters(0)
+        tag = salt.utils.to_bytes('salt/auth')
+        self.pub_channel.publish(tag, tag=tag)
+        ret = yield self.sub_channel.read(timeout=5)
+        self.assertEqual(ret, tag)
@@ -7,7 +7,11 @@
 from __future__ import absolute_import
 import os
 import time
+import ctypes
+import shutil
+import tempfile
 import threading
+import multiprocessing
 
 # linux_distribution deprecated in py3.7
 try:
@@ -25,16 +29,20 @@ import tornado.gen
 
 # Import Salt libs
 import salt.config
+import salt.crypt
+import salt.master
+import salt.payload
 import salt.ext.six as six
 import salt.utils
 import salt.transport.server
 import salt.transport.client
+import salt.transport.frame
 import salt.exceptions
 from salt.ext.six.moves import range
 from salt.transport.zeromq import AsyncReqMessageClientPool
 
 # Import test support libs
-from tests.support.paths import TMP_CONF_DIR
+from tests.support.paths import TMP, TMP_CONF_DIR
 from tests.support.unit import TestCase, skipIf
 from tests.support.helpers import flaky, get_unused_localhost_port
 from tests.support.mixins import AdaptedConfigurationTestCaseMixin
@@ -305,3 +313,133 @@ class AsyncReqMessageClientPoolTest(TestCase):
     def test_destroy(self):
         self.message_client_pool.destroy()
         self.assertEqual([], self.message_client_pool.message_clients)
+
+
+class ZeroMQPubServerChannelPublishTest(TestCase):
+    '''
+    Test the publications handed by a worker to the publisher daemon
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(dir=TMP)
+        self.opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+        self.opts.update({'sock_dir': self.tmpdir,
+                          'cachedir': self.tmpdir,
+                          'ipc_mode': 'ipc',
+                          'sign_pub_messages': False})
+        self.context = zmq.Context()
+        self.pull_sock = self.context.socket(zmq.PULL)
+        self.pull_sock.bind('ipc://{0}'.format(os.path.join(self.tmpdir, 'publish_pull.ipc')))
+        self.secret = multiprocessing.Array(
+            ctypes.c_char, six.b(salt.crypt.Crypticle.generate_key_string()))
+        patcher = patch.dict(salt.master.SMaster.secrets, {'aes': {'secret': self.secret}})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.channel = salt.transport.server.PubServerChannel.factory(self.opts)
+        self.load = {'fun': 'test.ping', 'arg': [], 'tgt': '*', 'tgt_type': 'glob', 'jid': '1'}
+
+    def tearDown(self):
+        self.channel.pub_close()
+        self.pull_sock.close(0)
+        self.context.term()
+        shutil.rmtree(self.tmpdir)
+
+    def _recv(self):
+        '''
+        Return the packages of the next message received by the daemon
+        '''
+        self.assertTrue(self.pull_sock.poll(5000))
+        # Decoded as the publish daemon does
+        return [salt.transport.frame.decode_embedded_strs(salt.payload.unpackage(part))
+                for part in self.pull_sock.recv_multipart()]
+
+    def test_publish(self):
+        '''
+        Test the connection and the cipher are kept across publications
+        '''
+        self.channel.publish(self.load)
+        sock = self.channel.pub_sock
+        crypticle = self.channel._get_crypticle()
+        self.channel.publish(self.load)
+        self.assertEqual(len(self._recv()), 1)
+        self.assertEqual(len(self._recv()), 1)
+        self.assertIs(self.channel.pub_sock, sock)
+        self.assertIs(self.channel._get_crypticle(), crypticle)
+
+        # A new AES key gets a new cipher
+        self.secret.value = six.b(salt.crypt.Crypticle.generate_key_string())
+        self.assertIsNot(self.channel._get_crypticle(), crypticle)
+
+    def test_publish_batch(self):
+        '''
+        Test publications are handed over together when batching is enabled
+        '''
+        self.opts['zmq_pub_batch_window'] = 60.0
+        self.opts['zmq_pub_batch_size'] = 2
+        io_loop = zmq.eventloop.ioloop.ZMQIOLoop()
+        io_loop.make_current()
+        try:
+            for _ in range(3):
+                self.channel.publish(self.load)
+            self.assertEqual(len(self._recv()), 2)
+            self.assertFalse(self.pull_sock.poll(100))
+            self.channel.flush()
+            self.assertEqual(len(self._recv()), 1)
+        finally:
+            io_loop.clear_current()
+            io_loop.close(all_fds=True)
+
+    @skipIf(not salt.crypt.HAS_ED25519, 'pycryptodome >= 3.15 is not available')
+    def test_publish_sign_ed25519(self):
+        '''
+        Test publications are signed with the Ed25519 key of the master
+        '''
+        seed = salt.crypt.gen_ed25519_seed()
+        self.opts.update({'sign_pub_messages': True,
+                          'pub_sign_algorithm': 'ed25519'})
+        secret = multiprocessing.Array(ctypes.c_char, six.b(seed))
+        with patch.dict(salt.master.SMaster.secrets, {'pub_sign': {'secret': secret}}):
+            self.channel.publish(self.load)
+        payload = salt.payload.Serial(self.opts).loads(self._recv()[0]['payload'])
+        self.assertEqual(payload['sig_alg'], 'ed25519')
+        self.assertTrue(salt.crypt.verify_signature_ed25519(
+            salt.crypt.ed25519_public_key(seed), payload['load'], payload['sig']))
+
+    def test_publish_targets(self):
+        '''
+        Test the minions are sent the jobs targeting them with zmq_filtering
+        '''
+        self.opts['zmq_filtering'] = True
+        self.load['tgt_type'] = 'grain'
+        self.load['tgt'] = 'role:web'
+        # Targets resolved with the minion data cache are not routed by default
+        self.channel.publish(self.load, minions=['web1', 'web2'])
+        self.assertNotIn('topic_lst', self._recv()[0])
+
+        self.opts['pub_route_target_types'] = ['glob', 'pcre', 'list', 'grain']
+        self.channel.publish(self.load, minions=['web1', 'web2'])
+        self.assertEqual(self._recv()[0]['topic_lst'], ['web1', 'web2'])
+
+        # The target is resolved again when the master did not
+        with patch('salt.utils.minions.CkMinions.check_minions',
+                   MagicMock(return_value=['web3'])) as check_minions:
+            self.channel.publish(self.load)
+        self.assertEqual(self._recv()[0]['topic_lst'], ['web3'])
+        check_minions.assert_called_once_with('role:web', 'grain', ':')
+
+        # Broadcast when the target resolves to too many minions, or
+        # to none, or when the target type is not routed
+        self.opts['pub_route_max_minions'] = 1
+        self.channel.publish(self.load, minions=['web1', 'web2'])
+        self.assertNotIn('topic_lst', self._recv()[0])
+        self.channel.publish(self.load, minions=[])
+        self.assertNotIn('topic_lst', self._recv()[0])
+        self.opts['pub_route_max_minions'] = 0
+        self.opts['pub_route_target_types'] = ['glob']
+        self.channel.publish(self.load, minions=['web1'])
+        self.assertNotIn('topic_lst', self._recv()[0])
+
+        # The minions of syndics are unknown to the master
+        self.opts['pub_route_target_types'] = ['grain']
+        self.opts['order_masters'] = True
+        self.channel.publish(self.load, minions=['web1'])
+        self.assertNotIn('topic_lst', self._recv()[0])
@@ -12,7 +12,8 @@ from __future__ import absolute_import
 import os
 import hashlib
 import time
-from tornado.testing import AsyncTestCase
+import tornado.gen
+from tornado.testing import AsyncTestCase, gen_test
 import zmq
 import zmq.eventloop.ioloop
 # support pyzmq 13.0.x, TODO: remove once we force people to 14.0.x
@@ -291,6 +292,18 @@ class TestSaltEvent(TestCase):
             evt2 = me2.get_event(tag='evt1')
             self.assertGotEvent(evt2, {'data': 'foo1'})
 
+    def test_event_tag_filter(self):
+        '''Test the events filtered by the publisher are not received'''
+        with eventpublisher_process():
+            me = event.MasterEvent(SOCK_DIR, listen=True)
+            me.set_tag_filter(['evt2'])
+            # Give the publisher the time to read the filter
+            time.sleep(0.5)
+            me.fire_event({'data': 'foo1'}, 'evt1')
+            me.fire_event({'data': 'foo2'}, 'evt2')
+            evt = me.get_event(tag='')
+            self.assertGotEvent(evt, {'data': 'foo2'})
+
     @expectedFailure
     def test_event_nested_sub_all(self):
         '''Test nested event subscriptions do not drop events, get event for all tags'''
@@ -365,3 +378,55 @@ class TestAsyncEventPublisher(AsyncTestCase):
         self.assertEqual(self.tag, 'evt1')
         self.data.pop('_stamp')  # drop the stamp
         self.assertEqual(self.data, {'data': 'foo1'})
+
+
+class TestAsyncEventReader(AsyncTestCase):
+    def get_new_ioloop(self):
+        return zmq.eventloop.ioloop.ZMQIOLoop()
+
+    def setUp(self):
+        super(TestAsyncEventReader, self).setUp()
+        self.opts = {'sock_dir': SOCK_DIR}
+        self.publisher = event.AsyncEventPublisher(
+            self.opts,
+            self.io_loop,
+        )
+        self.event = event.get_event('minion', opts=self.opts, io_loop=self.io_loop)
+
+    def tearDown(self):
+        self.event.destroy()
+        self.publisher.close()
+        super(TestAsyncEventReader, self).tearDown()
+
+    @tornado.gen.coroutine
+    def _connect(self):
+        self.event.connect_pub()
+        yield self.event.subscriber.connect()
+        # Give the publisher the time to accept the connection
+        yield tornado.gen.sleep(0.1)
+
+    @gen_test
+    def test_get_event_async(self):
+        '''Test events are read by the coroutine API'''
+        yield self._connect()
+        self.event.subscribe('evt1')
+        self.event.fire_event({'data': 'foo1'}, 'evt1')
+        self.event.fire_event({'data': 'foo2'}, 'evt2')
+        evt2 = yield self.event.get_event_async(tag='evt2')
+        self.assertEqual(evt2['data'], 'foo2')
+        evt1 = yield self.event.get_event_async(tag='evt1', full=True)
+        self.assertEqual(evt1['tag'], 'evt1')
+        self.assertEqual(evt1['data']['data'], 'foo1')
+        evt3 = yield self.event.get_event_async(tag='evt3', wait=0.2)
+        self.assertIsNone(evt3)
+
+    @gen_test
+    def test_get_event_async_tag_filter(self):
+        '''Test the events filtered by the publisher are not received'''
+        yield self._connect()
+        self.event.set_tag_filter(['evt2'])
+        yield tornado.gen.sleep(0.1)
+        self.event.fire_event({'data': 'foo1'}, 'evt1')
+        self.event.fire_event({'data': 'foo2'}, 'evt2')
+        evt = yield self.event.get_event_async(tag='')
+        self.assertEqual(evt['data'], 'foo2')
@@ -2,12 +2,19 @@
 
 # Import python libs
 from __future__ import absolute_import
+import os
+import shutil
+import tempfile
 
 # Import Salt Libs
+import salt.utils
+import salt.utils.inotify
 from salt.utils import minions
 
 # Import Salt Testing Libs
+from tests.support.paths import TMP
 from tests.support.unit import TestCase
+from tests.support.mock import MagicMock, patch
 
 NODEGROUPS = {
     'group1': 'L@host1,host2,host3',
@@ -36,3 +43,245 @@ class MinionsTestCase(TestCase):
             expected = EXPECTED[nodegroup]
             ret = minions.nodegroup_comp(nodegroup, NODEGROUPS)
             self.assertEqual(ret, expected)
+
+
+MINION_DATA = {
+    'web1': {'grains': {'os': 'Ubuntu',
+                        'roles': ['web', 'db'],
+                        'ip_interfaces': {'eth0': ['10.0.0.1']},
+                        'disks': [{'name': 'sda'}]},
+             'pillar': {'site': {'dc': 'ams'}}},
+    'web2': {'grains': {'os': 'CentOS',
+                        'roles': ['web'],
+                        'ip_interfaces': {'eth0': ['10.0.0.2'], 'lo': []},
+                        'disks': [{'name': 'sdb'}]},
+             'pillar': {'site': {'dc': 'fra'}, 'long': 'x' * 1024}},
+    'db1': {'grains': {'os': 'Ubuntu',
+                       'osrelease': 16.04,
+                       'roles': 'db'},
+            'pillar': {}},
+}
+
+EXPRESSIONS = [
+    ('grains', 'os:Ubuntu'),
+    ('grains', 'os:ubu*'),
+    ('grains', 'roles:web'),
+    ('grains', 'roles:0:web'),
+    ('grains', 'osrelease:16.04'),
+    ('grains', 'ip_interfaces:eth0:10.0.0.*'),
+    ('grains', 'ip_interfaces:lo'),
+    ('grains', 'ip_interfaces:*'),
+    ('grains', 'ip_interfaces:*:10.0.0.2'),
+    ('grains', 'disks:name:sdb'),
+    ('grains', 'missing:value'),
+    ('pillar', 'site:dc:ams'),
+    ('pillar', 'long:x*'),
+]
+
+
+class MinionDataIndexTestCase(TestCase):
+    '''
+    TestCase for salt.utils.minions.MinionDataIndex
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(dir=TMP)
+        self.opts = {'cachedir': self.cachedir}
+        self.cache = MagicMock()
+        self.cache.list_with_data.side_effect = lambda bank, key: dict(MINION_DATA)
+        self.index = minions.MinionDataIndex(self.opts, cache=self.cache)
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+
+    def _match(self, index, search_type, expr, **kwargs):
+        matched, scan = index.lookup(search_type, expr, **kwargs)
+        for id_ in scan:
+            if salt.utils.subdict_match(MINION_DATA[id_][search_type],
+                                        expr,
+                                        **kwargs):
+                matched.add(id_)
+        return matched
+
+    def test_lookup_matches_subdict_match(self):
+        '''
+        Test that the index agrees with subdict_match
+        '''
+        for search_type, expr in EXPRESSIONS:
+            expected = set(
+                id_ for id_, data in MINION_DATA.items()
+                if salt.utils.subdict_match(data[search_type], expr)
+            )
+            self.assertEqual(self._match(self.index, search_type, expr),
+                             expected,
+                             '{0}: {1}'.format(search_type, expr))
+
+    def test_lookup_pcre_and_exact(self):
+        '''
+        Test regex and exact matching against the index
+        '''
+        self.assertEqual(
+            self._match(self.index, 'grains', 'os:(ubuntu|centos)',
+                        regex_match=True),
+            set(['web1', 'web2', 'db1']))
+        self.assertEqual(
+            self._match(self.index, 'grains', 'os:Ubu*', exact_match=True),
+            set())
+
+    def test_leaf_lookup_does_not_scan(self):
+        '''
+        Test that plain key:value targets are answered from the index alone
+        '''
+        matched, scan = self.index.lookup('grains', 'os:Ubuntu')
+        self.assertEqual(matched, set(['web1', 'db1']))
+        self.assertEqual(scan, set())
+
+    def test_journal_is_shared(self):
+        '''
+        Test that updates are replayed by other index instances
+        '''
+        self.index.indexed()
+        self.cache.list_with_data.side_effect = lambda bank, key: {}
+        self.index.update('web3', {'grains': {'os': 'Ubuntu'}})
+        self.index.remove('db1')
+        other = minions.MinionDataIndex(self.opts, cache=self.cache)
+        self.assertEqual(other.indexed(), set(['web1', 'web2', 'web3']))
+        self.assertEqual(other.lookup('grains', 'os:Ubuntu')[0],
+                         set(['web1', 'web3']))
+        self.index.update('web3', {'grains': {'os': 'Debian'}})
+        self.assertEqual(other.lookup('grains', 'os:Ubuntu')[0],
+                         set(['web1']))
+
+    def test_compaction(self):
+        '''
+        Test that compacting the journal keeps the indexed data
+        '''
+        self.index.COMPACT_SLACK = 0
+        other = minions.MinionDataIndex(self.opts, cache=self.cache)
+        other.indexed()
+        for release in range(10):
+            self.index.update('db1', {'grains': {'osrelease': release}})
+        self.assertTrue(self.index._records <= 2 * len(self.index.minions))
+        self.assertEqual(other.lookup('grains', 'osrelease:9')[0],
+                         set(['db1']))
+        self.assertEqual(other.indexed(), set(['web1', 'web2', 'db1']))
+
+
+class CompoundTestCase(TestCase):
+    '''
+    TestCase for the compiled compound matcher
+    '''
+    accepted = ['web1', 'web2', 'db1', 'db2']
+
+    def setUp(self):
+        self.ckminions = minions.CkMinions.__new__(minions.CkMinions)
+        self.ckminions.opts = {'minion_data_cache': True}
+        self.ckminions._pinned_minions = None
+        self.ckminions._pki_minions = MagicMock(return_value=self.accepted)
+        self.ckminions._check_grain_minions = MagicMock(
+            return_value=['web1', 'db1'])
+
+    def _check(self, expr):
+        return sorted(self.ckminions._check_compound_minions(expr, ':', True))
+
+    def test_compile_compound(self):
+        '''
+        Test the precedence of the compound operators
+        '''
+        self.assertEqual(
+            minions.compile_compound('web* or G@os:Ubuntu and not db1'),
+            ('or', (('term', None, 'web*', None, 'web*'),
+                    ('and', (('term', 'G', 'os:Ubuntu', None, 'G@os:Ubuntu'),
+                             ('not', ('term', None, 'db1', None, 'db1')))))))
+        self.assertEqual(minions.compile_compound(['web*']),
+                         ('term', None, 'web*', None, 'web*'))
+
+    def test_compile_compound_invalid(self):
+        '''
+        Test that invalid compound targets do not compile
+        '''
+        for expr in ('', 'and web*', '( or web*', 'web* db*', 'web* )',
+                     'N@group1', 'web* and'):
+            self.assertIs(minions.compile_compound(expr), None, expr)
+            self.assertEqual(self._check(expr), [])
+
+    def test_check_compound_minions(self):
+        '''
+        Test evaluating compound targets against the accepted minions
+        '''
+        self.assertEqual(self._check('G@os:Ubuntu and web*'), ['web1'])
+        self.assertEqual(self._check('G@os:Ubuntu not web*'), ['db1'])
+        self.assertEqual(self._check('not G@os:Ubuntu'), ['db2', 'web2'])
+        self.assertEqual(self._check('( web* or L@db2 and G@os:Ubuntu'),
+                         ['web1', 'web2'])
+
+    def test_check_compound_minions_repeated_terms(self):
+        '''
+        Test that terms repeated in a compound target are matched once
+        '''
+        self.assertEqual(self._check('G@os:Ubuntu or G@os:Ubuntu'),
+                         ['db1', 'web1'])
+        self.assertEqual(self.ckminions._check_grain_minions.call_count, 1)
+
+
+class AcceptedKeysTestCase(TestCase):
+    '''
+    TestCase for salt.utils.minions.AcceptedKeys
+    '''
+    def setUp(self):
+        self.pki_dir = tempfile.mkdtemp(dir=TMP)
+        self.keydir = os.path.join(self.pki_dir, 'minions')
+        os.makedirs(self.keydir)
+        for id_ in ('web2', 'web1', '.hidden'):
+            self._add_key(id_)
+        self.opts = {'pki_dir': self.pki_dir, 'key_cache': ''}
+
+    def tearDown(self):
+        shutil.rmtree(self.pki_dir)
+
+    def _add_key(self, id_):
+        with salt.utils.fopen(os.path.join(self.keydir, id_), 'w') as fp_:
+            fp_.write('key')
+
+    def test_minions(self):
+        '''
+        Test that the listing follows changes of the key directory
+        '''
+        for has_pyinotify in (True, False):
+            with patch('salt.utils.inotify.HAS_PYINOTIFY',
+                       has_pyinotify and salt.utils.inotify.HAS_PYINOTIFY):
+                keys = minions.AcceptedKeys(self.opts)
+                self.assertEqual(keys.minions(), ['web1', 'web2'])
+                generation = keys.generation
+                self._add_key('db1')
+                self.assertEqual(keys.minions(), ['db1', 'web1', 'web2'])
+                self.assertEqual(keys.generation, generation + 1)
+                os.remove(os.path.join(self.keydir, 'db1'))
+                self.assertEqual(keys.minions(), ['web1', 'web2'])
+                keys._tracker.stop()
+
+    def test_minions_unchanged(self):
+        '''
+        Test that an unchanged key directory is not listed again
+        '''
+        keys = minions.AcceptedKeys(self.opts)
+        keys.minions()
+        # Pretend the listing happened long after the last change
+        keys._stat = keys._stat_sig(self.keydir)
+        with patch('os.listdir', MagicMock(side_effect=OSError)):
+            self.assertEqual(keys.minions(), ['web1', 'web2'])
+        keys._tracker.stop()
+
+    def test_key_cache(self):
+        '''
+        Test that the key cache file is only written when the keys changed
+        '''
+        self.opts['key_cache'] = 'sched'
+        keys = minions.AcceptedKeys(self.opts)
+        self.assertTrue(keys.write_key_cache())
+        self.assertFalse(keys.write_key_cache())
+        self.assertEqual(minions.AcceptedKeys(self.opts).minions(),
+                         ['web1', 'web2'])
+        self._add_key('db1')
+        self.assertTrue(keys.write_key_cache())
+        self.assertEqual(minions.AcceptedKeys(self.opts).minions(),
+                         ['db1', 'web1', 'web2'])